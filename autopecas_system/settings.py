@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -95,6 +96,40 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# AUTOPECAS_CACHE: 'memoria' (padrão, por processo), 'arquivo' (compartilhado
+# entre processos na mesma máquina) ou 'redis' (AUTOPECAS_REDIS_URL)
+
+CACHE_TIPO = os.environ.get('AUTOPECAS_CACHE', 'memoria')
+
+if CACHE_TIPO == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('AUTOPECAS_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'autopecas',
+        }
+    }
+elif CACHE_TIPO == 'arquivo':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('AUTOPECAS_CACHE_DIR', BASE_DIR / 'cache'),
+            'KEY_PREFIX': 'autopecas',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'autopecas',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -158,3 +193,26 @@ REST_FRAMEWORK = {
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Indicadores dos dashboards (segundos em cache, ver core/indicadores.py)
+INDICADORES_CACHE_TTL = 60
+
+# Séries dos gráficos financeiros (segundos em cache, ver financeiro/series.py)
+FINANCEIRO_SERIES_TTL = 300
+
+# Árvore de categorias/montadoras dos filtros (ver estoque/taxonomia.py).
+# No cache em memória cada processo tem a sua cópia e não vê a invalidação
+# dos outros: o TTL curto limita o tempo com a árvore antiga após uma edição
+ESTOQUE_TAXONOMIA_TTL = 60 * 60 * 24 if CACHE_TIPO != 'memoria' else 5 * 60
+
+# Texto extraído dos PDFs de pedido (ver compras/utils/pdf_parser.py):
+# diretório do cache em disco e processos usados na extração das páginas
+# na importação pela tela. 1 = na própria requisição, sem abrir processos
+# a partir do servidor; o benchmark_pdf_pedido usa --workers
+COMPRAS_PDF_CACHE_DIR = os.environ.get('AUTOPECAS_PDF_CACHE_DIR', BASE_DIR / 'cache' / 'pdf_pedidos')
+COMPRAS_PDF_WORKERS = int(os.environ.get('AUTOPECAS_PDF_WORKERS', 1))
+
+# Varredura de contas vencidas (ver financeiro/vencimentos.py): intervalo em
+# segundos do agendador dentro do servidor; 0 desliga (use então o comando
+# varrer_vencimentos no cron/Agendador de Tarefas)
+FINANCEIRO_VARREDURA_INTERVALO = int(os.environ.get('AUTOPECAS_VARREDURA_VENCIMENTOS', 60 * 60))
@@ -103,6 +103,7 @@ urlpatterns = [
     # APIs de Busca
     # path('api/buscar-produtos/', core_views.buscar_produtos_rapido, name='buscar_produtos_rapido'),
     path('api/pdv/buscar-produtos/', core_views.api_buscar_produtos_pdv, name='api_buscar_produtos_pdv'),
+    path('api/pdv/escanear/', core_views.api_escanear_codigo_pdv, name='api_escanear_codigo_pdv'),
     path('api/pdv/salvar-venda/', core_views.api_salvar_venda_pdv, name='api_salvar_venda_pdv'),
     path('api/buscar-modelos/', core_views.buscar_modelos_por_montadora, name='buscar_modelos_por_montadora'),
     # Categorias
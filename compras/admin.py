@@ -4,7 +4,7 @@ Admin do Módulo de Compras
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import NotaFiscalEntrada, ItemNotaEntrada, LogEntradaMercadoria
+from .models import NotaFiscalEntrada, ItemNotaEntrada, LogEntradaMercadoria, CodigoFornecedorProduto
 
 
 class ItemNotaEntradaInline(admin.TabularInline):
@@ -161,6 +161,18 @@ class ItemNotaEntradaAdmin(admin.ModelAdmin):
     conferido_display.short_description = 'Conferido'
 
 
+@admin.register(CodigoFornecedorProduto)
+class CodigoFornecedorProdutoAdmin(admin.ModelAdmin):
+    list_display = [
+        'fornecedor', 'codigo_fornecedor', 'codigo_barras', 'produto',
+        'vezes_utilizado', 'ultima_utilizacao'
+    ]
+    list_filter = ['fornecedor']
+    search_fields = ['codigo_fornecedor', 'codigo_barras', 'produto__codigo', 'produto__descricao']
+    raw_id_fields = ['fornecedor', 'produto']
+    readonly_fields = ['vezes_utilizado', 'ultima_utilizacao', 'created_at']
+
+
 @admin.register(LogEntradaMercadoria)
 class LogEntradaMercadoriaAdmin(admin.ModelAdmin):
     list_display = ['nota', 'acao', 'descricao_curta', 'usuario', 'created_at']
@@ -0,0 +1,224 @@
+"""
+Finalização de entrada de mercadoria em lote
+
+Todos os produtos da nota são carregados de uma vez e estoque, custo e
+preço de venda são calculados em memória. A gravação usa poucas consultas
+por nota (não por item), todas na mesma transação:
+
+- estoque: um UPDATE com incremento (F) por produto, que não perde vendas
+  feitas durante a finalização
+- custo/preços: bulk_update
+- movimentações e histórico de preço: bulk_create
+- cotações do fornecedor: um único upsert (bulk_create com update_conflicts)
+- referência cruzada código do fornecedor -> produto: idem
+- log: um registro de resumo com os itens, em vez de um por item
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+
+from .models import CodigoFornecedorProduto, LogEntradaMercadoria
+
+
+CAMPOS_PRECO = ['preco_custo', 'preco_venda_dinheiro', 'preco_venda_debito',
+                'preco_venda_credito', 'grade_precos', 'data_atualizacao']
+
+
+def _recalcular_preco_venda(produto, margem_padrao):
+    """
+    Preço de venda pela MARGEM sobre o custo (não markup):
+    Venda = Custo / (1 - Margem/100). Débito e crédito acompanham na
+    mesma proporção.
+    """
+    venda_anterior = produto.preco_venda_dinheiro
+    margem = margem_padrao / 100
+    if margem < 1:
+        produto.preco_venda_dinheiro = produto.preco_custo / (1 - margem)
+    else:
+        # Fallback para markup se margem >= 100%
+        produto.preco_venda_dinheiro = produto.preco_custo * Decimal('1.5')
+
+    if venda_anterior and venda_anterior > 0:
+        fator = produto.preco_venda_dinheiro / venda_anterior
+        if produto.preco_venda_debito:
+            produto.preco_venda_debito = produto.preco_venda_debito * fator
+        if produto.preco_venda_credito:
+            produto.preco_venda_credito = produto.preco_venda_credito * fator
+
+
+def _somar_estoque(entradas):
+    """Aplica {produto_id: quantidade} com um único UPDATE"""
+    from estoque.models import Produto
+
+    Produto.objects.filter(pk__in=entradas).update(
+        estoque_atual=Case(
+            *[When(pk=pk, then=F('estoque_atual') + quantidade) for pk, quantidade in entradas.items()],
+            default=F('estoque_atual'),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def _gravar_cotacoes(nota, precos, agora):
+    """
+    Upsert das cotações do fornecedor do dia (produto, fornecedor,
+    data_cotacao). Retorna quantas foram criadas.
+    """
+    from estoque.models import CotacaoFornecedor
+
+    hoje = timezone.localdate()
+    existentes = set(CotacaoFornecedor.objects.filter(
+        fornecedor=nota.fornecedor,
+        data_cotacao=hoje,
+        produto_id__in=precos,
+    ).values_list('produto_id', flat=True))
+
+    observacao = f"Atualizado via NF {nota.numero_nf} em {hoje.strftime('%d/%m/%Y')}"
+    CotacaoFornecedor.objects.bulk_create(
+        [
+            CotacaoFornecedor(
+                produto_id=produto_id,
+                fornecedor=nota.fornecedor,
+                preco_unitario=preco,
+                prazo_entrega_dias=nota.fornecedor.prazo_entrega_dias or 0,
+                observacoes=observacao,
+                data_cotacao=hoje,
+                ativo=True,
+                data_atualizacao=agora,
+            )
+            for produto_id, preco in precos.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['produto', 'fornecedor', 'data_cotacao'],
+        update_fields=['preco_unitario', 'prazo_entrega_dias', 'observacoes', 'ativo', 'data_atualizacao'],
+    )
+    return len(set(precos) - existentes)
+
+
+def _apos_gravar(produtos_ids):
+    """Caches que o save() de Produto invalidaria pelos signals"""
+    from core import indicadores
+    from estoque.search import cache_codigo_barras
+
+    for produto_id in produtos_ids:
+        cache_codigo_barras.invalidar_produto(produto_id)
+    indicadores.invalidar('estoque')
+
+
+@transaction.atomic
+def finalizar_nota(nota, usuario=None):
+    """
+    Atualiza estoque, custo, preços, cotações e movimentações de todos os
+    itens vinculados da nota. Não altera o status da nota.
+
+    Returns:
+        Dict resumo {estoque_atualizado, precos_atualizados, cotacoes_criadas, erros}
+    """
+    from estoque.models import Produto, MovimentacaoEstoque, HistoricoPreco
+    from estoque.precos import fatores_taxas, grade_precos
+
+    resumo = {
+        'estoque_atualizado': 0,
+        'precos_atualizados': 0,
+        'cotacoes_criadas': 0,
+        'erros': []
+    }
+
+    itens = list(nota.itens.filter(produto__isnull=False).order_by('numero_item', 'id'))
+    if not itens:
+        return resumo
+
+    produtos = Produto.objects.select_for_update().in_bulk({item.produto_id for item in itens})
+    anteriores = {
+        pk: (p.estoque_atual or 0, p.preco_custo, p.preco_venda_dinheiro)
+        for pk, p in produtos.items()
+    }
+
+    agora = timezone.now()
+    documento = f"NF {nota.numero_nf}/{nota.serie}"
+    observacao = f"Entrada via NF {nota.numero_nf} - {nota.fornecedor.nome_fantasia}"
+    nome_usuario = usuario.username if usuario else 'Sistema'
+
+    entradas = {}
+    precos_cotacao = {}
+    movimentacoes = []
+    for item in itens:
+        produto = produtos[item.produto_id]
+        quantidade = int(item.quantidade_conferida or item.quantidade)
+        custo_item = item.valor_custo_unitario or item.valor_unitario
+
+        entradas[produto.pk] = entradas.get(produto.pk, 0) + quantidade
+
+        if nota.atualizar_preco_custo:
+            produto.preco_custo = custo_item
+        if nota.atualizar_preco_venda and produto.preco_custo:
+            _recalcular_preco_venda(produto, nota.margem_padrao)
+            resumo['precos_atualizados'] += 1
+
+        movimentacoes.append(MovimentacaoEstoque(
+            produto=produto,
+            tipo='E',  # Entrada
+            quantidade=quantidade,
+            valor_unitario=custo_item,
+            valor_total=item.valor_total,
+            documento=documento,
+            observacoes=observacao,
+            usuario=nome_usuario,
+        ))
+        if nota.atualizar_cotacao:
+            precos_cotacao[produto.pk] = item.valor_unitario
+        resumo['estoque_atualizado'] += 1
+
+    # Produtos com custo ou preço alterado
+    fatores = fatores_taxas()
+    alterados = []
+    historicos = []
+    detalhes = []
+    for pk, produto in produtos.items():
+        estoque_anterior, custo_anterior, venda_anterior = anteriores[pk]
+        if custo_anterior != produto.preco_custo or venda_anterior != produto.preco_venda_dinheiro:
+            produto.grade_precos = grade_precos(produto, fatores)
+            produto.data_atualizacao = agora
+            alterados.append(produto)
+            historicos.append(HistoricoPreco(
+                produto=produto,
+                preco_custo_anterior=custo_anterior or Decimal('0.00'),
+                preco_custo_novo=produto.preco_custo or Decimal('0.00'),
+                preco_venda_anterior=venda_anterior or Decimal('0.00'),
+                preco_venda_novo=produto.preco_venda_dinheiro or Decimal('0.00'),
+                usuario=usuario,
+                motivo=f"Entrada NF {nota.numero_nf}"
+            ))
+        detalhes.append({
+            'produto_id': pk,
+            'codigo': produto.codigo,
+            'estoque_anterior': estoque_anterior,
+            'estoque_novo': estoque_anterior + entradas[pk],
+            'custo_anterior': str(custo_anterior),
+            'custo_novo': str(produto.preco_custo),
+        })
+
+    _somar_estoque(entradas)
+    if alterados:
+        Produto.objects.bulk_update(alterados, CAMPOS_PRECO, batch_size=500)
+    MovimentacaoEstoque.objects.bulk_create(movimentacoes, batch_size=500)
+    if historicos:
+        HistoricoPreco.objects.bulk_create(historicos, batch_size=500)
+    if precos_cotacao:
+        resumo['cotacoes_criadas'] = _gravar_cotacoes(nota, precos_cotacao, agora)
+    CodigoFornecedorProduto.registrar(nota.fornecedor, itens, agora)
+
+    LogEntradaMercadoria.objects.create(
+        nota=nota,
+        acao='ATUALIZAR_ESTOQUE',
+        descricao=f"Estoque atualizado: {len(itens)} itens, {len(produtos)} produtos",
+        dados_json={'produtos': detalhes},
+        usuario=usuario,
+    )
+
+    produtos_ids = list(produtos)
+    transaction.on_commit(lambda: _apos_gravar(produtos_ids))
+    return resumo
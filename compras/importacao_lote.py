@@ -0,0 +1,142 @@
+"""
+Importação de XMLs de NF-e em lote
+
+Recebe uma pasta (lida recursivamente) ou um arquivo ZIP com os XMLs:
+
+1. Os arquivos são lidos e o parse é feito em paralelo em processos
+   separados (compras.utils.xml_parser.parse_xml_bytes, que não depende
+   do Django)
+2. As chaves de acesso de todas as notas são verificadas contra o banco em
+   uma única consulta, e repetições dentro do próprio lote são descartadas
+3. Cada nota nova é gravada pelo EntradaMercadoriaService na sua própria
+   transação: um XML com problema não desfaz os demais. O índice de
+   produtos da vinculação automática é montado uma vez para o lote todo
+"""
+
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+
+from .models import NotaFiscalEntrada
+from .utils.xml_parser import parse_xml_bytes
+from .vinculacao import VinculadorProdutos
+
+
+# Abaixo disso o custo de subir os processos não compensa
+MINIMO_ARQUIVOS_PARALELO = 8
+
+
+def ler_arquivos(caminho):
+    """
+    Conteúdo dos XMLs de uma pasta ou de um ZIP
+
+    Returns:
+        Lista [(nome, conteúdo em bytes)] em ordem de nome
+    """
+    caminho = Path(caminho)
+    if caminho.is_dir():
+        return [
+            (str(arquivo.relative_to(caminho)), arquivo.read_bytes())
+            for arquivo in sorted(caminho.rglob('*'))
+            if arquivo.is_file() and arquivo.suffix.lower() == '.xml'
+        ]
+
+    if zipfile.is_zipfile(caminho):
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            return [
+                (nome, arquivo_zip.read(nome))
+                for nome in sorted(arquivo_zip.namelist())
+                if nome.lower().endswith('.xml') and not nome.endswith('/')
+            ]
+
+    if caminho.is_file() and caminho.suffix.lower() == '.xml':
+        return [(caminho.name, caminho.read_bytes())]
+
+    raise ValueError(f"'{caminho}' não é uma pasta, um ZIP ou um XML")
+
+
+def analisar_arquivos(conteudos, workers=None):
+    """
+    Parse de vários XMLs, em paralelo quando vale a pena
+
+    Returns:
+        Lista [(success, data, errors)] na mesma ordem de `conteudos`
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(conteudos) < MINIMO_ARQUIVOS_PARALELO:
+        return [parse_xml_bytes(conteudo) for conteudo in conteudos]
+
+    chunksize = max(1, len(conteudos) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_xml_bytes, conteudos, chunksize=chunksize))
+
+
+def importar_xml_lote(caminho, usuario=None, config=None, workers=None):
+    """
+    Importa todos os XMLs de uma pasta ou ZIP
+
+    Args:
+        caminho: Pasta, arquivo ZIP ou um único XML
+        usuario: Usuário registrado nas notas e nos logs
+        config: Configurações de importação (as mesmas de importar_xml)
+        workers: Processos para o parse (padrão: número de CPUs)
+
+    Returns:
+        Dict {arquivos, importadas: [(nome, nota_id)], duplicadas: [nome],
+        erros: [(nome, [mensagens])], avisos: [(nome, [mensagens])]}
+    """
+    from .services import EntradaMercadoriaService
+
+    arquivos = ler_arquivos(caminho)
+    resultados = analisar_arquivos([conteudo for _, conteudo in arquivos], workers)
+
+    resumo = {
+        'arquivos': len(arquivos),
+        'importadas': [],
+        'duplicadas': [],
+        'erros': [],
+        'avisos': [],
+    }
+
+    # Notas já importadas (ignora canceladas), em uma consulta
+    chaves = {
+        dados['nota']['chave_acesso']
+        for success, dados, _ in resultados
+        if success and dados['nota'].get('chave_acesso')
+    }
+    existentes = set(
+        NotaFiscalEntrada.objects.filter(chave_acesso__in=chaves).exclude(status='X').values_list(
+            'chave_acesso', flat=True
+        )
+    ) if chaves else set()
+
+    service = EntradaMercadoriaService(usuario)
+    vinculador = None
+    for (nome, conteudo), (success, dados, errors) in zip(arquivos, resultados):
+        if not success:
+            resumo['erros'].append((nome, errors))
+            continue
+
+        chave = dados['nota'].get('chave_acesso')
+        if chave and chave in existentes:
+            resumo['duplicadas'].append(nome)
+            continue
+
+        if vinculador is None:
+            vinculador = VinculadorProdutos()
+        arquivo = ContentFile(conteudo, name=os.path.basename(nome))
+        success, nota, mensagens = service.importar_dados_xml(dados, arquivo, config, vinculador)
+        if not success:
+            resumo['erros'].append((nome, mensagens))
+            continue
+
+        if chave:
+            existentes.add(chave)
+        resumo['importadas'].append((nome, nota.id))
+        if mensagens:
+            resumo['avisos'].append((nome, mensagens))
+
+    return resumo
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from compras.utils.pdf_parser import PDFPedidoParser, extrair_paginas
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de leitura de PDFs de pedido por página (sequencial, paralelo, cache e interpretação)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivos', nargs='+', help='PDFs de exemplo')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processos na extração paralela (padrão: número de CPUs)')
+        parser.add_argument('--repeticoes', type=int, default=3,
+                            help='Repetições de cada medição; vale a melhor (padrão 3)')
+
+    def _medir(self, funcao, repeticoes):
+        melhor = None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            decorrido = time.perf_counter() - inicio
+            melhor = decorrido if melhor is None else min(melhor, decorrido)
+        return melhor, resultado
+
+    def handle(self, *args, **options):
+        repeticoes = max(1, options['repeticoes'])
+        workers = options['workers'] or os.cpu_count() or 1
+
+        self.stdout.write(
+            f"{'arquivo':<30} {'págs':>5} {'formato':<9} {'itens':>5} "
+            f"{'seq ms/pág':>11} {'par ms/pág':>11} {'cache ms':>9} {'regex ms':>9}"
+        )
+        for nome in options['arquivos']:
+            caminho = Path(nome)
+            if not caminho.is_file():
+                raise CommandError(f"Arquivo '{nome}' não encontrado")
+            conteudo = caminho.read_bytes()
+
+            sequencial, paginas = self._medir(lambda: extrair_paginas(conteudo, workers=1), repeticoes)
+            paralelo, _ = self._medir(lambda: extrair_paginas(conteudo, workers=workers), repeticoes)
+
+            with tempfile.TemporaryDirectory() as diretorio:
+                PDFPedidoParser(cache_dir=diretorio, workers=1).parse(conteudo)
+                em_cache, _ = self._medir(
+                    lambda: PDFPedidoParser(cache_dir=diretorio).parse(conteudo), repeticoes
+                )
+
+            texto = ''.join(pagina + '\n' for pagina in paginas if pagina)
+            parser = PDFPedidoParser()
+            interpretacao, (success, dados, _) = self._medir(lambda: parser.parse_texto(texto), repeticoes)
+
+            total_paginas = max(len(paginas), 1)
+            self.stdout.write(
+                f"{caminho.name[:30]:<30} {len(paginas):>5} {parser.formato_detectado or '-':<9} "
+                f"{len(dados.get('itens', [])) if success else 0:>5} "
+                f"{sequencial * 1000 / total_paginas:>11.1f} {paralelo * 1000 / total_paginas:>11.1f} "
+                f"{em_cache * 1000:>9.1f} {interpretacao * 1000:>9.1f}"
+            )
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from compras.importacao_lote import importar_xml_lote
+
+
+class Command(BaseCommand):
+    help = 'Importa todos os XMLs de NF-e de uma pasta ou de um arquivo ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminho', help='Pasta (lida recursivamente) ou arquivo .zip com os XMLs')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processos para ler os XMLs (padrão: número de CPUs)')
+        parser.add_argument('--usuario', default=None,
+                            help='Username registrado nas notas importadas')
+        parser.add_argument('--atualizar-preco-venda', action='store_true',
+                            help='Recalcular o preço de venda na finalização')
+        parser.add_argument('--margem', type=Decimal, default=Decimal('50.00'),
+                            help='Margem padrão para o preço de venda (padrão 50)')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"Usuário '{options['usuario']}' não encontrado")
+
+        config = {
+            'atualizar_preco_venda': options['atualizar_preco_venda'],
+            'margem_padrao': options['margem'],
+        }
+        try:
+            resumo = importar_xml_lote(options['caminho'], usuario, config, options['workers'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for nome, mensagens in resumo['erros']:
+            self.stdout.write(self.style.ERROR(f'❌ {nome}: {"; ".join(mensagens)}'))
+        for nome, mensagens in resumo['avisos']:
+            self.stdout.write(self.style.WARNING(f'⚠️  {nome}: {"; ".join(mensagens)}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído! {resumo['arquivos']} arquivo(s): {len(resumo['importadas'])} importado(s), "
+            f"{len(resumo['duplicadas'])} já importado(s), {len(resumo['erros'])} com erro."
+        ))
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.14 on 2026-10-18 11:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def aprender_das_notas(apps, schema_editor):
+    """
+    Monta a referência cruzada com os itens já vinculados das notas
+    existentes (o vínculo mais recente de cada código vale)
+    """
+    from estoque.search import normalizar_codigo
+
+    ItemNotaEntrada = apps.get_model('compras', 'ItemNotaEntrada')
+    CodigoFornecedorProduto = apps.get_model('compras', 'CodigoFornecedorProduto')
+
+    vinculos = {}
+    for fornecedor_id, codigo, codigo_barras, produto_id, criado in ItemNotaEntrada.objects.filter(
+        produto__isnull=False,
+    ).exclude(codigo_produto_fornecedor='').order_by('id').values_list(
+        'nota__fornecedor_id', 'codigo_produto_fornecedor', 'codigo_barras_nf', 'produto_id', 'created_at'
+    ).iterator(chunk_size=2000):
+        codigo = normalizar_codigo(codigo)[:60]
+        if not codigo:
+            continue
+        ean = normalizar_codigo(codigo_barras)
+        ean = ean if ean.isdigit() and len(ean) <= 14 else ''
+        anterior = vinculos.get((fornecedor_id, codigo))
+        vezes = anterior['vezes'] + 1 if anterior and anterior['produto_id'] == produto_id else 1
+        vinculos[(fornecedor_id, codigo)] = {
+            'produto_id': produto_id,
+            'vezes': vezes,
+            'ean': ean or (anterior['ean'] if anterior else ''),
+            'ultima': criado,
+        }
+
+    CodigoFornecedorProduto.objects.bulk_create([
+        CodigoFornecedorProduto(
+            fornecedor_id=fornecedor_id,
+            codigo_fornecedor=codigo,
+            codigo_barras=dados['ean'],
+            produto_id=dados['produto_id'],
+            vezes_utilizado=dados['vezes'],
+            ultima_utilizacao=dados['ultima'],
+        )
+        for (fornecedor_id, codigo), dados in vinculos.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0001_initial'),
+        ('estoque', '0010_produto_grade_precos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodigoFornecedorProduto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo_fornecedor', models.CharField(help_text='Código do produto na NF do fornecedor (normalizado)', max_length=60, verbose_name='Código no Fornecedor')),
+                ('codigo_barras', models.CharField(blank=True, max_length=14, verbose_name='EAN/GTIN na NF')),
+                ('vezes_utilizado', models.PositiveIntegerField(default=1, verbose_name='Vezes Utilizado')),
+                ('ultima_utilizacao', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Última Utilização')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('fornecedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codigos_produtos', to='estoque.fornecedor', verbose_name='Fornecedor')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codigos_fornecedores', to='estoque.produto', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Código de Fornecedor',
+                'verbose_name_plural': 'Códigos de Fornecedores',
+                'ordering': ['fornecedor', 'codigo_fornecedor'],
+                'indexes': [models.Index(fields=['fornecedor', 'codigo_barras'], name='compras_cod_forn_ean_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='codigofornecedorproduto',
+            constraint=models.UniqueConstraint(fields=('fornecedor', 'codigo_fornecedor'), name='compras_codigo_fornecedor_unico'),
+        ),
+        migrations.RunPython(aprender_das_notas, migrations.RunPython.noop),
+    ]
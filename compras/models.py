@@ -486,63 +486,32 @@ class ItemNotaEntrada(models.Model):
         
         return self.valor_custo_unitario
     
-    def vincular_produto_automatico(self):
+    def vincular_produto_automatico(self, vinculador=None):
         """
         Tenta vincular automaticamente a um produto do sistema
-        Busca por: código de barras, código, referência
+        Busca por: código do fornecedor já vinculado (referência cruzada),
+        código de barras, código, referência e descrição (compras.vinculacao)
+        
+        Para vários itens, monte um VinculadorProdutos e use vincular_itens.
         """
         from estoque.models import Produto
+        from .vinculacao import VinculadorProdutos
         
         # Já está vinculado
         if self.produto:
             return self.produto
         
-        produto = None
-        
-        # 1. Busca por código de barras
-        if self.codigo_barras_nf:
-            produto = Produto.objects.filter(
-                codigo_barras=self.codigo_barras_nf,
-                ativo=True
-            ).first()
-        
-        # 2. Busca por código do fornecedor (pode estar no código do produto)
-        if not produto and self.codigo_produto_fornecedor:
-            produto = Produto.objects.filter(
-                codigo=self.codigo_produto_fornecedor,
-                ativo=True
-            ).first()
-            
-            # Tenta também pela referência do fabricante
-            if not produto:
-                produto = Produto.objects.filter(
-                    referencia_fabricante=self.codigo_produto_fornecedor,
-                    ativo=True
-                ).first()
-        
-        # 3. Busca por descrição similar (último recurso)
-        if not produto:
-            # Remove caracteres especiais e busca
-            descricao_limpa = ''.join(e for e in self.descricao_nf if e.isalnum() or e.isspace())
-            palavras = descricao_limpa.split()[:3]  # Primeiras 3 palavras
-            
-            if palavras:
-                from django.db.models import Q
-                query = Q()
-                for palavra in palavras:
-                    if len(palavra) > 3:  # Ignora palavras muito curtas
-                        query &= Q(descricao__icontains=palavra)
-                
-                if query:
-                    produtos = Produto.objects.filter(query, ativo=True)[:5]
-                    if produtos.count() == 1:
-                        produto = produtos.first()
+        if vinculador is None:
+            vinculador = VinculadorProdutos(self.nota.fornecedor)
         
-        if produto:
-            self.produto = produto
-            self.save()
+        produto_id, _ = vinculador.encontrar(self)
+        if not produto_id:
+            return None
         
-        return produto
+        self.produto = Produto.objects.get(pk=produto_id)
+        self.save()
+        vinculador.aprender(self.codigo_produto_fornecedor, produto_id, self.codigo_barras_nf)
+        return self.produto
 
 
 class LogEntradaMercadoria(models.Model):
@@ -605,3 +574,135 @@ class LogEntradaMercadoria(models.Model):
     
     def __str__(self):
         return f"{self.get_acao_display()} - {self.nota.numero_nf}"
+
+
+class CodigoFornecedorProduto(models.Model):
+    """
+    Referência cruzada código do fornecedor -> produto
+
+    Aprendida nas vinculações manuais e nas entradas finalizadas, é a
+    primeira coisa consultada na vinculação automática: uma compra repetida
+    do mesmo fornecedor vincula por busca exata, sem busca por descrição.
+    """
+
+    # ========== CHAVE ==========
+    fornecedor = models.ForeignKey(
+        'estoque.Fornecedor',
+        on_delete=models.CASCADE,
+        related_name='codigos_produtos',
+        verbose_name='Fornecedor'
+    )
+    codigo_fornecedor = models.CharField(
+        max_length=60,
+        verbose_name='Código no Fornecedor',
+        help_text='Código do produto na NF do fornecedor (normalizado)'
+    )
+    codigo_barras = models.CharField(
+        max_length=14,
+        blank=True,
+        verbose_name='EAN/GTIN na NF'
+    )
+
+    # ========== PRODUTO ==========
+    produto = models.ForeignKey(
+        'estoque.Produto',
+        on_delete=models.CASCADE,
+        related_name='codigos_fornecedores',
+        verbose_name='Produto'
+    )
+
+    # ========== USO ==========
+    vezes_utilizado = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Vezes Utilizado'
+    )
+    ultima_utilizacao = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Última Utilização'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Código de Fornecedor'
+        verbose_name_plural = 'Códigos de Fornecedores'
+        ordering = ['fornecedor', 'codigo_fornecedor']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fornecedor', 'codigo_fornecedor'],
+                name='compras_codigo_fornecedor_unico'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['fornecedor', 'codigo_barras'], name='compras_cod_forn_ean_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.fornecedor} {self.codigo_fornecedor} -> {self.produto_id}"
+
+    @classmethod
+    def registrar(cls, fornecedor, itens, agora=None):
+        """
+        Grava (ou corrige) o código do fornecedor de cada item vinculado
+        com uma leitura e um único upsert
+
+        Um código que passa a apontar para outro produto recomeça a
+        contagem de uso.
+
+        Args:
+            itens: ItemNotaEntrada (ou objetos com codigo_produto_fornecedor,
+                codigo_barras_nf e produto_id); sem código ou sem produto
+                são ignorados
+
+        Returns:
+            Quantidade de códigos gravados
+        """
+        from estoque.search import normalizar_codigo
+
+        if fornecedor is None:
+            return 0
+
+        usos = {}
+        for item in itens:
+            codigo = normalizar_codigo(item.codigo_produto_fornecedor)[:60]
+            if not codigo or not item.produto_id:
+                continue
+            ean = normalizar_codigo(item.codigo_barras_nf)
+            ean = ean if ean.isdigit() and len(ean) <= 14 else ''
+            produto_id, vezes, ean_anterior = usos.get(codigo, (None, 0, ''))
+            if produto_id != item.produto_id:
+                vezes = 0
+            usos[codigo] = (item.produto_id, vezes + 1, ean or ean_anterior)
+        if not usos:
+            return 0
+
+        existentes = {
+            codigo: (produto_id, vezes, ean)
+            for codigo, produto_id, vezes, ean in cls.objects.filter(
+                fornecedor=fornecedor,
+                codigo_fornecedor__in=list(usos),
+            ).values_list('codigo_fornecedor', 'produto_id', 'vezes_utilizado', 'codigo_barras')
+        }
+
+        agora = agora or timezone.now()
+        registros = []
+        for codigo, (produto_id, vezes, ean) in usos.items():
+            produto_anterior, vezes_anteriores, ean_anterior = existentes.get(codigo, (None, 0, ''))
+            if produto_anterior == produto_id:
+                vezes += vezes_anteriores
+            registros.append(cls(
+                fornecedor=fornecedor,
+                codigo_fornecedor=codigo,
+                codigo_barras=ean or ean_anterior,
+                produto_id=produto_id,
+                vezes_utilizado=vezes,
+                ultima_utilizacao=agora,
+            ))
+
+        cls.objects.bulk_create(
+            registros,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['fornecedor', 'codigo_fornecedor'],
+            update_fields=['codigo_barras', 'produto', 'vezes_utilizado', 'ultima_utilizacao'],
+        )
+        return len(registros)
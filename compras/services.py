@@ -10,13 +10,15 @@ Contém a lógica de negócio para:
 
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
+from django.conf import settings
 from django.db import transaction, models
 from django.utils import timezone
 from django.contrib.auth.models import User
 
-from .models import NotaFiscalEntrada, ItemNotaEntrada, LogEntradaMercadoria
+from .models import NotaFiscalEntrada, ItemNotaEntrada, LogEntradaMercadoria, CodigoFornecedorProduto
 from .utils.xml_parser import NFEXMLParser
 from .utils.pdf_parser import PDFPedidoParser
+from .vinculacao import VinculadorProdutos
 
 
 class EntradaMercadoriaService:
@@ -53,6 +55,30 @@ class EntradaMercadoriaService:
         if not dados.get('success'):
             return False, None, dados.get('errors', ['Erro ao processar XML'])
         
+        return self.importar_dados_xml(dados, xml_file, config)
+    
+    @transaction.atomic
+    def importar_dados_xml(self, dados: Dict, xml_file, config: Dict = None,
+                           vinculador: VinculadorProdutos = None) -> Tuple[bool, Optional[NotaFiscalEntrada], List[str]]:
+        """
+        Cria a nota a partir dos dados já extraídos pelo NFEXMLParser
+        (a importação em lote faz o parse em paralelo e chama este método)
+        
+        Args:
+            dados: Resultado de NFEXMLParser.get_all_data()
+            xml_file: Arquivo XML gravado na nota
+            config: Configurações de importação
+            vinculador: Índice de produtos já montado (reaproveitado
+                entre as notas de um lote)
+            
+        Returns:
+            Tuple (success, nota_fiscal, errors)
+        """
+        self.errors = []
+        self.warnings = []
+        
+        config = config or {}
+        
         # Extrai dados
         dados_nota = dados.get('nota', {})
         dados_emitente = dados.get('emitente', {})
@@ -140,7 +166,7 @@ class EntradaMercadoriaService:
         
         # Cria os itens
         itens_criados = 0
-        itens_vinculados = 0
+        itens_nota = []
         
         for item_data in itens:
             try:
@@ -163,15 +189,18 @@ class EntradaMercadoriaService:
                 )
                 
                 itens_criados += 1
-                
-                # Tenta vincular automaticamente
-                produto = item.vincular_produto_automatico()
-                if produto:
-                    itens_vinculados += 1
+                itens_nota.append(item)
                 
             except Exception as e:
                 self.warnings.append(f"Erro ao criar item {item_data.get('numero_item')}: {str(e)}")
         
+        # Vincula automaticamente todos os itens com um único índice em memória
+        if vinculador is None:
+            vinculador = VinculadorProdutos(nota.fornecedor)
+        else:
+            vinculador = vinculador.para_fornecedor(nota.fornecedor)
+        itens_vinculados = len(vinculador.vincular_itens(itens_nota))
+        
         # Log
         self._criar_log(
             nota=nota,
@@ -183,13 +212,16 @@ class EntradaMercadoriaService:
         return True, nota, self.warnings
     
     @transaction.atomic
-    def importar_pdf(self, pdf_file, config: Dict = None) -> Tuple[bool, Optional[NotaFiscalEntrada], List[str]]:
+    def importar_pdf(self, pdf_file, config: Dict = None,
+                     workers: int = None) -> Tuple[bool, Optional[NotaFiscalEntrada], List[str]]:
         """
         Importa pedido a partir de arquivo PDF
         
         Args:
             pdf_file: Arquivo PDF
             config: Configurações de importação
+            workers: Processos para extrair as páginas (padrão: COMPRAS_PDF_WORKERS,
+                1 = sequencial, que é o adequado dentro de uma requisição)
             
         Returns:
             Tuple (success, nota_fiscal, errors)
@@ -199,8 +231,11 @@ class EntradaMercadoriaService:
         
         config = config or {}
         
-        # Parse do PDF
-        parser = PDFPedidoParser()
+        # Parse do PDF (texto em cache: reenvio do mesmo PDF não extrai de novo)
+        parser = PDFPedidoParser(
+            cache_dir=getattr(settings, 'COMPRAS_PDF_CACHE_DIR', None),
+            workers=workers or getattr(settings, 'COMPRAS_PDF_WORKERS', 1),
+        )
         success, dados, warnings = parser.parse(pdf_file)
         
         if not success:
@@ -293,7 +328,7 @@ class EntradaMercadoriaService:
         
         # Cria os itens
         itens_criados = 0
-        itens_vinculados = 0
+        itens_nota = []
         
         for item_data in itens:
             try:
@@ -316,15 +351,14 @@ class EntradaMercadoriaService:
                 )
                 
                 itens_criados += 1
-                
-                # Tenta vincular automaticamente
-                produto = item.vincular_produto_automatico()
-                if produto:
-                    itens_vinculados += 1
+                itens_nota.append(item)
                 
             except Exception as e:
                 self.warnings.append(f"Erro ao criar item {item_data.get('numero_item')}: {str(e)}")
         
+        # Vincula automaticamente todos os itens com um único índice em memória
+        itens_vinculados = len(VinculadorProdutos(nota.fornecedor).vincular_itens(itens_nota))
+        
         # Log
         self._criar_log(
             nota=nota,
@@ -371,50 +405,11 @@ class EntradaMercadoriaService:
     def _gerar_proximo_codigo_produto(self) -> str:
         """
         Gera o próximo código de produto sequencial
-        Baseado no maior código numérico existente + 1
+        (sequência 'produto_codigo', ver Produto.gerar_proximo_codigo)
         """
         from estoque.models import Produto
-        from django.db.models import Max
-        from django.db.models.functions import Cast
-        from django.db.models import IntegerField
         
-        try:
-            # Busca o maior código numérico (6 dígitos)
-            # Filtra apenas códigos que são puramente numéricos e têm 6 dígitos
-            produtos_numericos = Produto.objects.filter(
-                codigo__regex=r'^\d{6}$'
-            )
-            
-            if produtos_numericos.exists():
-                # Converte para inteiro e pega o máximo
-                maior_codigo = 0
-                for p in produtos_numericos.values_list('codigo', flat=True):
-                    try:
-                        cod_int = int(p)
-                        if cod_int > maior_codigo:
-                            maior_codigo = cod_int
-                    except ValueError:
-                        continue
-                
-                proximo = maior_codigo + 1
-            else:
-                # Se não há códigos de 6 dígitos, começa do 100001
-                proximo = 100001
-            
-            # Formata com 6 dígitos
-            codigo = str(proximo).zfill(6)
-            
-            # Garante que não existe (segurança extra)
-            while Produto.objects.filter(codigo=codigo).exists():
-                proximo += 1
-                codigo = str(proximo).zfill(6)
-            
-            return codigo
-            
-        except Exception as e:
-            # Fallback: gera código único com timestamp
-            import uuid
-            return f"{int(timezone.now().timestamp()) % 1000000:06d}"
+        return Produto.gerar_proximo_codigo()
     
     def _get_or_create_fornecedor(self, dados_emitente: Dict):
         """Busca ou cria fornecedor com dados do XML"""
@@ -475,6 +470,9 @@ class EntradaMercadoriaService:
             item.produto = produto
             item.save()
             
+            # Próximas notas do fornecedor vinculam este código direto
+            CodigoFornecedorProduto.registrar(item.nota.fornecedor, [item])
+            
             self._criar_log(
                 nota=item.nota,
                 item=item,
@@ -698,7 +696,6 @@ class EntradaMercadoriaService:
         except Exception as e:
             return False, f"Erro ao conferir: {str(e)}"
     
-    @transaction.atomic
     def finalizar_entrada(self, nota_id: int) -> Tuple[bool, str, Dict]:
         """
         Finaliza a entrada de mercadoria
@@ -709,13 +706,16 @@ class EntradaMercadoriaService:
         - Cria cotações do fornecedor (se configurado)
         - Gera movimentações de estoque
         
+        Tudo é gravado em lote e numa única transação (compras.finalizacao):
+        se algum item falhar, nada é aplicado.
+        
         Args:
             nota_id: ID da NotaFiscalEntrada
             
         Returns:
             Tuple (success, message, resumo)
         """
-        from estoque.models import MovimentacaoEstoque, CotacaoFornecedor, HistoricoPreco
+        from .finalizacao import finalizar_nota
         
         resumo = {
             'estoque_atualizado': 0,
@@ -725,127 +725,36 @@ class EntradaMercadoriaService:
         }
         
         try:
-            nota = NotaFiscalEntrada.objects.get(id=nota_id)
-            
-            # Validações
-            if nota.status == 'F':
-                return False, "Nota já finalizada", resumo
-            
-            if nota.status == 'X':
-                return False, "Nota cancelada", resumo
-            
-            if nota.itens_pendentes > 0:
-                return False, f"Existem {nota.itens_pendentes} itens não vinculados", resumo
-            
-            # Processa cada item
-            for item in nota.itens.filter(produto__isnull=False):
-                produto = item.produto
-                quantidade = int(item.quantidade_conferida or item.quantidade)
+            with transaction.atomic():
+                nota = NotaFiscalEntrada.objects.select_for_update().select_related(
+                    'fornecedor'
+                ).get(id=nota_id)
                 
-                try:
-                    # 1. Atualiza estoque
-                    estoque_anterior = produto.estoque_atual
-                    produto.estoque_atual = (produto.estoque_atual or 0) + quantidade
-                    
-                    # 2. Atualiza preço de custo
-                    custo_anterior = produto.preco_custo
-                    if nota.atualizar_preco_custo:
-                        produto.preco_custo = item.valor_custo_unitario or item.valor_unitario
-                    
-                    # 3. Recalcula preço de venda se configurado (usando MARGEM, não markup)
-                    # Margem = (Venda - Custo) / Venda * 100
-                    # Venda = Custo / (1 - Margem/100)
-                    venda_anterior = produto.preco_venda_dinheiro
-                    if nota.atualizar_preco_venda and produto.preco_custo:
-                        margem = nota.margem_padrao / 100
-                        if margem < 1:  # Se margem < 100%
-                            produto.preco_venda_dinheiro = produto.preco_custo / (1 - margem)
-                        else:
-                            # Fallback para markup se margem >= 100%
-                            produto.preco_venda_dinheiro = produto.preco_custo * Decimal('1.5')
-                        
-                        # Atualiza outros preços proporcionalmente se existirem
-                        if produto.preco_venda_debito and venda_anterior and venda_anterior > 0:
-                            fator = produto.preco_venda_dinheiro / venda_anterior
-                            produto.preco_venda_debito = produto.preco_venda_debito * fator
-                        
-                        if produto.preco_venda_credito and venda_anterior and venda_anterior > 0:
-                            fator = produto.preco_venda_dinheiro / venda_anterior
-                            produto.preco_venda_credito = produto.preco_venda_credito * fator
-                        
-                        resumo['precos_atualizados'] += 1
-                    
-                    produto.save()
-                    resumo['estoque_atualizado'] += 1
-                    
-                    # 4. Cria movimentação de estoque
-                    MovimentacaoEstoque.objects.create(
-                        produto=produto,
-                        tipo='E',  # Entrada
-                        quantidade=quantidade,
-                        valor_unitario=item.valor_custo_unitario or item.valor_unitario,
-                        valor_total=item.valor_total,
-                        documento=f"NF {nota.numero_nf}/{nota.serie}",
-                        observacoes=f"Entrada via NF {nota.numero_nf} - {nota.fornecedor.nome_fantasia}",
-                        usuario=self.usuario.username if self.usuario else 'Sistema',
-                    )
-                    
-                    # 5. Registra histórico de preço se mudou
-                    if custo_anterior != produto.preco_custo or venda_anterior != produto.preco_venda_dinheiro:
-                        HistoricoPreco.objects.create(
-                            produto=produto,
-                            preco_custo_anterior=custo_anterior or Decimal('0.00'),
-                            preco_custo_novo=produto.preco_custo or Decimal('0.00'),
-                            preco_venda_anterior=venda_anterior or Decimal('0.00'),
-                            preco_venda_novo=produto.preco_venda_dinheiro or Decimal('0.00'),
-                            usuario=self.usuario,
-                            motivo=f"Entrada NF {nota.numero_nf}"
-                        )
-                    
-                    # 6. Cria/atualiza cotação do fornecedor
-                    if nota.atualizar_cotacao:
-                        cotacao, created = CotacaoFornecedor.objects.update_or_create(
-                            produto=produto,
-                            fornecedor=nota.fornecedor,
-                            defaults={
-                                'preco': item.valor_unitario,
-                                'prazo_entrega': nota.fornecedor.prazo_entrega_dias or 0,
-                                'observacoes': f"Atualizado via NF {nota.numero_nf} em {timezone.now().strftime('%d/%m/%Y')}",
-                                'ativo': True,
-                            }
-                        )
-                        if created:
-                            resumo['cotacoes_criadas'] += 1
-                    
-                    self._criar_log(
-                        nota=nota,
-                        item=item,
-                        acao='ATUALIZAR_ESTOQUE',
-                        descricao=f"Estoque atualizado: {estoque_anterior} → {produto.estoque_atual}",
-                        dados={
-                            'estoque_anterior': estoque_anterior,
-                            'estoque_novo': produto.estoque_atual,
-                            'custo_anterior': str(custo_anterior),
-                            'custo_novo': str(produto.preco_custo)
-                        }
-                    )
-                    
-                except Exception as e:
-                    resumo['erros'].append(f"Erro no item {item.numero_item}: {str(e)}")
-            
-            # Finaliza a nota
-            nota.status = 'F'
-            nota.data_finalizacao = timezone.now()
-            nota.usuario_finalizacao = self.usuario
-            nota.save()
-            
-            self._criar_log(
-                nota=nota,
-                acao='FINALIZAR',
-                descricao=f"Entrada finalizada. Estoque: {resumo['estoque_atualizado']} itens, "
-                         f"Preços: {resumo['precos_atualizados']}, Cotações: {resumo['cotacoes_criadas']}",
-                dados=resumo
-            )
+                # Validações
+                if nota.status == 'F':
+                    return False, "Nota já finalizada", resumo
+                
+                if nota.status == 'X':
+                    return False, "Nota cancelada", resumo
+                
+                if nota.itens_pendentes > 0:
+                    return False, f"Existem {nota.itens_pendentes} itens não vinculados", resumo
+                
+                resumo = finalizar_nota(nota, self.usuario)
+                
+                # Finaliza a nota
+                nota.status = 'F'
+                nota.data_finalizacao = timezone.now()
+                nota.usuario_finalizacao = self.usuario
+                nota.save()
+                
+                self._criar_log(
+                    nota=nota,
+                    acao='FINALIZAR',
+                    descricao=f"Entrada finalizada. Estoque: {resumo['estoque_atualizado']} itens, "
+                             f"Preços: {resumo['precos_atualizados']}, Cotações: {resumo['cotacoes_criadas']}",
+                    dados=resumo
+                )
             
             return True, "Entrada finalizada com sucesso", resumo
             
@@ -905,18 +814,14 @@ class EntradaMercadoriaService:
             Lista de produtos encontrados
         """
         from estoque.models import Produto
-        from django.db.models import Q
+        from core.busca import buscar_texto
         
         if not termo or len(termo) < 2:
             return []
         
-        produtos = Produto.objects.filter(
-            Q(codigo__icontains=termo) |
-            Q(codigo_barras__icontains=termo) |
-            Q(descricao__icontains=termo) |
-            Q(referencia_fabricante__icontains=termo),
-            ativo=True
-        )[:limit]
+        produtos = buscar_texto(
+            Produto.objects.filter(ativo=True), termo
+        ).order_by('descricao')[:limit]
         
         return [
             {
@@ -5,56 +5,252 @@ Suporta múltiplos formatos de PDF de pedido:
 - Conexão Distribuidora (CM Sistemas)
 - AC Araujo Distribuidora
 - Formato genérico (tentativa de extração automática)
+
+A extração de texto (pdfplumber) é a parte cara, na casa de centenas de
+ms por página. Por isso:
+- PDFs com várias páginas são extraídos em paralelo, cada processo com
+  uma faixa de páginas
+- o texto extraído fica em cache em disco, pela hash SHA-256 do conteúdo:
+  reenviar o mesmo PDF (nova tentativa de importação) não extrai de novo.
+  Só o texto é guardado; os itens são sempre reinterpretados a partir
+  dele, o que é rápido e acompanha correções nos padrões abaixo
+- os padrões de cada formato são compilados uma vez, no import do módulo
 """
 
+import hashlib
+import io
+import json
+import math
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
+from itertools import repeat
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
-import io
+
+
+# Abaixo disso o custo de subir os processos não compensa
+MINIMO_PAGINAS_PARALELO = 4
+
+# Incrementar quando a forma de extrair o texto mudar (invalida o cache)
+VERSAO_EXTRACAO = 1
+
+
+# ============================================
+# PADRÕES POR FORMATO
+# ============================================
+
+_UNIDADES = r'(UN|CX|PC|KG|LT|MT|PR)'
+
+PADROES_CONEXAO = {
+    'numero_pedido': re.compile(r'Pedido:\s*(\d+)'),
+    'data_emissao': re.compile(r'Dt\.\s*Emiss[ãa]o:\s*(\d{2}/\d{2}/\d{4})'),
+    'subtotal': re.compile(r'Subtotal:\s*([\d.,]+)'),
+    'icms_st': re.compile(r'ICMS-ST:\s*([\d.,]+)'),
+    'ipi': re.compile(r'IPI:\s*([\d.,]+)'),
+    'total': re.compile(r'T\s*O\s*T\s*A\s*L\s*:\s*([\d.,]+)'),
+    # 001 TG1014002 LAMPADA TORPEDO 36MM 16 LED (PAR) TIGER UN 2,000 60,000 8,5700 17,14
+    # Item Código Descrição Un Quant Saldo Unit Total
+    'item': re.compile(
+        r'(\d{3})\s+'  # Item (001, 002, etc)
+        r'([A-Z0-9]+)\s+'  # Código
+        r'(.+?)\s+'  # Descrição (não-greedy)
+        + _UNIDADES + r'\s+'  # Unidade
+        r'([\d.,]+)\s+'  # Quantidade
+        r'([\d.,]+)\s+'  # Saldo (ignoramos)
+        r'([\d.,]+)\s+'  # Valor unitário
+        r'([\d.,]+)'  # Valor total
+    ),
+    'item_alternativo': re.compile(r'^(\d{3})\s+(\S+)\s+(.+)'),
+}
+
+PADROES_ARAUJO = {
+    'numero_pedido': re.compile(r'N[úu]mero do Pedido:\s*(\d+)'),
+    'data_emissao': re.compile(r'Pedido feito em:\s*(\d{2}/\d{2}/\d{4})'),
+    'total': re.compile(r'Total\s+\d+\s+\$?([\d.,]+)'),
+    # 6 4T20W50 COD.1024151 LUBRAX SL 4T 20W50 CXC24 1L PC 7891344015750 24 $16.99 $407.76
+    # # PROD. DESCRIÇÃO UNID. COD. BARRAS QTDE. PREÇO UN. PREÇO
+    'item': re.compile(
+        r'(\d+)\s+'  # Número do item
+        r'([A-Z0-9]+)\s+'  # Código do produto
+        r'(.+?)\s+'  # Descrição
+        + _UNIDADES + r'\s+'  # Unidade
+        r'(\d{8,14})\s+'  # Código de barras
+        r'(\d+)\s+'  # Quantidade
+        r'\$?([\d.,]+)\s+'  # Preço unitário
+        r'\$?([\d.,]+)'  # Preço total
+    ),
+    'codigo_barras': re.compile(r'\b(\d{8,14})\b'),
+    'valores': re.compile(r'\$?([\d.,]+)'),
+    'codigo': re.compile(r'^\s*\d+\s+([A-Z0-9]+)'),
+}
+
+PADROES_GENERICO = {
+    'numero_pedido': re.compile(r'[Pp]edido[:\s#]*(\d+)'),
+    'data_emissao': re.compile(r'(\d{2}/\d{2}/\d{4})'),
+    'valores': re.compile(r'[\d.,]+'),
+    'codigo': re.compile(r'\b([A-Z0-9]{3,20})\b'),
+}
+
+_RE_VALORES = re.compile(r'([\d.,]+)')
+_RE_UNIDADE = re.compile(r'\b' + _UNIDADES + r'\b')
+
+_MARCAS_EMPRESA = ['LTDA', 'EIRELI', 'S.A.', 'S/A', 'ME', 'EPP']
+
+
+def _primeiro_grupo(padrao, texto) -> Optional[str]:
+    match = padrao.search(texto)
+    return match.group(1) if match else None
+
+
+def _data_br(texto) -> Optional[object]:
+    if texto:
+        try:
+            return datetime.strptime(texto, '%d/%m/%Y').date()
+        except ValueError:
+            pass
+    return None
+
+
+# ============================================
+# EXTRAÇÃO DE TEXTO
+# ============================================
+
+def _importar_pdfplumber():
+    try:
+        import pdfplumber
+    except ImportError:
+        raise ImportError("Biblioteca pdfplumber não instalada. Execute: pip install pdfplumber")
+    return pdfplumber
+
+
+def _extrair_faixa(conteudo: bytes, inicio: int, fim: int) -> List[str]:
+    """Texto das páginas [inicio, fim) (executado nos processos)"""
+    pdfplumber = _importar_pdfplumber()
+    with pdfplumber.open(io.BytesIO(conteudo)) as pdf:
+        return [pdf.pages[indice].extract_text() or '' for indice in range(inicio, fim)]
+
+
+def extrair_paginas(conteudo: bytes, workers: int = None) -> List[str]:
+    """
+    Texto de cada página do PDF, em paralelo quando há páginas suficientes
+
+    Args:
+        conteudo: Bytes do PDF
+        workers: Processos (padrão: número de CPUs; 1 = sequencial)
+    """
+    pdfplumber = _importar_pdfplumber()
+    with pdfplumber.open(io.BytesIO(conteudo)) as pdf:
+        total = len(pdf.pages)
+        workers = min(workers or os.cpu_count() or 1, total)
+        if workers <= 1 or total < MINIMO_PAGINAS_PARALELO:
+            return [pagina.extract_text() or '' for pagina in pdf.pages]
+
+    tamanho = math.ceil(total / workers)
+    inicios = list(range(0, total, tamanho))
+    fins = [min(inicio + tamanho, total) for inicio in inicios]
+    with ProcessPoolExecutor(max_workers=len(inicios)) as executor:
+        faixas = executor.map(_extrair_faixa, repeat(conteudo), inicios, fins)
+        return [texto for faixa in faixas for texto in faixa]
+
+
+class CacheTextoPDF:
+    """
+    Texto extraído de PDFs em disco, por hash do conteúdo
+
+    Um arquivo JSON por PDF em <diretorio>/<2 primeiros da hash>/<hash>.json.
+    Falhas de leitura ou gravação são ignoradas (o PDF é extraído de novo).
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+
+    @staticmethod
+    def chave(conteudo: bytes) -> str:
+        return hashlib.sha256(conteudo).hexdigest()
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / chave[:2] / f'{chave}.json'
+
+    def ler(self, chave: str) -> Optional[List[str]]:
+        try:
+            with open(self._caminho(chave), encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        if dados.get('versao') != VERSAO_EXTRACAO:
+            return None
+        return dados.get('paginas')
+
+    def gravar(self, chave: str, paginas: List[str]):
+        caminho = self._caminho(chave)
+        temporario = caminho.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump({'versao': VERSAO_EXTRACAO, 'paginas': paginas}, arquivo, ensure_ascii=False)
+            os.replace(temporario, caminho)
+        except OSError:
+            pass
 
 
 class PDFPedidoParser:
     """
     Parser para extrair dados de PDFs de pedidos de fornecedores
     """
-    
-    def __init__(self):
+
+    def __init__(self, cache_dir=None, workers: int = None):
+        """
+        Args:
+            cache_dir: Diretório do cache de texto extraído (sem cache se None)
+            workers: Processos para extrair as páginas (padrão: número de CPUs)
+        """
         self.texto = ""
         self.linhas = []
+        self.paginas = []
         self.formato_detectado = None
         self.errors = []
         self.warnings = []
-    
+        self.cache = CacheTextoPDF(cache_dir) if cache_dir else None
+        self.workers = workers
+        self.texto_em_cache = False
+
     def parse(self, pdf_file) -> Tuple[bool, Dict, List[str]]:
         """
         Faz o parse do PDF
-        
+
         Args:
-            pdf_file: Arquivo PDF (file-like object)
-            
+            pdf_file: Arquivo PDF (file-like object, bytes ou path)
+
         Returns:
             Tuple (success, dados, errors)
         """
         self.errors = []
         self.warnings = []
-        
+
         # Extrai texto do PDF
         try:
-            self.texto = self._extrair_texto_pdf(pdf_file)
-            if not self.texto:
-                self.errors.append("Não foi possível extrair texto do PDF")
-                return False, {}, self.errors
-            
-            self.linhas = self.texto.split('\n')
-            
+            texto = self._extrair_texto_pdf(pdf_file)
         except Exception as e:
             self.errors.append(f"Erro ao ler PDF: {str(e)}")
             return False, {}, self.errors
-        
+
+        if not texto:
+            self.errors.append("Não foi possível extrair texto do PDF")
+            return False, {}, self.errors
+
+        return self.parse_texto(texto)
+
+    def parse_texto(self, texto: str) -> Tuple[bool, Dict, List[str]]:
+        """Interpreta o texto já extraído de um PDF"""
+        self.texto = texto
+        self.linhas = texto.split('\n')
+
         # Detecta o formato do PDF
         self.formato_detectado = self._detectar_formato()
-        
+
         # Extrai dados baseado no formato
         if self.formato_detectado == 'conexao':
             dados = self._parse_conexao()
@@ -62,69 +258,72 @@ class PDFPedidoParser:
             dados = self._parse_araujo()
         else:
             dados = self._parse_generico()
-        
+
         if not dados.get('itens'):
             self.errors.append("Nenhum item encontrado no PDF")
             return False, {}, self.errors
-        
+
         dados['formato_detectado'] = self.formato_detectado
         dados['success'] = True
-        
+
         return True, dados, self.warnings
-    
-    def _extrair_texto_pdf(self, pdf_file) -> str:
-        """Extrai texto do PDF usando pdfplumber"""
-        try:
-            import pdfplumber
-        except ImportError:
-            raise ImportError("Biblioteca pdfplumber não instalada. Execute: pip install pdfplumber")
-        
-        texto_completo = ""
-        
-        # Se for bytes, converte para file-like object
+
+    @staticmethod
+    def _ler_conteudo(pdf_file) -> bytes:
+        if isinstance(pdf_file, (bytes, bytearray)):
+            return bytes(pdf_file)
         if hasattr(pdf_file, 'read'):
             content = pdf_file.read()
             if hasattr(pdf_file, 'seek'):
                 pdf_file.seek(0)
-            pdf_file = io.BytesIO(content)
-        
-        with pdfplumber.open(pdf_file) as pdf:
-            for pagina in pdf.pages:
-                texto = pagina.extract_text()
-                if texto:
-                    texto_completo += texto + "\n"
-        
-        return texto_completo
-    
+            return content
+        return Path(pdf_file).read_bytes()
+
+    def _extrair_texto_pdf(self, pdf_file) -> str:
+        """Extrai texto do PDF usando pdfplumber (ou do cache)"""
+        conteudo = self._ler_conteudo(pdf_file)
+
+        chave = self.cache.chave(conteudo) if self.cache else None
+        paginas = self.cache.ler(chave) if self.cache else None
+        self.texto_em_cache = paginas is not None
+
+        if paginas is None:
+            paginas = extrair_paginas(conteudo, self.workers)
+            if self.cache:
+                self.cache.gravar(chave, paginas)
+
+        self.paginas = paginas
+        return ''.join(texto + '\n' for texto in paginas if texto)
+
     def _detectar_formato(self) -> str:
         """Detecta o formato do PDF baseado no conteúdo"""
         texto_lower = self.texto.lower()
-        
+
         # Conexão Distribuidora (CM Sistemas)
         if 'cm sistemas' in texto_lower or 'conexao distribuidora' in texto_lower:
             return 'conexao'
-        
+
         # AC Araujo
         if 'araujo' in texto_lower and 'distribuidora' in texto_lower:
             return 'araujo'
-        
+
         # Tenta detectar por estrutura
         if 'listagem de pedidos' in texto_lower:
             return 'conexao'
-        
+
         if 'pedido de venda' in texto_lower and 'cod. barras' in texto_lower:
             return 'araujo'
-        
+
         return 'generico'
-    
+
     def _limpar_valor(self, valor_str: str) -> Decimal:
         """Converte string de valor para Decimal"""
         if not valor_str:
             return Decimal('0.00')
-        
+
         # Remove símbolos de moeda e espaços
         valor_str = valor_str.replace('$', '').replace('R$', '').strip()
-        
+
         # Trata formato brasileiro (1.234,56) e americano (1,234.56)
         if ',' in valor_str and '.' in valor_str:
             # Verifica qual é o separador decimal
@@ -137,88 +336,49 @@ class PDFPedidoParser:
         elif ',' in valor_str:
             # Só vírgula: assume decimal brasileiro
             valor_str = valor_str.replace(',', '.')
-        
+
         try:
             return Decimal(valor_str)
         except (InvalidOperation, ValueError):
             return Decimal('0.00')
-    
+
     def _limpar_quantidade(self, qtd_str: str) -> Decimal:
         """Converte string de quantidade para Decimal"""
         if not qtd_str:
             return Decimal('0')
-        
+
         # Remove espaços e converte vírgula para ponto
         qtd_str = qtd_str.strip().replace(',', '.')
-        
+
         # Remove zeros à direita desnecessários (ex: 2,000 -> 2)
         try:
             valor = Decimal(qtd_str)
             return valor
         except (InvalidOperation, ValueError):
             return Decimal('0')
-    
+
     def _parse_conexao(self) -> Dict:
         """Parse para formato Conexão Distribuidora (CM Sistemas)"""
+        padroes = PADROES_CONEXAO
         dados = {
             'fornecedor': 'CONEXAO DISTRIBUIDORA DE AUTO PECAS LTDA',
-            'numero_pedido': '',
-            'data_emissao': None,
+            'numero_pedido': _primeiro_grupo(padroes['numero_pedido'], self.texto) or '',
+            'data_emissao': _data_br(_primeiro_grupo(padroes['data_emissao'], self.texto)),
             'itens': [],
             'subtotal': Decimal('0.00'),
             'icms_st': Decimal('0.00'),
             'ipi': Decimal('0.00'),
             'total': Decimal('0.00'),
         }
-        
-        # Extrai número do pedido
-        match = re.search(r'Pedido:\s*(\d+)', self.texto)
-        if match:
-            dados['numero_pedido'] = match.group(1)
-        
-        # Extrai data de emissão
-        match = re.search(r'Dt\.\s*Emiss[ãa]o:\s*(\d{2}/\d{2}/\d{4})', self.texto)
-        if match:
-            try:
-                dados['data_emissao'] = datetime.strptime(match.group(1), '%d/%m/%Y').date()
-            except ValueError:
-                pass
-        
+
         # Extrai totais
-        match = re.search(r'Subtotal:\s*([\d.,]+)', self.texto)
-        if match:
-            dados['subtotal'] = self._limpar_valor(match.group(1))
-        
-        match = re.search(r'ICMS-ST:\s*([\d.,]+)', self.texto)
-        if match:
-            dados['icms_st'] = self._limpar_valor(match.group(1))
-        
-        match = re.search(r'IPI:\s*([\d.,]+)', self.texto)
-        if match:
-            dados['ipi'] = self._limpar_valor(match.group(1))
-        
-        match = re.search(r'T\s*O\s*T\s*A\s*L\s*:\s*([\d.,]+)', self.texto)
-        if match:
-            dados['total'] = self._limpar_valor(match.group(1))
-        
-        # Extrai itens
-        # Padrão: 001 TG1014002 LAMPADA TORPEDO 36MM 16 LED (PAR) TIGER UN 2,000 60,000 8,5700 17,14
-        # Formato: Item Código Descrição Un Quant Saldo Unit Total
-        
-        # Regex para capturar linha de item
-        # O formato pode ter a descrição em múltiplas linhas
-        padrao_item = re.compile(
-            r'(\d{3})\s+'  # Item (001, 002, etc)
-            r'([A-Z0-9]+)\s+'  # Código
-            r'(.+?)\s+'  # Descrição (não-greedy)
-            r'(UN|CX|PC|KG|LT|MT|PR)\s+'  # Unidade
-            r'([\d.,]+)\s+'  # Quantidade
-            r'([\d.,]+)\s+'  # Saldo (ignoramos)
-            r'([\d.,]+)\s+'  # Valor unitário
-            r'([\d.,]+)'  # Valor total
-        )
-        
-        for match in padrao_item.finditer(self.texto):
+        for campo in ('subtotal', 'icms_st', 'ipi', 'total'):
+            valor = _primeiro_grupo(padroes[campo], self.texto)
+            if valor:
+                dados[campo] = self._limpar_valor(valor)
+
+        # Extrai itens (a descrição pode ocupar várias linhas)
+        for match in padroes['item'].finditer(self.texto):
             item = {
                 'numero_item': int(match.group(1)),
                 'codigo': match.group(2).strip(),
@@ -230,44 +390,44 @@ class PDFPedidoParser:
                 'codigo_barras': '',
             }
             dados['itens'].append(item)
-        
+
         # Se não encontrou com o padrão acima, tenta outro método
         if not dados['itens']:
             dados['itens'] = self._extrair_itens_conexao_alternativo()
-        
+
         return dados
-    
+
     def _extrair_itens_conexao_alternativo(self) -> List[Dict]:
         """Método alternativo para extrair itens do formato Conexão"""
         itens = []
-        
+
         # Procura por linhas que começam com número de 3 dígitos
         em_itens = False
         item_atual = None
-        
+
         for linha in self.linhas:
             linha = linha.strip()
-            
+
             # Detecta início da seção de itens
             if 'Item' in linha and 'Código' in linha and 'Descrição' in linha:
                 em_itens = True
                 continue
-            
+
             # Detecta fim da seção de itens
             if 'T O T A L' in linha or 'Subtotal:' in linha:
                 em_itens = False
                 continue
-            
+
             if not em_itens:
                 continue
-            
+
             # Tenta extrair item
-            match = re.match(r'^(\d{3})\s+(\S+)\s+(.+)', linha)
+            match = PADROES_CONEXAO['item_alternativo'].match(linha)
             if match:
                 # Salva item anterior se existir
                 if item_atual:
                     itens.append(item_atual)
-                
+
                 # Inicia novo item
                 item_atual = {
                     'numero_item': int(match.group(1)),
@@ -279,73 +439,47 @@ class PDFPedidoParser:
                     'valor_total': Decimal('0'),
                     'codigo_barras': '',
                 }
-                
+
                 # Tenta extrair valores do restante da linha
                 resto = match.group(3)
-                valores = re.findall(r'([\d.,]+)', resto)
+                valores = _RE_VALORES.findall(resto)
                 if len(valores) >= 3:
                     item_atual['quantidade'] = self._limpar_quantidade(valores[-4]) if len(valores) >= 4 else Decimal('1')
                     item_atual['valor_unitario'] = self._limpar_valor(valores[-2])
                     item_atual['valor_total'] = self._limpar_valor(valores[-1])
-                
+
                 # Extrai unidade
-                unidade_match = re.search(r'\b(UN|CX|PC|KG|LT|MT|PR)\b', resto)
+                unidade_match = _RE_UNIDADE.search(resto)
                 if unidade_match:
                     item_atual['unidade'] = unidade_match.group(1)
-        
+
         # Adiciona último item
         if item_atual:
             itens.append(item_atual)
-        
+
         return itens
-    
+
     def _parse_araujo(self) -> Dict:
         """Parse para formato AC Araujo Distribuidora"""
+        padroes = PADROES_ARAUJO
         dados = {
             'fornecedor': 'AC ARAUJO DISTRIBUIDORA DE AUTO PECAS',
-            'numero_pedido': '',
-            'data_emissao': None,
+            'numero_pedido': _primeiro_grupo(padroes['numero_pedido'], self.texto) or '',
+            'data_emissao': _data_br(_primeiro_grupo(padroes['data_emissao'], self.texto)),
             'itens': [],
             'subtotal': Decimal('0.00'),
             'icms_st': Decimal('0.00'),
             'ipi': Decimal('0.00'),
             'total': Decimal('0.00'),
         }
-        
-        # Extrai número do pedido
-        match = re.search(r'N[úu]mero do Pedido:\s*(\d+)', self.texto)
-        if match:
-            dados['numero_pedido'] = match.group(1)
-        
-        # Extrai data de emissão
-        match = re.search(r'Pedido feito em:\s*(\d{2}/\d{2}/\d{4})', self.texto)
-        if match:
-            try:
-                dados['data_emissao'] = datetime.strptime(match.group(1), '%d/%m/%Y').date()
-            except ValueError:
-                pass
-        
+
         # Extrai total
-        match = re.search(r'Total\s+\d+\s+\$?([\d.,]+)', self.texto)
-        if match:
-            dados['total'] = self._limpar_valor(match.group(1))
-        
+        total = _primeiro_grupo(padroes['total'], self.texto)
+        if total:
+            dados['total'] = self._limpar_valor(total)
+
         # Extrai itens
-        # Formato: # PROD. DESCRIÇÃO UNID. COD. BARRAS QTDE. PREÇO UN. PREÇO
-        # Exemplo: 6 4T20W50 COD.1024151 LUBRAX SL 4T 20W50 CXC24 1L PC 7891344015750 24 $16.99 $407.76
-        
-        padrao_item = re.compile(
-            r'(\d+)\s+'  # Número do item
-            r'([A-Z0-9]+)\s+'  # Código do produto
-            r'(.+?)\s+'  # Descrição
-            r'(UN|CX|PC|KG|LT|MT|PR)\s+'  # Unidade
-            r'(\d{8,14})\s+'  # Código de barras
-            r'(\d+)\s+'  # Quantidade
-            r'\$?([\d.,]+)\s+'  # Preço unitário
-            r'\$?([\d.,]+)'  # Preço total
-        )
-        
-        for match in padrao_item.finditer(self.texto):
+        for match in padroes['item'].finditer(self.texto):
             item = {
                 'numero_item': int(match.group(1)),
                 'codigo': match.group(2).strip(),
@@ -357,44 +491,45 @@ class PDFPedidoParser:
                 'valor_total': self._limpar_valor(match.group(8)),
             }
             dados['itens'].append(item)
-        
+
         # Se não encontrou, tenta método alternativo
         if not dados['itens']:
             dados['itens'] = self._extrair_itens_araujo_alternativo()
-        
+
         # Calcula total se não encontrado
         if dados['total'] == 0 and dados['itens']:
             dados['total'] = sum(item['valor_total'] for item in dados['itens'])
-        
+
         dados['subtotal'] = dados['total']
-        
+
         return dados
-    
+
     def _extrair_itens_araujo_alternativo(self) -> List[Dict]:
         """Método alternativo para extrair itens do formato Araujo"""
+        padroes = PADROES_ARAUJO
         itens = []
-        
+
         # Procura por linhas com código de barras (8-14 dígitos)
         for linha in self.linhas:
             # Procura código de barras
-            barras_match = re.search(r'\b(\d{8,14})\b', linha)
+            barras_match = padroes['codigo_barras'].search(linha)
             if not barras_match:
                 continue
-            
+
             codigo_barras = barras_match.group(1)
-            
+
             # Procura valores monetários
-            valores = re.findall(r'\$?([\d.,]+)', linha)
+            valores = padroes['valores'].findall(linha)
             if len(valores) < 2:
                 continue
-            
+
             # Procura código do produto (geralmente no início)
-            codigo_match = re.match(r'^\s*\d+\s+([A-Z0-9]+)', linha)
+            codigo_match = padroes['codigo'].match(linha)
             codigo = codigo_match.group(1) if codigo_match else ''
-            
+
             # Extrai descrição (texto entre código e unidade)
             descricao = linha
-            
+
             item = {
                 'numero_item': len(itens) + 1,
                 'codigo': codigo,
@@ -406,45 +541,33 @@ class PDFPedidoParser:
                 'valor_total': self._limpar_valor(valores[-1]),
             }
             itens.append(item)
-        
+
         return itens
-    
+
     def _parse_generico(self) -> Dict:
         """Parse genérico para formatos não reconhecidos"""
+        padroes = PADROES_GENERICO
         dados = {
             'fornecedor': '',
-            'numero_pedido': '',
-            'data_emissao': None,
+            'numero_pedido': _primeiro_grupo(padroes['numero_pedido'], self.texto) or '',
+            'data_emissao': _data_br(_primeiro_grupo(padroes['data_emissao'], self.texto)),
             'itens': [],
             'subtotal': Decimal('0.00'),
             'icms_st': Decimal('0.00'),
             'ipi': Decimal('0.00'),
             'total': Decimal('0.00'),
         }
-        
+
         # Tenta extrair fornecedor (primeira linha com LTDA, EIRELI, etc)
         for linha in self.linhas[:10]:
-            if any(x in linha.upper() for x in ['LTDA', 'EIRELI', 'S.A.', 'S/A', 'ME', 'EPP']):
+            if any(x in linha.upper() for x in _MARCAS_EMPRESA):
                 dados['fornecedor'] = linha.strip()[:100]
                 break
-        
-        # Tenta extrair número do pedido
-        match = re.search(r'[Pp]edido[:\s#]*(\d+)', self.texto)
-        if match:
-            dados['numero_pedido'] = match.group(1)
-        
-        # Tenta extrair data
-        match = re.search(r'(\d{2}/\d{2}/\d{4})', self.texto)
-        if match:
-            try:
-                dados['data_emissao'] = datetime.strptime(match.group(1), '%d/%m/%Y').date()
-            except ValueError:
-                pass
-        
+
         # Tenta extrair itens (procura linhas com padrão de produto)
         for linha in self.linhas:
             # Procura linhas com valores monetários
-            valores = re.findall(r'[\d.,]+', linha)
+            valores = padroes['valores'].findall(linha)
             if len(valores) >= 3:
                 # Tenta identificar como item
                 try:
@@ -452,15 +575,15 @@ class PDFPedidoParser:
                     quantidade = self._limpar_quantidade(valores[-3])
                     unitario = self._limpar_valor(valores[-2])
                     total = self._limpar_valor(valores[-1])
-                    
+
                     # Valida se faz sentido (quantidade * unitário ≈ total)
                     if quantidade > 0 and unitario > 0 and total > 0:
                         calc = quantidade * unitario
                         if abs(calc - total) < total * Decimal('0.1'):  # 10% de tolerância
                             # Extrai código (primeiro texto alfanumérico)
-                            codigo_match = re.search(r'\b([A-Z0-9]{3,20})\b', linha)
+                            codigo_match = padroes['codigo'].search(linha)
                             codigo = codigo_match.group(1) if codigo_match else ''
-                            
+
                             item = {
                                 'numero_item': len(dados['itens']) + 1,
                                 'codigo': codigo,
@@ -474,26 +597,27 @@ class PDFPedidoParser:
                             dados['itens'].append(item)
                 except:
                     continue
-        
+
         # Calcula total
         if dados['itens']:
             dados['total'] = sum(item['valor_total'] for item in dados['itens'])
             dados['subtotal'] = dados['total']
-        
+
         self.warnings.append(f"Formato não reconhecido. Extração genérica com {len(dados['itens'])} itens.")
-        
+
         return dados
 
 
-def parse_pdf_pedido(pdf_file) -> Tuple[bool, Dict, List[str]]:
+def parse_pdf_pedido(pdf_file, cache_dir=None) -> Tuple[bool, Dict, List[str]]:
     """
     Função helper para fazer parse de PDF de pedido
-    
+
     Args:
         pdf_file: Arquivo PDF (file-like object ou path)
-        
+        cache_dir: Diretório do cache de texto extraído (opcional)
+
     Returns:
         Tuple (success, dados, errors)
     """
-    parser = PDFPedidoParser()
+    parser = PDFPedidoParser(cache_dir=cache_dir)
     return parser.parse(pdf_file)
@@ -5,406 +5,350 @@ Este módulo é responsável por:
 - Ler e validar arquivos XML de NF-e
 - Extrair dados do fornecedor, produtos, valores
 - Converter para estrutura compatível com o sistema
+
+O XML é lido em fluxo (ElementTree.iterparse): cada bloco da nota (ide,
+emit, det, ICMSTot) é convertido assim que se fecha e depois descartado,
+sem montar a árvore inteira nem percorrê-la de novo a cada campo. As tags
+são comparadas pelo nome local, sem namespace, resolvido uma vez por tag.
 """
 
+import io
 import xml.etree.ElementTree as ET
+from xml.parsers.expat import errors as expat_errors
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Tuple
 import re
 
 
+# ============================================
+# TAGS
+# ============================================
+
+# '{http://www.portalfiscal.inf.br/nfe}det' -> 'det' (cache por tag)
+_NOMES_LOCAIS = {}
+
+GTIN_VAZIO = {'SEM GTIN', 'SEM EAN'}
+
+# Erro do expat para documento sem nenhum elemento
+_ERRO_SEM_ELEMENTOS = expat_errors.codes[expat_errors.XML_ERROR_NO_ELEMENTS]
+
+
+def _local(tag) -> str:
+    """Nome da tag sem o namespace"""
+    nome = _NOMES_LOCAIS.get(tag)
+    if nome is None:
+        nome = tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+        _NOMES_LOCAIS[tag] = nome
+    return nome
+
+
+def _filhos(elemento) -> Dict:
+    """Texto dos filhos diretos {nome_local: texto}"""
+    return {_local(filho.tag): filho.text for filho in elemento}
+
+
+def _filho(elemento, nome):
+    """Primeiro filho direto com o nome local informado"""
+    for filho in elemento:
+        if _local(filho.tag) == nome:
+            return filho
+    return None
+
+
+def _descendentes(elemento, nome) -> Iterator[str]:
+    """Textos dos descendentes com o nome local informado"""
+    for filho in elemento.iter():
+        if _local(filho.tag) == nome and filho.text:
+            yield filho.text
+
+
+# ============================================
+# CONVERSÃO DE VALORES
+# ============================================
+
+def _texto(campos: Dict, nome: str, default: str = '') -> str:
+    return campos.get(nome) or default
+
+
+def _decimal(texto, default: Decimal = Decimal('0.00')) -> Decimal:
+    if texto:
+        try:
+            return Decimal(texto.replace(',', '.'))
+        except InvalidOperation:
+            pass
+    return default
+
+
+def _data(texto):
+    if not texto:
+        return None
+    try:
+        # Formato ISO com timezone
+        if 'T' in texto:
+            return datetime.fromisoformat(texto.replace('Z', '+00:00')).date()
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _formatar_cnpj(cnpj: str) -> str:
+    cnpj = re.sub(r'\D', '', cnpj)
+    if len(cnpj) == 14:
+        cnpj = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+    return cnpj
+
+
+# ============================================
+# BLOCOS DA NOTA
+# ============================================
+
+def _dados_nota(ide, chave_acesso: str) -> Dict:
+    campos = _filhos(ide)
+    return {
+        'numero_nf': _texto(campos, 'nNF'),
+        'serie': _texto(campos, 'serie', '1'),
+        'natureza_operacao': _texto(campos, 'natOp'),
+        'data_emissao': _data(_texto(campos, 'dhEmi') or _texto(campos, 'dEmi')),
+        'chave_acesso': chave_acesso,
+        'modelo': _texto(campos, 'mod', '55'),
+        'tipo_operacao': _texto(campos, 'tpNF', '0'),  # 0=entrada, 1=saída
+    }
+
+
+def _dados_emitente(emit) -> Dict:
+    campos = _filhos(emit)
+
+    # Endereço
+    endereco = {}
+    ender_emit = _filho(emit, 'enderEmit')
+    if ender_emit is not None:
+        ender = _filhos(ender_emit)
+        endereco = {
+            'logradouro': _texto(ender, 'xLgr'),
+            'numero': _texto(ender, 'nro'),
+            'complemento': _texto(ender, 'xCpl'),
+            'bairro': _texto(ender, 'xBairro'),
+            'cidade': _texto(ender, 'xMun'),
+            'uf': _texto(ender, 'UF'),
+            'cep': _texto(ender, 'CEP'),
+            'telefone': _texto(ender, 'fone'),
+        }
+
+    cnpj = _texto(campos, 'CNPJ')
+    return {
+        'cnpj': _formatar_cnpj(cnpj) if cnpj else cnpj,
+        'razao_social': _texto(campos, 'xNome'),
+        'nome_fantasia': _texto(campos, 'xFant') or _texto(campos, 'xNome'),
+        'inscricao_estadual': _texto(campos, 'IE'),
+        'email': _texto(campos, 'email'),
+        **endereco
+    }
+
+
+def _dados_item(det):
+    """Dados de um det (None se não tiver prod)"""
+    prod = _filho(det, 'prod')
+    if prod is None:
+        return None
+    campos = _filhos(prod)
+
+    # Valores de impostos
+    valor_ipi = Decimal('0.00')
+    valor_icms_st = Decimal('0.00')
+    imposto = _filho(det, 'imposto')
+    if imposto is not None:
+        ipi = _filho(imposto, 'IPI')
+        if ipi is not None:
+            # vIPI fica em IPITrib
+            valor_ipi = _decimal(next(_descendentes(ipi, 'vIPI'), ''))
+
+        icms = _filho(imposto, 'ICMS')
+        if icms is not None:
+            for texto in _descendentes(icms, 'vICMSST'):
+                valor_icms_st = _decimal(texto)
+                if valor_icms_st > 0:
+                    break
+
+    # Código de barras
+    codigo_barras = _texto(campos, 'cEAN')
+    if codigo_barras in GTIN_VAZIO or not codigo_barras:
+        codigo_barras = _texto(campos, 'cEANTrib')
+        if codigo_barras in GTIN_VAZIO:
+            codigo_barras = ''
+
+    return {
+        'numero_item': int(det.get('nItem', '1')),
+        'codigo_produto_fornecedor': _texto(campos, 'cProd'),
+        'codigo_barras': codigo_barras,
+        'descricao': _texto(campos, 'xProd'),
+        'ncm': _texto(campos, 'NCM'),
+        'cest': _texto(campos, 'CEST'),
+        'cfop': _texto(campos, 'CFOP'),
+        'unidade': _texto(campos, 'uCom', 'UN'),
+        'quantidade': _decimal(campos.get('qCom'), Decimal('0')),
+        'valor_unitario': _decimal(campos.get('vUnCom'), Decimal('0')),
+        'valor_total': _decimal(campos.get('vProd'), Decimal('0')),
+        'valor_desconto': _decimal(campos.get('vDesc'), Decimal('0')),
+        'valor_ipi': valor_ipi,
+        'valor_icms_st': valor_icms_st,
+    }
+
+
+def _totais(icms_tot) -> Dict:
+    campos = _filhos(icms_tot)
+    return {
+        'valor_produtos': _decimal(campos.get('vProd')),
+        'valor_desconto': _decimal(campos.get('vDesc')),
+        'valor_frete': _decimal(campos.get('vFrete')),
+        'valor_seguro': _decimal(campos.get('vSeg')),
+        'valor_outras_despesas': _decimal(campos.get('vOutro')),
+        'valor_ipi': _decimal(campos.get('vIPI')),
+        'valor_icms_st': _decimal(campos.get('vST')),
+        'valor_total': _decimal(campos.get('vNF')),
+    }
+
+
+# Bloco que fecha -> tipo do evento gerado
+_BLOCOS = {
+    'ide': 'nota',
+    'emit': 'emitente',
+    'det': 'item',
+    'ICMSTot': 'totais',
+}
+
+
 class NFEXMLParser:
     """
     Parser para arquivos XML de NF-e
-    
-    Suporta NF-e versão 4.0 (atual)
+
+    Suporta NF-e versão 4.0 (atual), com ou sem nfeProc e com ou sem
+    namespace
     """
-    
-    # Namespaces da NF-e
-    NAMESPACES = {
-        'nfe': 'http://www.portalfiscal.inf.br/nfe',
-    }
-    
+
     def __init__(self, xml_content: str = None, xml_file=None):
         """
         Inicializa o parser
-        
+
         Args:
             xml_content: String com o conteúdo XML
-            xml_file: Arquivo XML (file-like object)
+            xml_file: Arquivo XML (file-like object, texto ou bytes)
         """
         self.xml_content = xml_content
         self.xml_file = xml_file
-        self.root = None
-        self.nfe = None
-        self.infNFe = None
+        self.chave_acesso = ''
+        self.vazio = True
+        self.encontrou_inf_nfe = False
+        self.nota = {}
+        self.emitente = {}
+        self.itens = []
+        self.totais = {}
         self.errors = []
-        
+
+    def _fonte(self):
+        if self.xml_file is not None:
+            return self.xml_file
+        # Remove BOM se existir
+        return io.StringIO((self.xml_content or '').lstrip('\ufeff'))
+
+    def iterar(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Lê o XML em fluxo e gera cada bloco assim que ele termina:
+        ('nota', dados), ('emitente', dados), ('item', dados) para cada
+        det e ('totais', dados)
+
+        Raises:
+            ET.ParseError: XML malformado ou vazio
+        """
+        dentro_inf_nfe = False
+        for evento, elemento in ET.iterparse(self._fonte(), events=('start', 'end')):
+            self.vazio = False
+            nome = _local(elemento.tag)
+
+            if nome == 'infNFe':
+                dentro_inf_nfe = evento == 'start'
+                if dentro_inf_nfe:
+                    self.encontrou_inf_nfe = True
+                    # Chave está no atributo Id
+                    chave = elemento.get('Id', '')
+                    self.chave_acesso = chave[3:] if chave.startswith('NFe') else chave
+                continue
+
+            if evento != 'end' or not dentro_inf_nfe or nome not in _BLOCOS:
+                continue
+
+            if nome == 'ide':
+                dados = _dados_nota(elemento, self.chave_acesso)
+            elif nome == 'emit':
+                dados = _dados_emitente(elemento)
+            elif nome == 'det':
+                dados = _dados_item(elemento)
+            else:
+                dados = _totais(elemento)
+
+            # O bloco já foi convertido: libera os elementos
+            elemento.clear()
+            if dados is not None:
+                yield _BLOCOS[nome], dados
+
     def parse(self) -> bool:
         """
         Faz o parse do XML
-        
+
         Returns:
             True se parse foi bem sucedido
         """
+        self.chave_acesso = ''
+        self.vazio = True
+        self.encontrou_inf_nfe = False
+        self.nota, self.emitente, self.itens, self.totais = {}, {}, [], {}
+
         try:
-            if self.xml_file:
-                # Lê o arquivo
-                content = self.xml_file.read()
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-                self.xml_content = content
-            
-            if not self.xml_content:
-                self.errors.append("Conteúdo XML vazio")
-                return False
-            
-            # Remove BOM se existir
-            self.xml_content = self.xml_content.lstrip('\ufeff')
-            
-            # Parse do XML
-            self.root = ET.fromstring(self.xml_content)
-            
-            # Encontra o elemento NFe
-            self.nfe = self._find_element(self.root, './/nfe:NFe')
-            if self.nfe is None:
-                # Tenta sem namespace
-                self.nfe = self.root.find('.//NFe')
-            
-            if self.nfe is None:
-                # O próprio root pode ser o NFe ou nfeProc
-                if 'NFe' in self.root.tag:
-                    self.nfe = self.root
-                elif 'nfeProc' in self.root.tag:
-                    self.nfe = self._find_element(self.root, './/nfe:NFe')
-                    if self.nfe is None:
-                        for child in self.root:
-                            if 'NFe' in child.tag:
-                                self.nfe = child
-                                break
-            
-            if self.nfe is None:
-                self.errors.append("Elemento NFe não encontrado no XML")
-                return False
-            
-            # Encontra infNFe
-            self.infNFe = self._find_element(self.nfe, './/nfe:infNFe')
-            if self.infNFe is None:
-                for child in self.nfe:
-                    if 'infNFe' in child.tag:
-                        self.infNFe = child
-                        break
-            
-            if self.infNFe is None:
-                self.errors.append("Elemento infNFe não encontrado no XML")
-                return False
-                
-            return True
-            
+            for tipo, dados in self.iterar():
+                if tipo == 'item':
+                    self.itens.append(dados)
+                else:
+                    setattr(self, tipo, dados)
         except ET.ParseError as e:
-            self.errors.append(f"Erro ao fazer parse do XML: {str(e)}")
+            if self.vazio and e.code == _ERRO_SEM_ELEMENTOS:
+                self.errors.append("Conteúdo XML vazio")
+            else:
+                self.errors.append(f"Erro ao fazer parse do XML: {str(e)}")
             return False
         except Exception as e:
             self.errors.append(f"Erro inesperado: {str(e)}")
             return False
-    
-    def _find_element(self, parent, path: str):
-        """Encontra elemento considerando namespace"""
-        element = parent.find(path, self.NAMESPACES)
-        if element is None:
-            # Tenta sem namespace
-            clean_path = path.replace('nfe:', '')
-            element = parent.find(clean_path)
-        return element
-    
-    def _get_text(self, parent, path: str, default: str = '') -> str:
-        """Obtém texto de um elemento"""
-        element = self._find_element(parent, path)
-        if element is None:
-            # Tenta busca direta
-            for child in parent.iter():
-                tag_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                search_name = path.split(':')[-1] if ':' in path else path
-                search_name = search_name.replace('./', '').replace('/', '')
-                if tag_name == search_name:
-                    return child.text or default
-        return element.text if element is not None and element.text else default
-    
-    def _get_decimal(self, parent, path: str, default: Decimal = Decimal('0.00')) -> Decimal:
-        """Obtém valor decimal de um elemento"""
-        text = self._get_text(parent, path, '')
-        if text:
-            try:
-                return Decimal(text.replace(',', '.'))
-            except InvalidOperation:
-                pass
-        return default
-    
-    def _get_int(self, parent, path: str, default: int = 0) -> int:
-        """Obtém valor inteiro de um elemento"""
-        text = self._get_text(parent, path, '')
-        if text:
-            try:
-                return int(text)
-            except ValueError:
-                pass
-        return default
-    
+
+        if not self.encontrou_inf_nfe:
+            self.errors.append("Elemento infNFe não encontrado no XML")
+            return False
+
+        return True
+
     def get_chave_acesso(self) -> str:
         """Retorna a chave de acesso da NF-e"""
-        if self.infNFe is not None:
-            # Chave está no atributo Id
-            chave = self.infNFe.get('Id', '')
-            if chave.startswith('NFe'):
-                chave = chave[3:]
-            return chave
-        return ''
-    
+        return self.chave_acesso
+
     def get_dados_nota(self) -> Dict:
-        """
-        Extrai dados gerais da nota fiscal
-        
-        Returns:
-            Dicionário com dados da nota
-        """
-        if self.infNFe is None:
-            return {}
-        
-        # Busca elemento ide (identificação)
-        ide = self._find_element(self.infNFe, 'nfe:ide')
-        if ide is None:
-            for child in self.infNFe:
-                if 'ide' in child.tag:
-                    ide = child
-                    break
-        
-        if ide is None:
-            return {}
-        
-        # Data de emissão
-        data_emissao_str = self._get_text(ide, 'nfe:dhEmi')
-        if not data_emissao_str:
-            data_emissao_str = self._get_text(ide, 'nfe:dEmi')
-        
-        data_emissao = None
-        if data_emissao_str:
-            try:
-                # Formato ISO com timezone
-                if 'T' in data_emissao_str:
-                    data_emissao = datetime.fromisoformat(
-                        data_emissao_str.replace('Z', '+00:00')
-                    ).date()
-                else:
-                    data_emissao = datetime.strptime(data_emissao_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
-        
-        return {
-            'numero_nf': self._get_text(ide, 'nfe:nNF'),
-            'serie': self._get_text(ide, 'nfe:serie', '1'),
-            'natureza_operacao': self._get_text(ide, 'nfe:natOp'),
-            'data_emissao': data_emissao,
-            'chave_acesso': self.get_chave_acesso(),
-            'modelo': self._get_text(ide, 'nfe:mod', '55'),
-            'tipo_operacao': self._get_text(ide, 'nfe:tpNF', '0'),  # 0=entrada, 1=saída
-        }
-    
+        """Dados gerais da nota fiscal (após parse)"""
+        return self.nota
+
     def get_dados_emitente(self) -> Dict:
-        """
-        Extrai dados do emitente (fornecedor)
-        
-        Returns:
-            Dicionário com dados do fornecedor
-        """
-        if self.infNFe is None:
-            return {}
-        
-        emit = self._find_element(self.infNFe, 'nfe:emit')
-        if emit is None:
-            for child in self.infNFe:
-                if 'emit' in child.tag:
-                    emit = child
-                    break
-        
-        if emit is None:
-            return {}
-        
-        # Endereço
-        enderEmit = self._find_element(emit, 'nfe:enderEmit')
-        if enderEmit is None:
-            for child in emit:
-                if 'enderEmit' in child.tag:
-                    enderEmit = child
-                    break
-        
-        endereco = {}
-        if enderEmit is not None:
-            endereco = {
-                'logradouro': self._get_text(enderEmit, 'nfe:xLgr'),
-                'numero': self._get_text(enderEmit, 'nfe:nro'),
-                'complemento': self._get_text(enderEmit, 'nfe:xCpl'),
-                'bairro': self._get_text(enderEmit, 'nfe:xBairro'),
-                'cidade': self._get_text(enderEmit, 'nfe:xMun'),
-                'uf': self._get_text(enderEmit, 'nfe:UF'),
-                'cep': self._get_text(enderEmit, 'nfe:CEP'),
-                'telefone': self._get_text(enderEmit, 'nfe:fone'),
-            }
-        
-        cnpj = self._get_text(emit, 'nfe:CNPJ')
-        if cnpj:
-            # Formata CNPJ
-            cnpj = re.sub(r'\D', '', cnpj)
-            if len(cnpj) == 14:
-                cnpj = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
-        
-        return {
-            'cnpj': cnpj,
-            'razao_social': self._get_text(emit, 'nfe:xNome'),
-            'nome_fantasia': self._get_text(emit, 'nfe:xFant') or self._get_text(emit, 'nfe:xNome'),
-            'inscricao_estadual': self._get_text(emit, 'nfe:IE'),
-            'email': self._get_text(emit, 'nfe:email'),
-            **endereco
-        }
-    
+        """Dados do emitente/fornecedor (após parse)"""
+        return self.emitente
+
     def get_itens(self) -> List[Dict]:
-        """
-        Extrai todos os itens da nota fiscal
-        
-        Returns:
-            Lista de dicionários com dados dos itens
-        """
-        if self.infNFe is None:
-            return []
-        
-        itens = []
-        
-        # Busca todos os elementos det (detalhe)
-        for det in self.infNFe.iter():
-            if 'det' in det.tag and det.tag.endswith('det'):
-                item = self._parse_item(det)
-                if item:
-                    itens.append(item)
-        
-        return itens
-    
-    def _parse_item(self, det) -> Optional[Dict]:
-        """Parse de um item da nota"""
-        numero_item = det.get('nItem', '1')
-        
-        # Busca prod (dados do produto)
-        prod = None
-        for child in det:
-            if 'prod' in child.tag:
-                prod = child
-                break
-        
-        if prod is None:
-            return None
-        
-        # Busca imposto
-        imposto = None
-        for child in det:
-            if 'imposto' in child.tag:
-                imposto = child
-                break
-        
-        # Valores de impostos
-        valor_ipi = Decimal('0.00')
-        valor_icms_st = Decimal('0.00')
-        
-        if imposto is not None:
-            # IPI
-            for ipi in imposto.iter():
-                if 'IPI' in ipi.tag:
-                    valor_ipi = self._get_decimal(ipi, 'nfe:vIPI')
-                    if valor_ipi == 0:
-                        # Tenta IPITrib
-                        for trib in ipi.iter():
-                            if 'IPITrib' in trib.tag:
-                                valor_ipi = self._get_decimal(trib, 'nfe:vIPI')
-                                break
-                    break
-            
-            # ICMS ST
-            for icms in imposto.iter():
-                if 'ICMS' in icms.tag:
-                    for child in icms:
-                        valor_icms_st = self._get_decimal(child, 'nfe:vICMSST')
-                        if valor_icms_st > 0:
-                            break
-                    break
-        
-        # Código de barras
-        codigo_barras = self._get_text(prod, 'nfe:cEAN')
-        if codigo_barras in ['SEM GTIN', 'SEM EAN', '']:
-            codigo_barras = self._get_text(prod, 'nfe:cEANTrib', '')
-            if codigo_barras in ['SEM GTIN', 'SEM EAN']:
-                codigo_barras = ''
-        
-        return {
-            'numero_item': int(numero_item),
-            'codigo_produto_fornecedor': self._get_text(prod, 'nfe:cProd'),
-            'codigo_barras': codigo_barras,
-            'descricao': self._get_text(prod, 'nfe:xProd'),
-            'ncm': self._get_text(prod, 'nfe:NCM'),
-            'cest': self._get_text(prod, 'nfe:CEST'),
-            'cfop': self._get_text(prod, 'nfe:CFOP'),
-            'unidade': self._get_text(prod, 'nfe:uCom', 'UN'),
-            'quantidade': self._get_decimal(prod, 'nfe:qCom', Decimal('0')),
-            'valor_unitario': self._get_decimal(prod, 'nfe:vUnCom', Decimal('0')),
-            'valor_total': self._get_decimal(prod, 'nfe:vProd', Decimal('0')),
-            'valor_desconto': self._get_decimal(prod, 'nfe:vDesc', Decimal('0')),
-            'valor_ipi': valor_ipi,
-            'valor_icms_st': valor_icms_st,
-        }
-    
+        """Itens da nota fiscal (após parse)"""
+        return self.itens
+
     def get_totais(self) -> Dict:
-        """
-        Extrai os totais da nota fiscal
-        
-        Returns:
-            Dicionário com valores totais
-        """
-        if self.infNFe is None:
-            return {}
-        
-        # Busca total
-        total = self._find_element(self.infNFe, 'nfe:total')
-        if total is None:
-            for child in self.infNFe:
-                if 'total' in child.tag:
-                    total = child
-                    break
-        
-        if total is None:
-            return {}
-        
-        # Busca ICMSTot
-        icms_tot = None
-        for child in total.iter():
-            if 'ICMSTot' in child.tag:
-                icms_tot = child
-                break
-        
-        if icms_tot is None:
-            return {}
-        
-        return {
-            'valor_produtos': self._get_decimal(icms_tot, 'nfe:vProd'),
-            'valor_desconto': self._get_decimal(icms_tot, 'nfe:vDesc'),
-            'valor_frete': self._get_decimal(icms_tot, 'nfe:vFrete'),
-            'valor_seguro': self._get_decimal(icms_tot, 'nfe:vSeg'),
-            'valor_outras_despesas': self._get_decimal(icms_tot, 'nfe:vOutro'),
-            'valor_ipi': self._get_decimal(icms_tot, 'nfe:vIPI'),
-            'valor_icms_st': self._get_decimal(icms_tot, 'nfe:vST'),
-            'valor_total': self._get_decimal(icms_tot, 'nfe:vNF'),
-        }
-    
+        """Valores totais da nota fiscal (após parse)"""
+        return self.totais
+
     def get_all_data(self) -> Dict:
         """
         Extrai todos os dados da nota fiscal
-        
+
         Returns:
             Dicionário completo com todos os dados
         """
@@ -413,49 +357,59 @@ class NFEXMLParser:
                 'success': False,
                 'errors': self.errors
             }
-        
+
         return {
             'success': True,
-            'nota': self.get_dados_nota(),
-            'emitente': self.get_dados_emitente(),
-            'itens': self.get_itens(),
-            'totais': self.get_totais(),
+            'nota': self.nota,
+            'emitente': self.emitente,
+            'itens': self.itens,
+            'totais': self.totais,
         }
 
 
+def _resultado(parser: NFEXMLParser) -> Tuple[bool, Dict, List[str]]:
+    data = parser.get_all_data()
+
+    if data.get('success'):
+        return True, data, []
+    else:
+        return False, {}, data.get('errors', ['Erro desconhecido'])
+
+
 def parse_xml_file(xml_file) -> Tuple[bool, Dict, List[str]]:
     """
     Função helper para fazer parse de arquivo XML
-    
+
     Args:
         xml_file: Arquivo XML (file-like object)
-        
+
     Returns:
         Tuple (success, data, errors)
     """
-    parser = NFEXMLParser(xml_file=xml_file)
-    data = parser.get_all_data()
-    
-    if data.get('success'):
-        return True, data, []
-    else:
-        return False, {}, data.get('errors', ['Erro desconhecido'])
+    return _resultado(NFEXMLParser(xml_file=xml_file))
 
 
 def parse_xml_string(xml_content: str) -> Tuple[bool, Dict, List[str]]:
     """
     Função helper para fazer parse de string XML
-    
+
     Args:
         xml_content: String com conteúdo XML
-        
+
     Returns:
         Tuple (success, data, errors)
     """
-    parser = NFEXMLParser(xml_content=xml_content)
-    data = parser.get_all_data()
-    
-    if data.get('success'):
-        return True, data, []
-    else:
-        return False, {}, data.get('errors', ['Erro desconhecido'])
+    return _resultado(NFEXMLParser(xml_content=xml_content))
+
+
+def parse_xml_bytes(conteudo: bytes) -> Tuple[bool, Dict, List[str]]:
+    """
+    Função helper para fazer parse do conteúdo bruto de um XML
+
+    Não depende do Django: é a função executada pelos processos da
+    importação em lote (compras.importacao_lote).
+
+    Returns:
+        Tuple (success, data, errors)
+    """
+    return _resultado(NFEXMLParser(xml_file=io.BytesIO(conteudo)))
@@ -19,6 +19,7 @@ from .forms import (
     ConferirItemForm, FiltroEntradasForm, CadastrarProdutoForm
 )
 from .services import EntradaMercadoriaService
+from .vinculacao import VinculadorProdutos
 
 
 @login_required
@@ -671,22 +672,29 @@ def vincular_automatico(request, nota_id):
             'message': 'Nota já finalizada ou cancelada'
         })
     
-    vinculados = 0
+    # Índice montado uma vez para todos os itens pendentes
+    pendentes_antes = list(nota.itens.filter(produto__isnull=True))
+    itens = VinculadorProdutos(nota.fornecedor).vincular_itens(pendentes_antes)
+    vinculados = len(itens)
     
-    for item in nota.itens.filter(produto__isnull=True):
-        produto = item.vincular_produto_automatico()
-        if produto:
-            vinculados += 1
-            
-            LogEntradaMercadoria.objects.create(
+    if itens:
+        from estoque.models import Produto
+        
+        descricoes = dict(
+            Produto.objects.filter(pk__in={item.produto_id for item in itens}).values_list('pk', 'descricao')
+        )
+        LogEntradaMercadoria.objects.bulk_create([
+            LogEntradaMercadoria(
                 nota=nota,
                 item=item,
                 acao='VINCULAR',
-                descricao=f'Vinculação automática: {produto.descricao[:50]}',
+                descricao=f'Vinculação automática: {descricoes[item.produto_id][:50]}',
                 usuario=request.user
             )
+            for item in itens
+        ])
     
-    pendentes = nota.itens.filter(produto__isnull=True).count()
+    pendentes = len(pendentes_antes) - vinculados
     
     return JsonResponse({
         'success': True,
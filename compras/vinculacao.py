@@ -0,0 +1,233 @@
+"""
+Vinculação automática de itens de NF-e a produtos
+
+O VinculadorProdutos é montado uma vez por importação (ou por pedido de
+vinculação automática) com duas consultas: os produtos ativos e a
+referência cruzada do fornecedor (CodigoFornecedorProduto). Depois disso
+cada item é resolvido em memória, na ordem:
+
+    1. Referência cruzada: código do fornecedor (ou, sem ele, o EAN que
+       o fornecedor usa) já vinculado antes a um produto
+    2. EAN/GTIN da nota (com e sem zeros à esquerda)
+    3. Código interno ou referência do fabricante igual ao código do item
+    4. Similaridade da descrição (tokens ponderados por raridade)
+
+Um critério só vincula quando aponta para um único produto; em caso de
+empate passa para o próximo.
+"""
+
+import copy
+import math
+
+from estoque.search import eh_codigo_barras, normalizar_codigo, tokenizar, variantes_gtin
+
+
+# Similaridade mínima da descrição (0 a 1) e vantagem mínima sobre o 2º colocado
+LIMIAR_SIMILARIDADE = 0.6
+MARGEM_SIMILARIDADE = 0.1
+
+
+class VinculadorProdutos:
+    """Índice de produtos em memória para vincular itens de uma nota"""
+
+    def __init__(self, fornecedor=None):
+        self.fornecedor = fornecedor
+        self._por_ean = {}
+        self._por_codigo = {}
+        self._por_referencia = {}
+        self._por_codigo_fornecedor = {}
+        self._por_ean_fornecedor = {}
+        self._termos = {}          # token -> set(ids)
+        self._peso_produto = {}    # id -> soma dos pesos dos tokens
+        self._carregar_produtos()
+        if fornecedor is not None:
+            self._carregar_vinculos()
+
+    # ============================================
+    # CARGA
+    # ============================================
+
+    @staticmethod
+    def _indexar(mapa, chave, produto_id):
+        if chave:
+            mapa.setdefault(chave, set()).add(produto_id)
+
+    def _carregar_produtos(self):
+        from estoque.models import Produto
+
+        tokens_produto = {}
+        for produto_id, codigo, codigo_barras, referencia, descricao in Produto.objects.filter(
+            ativo=True
+        ).values_list('id', 'codigo', 'codigo_barras', 'referencia_fabricante', 'descricao').iterator(
+            chunk_size=2000
+        ):
+            self._indexar(self._por_ean, normalizar_codigo(codigo_barras), produto_id)
+            self._indexar(self._por_codigo, normalizar_codigo(codigo), produto_id)
+            self._indexar(self._por_referencia, normalizar_codigo(referencia), produto_id)
+
+            tokens = set(tokenizar(descricao))
+            tokens_produto[produto_id] = tokens
+            for token in tokens:
+                self._termos.setdefault(token, set()).add(produto_id)
+
+        # Peso do token = raridade (idf): "filtro" vale menos que "w950"
+        total = max(len(tokens_produto), 1)
+        self._idf = {
+            token: math.log(1 + total / len(ids))
+            for token, ids in self._termos.items()
+        }
+        self._peso_produto = {
+            produto_id: sum(self._idf[token] for token in tokens)
+            for produto_id, tokens in tokens_produto.items()
+        }
+
+    def _carregar_vinculos(self):
+        """Referência cruzada do fornecedor (código e EAN -> produto)"""
+        from .models import CodigoFornecedorProduto
+
+        vinculos = CodigoFornecedorProduto.objects.filter(
+            fornecedor=self.fornecedor,
+            produto__ativo=True,
+        ).values_list('codigo_fornecedor', 'codigo_barras', 'produto_id')
+        for codigo, codigo_barras, produto_id in vinculos:
+            self.aprender(codigo, produto_id, codigo_barras)
+
+    def para_fornecedor(self, fornecedor):
+        """
+        Vinculador para outro fornecedor reaproveitando o índice de
+        produtos já carregado (só a referência cruzada é consultada)
+        """
+        vinculador = copy.copy(self)
+        vinculador.fornecedor = fornecedor
+        vinculador._por_codigo_fornecedor = {}
+        vinculador._por_ean_fornecedor = {}
+        if fornecedor is not None:
+            vinculador._carregar_vinculos()
+        return vinculador
+
+    def aprender(self, codigo_fornecedor, produto_id, codigo_barras=''):
+        """Registra (ou corrige) o produto de um código do fornecedor"""
+        chave = normalizar_codigo(codigo_fornecedor)
+        if chave:
+            self._por_codigo_fornecedor[chave] = produto_id
+        self._indexar(self._por_ean_fornecedor, normalizar_codigo(codigo_barras), produto_id)
+
+    # ============================================
+    # CRITÉRIOS
+    # ============================================
+
+    @staticmethod
+    def _unico(ids):
+        if ids and len(ids) == 1:
+            return next(iter(ids))
+        return None
+
+    def _por_gtin(self, codigo_barras):
+        codigo = normalizar_codigo(codigo_barras)
+        if not codigo.isdigit():
+            # "SEM GTIN" e afins
+            return None
+        encontrados = set()
+        for variante in variantes_gtin(codigo) if eh_codigo_barras(codigo) else [codigo]:
+            encontrados |= self._por_ean.get(variante, set())
+        return self._unico(encontrados)
+
+    def pontuar_descricao(self, descricao, limite=5):
+        """
+        Produtos mais parecidos com a descrição (similaridade de Jaccard
+        ponderada pelo idf dos tokens)
+
+        Returns:
+            Lista [(produto_id, similaridade)] em ordem decrescente
+        """
+        tokens = {token for token in tokenizar(descricao) if token in self._idf}
+        if not tokens:
+            return []
+
+        peso_consulta = sum(self._idf[token] for token in tokens)
+        comum = {}
+        for token in tokens:
+            peso = self._idf[token]
+            for produto_id in self._termos[token]:
+                comum[produto_id] = comum.get(produto_id, 0) + peso
+
+        pontuacao = [
+            (produto_id, peso / (peso_consulta + self._peso_produto[produto_id] - peso))
+            for produto_id, peso in comum.items()
+        ]
+        pontuacao.sort(key=lambda par: (-par[1], par[0]))
+        return pontuacao[:limite]
+
+    def _por_descricao(self, descricao):
+        melhores = self.pontuar_descricao(descricao, limite=2)
+        if not melhores or melhores[0][1] < LIMIAR_SIMILARIDADE:
+            return None
+        if len(melhores) > 1 and melhores[0][1] - melhores[1][1] < MARGEM_SIMILARIDADE:
+            return None
+        return melhores[0][0]
+
+    # ============================================
+    # API
+    # ============================================
+
+    def encontrar(self, item):
+        """
+        Produto para o item (sem consultas ao banco)
+
+        Returns:
+            Tuple (produto_id, criterio) ou (None, None)
+        """
+        codigo = normalizar_codigo(item.codigo_produto_fornecedor)
+        if codigo:
+            produto_id = self._por_codigo_fornecedor.get(codigo)
+            if produto_id:
+                return produto_id, 'codigo_fornecedor'
+
+        ean = normalizar_codigo(item.codigo_barras_nf)
+        if ean.isdigit():
+            produto_id = self._unico(self._por_ean_fornecedor.get(ean))
+            if produto_id:
+                return produto_id, 'ean_fornecedor'
+
+            produto_id = self._por_gtin(ean)
+            if produto_id:
+                return produto_id, 'ean'
+
+        if codigo:
+            produto_id = self._unico(self._por_codigo.get(codigo))
+            if produto_id:
+                return produto_id, 'codigo'
+
+            produto_id = self._unico(self._por_referencia.get(codigo))
+            if produto_id:
+                return produto_id, 'referencia'
+
+        if item.descricao_nf:
+            produto_id = self._por_descricao(item.descricao_nf)
+            if produto_id:
+                return produto_id, 'descricao'
+
+        return None, None
+
+    def vincular_itens(self, itens):
+        """
+        Vincula os itens ainda sem produto e grava tudo com um bulk_update
+
+        Returns:
+            Lista dos itens vinculados
+        """
+        from .models import ItemNotaEntrada
+
+        vinculados = []
+        for item in itens:
+            if item.produto_id:
+                continue
+            produto_id, _ = self.encontrar(item)
+            if produto_id:
+                item.produto_id = produto_id
+                self.aprender(item.codigo_produto_fornecedor, produto_id, item.codigo_barras_nf)
+                vinculados.append(item)
+
+        if vinculados:
+            ItemNotaEntrada.objects.bulk_update(vinculados, ['produto'], batch_size=500)
+        return vinculados
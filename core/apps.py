@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def garantir_indices_busca(sender, using='default', apps=None, **kwargs):
+    """Recria triggers/índices de busca perdidos em migrations que recriam tabelas"""
+    from django.db import connections
+    from .busca import instalar_indices
+
+    tabelas = connections[using].introspection.table_names()
+    if 'estoque_produto' in tabelas and 'clientes_cliente' in tabelas:
+        instalar_indices(apps=apps, using=using)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        post_migrate.connect(garantir_indices_busca, sender=self)
+        from . import signals  # noqa: F401
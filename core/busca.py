@@ -0,0 +1,191 @@
+"""
+Busca textual indexada (Produto, Cliente, Fornecedor)
+
+SQLite: tabelas virtuais FTS5 (external content) sincronizadas por triggers.
+PostgreSQL: índices GIN trigram (pg_trgm), usados pelo próprio ILIKE.
+Outros bancos: busca por icontains sem índice.
+
+A estrutura é criada pela migration core.0001 e conferida novamente a cada
+post_migrate, pois o SQLite recria a tabela (e perde os triggers) quando uma
+migration altera o model.
+"""
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from estoque.search import tokenizar
+
+
+# ============================================
+# CONFIGURAÇÃO DOS ÍNDICES
+# ============================================
+
+# (app_label, model) -> (nome da tabela FTS, colunas indexadas)
+INDICES_BUSCA = {
+    ('estoque', 'produto'): (
+        'busca_produto',
+        ['codigo', 'codigo_sku', 'codigo_barras', 'referencia_fabricante',
+         'descricao', 'aplicacao_generica'],
+    ),
+    ('clientes', 'cliente'): (
+        'busca_cliente',
+        ['nome', 'cpf_cnpj', 'telefone', 'celular', 'email'],
+    ),
+    ('estoque', 'fornecedor'): (
+        'busca_fornecedor',
+        ['nome_fantasia', 'razao_social', 'cnpj', 'telefone', 'email'],
+    ),
+}
+
+# Cache por alias de banco: conjunto de tabelas FTS existentes
+_tabelas_fts = {}
+
+
+def _sql_sqlite(tabela, fts, colunas):
+    """DDL da tabela FTS5 e dos triggers de sincronização"""
+    lista = ', '.join(colunas)
+    novos = ', '.join(f'new.{c}' for c in colunas)
+    antigos = ', '.join(f'old.{c}' for c in colunas)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{lista}, content='{tabela}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+        f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); "
+        f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END",
+    ]
+
+
+def _sql_postgresql(tabela, fts, colunas):
+    """Índices trigram para acelerar o ILIKE '%termo%'"""
+    return [
+        f"CREATE INDEX IF NOT EXISTS {fts}_{coluna}_trgm "
+        f"ON {tabela} USING gin ({coluna} gin_trgm_ops)"
+        for coluna in colunas
+    ]
+
+
+def _triggers_existentes(cursor, fts):
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+        [f'{fts}_ai', f'{fts}_ad', f'{fts}_au'],
+    )
+    return cursor.fetchone()[0]
+
+
+def instalar_indices(apps=None, using='default'):
+    """
+    Cria (se necessário) as estruturas de busca para o banco `using`.
+    Reconstrói o índice FTS quando os triggers precisaram ser recriados.
+    """
+    from django.apps import apps as apps_global
+
+    apps = apps or apps_global
+    connection = connections[using]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+        for (app_label, model_name), (fts, colunas) in INDICES_BUSCA.items():
+            model = apps.get_model(app_label, model_name)
+            tabela = model._meta.db_table
+
+            if connection.vendor == 'sqlite':
+                completo = _triggers_existentes(cursor, fts) == 3
+                for sql in _sql_sqlite(tabela, fts, colunas):
+                    cursor.execute(sql)
+                if not completo:
+                    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                for sql in _sql_postgresql(tabela, fts, colunas):
+                    cursor.execute(sql)
+
+    _tabelas_fts.pop(using, None)
+
+
+def remover_indices(apps=None, using='default'):
+    """Remove as estruturas de busca (reverse da migration)"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for fts, colunas in INDICES_BUSCA.values():
+            if connection.vendor == 'sqlite':
+                for sufixo in ('ai', 'ad', 'au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{sufixo}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+            elif connection.vendor == 'postgresql':
+                for coluna in colunas:
+                    cursor.execute(f'DROP INDEX IF EXISTS {fts}_{coluna}_trgm')
+    _tabelas_fts.pop(using, None)
+
+
+# ============================================
+# CONSULTA
+# ============================================
+
+def _fts_disponivel(using, fts):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if using not in _tabelas_fts:
+        _tabelas_fts[using] = {
+            nome for nome in connection.introspection.table_names()
+            if nome.startswith('busca_')
+        }
+    return fts in _tabelas_fts[using]
+
+
+def montar_consulta_fts(termo):
+    """
+    Converte o termo digitado em expressão MATCH do FTS5:
+    cada palavra vira um prefixo entre aspas e todas são obrigatórias.
+    """
+    palavras = [p for p in tokenizar(termo) if len(p) >= 2]
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+
+def buscar_texto(queryset, termo, campos=None):
+    """
+    Filtra o queryset pelo termo de busca (todas as palavras obrigatórias).
+
+    Args:
+        queryset: QuerySet de Produto, Cliente ou Fornecedor (ou outro model)
+        termo: String digitada pelo usuário
+        campos: Campos usados no fallback por icontains. Se None, usa as
+            colunas indexadas do model.
+
+    Returns:
+        QuerySet filtrado
+    """
+    if not termo:
+        return queryset
+
+    meta = queryset.model._meta
+    indice = INDICES_BUSCA.get((meta.app_label, meta.model_name))
+    using = queryset.db
+
+    if indice:
+        fts, colunas = indice
+        if _fts_disponivel(using, fts):
+            consulta = montar_consulta_fts(termo)
+            if not consulta:
+                return queryset
+            return queryset.filter(
+                pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [consulta])
+            )
+        campos = campos or colunas
+
+    # Fallback (PostgreSQL usa os índices trigram neste ILIKE)
+    palavras = [p for p in termo.split() if len(p) >= 2]
+    for palavra in palavras:
+        filtro_palavra = Q()
+        for campo in campos or []:
+            filtro_palavra |= Q(**{f'{campo}__icontains': palavra})
+        queryset = queryset.filter(filtro_palavra)
+
+    return queryset
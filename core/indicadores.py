@@ -0,0 +1,162 @@
+"""
+Indicadores (KPIs) dos dashboards
+
+Cada grupo de indicadores é calculado com agregação condicional em uma
+única consulta e guardado no cache do Django por INDICADORES_CACHE_TTL
+segundos (padrão 60). Os signals de core.signals apagam o grupo afetado
+quando vendas, produtos, OS, clientes ou contas são alterados.
+
+Grupos:
+    vendas       vendas de hoje e do mês (total, quantidade, por forma)
+    estoque      situação do estoque e valor imobilizado
+    operacional  OS em aberto e clientes ativos
+    financeiro   contas a pagar/receber do mês e em atraso
+"""
+
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+GRUPOS = ('vendas', 'estoque', 'operacional', 'financeiro')
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _ttl():
+    return getattr(settings, 'INDICADORES_CACHE_TTL', 60)
+
+
+def _chave(grupo, hoje):
+    # A data na chave vira o dia sozinha à meia-noite
+    return f'indicadores:{grupo}:{hoje.isoformat()}'
+
+
+def _soma(campo, filtro=None):
+    return Coalesce(Sum(campo, filter=filtro), ZERO)
+
+
+def invalidar(*grupos):
+    """Apaga do cache os grupos informados (todos se nenhum)"""
+    hoje = timezone.localdate()
+    cache.delete_many([_chave(grupo, hoje) for grupo in (grupos or GRUPOS)])
+
+
+def _obter(grupo, calcular):
+    hoje = timezone.localdate()
+    chave = _chave(grupo, hoje)
+    valores = cache.get(chave)
+    if valores is None:
+        valores = calcular(hoje)
+        cache.set(chave, valores, _ttl())
+    return valores
+
+
+# ============================================
+# CÁLCULO
+# ============================================
+
+def _calcular_vendas(hoje):
+    from vendas.models import Venda
+
+    tz = timezone.get_current_timezone()
+    inicio_hoje = timezone.make_aware(datetime.combine(hoje, time.min), tz)
+    inicio_mes = timezone.make_aware(datetime.combine(hoje.replace(day=1), time.min), tz)
+    de_hoje = Q(data_venda__gte=inicio_hoje)
+
+    valores = Venda.objects.filter(status='F', data_venda__gte=inicio_mes).aggregate(
+        vendas_mes_total=_soma('total'),
+        vendas_mes_qtd=Count('id'),
+        vendas_hoje_total=_soma('total', de_hoje),
+        vendas_hoje_qtd=Count('id', filter=de_hoje),
+        vendas_hoje_dinheiro=_soma('total', de_hoje & Q(forma_pagamento='DI')),
+        vendas_hoje_pix=_soma('total', de_hoje & Q(forma_pagamento='PI')),
+        vendas_hoje_debito=_soma('total', de_hoje & Q(forma_pagamento='CD')),
+        vendas_hoje_credito=_soma('total', de_hoje & Q(forma_pagamento='CC')),
+    )
+    qtd = valores['vendas_mes_qtd']
+    valores['ticket_medio_mes'] = valores['vendas_mes_total'] / qtd if qtd else Decimal('0')
+    return valores
+
+
+def _calcular_estoque(hoje):
+    from estoque.models import Produto
+
+    critico = Q(estoque_atual__lte=F('estoque_minimo'))
+    baixo = Q(estoque_atual__gt=F('estoque_minimo'), estoque_atual__lte=F('estoque_minimo') * 2)
+    normal = Q(estoque_atual__gt=F('estoque_minimo') * 2)
+
+    valores = Produto.objects.filter(ativo=True).aggregate(
+        total_produtos=Count('id'),
+        total_estoque_critico=Count('id', filter=critico),
+        total_estoque_baixo=Count('id', filter=baixo),
+        total_estoque_normal=Count('id', filter=normal),
+        valor_custo_estoque=Sum(F('estoque_atual') * F('preco_custo')),
+        valor_venda_estoque=Sum(F('estoque_atual') * F('preco_venda_dinheiro')),
+        total_itens=Sum('estoque_atual'),
+    )
+    for campo in ('valor_custo_estoque', 'valor_venda_estoque', 'total_itens'):
+        valores[campo] = valores[campo] or 0
+    return valores
+
+
+def _calcular_operacional(hoje):
+    from clientes.models import Cliente
+    from vendas.models import OrdemServico
+
+    valores = OrdemServico.objects.filter(status__in=['AB', 'EA', 'AG']).aggregate(
+        os_abertas_qtd=Count('id'),
+        os_abertas_total=_soma('total'),
+    )
+    valores['total_clientes'] = Cliente.objects.filter(ativo=True).count()
+    return valores
+
+
+def _calcular_financeiro(hoje):
+    from financeiro.models import ContaPagar, ContaReceber
+
+    do_mes = Q(data_vencimento__year=hoje.year, data_vencimento__month=hoje.month)
+    vencida = Q(data_vencimento__lt=hoje)
+    em_aberto = Q(status__in=['PENDENTE', 'ATRASADO'])
+
+    valores = ContaPagar.objects.exclude(status='CANCELADO').aggregate(
+        total_contas_mes=_soma('valor', do_mes),
+        total_pagas_mes=_soma('valor', do_mes & Q(status='PAGO')),
+        total_pendentes_mes=_soma('valor', do_mes & Q(status='PENDENTE')),
+        despesas_fixas_mes=_soma('valor', do_mes & Q(tipo='FIXA')),
+        despesas_variaveis_mes=_soma('valor', do_mes & Q(tipo='VARIAVEL')),
+        despesas_parceladas_mes=_soma('valor', do_mes & Q(tipo='PARCELADO')),
+        tributos_mes=_soma('valor', do_mes & Q(tipo='TRIBUTO')),
+        total_atrasadas=_soma('valor', vencida & em_aberto),
+        qtd_atrasadas=Count('id', filter=vencida & em_aberto),
+        contas_pagar_vencidas=_soma('valor', vencida & em_aberto),
+    )
+    valores['receber_atrasado'] = ContaReceber.objects.filter(
+        vencida & em_aberto
+    ).aggregate(total=_soma('valor'))['total']
+    return valores
+
+
+# ============================================
+# API
+# ============================================
+
+def indicadores_vendas():
+    return _obter('vendas', _calcular_vendas)
+
+
+def indicadores_estoque():
+    return _obter('estoque', _calcular_estoque)
+
+
+def indicadores_operacional():
+    return _obter('operacional', _calcular_operacional)
+
+
+def indicadores_financeiro():
+    return _obter('financeiro', _calcular_financeiro)
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def instalar(apps, schema_editor):
+    from core.busca import instalar_indices
+    instalar_indices(apps=apps, using=schema_editor.connection.alias)
+
+
+def remover(apps, schema_editor):
+    from core.busca import remover_indices
+    remover_indices(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0009_produto_tem_st'),
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar, remover),
+    ]
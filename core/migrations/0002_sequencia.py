@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_busca_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('valor', models.BigIntegerField(default=0, verbose_name='Último Valor')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Sequência',
+                'verbose_name_plural': 'Sequências',
+                'ordering': ['nome'],
+            },
+        ),
+    ]
@@ -1,3 +1,19 @@
 from django.db import models
 
-# Create your models here.
+
+class Sequencia(models.Model):
+    """
+    Contador nomeado para numeração de documentos (vendas, orçamentos, ...)
+    Use core.sequencias.proximo_valor() em vez de ler o último registro.
+    """
+    nome = models.CharField(max_length=50, unique=True, verbose_name='Nome')
+    valor = models.BigIntegerField(default=0, verbose_name='Último Valor')
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    class Meta:
+        verbose_name = 'Sequência'
+        verbose_name_plural = 'Sequências'
+        ordering = ['nome']
+
+    def __str__(self):
+        return f"{self.nome}: {self.valor}"
@@ -0,0 +1,83 @@
+"""
+Numeração sequencial segura para múltiplos processos
+
+O incremento é feito com UPDATE ... SET valor = valor + n, que bloqueia a
+linha (PostgreSQL) ou o banco (SQLite) até o fim da transação, e só então
+o valor é lido. Chamado dentro do transaction.atomic() do documento, um
+rollback devolve o número e a numeração continua sem buracos.
+
+Sequências em uso:
+    venda            V000001 (vendas.services)
+    orcamento        ORC-000001 (vendas.models.Orcamento)
+    produto_codigo   000001 (estoque.models.Produto)
+
+Números de NF-e/NFC-e continuam em ConfiguracaoFiscal (editáveis no admin)
+e usam proximo_valor_campo().
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Sequencia
+
+
+def reservar_intervalo(nome, quantidade=1, inicial=None):
+    """
+    Reserva `quantidade` valores consecutivos da sequência `nome`.
+
+    Args:
+        nome: Nome da sequência (ex: 'venda')
+        quantidade: Tamanho do bloco (importações em lote reservam de uma vez)
+        inicial: Último valor já usado, ou função que o calcula, aplicado só
+            quando a sequência ainda não existe (migração da numeração antiga)
+
+    Returns:
+        range com os valores reservados
+    """
+    if quantidade < 1:
+        return range(0)
+
+    with transaction.atomic():
+        atualizados = Sequencia.objects.filter(nome=nome).update(
+            valor=F('valor') + quantidade
+        )
+        if not atualizados:
+            valor_inicial = inicial() if callable(inicial) else (inicial or 0)
+            try:
+                with transaction.atomic():
+                    Sequencia.objects.create(nome=nome, valor=valor_inicial + quantidade)
+            except IntegrityError:
+                # Outro processo criou a sequência ao mesmo tempo
+                Sequencia.objects.filter(nome=nome).update(valor=F('valor') + quantidade)
+        ultimo = Sequencia.objects.filter(nome=nome).values_list('valor', flat=True).get()
+
+    return range(ultimo - quantidade + 1, ultimo + 1)
+
+
+def proximo_valor(nome, inicial=None):
+    """Retorna o próximo valor da sequência `nome`"""
+    return reservar_intervalo(nome, 1, inicial=inicial)[0]
+
+
+def valor_atual(nome):
+    """Último valor entregue pela sequência (None se ainda não existe)"""
+    return Sequencia.objects.filter(nome=nome).values_list('valor', flat=True).first()
+
+
+def ajustar_sequencia(nome, valor):
+    """Define o último valor usado (ex.: após importar documentos antigos)"""
+    Sequencia.objects.update_or_create(nome=nome, defaults={'valor': valor})
+
+
+def proximo_valor_campo(instance, campo):
+    """
+    Contador guardado em uma coluna de outro model (ex.: próximo número de
+    NF-e na configuração fiscal). Retorna o valor atual do campo e o
+    incrementa com UPDATE atômico.
+    """
+    model = type(instance)
+    with transaction.atomic():
+        model.objects.filter(pk=instance.pk).update(**{campo: F(campo) + 1})
+        proximo = model.objects.filter(pk=instance.pk).values_list(campo, flat=True).get()
+    setattr(instance, campo, proximo)
+    return proximo - 1
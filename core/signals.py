@@ -0,0 +1,34 @@
+"""
+Signals do core: invalidação do cache de indicadores dos dashboards
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from . import indicadores
+
+
+# Model -> grupos de indicadores afetados
+GRUPOS_POR_MODEL = {
+    'vendas.Venda': ('vendas', 'estoque'),
+    'vendas.OrdemServico': ('operacional',),
+    'estoque.Produto': ('estoque',),
+    'clientes.Cliente': ('operacional',),
+    'financeiro.ContaPagar': ('financeiro',),
+    'financeiro.ContaReceber': ('financeiro',),
+}
+
+
+def _invalidador(grupos):
+    def invalidar_indicadores(sender, **kwargs):
+        transaction.on_commit(lambda: indicadores.invalidar(*grupos))
+    return invalidar_indicadores
+
+
+_receivers = []
+
+for model, grupos in GRUPOS_POR_MODEL.items():
+    receiver = _invalidador(grupos)
+    _receivers.append(receiver)  # signals guardam referência fraca
+    post_save.connect(receiver, sender=model)
+    post_delete.connect(receiver, sender=model)
@@ -2,7 +2,7 @@ from django.http import JsonResponse
 from vendas.models import Venda, OrdemServico
 from django.utils import timezone
 from datetime import datetime, timedelta, date
-from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.db.models.functions import TruncMonth, TruncWeek
 import json
 from estoque.forms import ProdutoForm
 from django.shortcuts import render, get_object_or_404, redirect
@@ -18,10 +18,20 @@ from estoque.models import AmperagemBateria
 from estoque.models import (
     Produto, Categoria, Subcategoria, Fabricante,
     Fornecedor, CotacaoFornecedor, Montadora, 
-    VeiculoModelo, VeiculoVersao,
+    VeiculoModelo,
     MovimentacaoEstoque,AmperagemBateria, EstoqueCasco,
     MovimentacaoCasco, ItemVendaBateria,  # ✅ CORRIGIDO: Adicionado import que faltava
 )
+from estoque.search import (
+    buscar_produtos, ordenar_por_relevancia, MAXIMO_RESULTADOS,
+    cache_codigo_barras, eh_codigo_barras, variantes_gtin,
+)
+from core.busca import buscar_texto
+from estoque import taxonomia
+from estoque.precos import grade_atual
+from core.indicadores import (
+    indicadores_vendas, indicadores_estoque, indicadores_operacional, indicadores_financeiro,
+)
 from vendas.models import (
     Venda, ItemVenda, OrdemServico, PecaOS,   # ← ADICIONE ItemVenda aqui
     ServicoOS, Orcamento, ItemOrcamento
@@ -31,58 +41,39 @@ from vendas.models import (
 # ============================================
 # FUNÇÃO DE BUSCA FUZZY - TODAS AS PALAVRAS
 # ============================================
-def busca_fuzzy(queryset, campos, termo_busca):
+def busca_fuzzy(queryset, campos, termo_busca, somente_ativos=False):
     """
     Realiza busca fuzzy onde TODAS as palavras devem ser encontradas.
     
     Args:
         queryset: QuerySet do Django
-        campos: Lista de campos para buscar (ex: ['codigo', 'descricao'])
+        campos: Lista de campos para buscar (ex: ['codigo', 'descricao']).
+            Ignorada para Produto: o índice em memória sempre busca nos
+            códigos, descrição e aplicação
         termo_busca: String de busca (ex: 'oleo 20w50')
+        somente_ativos: True se o queryset de Produto já é só de ativos (o índice
+            descarta os inativos antes de cruzar com o queryset)
     
     Returns:
-        QuerySet filtrado
+        QuerySet filtrado (para Produto, no máximo MAXIMO_RESULTADOS
+        produtos do queryset, os mais relevantes)
     """
     if not termo_busca:
         return queryset
     
-    # Divide a busca em palavras (ignora palavras muito curtas)
-    palavras = [p for p in termo_busca.split() if len(p) >= 2]
-    
-    if not palavras:
-        return queryset
-    
-    # Para cada palavra, ela deve estar em PELO MENOS UM dos campos
-    for palavra in palavras:
-        filtro_palavra = Q()
-        for campo in campos:
-            filtro_palavra |= Q(**{f'{campo}__icontains': palavra})
-        queryset = queryset.filter(filtro_palavra)
+    # Produtos usam o índice em memória (estoque.search)
+    if queryset.model is Produto:
+        ids = buscar_produtos(termo_busca, limite=None, somente_ativos=somente_ativos)
+        return ordenar_por_relevancia(queryset, ids)
     
-    return queryset
+    # Demais models usam o índice textual do banco (core.busca)
+    return buscar_texto(queryset, termo_busca, campos)
 
 @login_required
 def dashboard(request):
     """Dashboard principal com indicadores"""
-    hoje = timezone.now().date()
-    mes_atual = hoje.replace(day=1)
-    
-    # Vendas do dia
-    vendas_hoje = Venda.objects.filter(
-        data_venda__date=hoje,
-        status='F'
-    )
-    
-    # Vendas do mês
-    vendas_mes = Venda.objects.filter(
-        data_venda__date__gte=mes_atual,
-        status='F'
-    )
-    
-    # OS em aberto
-    os_abertas = OrdemServico.objects.filter(
-        status__in=['AB', 'EA', 'AG']
-    )
+    vendas = indicadores_vendas()
+    operacional = indicadores_operacional()
     
     # Produtos com estoque baixo
     produtos_criticos = Produto.objects.filter(
@@ -91,14 +82,14 @@ def dashboard(request):
     )
     
     context = {
-        'vendas_hoje_total': vendas_hoje.aggregate(Sum('total'))['total__sum'] or 0,
-        'vendas_hoje_qtd': vendas_hoje.count(),
-        'vendas_mes_total': vendas_mes.aggregate(Sum('total'))['total__sum'] or 0,
-        'vendas_mes_qtd': vendas_mes.count(),
-        'os_abertas_qtd': os_abertas.count(),
-        'os_abertas_total': os_abertas.aggregate(Sum('total'))['total__sum'] or 0,
-        'produtos_criticos_qtd': produtos_criticos.count(),
-        'total_clientes': Cliente.objects.filter(ativo=True).count(),
+        'vendas_hoje_total': vendas['vendas_hoje_total'],
+        'vendas_hoje_qtd': vendas['vendas_hoje_qtd'],
+        'vendas_mes_total': vendas['vendas_mes_total'],
+        'vendas_mes_qtd': vendas['vendas_mes_qtd'],
+        'os_abertas_qtd': operacional['os_abertas_qtd'],
+        'os_abertas_total': operacional['os_abertas_total'],
+        'produtos_criticos_qtd': indicadores_estoque()['total_estoque_critico'],
+        'total_clientes': operacional['total_clientes'],
         'vendas_recentes': Venda.objects.filter(status='F').order_by('-data_venda')[:10],
         'os_recentes': OrdemServico.objects.order_by('-data_entrada')[:10],
         'produtos_criticos': produtos_criticos[:10],
@@ -127,73 +118,59 @@ def pdv(request):
     
     return render(request, 'core/pdv.html', context)
 
+
+def serializar_produto_pdv(p):
+    """
+    Payload JSON de um produto no PDV (usado na busca e na leitura de código de barras)
+    `precos_cartao` é a grade gravada no produto (ou calculada na hora, se a
+    tabela de taxas mudou desde a gravação), com o preço final de cada forma
+    de pagamento; o PDV não recalcula nada
+    """
+    return {
+        'id': p.id,
+        'codigo': p.codigo,
+        'codigo_barras': p.codigo_barras or '',
+        'descricao': p.descricao,
+        'preco_venda_dinheiro': float(p.preco_venda_dinheiro) if p.preco_venda_dinheiro else 0,
+        'preco_venda_debito': float(p.preco_venda_debito) if p.preco_venda_debito else 0,
+        'preco_venda_credito': float(p.preco_venda_credito) if p.preco_venda_credito else 0,
+        'estoque_atual': float(p.estoque_atual) if p.estoque_atual else 0,
+        'aplicar_imposto_4': p.aplicar_imposto_4,
+        'preco_customizado_cartao': p.preco_customizado_cartao,
+        'precos_cartao': grade_atual(p),
+        'categoria': p.categoria.nome if p.categoria else '',
+        'fabricante': p.fabricante.nome if p.fabricante else '',
+
+        # ========== CAMPOS DE BATERIA ==========
+        'amperagem_bateria_id': p.amperagem_bateria_id if p.amperagem_bateria else None,
+        'amperagem_nome': p.amperagem_bateria.amperagem if p.amperagem_bateria else None,
+        'valor_casco': float(p.amperagem_bateria.valor_casco_troca) if p.amperagem_bateria else 0,
+        'is_bateria': p.amperagem_bateria is not None,
+        # ========================================
+    }
+
+
 @login_required
 def api_buscar_produtos_pdv(request):
     """
     API para buscar produtos no PDV via AJAX
     Retorna JSON com produtos filtrados
-    BUSCA FUZZY: Busca múltiplas palavras separadas
+    BUSCA FUZZY: Busca múltiplas palavras separadas (índice estoque.search)
     """
     query = request.GET.get('q', '').strip()
     
     if not query or len(query) < 2:
         return JsonResponse({'produtos': []})
     
-    # Dividir query em palavras (busca fuzzy)
-    palavras = query.split()
-    
-    # Construir filtros para cada palavra
-    filtros = Q(ativo=True)
-    
-    for palavra in palavras:
-        if palavra:  # Ignorar strings vazias
-            filtros &= (
-                Q(codigo__icontains=palavra) |
-                Q(descricao__icontains=palavra) |
-                Q(codigo_barras__icontains=palavra) |
-                Q(codigo_sku__icontains=palavra)
-            )
-    
-    # Buscar produtos que contenham TODAS as palavras
-    produtos = Produto.objects.filter(filtros).select_related('categoria', 'fabricante', 'amperagem_bateria')[:50]
+    # Busca no índice em memória (já ordenado por relevância)
+    ids = buscar_produtos(query, limite=50)
+    produtos_por_id = Produto.objects.select_related(
+        'categoria', 'fabricante', 'amperagem_bateria'
+    ).in_bulk(ids)
+    produtos = [produtos_por_id[pk] for pk in ids if pk in produtos_por_id]
     
     # Serializa os produtos para JSON
-    produtos_data = []
-    for p in produtos:
-        produtos_data.append({
-            'id': p.id,
-            'codigo': p.codigo,
-            'codigo_barras': p.codigo_barras or '',
-            'descricao': p.descricao,
-            'preco_venda_dinheiro': float(p.preco_venda_dinheiro) if p.preco_venda_dinheiro else 0,
-            'preco_venda_debito': float(p.preco_venda_debito) if p.preco_venda_debito else 0,
-            'preco_venda_credito': float(p.preco_venda_credito) if p.preco_venda_credito else 0,
-            'estoque_atual': float(p.estoque_atual) if p.estoque_atual else 0,
-            'aplicar_imposto_4': p.aplicar_imposto_4 if hasattr(p, 'aplicar_imposto_4') else False,
-            'preco_customizado_cartao': p.preco_customizado_cartao if hasattr(p, 'preco_customizado_cartao') else False,
-            'precos_credito': {
-                '2x': float(p.preco_credito_2x) if hasattr(p, 'preco_credito_2x') and p.preco_credito_2x else 0,
-                '3x': float(p.preco_credito_3x) if hasattr(p, 'preco_credito_3x') and p.preco_credito_3x else 0,
-                '4x': float(p.preco_credito_4x) if hasattr(p, 'preco_credito_4x') and p.preco_credito_4x else 0,
-                '5x': float(p.preco_credito_5x) if hasattr(p, 'preco_credito_5x') and p.preco_credito_5x else 0,
-                '6x': float(p.preco_credito_6x) if hasattr(p, 'preco_credito_6x') and p.preco_credito_6x else 0,
-                '7x': float(p.preco_credito_7x) if hasattr(p, 'preco_credito_7x') and p.preco_credito_7x else 0,
-                '8x': float(p.preco_credito_8x) if hasattr(p, 'preco_credito_8x') and p.preco_credito_8x else 0,
-                '9x': float(p.preco_credito_9x) if hasattr(p, 'preco_credito_9x') and p.preco_credito_9x else 0,
-                '10x': float(p.preco_credito_10x) if hasattr(p, 'preco_credito_10x') and p.preco_credito_10x else 0,
-                '11x': float(p.preco_credito_11x) if hasattr(p, 'preco_credito_11x') and p.preco_credito_11x else 0,
-                '12x': float(p.preco_credito_12x) if hasattr(p, 'preco_credito_12x') and p.preco_credito_12x else 0,
-            },
-            'categoria': p.categoria.nome if p.categoria else '',
-            'fabricante': p.fabricante.nome if p.fabricante else '',
-
-            # ========== CAMPOS DE BATERIA ==========
-            'amperagem_bateria_id': p.amperagem_bateria_id if p.amperagem_bateria else None,
-            'amperagem_nome': p.amperagem_bateria.amperagem if p.amperagem_bateria else None,
-            'valor_casco': float(p.amperagem_bateria.valor_casco_troca) if p.amperagem_bateria else 0,
-            'is_bateria': p.amperagem_bateria is not None,
-            # ========================================
-        })
+    produtos_data = [serializar_produto_pdv(p) for p in produtos]
     
     return JsonResponse({
         'produtos': produtos_data,
@@ -202,71 +179,75 @@ def api_buscar_produtos_pdv(request):
 
 
 @login_required
-def relatorios(request):
-    """Dashboard principal de relatórios"""
-    from vendas.models import Venda, ItemVenda
-    from financeiro.models import ContaPagar, ContaReceber, MovimentacaoCaixa
+def api_escanear_codigo_pdv(request):
+    """
+    API de leitura do scanner no PDV
+    Recebe um EAN-8/EAN-13/GTIN e retorna um único produto já serializado
+    (busca exata no índice de codigo_barras + cache LRU em memória)
+    """
+    codigo = request.GET.get('codigo', '').strip()
     
-    hoje = date.today()
-    inicio_mes = hoje.replace(day=1)
+    if not eh_codigo_barras(codigo):
+        return JsonResponse({
+            'success': False,
+            'error': 'Código de barras inválido'
+        }, status=400)
     
-    # Vendas do mês
-    vendas_mes = Venda.objects.filter(
-        data_venda__date__gte=inicio_mes,
-        data_venda__date__lte=hoje,
-        status='F'
-    )
+    payload = cache_codigo_barras.obter(codigo)
+    if payload is not None:
+        return JsonResponse({'success': True, 'produto': payload})
     
-    total_vendas_mes = vendas_mes.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    qtd_vendas_mes = vendas_mes.count()
-    ticket_medio = total_vendas_mes / qtd_vendas_mes if qtd_vendas_mes > 0 else Decimal('0')
+    produto = Produto.objects.filter(
+        codigo_barras__in=variantes_gtin(codigo),
+        ativo=True
+    ).select_related(
+        'categoria', 'fabricante', 'amperagem_bateria'
+    ).order_by('id').first()
     
-    # Vendas de hoje
-    vendas_hoje = Venda.objects.filter(
-        data_venda__date=hoje,
-        status='F'
-    )
-    total_vendas_hoje = vendas_hoje.aggregate(total=Sum('total'))['total'] or Decimal('0')
+    if not produto:
+        return JsonResponse({
+            'success': False,
+            'error': 'Produto não encontrado'
+        }, status=404)
     
-    # Contas a pagar vencidas
-    contas_vencidas = ContaPagar.objects.filter(
-        status__in=['PENDENTE', 'ATRASADO'],
-        data_vencimento__lt=hoje
-    ).aggregate(total=Sum('valor'))['total'] or Decimal('0')
+    payload = serializar_produto_pdv(produto)
+    cache_codigo_barras.guardar(codigo, produto.id, payload)
     
-    # Contas a receber em atraso
-    receber_atrasado = ContaReceber.objects.filter(
-        status__in=['PENDENTE', 'ATRASADO'],
-        data_vencimento__lt=hoje
-    ).aggregate(total=Sum('valor'))['total'] or Decimal('0')
+    return JsonResponse({'success': True, 'produto': payload})
+
+
+@login_required
+def relatorios(request):
+    """Dashboard principal de relatórios"""
+    from vendas.models import FatoVendaProdutoDia
+    
+    hoje = date.today()
+    inicio_mes = hoje.replace(day=1)
+    
+    vendas = indicadores_vendas()
+    financeiro = indicadores_financeiro()
     
     # Produtos mais vendidos do mês
-    produtos_mais_vendidos = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=inicio_mes,
-        venda__status='F'
+    produtos_mais_vendidos = FatoVendaProdutoDia.objects.filter(
+        data__gte=inicio_mes,
+        data__lte=hoje
     ).values(
         'produto__codigo',
         'produto__descricao'
     ).annotate(
         qtd_vendida=Sum('quantidade'),
-        total_vendido=Sum('total')
-    ).order_by('-qtd_vendida')[:5]
-    
-    # Estoque crítico
-    produtos_criticos = Produto.objects.filter(
-        ativo=True,
-        estoque_atual__lte=F('estoque_minimo')
-    ).count()
+        total_vendido=Sum('valor_total')
+    ).filter(qtd_vendida__gt=0).order_by('-qtd_vendida')[:5]
     
     context = {
-        'total_vendas_mes': total_vendas_mes,
-        'qtd_vendas_mes': qtd_vendas_mes,
-        'ticket_medio': ticket_medio,
-        'total_vendas_hoje': total_vendas_hoje,
-        'contas_vencidas': contas_vencidas,
-        'receber_atrasado': receber_atrasado,
+        'total_vendas_mes': vendas['vendas_mes_total'],
+        'qtd_vendas_mes': vendas['vendas_mes_qtd'],
+        'ticket_medio': vendas['ticket_medio_mes'],
+        'total_vendas_hoje': vendas['vendas_hoje_total'],
+        'contas_vencidas': financeiro['contas_pagar_vencidas'],
+        'receber_atrasado': financeiro['receber_atrasado'],
         'produtos_mais_vendidos': produtos_mais_vendidos,
-        'produtos_criticos': produtos_criticos,
+        'produtos_criticos': indicadores_estoque()['total_estoque_critico'],
         'hoje': hoje,
         'inicio_mes': inicio_mes,
     }
@@ -321,12 +302,20 @@ def detalhe_cliente(request, cliente_id):
     vendas = cliente.venda_set.filter(status='F').order_by('-data_venda')[:20]
     ordens_servico = cliente.ordemservico_set.all().order_by('-data_entrada')[:20]
     
+    # Parcelas em aberto com juros/multa calculados no banco
+    from financeiro.models import ContaReceber
+    from financeiro.encargos import EM_ABERTO, anotar_encargos, totais_encargos
+    hoje = date.today()
+    em_aberto = ContaReceber.objects.filter(cliente=cliente, status__in=EM_ABERTO)
+    pendencias = anotar_encargos(em_aberto.order_by('data_vencimento'), hoje)
+    
     # Estatísticas
     stats = {
         'total_compras': vendas.aggregate(Sum('total'))['total__sum'] or 0,
         'total_vendas': vendas.count(),
         'total_os': ordens_servico.count(),
         'total_veiculos': veiculos.count(),
+        'pendencias': totais_encargos(em_aberto, hoje),
     }
     
     context = {
@@ -334,6 +323,7 @@ def detalhe_cliente(request, cliente_id):
         'veiculos': veiculos,
         'vendas': vendas,
         'ordens_servico': ordens_servico,
+        'pendencias': pendencias,
         'stats': stats,
     }
     return render(request, 'core/cliente_detalhe.html', context)
@@ -365,15 +355,7 @@ def lista_estoque(request):
     # BUSCA FUZZY - Todas as palavras devem ser encontradas
     # ============================================================
     if busca:
-        palavras = busca.split()
-        for palavra in palavras:
-            produtos = produtos.filter(
-                Q(codigo__icontains=palavra) |
-                Q(descricao__icontains=palavra) |
-                Q(codigo_sku__icontains=palavra) |
-                Q(codigo_barras__icontains=palavra) |
-                Q(referencia_fabricante__icontains=palavra)
-            )
+        produtos = buscar_texto(produtos, busca)
     
     # ============================================================
     # FILTROS DE CATEGORIZAÇÃO (Multi-seleção)
@@ -433,46 +415,18 @@ def lista_estoque(request):
     # ============================================================
     # DADOS PARA OS FILTROS
     # ============================================================
-    todas_categorias = Categoria.objects.filter(ativo=True).order_by('nome')
-    todas_montadoras = Montadora.objects.filter(ativa=True).order_by('ordem', 'nome')
-    
-    # Subcategorias, grupos e subgrupos filtrados (para cascata inicial)
-    todas_subcategorias = Subcategoria.objects.filter(ativo=True).order_by('nome')
-    todos_grupos = Grupo.objects.filter(ativo=True).order_by('nome')
-    todos_subgrupos = Subgrupo.objects.filter(ativo=True).order_by('nome')
-    
-    # Se há categorias selecionadas, filtrar subcategorias
-    if categorias_ids:
-        todas_subcategorias = todas_subcategorias.filter(categoria_id__in=categorias_ids)
-    
-    # Se há subcategorias selecionadas, filtrar grupos
-    if subcategorias_ids:
-        todos_grupos = todos_grupos.filter(subcategoria_id__in=subcategorias_ids)
-    
-    # Se há grupos selecionados, filtrar subgrupos
-    if grupos_ids:
-        todos_subgrupos = todos_subgrupos.filter(grupo_id__in=grupos_ids)
+    # Árvore em cache (estoque.taxonomia); cascata inicial pelos selecionados
+    arvore = taxonomia.arvore_taxonomia()
+    todas_categorias = arvore['categorias']
+    todas_montadoras = arvore['montadoras']
+    todas_subcategorias = taxonomia.subcategorias(categorias_ids)
+    todos_grupos = taxonomia.grupos(subcategorias_ids)
+    todos_subgrupos = taxonomia.subgrupos(grupos_ids)
     
     # ============================================================
     # ESTATÍSTICAS
     # ============================================================
-    todos_produtos = Produto.objects.filter(ativo=True)
-    stats = {
-        'total_produtos': todos_produtos.count(),
-        'total_estoque_critico': todos_produtos.filter(estoque_atual__lte=F('estoque_minimo')).count(),
-        'total_estoque_baixo': todos_produtos.filter(
-            estoque_atual__gt=F('estoque_minimo'),
-            estoque_atual__lte=F('estoque_minimo') * 2
-        ).count(),
-        'total_estoque_normal': todos_produtos.filter(estoque_atual__gt=F('estoque_minimo') * 2).count(),
-        'valor_custo_estoque': todos_produtos.aggregate(
-            total=Sum(F('estoque_atual') * F('preco_custo'))
-        )['total'] or 0,
-        'valor_venda_estoque': todos_produtos.aggregate(
-            total=Sum(F('estoque_atual') * F('preco_venda_dinheiro'))
-        )['total'] or 0,
-        'total_itens': todos_produtos.aggregate(total=Sum('estoque_atual'))['total'] or 0,
-    }
+    stats = indicadores_estoque()
 
         # Produtos com estoque CRÍTICO
     produtos_criticos = Produto.objects.filter(
@@ -530,20 +484,7 @@ def api_subcategorias_por_categorias(request):
     """
     categorias_ids = request.GET.getlist('categorias')
     
-    if categorias_ids:
-        subcategorias = Subcategoria.objects.filter(
-            categoria_id__in=categorias_ids,
-            ativo=True
-        ).order_by('nome')
-    else:
-        subcategorias = Subcategoria.objects.filter(ativo=True).order_by('nome')
-    
-    data = [
-        {'id': s.id, 'nome': s.nome, 'categoria_id': s.categoria_id}
-        for s in subcategorias
-    ]
-    
-    return JsonResponse({'subcategorias': data})
+    return JsonResponse({'subcategorias': taxonomia.subcategorias(categorias_ids)})
 
 
 @login_required
@@ -554,20 +495,7 @@ def api_grupos_por_subcategorias(request):
     """
     subcategorias_ids = request.GET.getlist('subcategorias')
     
-    if subcategorias_ids:
-        grupos = Grupo.objects.filter(
-            subcategoria_id__in=subcategorias_ids,
-            ativo=True
-        ).order_by('nome')
-    else:
-        grupos = Grupo.objects.filter(ativo=True).order_by('nome')
-    
-    data = [
-        {'id': g.id, 'nome': g.nome, 'subcategoria_id': g.subcategoria_id}
-        for g in grupos
-    ]
-    
-    return JsonResponse({'grupos': data})
+    return JsonResponse({'grupos': taxonomia.grupos(subcategorias_ids)})
 
 
 @login_required
@@ -578,20 +506,7 @@ def api_subgrupos_por_grupos(request):
     """
     grupos_ids = request.GET.getlist('grupos')
     
-    if grupos_ids:
-        subgrupos = Subgrupo.objects.filter(
-            grupo_id__in=grupos_ids,
-            ativo=True
-        ).order_by('nome')
-    else:
-        subgrupos = Subgrupo.objects.filter(ativo=True).order_by('nome')
-    
-    data = [
-        {'id': s.id, 'nome': s.nome, 'grupo_id': s.grupo_id}
-        for s in subgrupos
-    ]
-    
-    return JsonResponse({'subgrupos': data})
+    return JsonResponse({'subgrupos': taxonomia.subgrupos(grupos_ids)})
 
 
 @login_required  
@@ -600,18 +515,11 @@ def api_filtros_estoque(request):
     API unificada que retorna todos os dados de filtro de uma vez.
     Útil para carregar filtros iniciais ou resetar.
     """
-    categorias = Categoria.objects.filter(ativo=True).order_by('nome')
-    subcategorias = Subcategoria.objects.filter(ativo=True).order_by('nome')
-    grupos = Grupo.objects.filter(ativo=True).order_by('nome')
-    subgrupos = Subgrupo.objects.filter(ativo=True).order_by('nome')
-    montadoras = Montadora.objects.filter(ativa=True).order_by('ordem', 'nome')
+    arvore = taxonomia.arvore_taxonomia()
     
     return JsonResponse({
-        'categorias': [{'id': c.id, 'nome': c.nome} for c in categorias],
-        'subcategorias': [{'id': s.id, 'nome': s.nome, 'categoria_id': s.categoria_id} for s in subcategorias],
-        'grupos': [{'id': g.id, 'nome': g.nome, 'subcategoria_id': g.subcategoria_id} for g in grupos],
-        'subgrupos': [{'id': s.id, 'nome': s.nome, 'grupo_id': s.grupo_id} for s in subgrupos],
-        'montadoras': [{'id': m.id, 'nome': m.nome} for m in montadoras],
+        campo: arvore[campo]
+        for campo in ('categorias', 'subcategorias', 'grupos', 'subgrupos', 'montadoras')
     })
 
 
@@ -774,24 +682,9 @@ def api_buscar_modelos(request):
     if not montadora_id:
         return JsonResponse({'success': False, 'modelos': []})
     
-    modelos = VeiculoModelo.objects.filter(
-        montadora_id=montadora_id,
-        ativo=True
-    ).order_by('-popular', 'nome')
-    
-    resultados = [
-        {
-            'id': m.id,
-            'nome': m.nome,
-            'descricao': m.nome,
-            'popular': m.popular,
-        }
-        for m in modelos
-    ]
-    
     return JsonResponse({
         'success': True,
-        'modelos': resultados
+        'modelos': taxonomia.modelos_da_montadora(montadora_id)
     })
 
 @login_required
@@ -810,30 +703,7 @@ def api_buscar_versoes(request):
     # Remover valores None ou vazios
     modelos_ids = [m for m in modelos_ids if m]
     
-    versoes = VeiculoVersao.objects.filter(
-        modelo_id__in=modelos_ids,
-        ativo=True
-    ).select_related('modelo', 'modelo__montadora').order_by(
-        'modelo__montadora__nome', 
-        'modelo__nome', 
-        '-ano_inicial', 
-        'nome'
-    )
-    
-    resultados = [
-        {
-            'id': v.id,
-            'nome': v.nome,
-            'modelo': v.modelo.nome,
-            'montadora': v.modelo.montadora.nome,
-            'descricao': v.get_descricao_completa(),
-            'ano_inicial': v.ano_inicial,
-            'ano_final': v.ano_final,
-            'anos_range': v.get_anos_range(),
-            'motorizacoes': v.motorizacoes,
-        }
-        for v in versoes
-    ]
+    resultados = taxonomia.versoes_dos_modelos(modelos_ids)
     
     return JsonResponse({
         'success': True,
@@ -1078,11 +948,7 @@ def comparador_precos(request):
         produtos = produtos.filter(categoria_id=categoria_id)
     
     if busca:
-        produtos = produtos.filter(
-            Q(codigo__icontains=busca) |
-            Q(descricao__icontains=busca) |
-            Q(codigo_barras__icontains=busca)
-        )
+        produtos = buscar_texto(produtos, busca)
     
     # Se um produto específico foi selecionado
     produto_selecionado = None
@@ -1503,11 +1369,7 @@ def comparador_precos_fornecedores(request):
     
     # Se há busca, procura produtos
     if busca:
-        produtos = Produto.objects.filter(
-            Q(codigo__icontains=busca) |
-            Q(descricao__icontains=busca) |
-            Q(codigo_barras__icontains=busca)
-        ).annotate(
+        produtos = buscar_texto(Produto.objects.all(), busca).annotate(
             num_cotacoes=Count('cotacoes')
         )[:20]
     
@@ -1715,6 +1577,33 @@ def lista_orcamentos(request):
     
     return render(request, 'core/orcamentos_lista.html', context)
 
+def itens_orcamento_do_post(request, orcamento):
+    """
+    Lê o campo `itens` (JSON) enviado na criação/edição em lote do orçamento:
+    [{"produto_id": 1, "quantidade": 2, "preco_unitario": "10.00", "desconto_item": "0"}]
+    Sem preco_unitario, usa o preço da forma de pagamento do orçamento.
+    """
+    itens = json.loads(request.POST.get('itens') or '[]')
+    produtos = Produto.objects.in_bulk([int(item['produto_id']) for item in itens])
+    
+    resultado = []
+    for item in itens:
+        produto = produtos.get(int(item['produto_id']))
+        if produto is None:
+            raise Produto.DoesNotExist(f"Produto {item['produto_id']} não encontrado")
+        quantidade = int(item.get('quantidade') or 1)
+        if quantidade <= 0:
+            raise ValueError(f'Quantidade inválida para {produto.codigo}')
+        preco = item.get('preco_unitario')
+        resultado.append({
+            'produto': produto,
+            'quantidade': quantidade,
+            'preco_unitario': Decimal(str(preco)) if preco not in (None, '') else orcamento.preco_para(produto),
+            'desconto_item': Decimal(str(item.get('desconto_item') or '0')),
+        })
+    return resultado
+
+
 @login_required
 def criar_orcamento(request):
     """Criar novo orçamento"""
@@ -1728,23 +1617,27 @@ def criar_orcamento(request):
             messages.error(request, 'Selecione um cliente!')
             return redirect('criar_orcamento')
         
-        # Gerar número do orçamento
-        ultimo_orc = Orcamento.objects.order_by('-id').first()
-        if ultimo_orc:
-            numero = int(ultimo_orc.numero.split('-')[1]) + 1
-        else:
-            numero = 1
-        numero_orcamento = f"ORC-{numero:06d}"
-        
-        # Criar orçamento
-        orcamento = Orcamento.objects.create(
-            numero=numero_orcamento,
-            cliente_id=cliente_id,
-            veiculo_modelo_id=veiculo_modelo_id if veiculo_modelo_id else None,
-            vendedor=request.user,
-            forma_pagamento=forma_pagamento,
-            data_validade=datetime.now().date() + timedelta(days=15),
-        )
+        try:
+            with transaction.atomic():
+                # Gerar número do orçamento
+                numero_orcamento = Orcamento.gerar_numero()
+                
+                # Criar orçamento
+                orcamento = Orcamento.objects.create(
+                    numero=numero_orcamento,
+                    cliente_id=cliente_id,
+                    veiculo_modelo_id=veiculo_modelo_id if veiculo_modelo_id else None,
+                    vendedor=request.user,
+                    forma_pagamento=forma_pagamento,
+                    data_validade=datetime.now().date() + timedelta(days=15),
+                )
+                
+                # Itens enviados junto com o cabeçalho (opcional)
+                if request.POST.get('itens'):
+                    orcamento.set_itens(itens_orcamento_do_post(request, orcamento))
+        except (ValueError, KeyError, Produto.DoesNotExist) as e:
+            messages.error(request, f'Itens inválidos: {e}')
+            return redirect('criar_orcamento')
         
         messages.success(request, f'Orçamento {numero_orcamento} criado com sucesso!')
         return redirect('editar_orcamento', orcamento_id=orcamento.id)
@@ -1774,42 +1667,44 @@ def editar_orcamento(request, orcamento_id):
             quantidade = int(request.POST.get('quantidade', 1))
             produto = get_object_or_404(Produto, id=produto_id)
             
-            # Determinar preço baseado na forma de pagamento
-            precos = {
-                'DINHEIRO': produto.preco_venda_dinheiro,
-                'DEBITO': produto.preco_venda_debito,
-                'CREDITO': produto.preco_venda_credito,
-                'ATACADO': produto.preco_atacado or produto.preco_venda_dinheiro,
-            }
-            preco_unitario = precos.get(orcamento.forma_pagamento, produto.preco_venda_dinheiro)
-            
-            # Criar ou atualizar item
-            item, created = ItemOrcamento.objects.get_or_create(
-                orcamento=orcamento,
-                produto=produto,
-                defaults={'quantidade': quantidade, 'preco_unitario': preco_unitario}
-            )
-            if not created:
-                item.quantidade += quantidade
-                item.save()
+            # Criar ou atualizar item (o total do orçamento é ajustado pela diferença).
+            # first() em vez de get_or_create: orçamentos antigos podem ter
+            # linhas repetidas do produto (o set_itens as remove)
+            with transaction.atomic():
+                item = orcamento.itens.filter(produto=produto).order_by('pk').first()
+                if item is None:
+                    ItemOrcamento.objects.create(
+                        orcamento=orcamento, produto=produto, quantidade=quantidade,
+                        preco_unitario=orcamento.preco_para(produto),
+                    )
+                else:
+                    item.quantidade += quantidade
+                    item.save()
             
-            orcamento.atualizar_totais()
             messages.success(request, f'Produto {produto.codigo} adicionado!')
             return redirect('editar_orcamento', orcamento_id=orcamento.id)
         
+        elif action == 'set_itens':
+            # Edição em lote: substitui todos os itens de uma vez
+            try:
+                with transaction.atomic():
+                    orcamento.set_itens(itens_orcamento_do_post(request, orcamento))
+                messages.success(request, 'Itens do orçamento atualizados!')
+            except (ValueError, KeyError, Produto.DoesNotExist) as e:
+                messages.error(request, f'Itens inválidos: {e}')
+            return redirect('editar_orcamento', orcamento_id=orcamento.id)
+        
         elif action == 'remove_item':
             item_id = request.POST.get('item_id')
             item = get_object_or_404(ItemOrcamento, id=item_id, orcamento=orcamento)
+            item.orcamento = orcamento
             item.delete()
-            orcamento.atualizar_totais()
             messages.success(request, 'Item removido!')
             return redirect('editar_orcamento', orcamento_id=orcamento.id)
         
         elif action == 'update_desconto':
             desconto = Decimal(request.POST.get('desconto', '0'))
-            orcamento.desconto = desconto
-            orcamento.save()
-            orcamento.atualizar_totais()
+            orcamento.aplicar_desconto(desconto)
             messages.success(request, 'Desconto atualizado!')
             return redirect('editar_orcamento', orcamento_id=orcamento.id)
         
@@ -1874,14 +1769,6 @@ def buscar_produtos_rapido(request):
     # Busca base
     produtos = Produto.objects.filter(ativo=True)
     
-    # Filtro por texto (código, SKU, descrição)
-    if busca:
-        produtos = busca_fuzzy(
-            produtos, 
-            ['codigo', 'codigo_sku', 'codigo_barras', 'descricao', 'aplicacao_generica'], 
-            busca
-        )
-    
     # Filtros de categorização
     if categorias_ids:
         produtos = produtos.filter(categoria_id__in=categorias_ids)
@@ -1907,6 +1794,16 @@ def buscar_produtos_rapido(request):
             versoes_compativeis__modelo_id=modelo_id
         ).distinct()
     
+    # Filtro por texto (código, SKU, descrição) por último: a relevância
+    # é cortada em MAXIMO_RESULTADOS depois dos filtros acima
+    if busca:
+        produtos = busca_fuzzy(
+            produtos, 
+            ['codigo', 'codigo_sku', 'codigo_barras', 'descricao', 'aplicacao_generica'], 
+            busca,
+            somente_ativos=True,
+        )
+    
     # Selecionar campos necessários e limitar
     produtos = produtos.select_related(
         'categoria', 'subcategoria', 'grupo', 'subgrupo', 'fabricante'
@@ -1918,8 +1815,9 @@ def buscar_produtos_rapido(request):
     resultados = []
     for p in produtos:
         # Status de estoque
-        situacao = p.get_situacao_estoque()
+        situacao = p.situacao_estoque
         status_estoque = {
+            'zerado': 'danger',
             'critico': 'danger',
             'baixo': 'warning',
             'normal': 'success',
@@ -1961,7 +1859,7 @@ def buscar_produtos_rapido(request):
             'status_estoque': status_estoque,
             'situacao': situacao,
             'aplicacoes': aplicacoes_list,
-            'localizacao': p.get_localizacao_completa() if hasattr(p, 'get_localizacao_completa') else '',
+            'localizacao': p.localizacao_completa,
         })
     
     return JsonResponse({
@@ -2034,6 +1932,7 @@ def converter_orcamento_venda(request, orcamento_id):
             with transaction.atomic():
                 # Criar venda
                 venda = Venda.objects.create(
+                    numero=gerar_numero_venda(),
                     cliente=orcamento.cliente,
                     forma_pagamento=orcamento.forma_pagamento,
                     status='A',  # Aberta
@@ -2047,7 +1946,7 @@ def converter_orcamento_venda(request, orcamento_id):
                         venda=venda,
                         produto=item_orc.produto,
                         quantidade=item_orc.quantidade,
-                        preco_unitario=item_orc.preco_unitario,
+                        valor_unitario=item_orc.preco_unitario,
                         desconto=item_orc.desconto_item,
                         total=item_orc.total,
                     )
@@ -2322,7 +2221,8 @@ def api_buscar_subcategorias(request):
 # API PARA SALVAR VENDA DO PDV
 # ==========================================
 from vendas.models import Venda, ItemVenda
-from financeiro.models import ContaReceber, VendaParcelada, CategoriaReceita
+from financeiro.models import ContaReceber
+from vendas.services import VendaPDVService, gerar_numero_venda
 import json
 
 @login_required
@@ -2355,192 +2255,26 @@ def api_salvar_venda_pdv(request):
         if forma_pagamento == 'CR' and not cliente_id:
             return JsonResponse({'success': False, 'error': 'Cliente obrigatório para crediário'})
         
-        # Mapear forma de pagamento do PDV para o modelo
-        mapa_forma = {
-            'DI': 'DI',  # Dinheiro
-            'PI': 'PI',  # PIX
-            'DB': 'CD',  # Débito
-            'CC': 'CC',  # Crédito à vista
-            'CP': 'CC',  # Crédito parcelado (ainda é cartão de crédito)
-            'CR': 'CR',  # Crediário
-        }
-        forma_pagamento_db = mapa_forma.get(forma_pagamento, 'DI')
-        
-        with transaction.atomic():
-            # Gerar número da venda
-            ultima_venda = Venda.objects.order_by('-id').first()
-            if ultima_venda and ultima_venda.numero:
-                try:
-                    ultimo_num = int(ultima_venda.numero.replace('V', '').replace('-', ''))
-                    novo_num = ultimo_num + 1
-                except:
-                    novo_num = 1
-            else:
-                novo_num = 1
-            numero_venda = f"V{novo_num:06d}"
-            
-            # Buscar cliente se informado
-            cliente = None
-            if cliente_id:
-                cliente = Cliente.objects.filter(id=cliente_id).first()
-            
-            # Se não tem cliente, criar/buscar cliente genérico
-            if not cliente:
-                cliente, _ = Cliente.objects.get_or_create(
-                    cpf_cnpj='00000000000',
-                    defaults={
-                        'nome': 'Cliente não identificado',
-                        'ativo': True
-                    }
-                )
-            
-            # Criar a venda
-            venda = Venda.objects.create(
-                numero=numero_venda,
-                cliente=cliente,
-                forma_pagamento=forma_pagamento_db,
-                status='F',  # Finalizada
-                subtotal=subtotal,
-                desconto=desconto,
-                total=total,
-                observacoes=observacoes,
-                vendedor=request.user.username
-            )
-            
-            # Criar itens da venda e baixar estoque
-            for item in itens:
-                produto = Produto.objects.get(id=item['id'])
-                quantidade = Decimal(str(item['quantidade']))
-                preco_unitario = Decimal(str(item['preco']))
-                total_item = quantidade * preco_unitario
-                
-                ItemVenda.objects.create(
-                    venda=venda,
-                    produto=produto,
-                    quantidade=int(quantidade),
-                    valor_unitario=preco_unitario,
-                    total=total_item
-                )
-                
-                # Baixar estoque
-                produto.estoque_atual -= quantidade
-                produto.save()
-
-                # ============================================
-                # MOVIMENTACAO DE CASCOS (BATERIAS)
-                # ============================================
-                if item.get('is_bateria') and produto.amperagem_bateria:
-                    info_casco = item.get('info_casco', {})
-                    amperagem_vendida = produto.amperagem_bateria
-                    trouxe_casco = info_casco.get('trouxe_casco', False) if info_casco else False
-                    
-                    if trouxe_casco:
-                        # Cliente trouxe casco
-                        amperagem_casco_id = info_casco.get('amperagem_casco_id')
-                        
-                        if amperagem_casco_id:
-                            amperagem_casco = AmperagemBateria.objects.filter(id=amperagem_casco_id).first()
-                            
-                            if amperagem_casco and amperagem_casco.id != amperagem_vendida.id:
-                                # Amperagens diferentes: saida da vendida, entrada da recebida
-                                
-                                # Saida do casco da bateria vendida
-                                MovimentacaoCasco.objects.create(
-                                    amperagem=amperagem_vendida,
-                                    tipo='S',
-                                    motivo='VENDA_COM_TROCA',
-                                    quantidade=int(quantidade),
-                                    observacao=f'Venda {numero_venda} - Troca por casco {amperagem_casco.amperagem}',
-                                    usuario=request.user,
-                                    venda=venda
-                                )
-                                
-                                # Entrada do casco recebido
-                                MovimentacaoCasco.objects.create(
-                                    amperagem=amperagem_casco,
-                                    tipo='E',
-                                    motivo='VENDA_COM_TROCA',
-                                    quantidade=int(quantidade),
-                                    observacao=f'Venda {numero_venda} - Casco recebido em troca de {amperagem_vendida.amperagem}',
-                                    usuario=request.user,
-                                    venda=venda
-                                )
-                            # Se mesma amperagem, nao precisa movimentar (entra e sai igual)
-                    else:
-                        # Cliente NAO trouxe casco - diminui estoque de casco
-                        MovimentacaoCasco.objects.create(
-                            amperagem=amperagem_vendida,
-                            tipo='S',
-                            motivo='VENDA_SEM_TROCA',
-                            quantidade=int(quantidade),
-                            observacao=f'Venda {numero_venda} - Sem troca de casco',
-                            usuario=request.user,
-                            venda=venda
-                        )
-
-            # Se for CREDIARIO, criar parcelas no financeiro
-            if forma_pagamento == 'CR' and parcelas > 0:
-                # Buscar ou criar categoria de receita padrão
-                categoria_receita, _ = CategoriaReceita.objects.get_or_create(
-                    nome='Vendas de Peças',
-                    defaults={
-                        'tipo': 'VENDA',
-                        'icone': 'bi-box-seam',
-                        'cor': '#22c55e'
-                    }
-                )
-                
-                # Criar VendaParcelada
-                venda_parcelada = VendaParcelada.objects.create(
-                    descricao=f'Venda {numero_venda}',
-                    categoria=categoria_receita,
-                    cliente=cliente,
-                    venda=venda,
-                    valor_total=total,
-                    numero_parcelas=parcelas,
-                    data_primeira_parcela=date.today() + timedelta(days=30),
-                    intervalo_tipo='MENSAL',
-                    forma_cobranca='FIADO',
-                    usuario_cadastro=request.user
-                )
-                
-                # Gerar as parcelas
-                venda_parcelada.gerar_parcelas()
-            
-            # Se for cartão de crédito parcelado no cartão (loja não recebe parcelado)
-            # Criar receita única pois a administradora paga à vista
-            elif forma_pagamento in ['DI', 'PI', 'DB', 'CC', 'CP']:
-                # Buscar ou criar categoria de receita padrão
-                categoria_receita, _ = CategoriaReceita.objects.get_or_create(
-                    nome='Vendas de Peças',
-                    defaults={
-                        'tipo': 'VENDA',
-                        'icone': 'bi-box-seam',
-                        'cor': '#22c55e'
-                    }
-                )
-                
-                # Criar receita única (já recebida)
-                ContaReceber.objects.create(
-                    descricao=f'Venda {numero_venda}',
-                    categoria=categoria_receita,
-                    tipo='VENDA',
-                    valor=total,
-                    data_vencimento=date.today(),
-                    data_recebimento=date.today(),
-                    status='RECEBIDO',
-                    forma_cobranca='DINHEIRO' if forma_pagamento in ['DI', 'PI'] else 'CARTAO',
-                    cliente=cliente if cliente.cpf_cnpj != '00000000000' else None,
-                    venda=venda,
-                    valor_recebido=total,
-                    usuario_cadastro=request.user
-                )
+        # Grava venda, itens, estoque, cascos e financeiro em lote
+        service = VendaPDVService(usuario=request.user)
+        venda = service.finalizar(
+            itens=itens,
+            forma_pagamento=forma_pagamento,
+            cliente_id=cliente_id,
+            subtotal=subtotal,
+            desconto=desconto,
+            total=total,
+            parcelas=parcelas,
+            observacoes=observacoes,
+        )
+        numero_venda = venda.numero
         
         return JsonResponse({
             'success': True,
             'venda_id': venda.id,
             'numero': numero_venda,
-            'message': f'Venda {numero_venda} realizada com sucesso!'
+            'message': f'Venda {numero_venda} realizada com sucesso!',
+            'avisos': service.warnings
         })
         
     except Exception as e:
@@ -2565,6 +2299,7 @@ def editar_venda(request, venda_id):
         if action == 'cancelar':
             if venda.status != 'C':  # Se ainda não está cancelada
                 with transaction.atomic():
+                    # Os fatos diários (relatórios) saem pelo signal ao salvar a venda cancelada
                     # Devolver estoque de todos os itens
                     for item in venda.itens.all():
                         item.produto.estoque_atual += item.quantidade
@@ -2606,8 +2341,9 @@ def editar_venda(request, venda_id):
             item_id = request.POST.get('item_id')
             try:
                 with transaction.atomic():
-                    item = venda.itens.get(id=item_id)
+                    item = venda.itens.select_related('produto').get(id=item_id)
                     
+
                     # Devolver estoque
                     item.produto.estoque_atual += item.quantidade
                     item.produto.save()
@@ -2655,6 +2391,7 @@ def api_cancelar_venda(request, venda_id):
             return JsonResponse({'success': False, 'error': 'Venda já está cancelada'})
         
         with transaction.atomic():
+            # Os fatos diários (relatórios) saem pelo signal ao salvar a venda cancelada
             # Devolver estoque
             for item in venda.itens.all():
                 item.produto.estoque_atual += item.quantidade
@@ -3208,7 +2945,8 @@ def criar_amperagem(request):
 @login_required
 def relatorio_vendas_periodo(request):
     """Relatório de vendas por período"""
-    from vendas.models import Venda, ItemVenda
+    from vendas.models import Venda, FatoVendaDia
+    from vendas.fatos import intervalo_datas
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.strftime('%Y-%m-%d'))
@@ -3222,44 +2960,39 @@ def relatorio_vendas_periodo(request):
         data_inicio = hoje
         data_fim = hoje
     
-    vendas = Venda.objects.filter(
-        data_venda__date__gte=data_inicio,
-        data_venda__date__lte=data_fim,
-        status='F'
-    )
+    # Totais e agrupamentos vêm dos fatos diários (vendas.fatos)
+    fatos = FatoVendaDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
     
     # Totais gerais
-    totais = vendas.aggregate(
-        total_vendas=Sum('total'),
-        total_desconto=Sum('desconto'),
-        qtd_vendas=Count('id')
+    totais = fatos.aggregate(
+        total_vendas=Sum('valor_total'),
+        total_desconto=Sum('valor_desconto'),
+        qtd_vendas=Sum('quantidade_vendas')
     )
+    totais['qtd_vendas'] = totais['qtd_vendas'] or 0
     
     # Agrupamento
     if agrupamento == 'dia':
-        vendas_agrupadas = vendas.annotate(
-            periodo=TruncDate('data_venda')
-        ).values('periodo').annotate(
-            total=Sum('total'),
-            quantidade=Count('id')
-        ).order_by('periodo')
+        periodo = F('data')
     elif agrupamento == 'semana':
-        vendas_agrupadas = vendas.annotate(
-            periodo=TruncWeek('data_venda')
-        ).values('periodo').annotate(
-            total=Sum('total'),
-            quantidade=Count('id')
-        ).order_by('periodo')
+        periodo = TruncWeek('data')
     else:  # mes
-        vendas_agrupadas = vendas.annotate(
-            periodo=TruncMonth('data_venda')
-        ).values('periodo').annotate(
-            total=Sum('total'),
-            quantidade=Count('id')
-        ).order_by('periodo')
+        periodo = TruncMonth('data')
+    
+    vendas_agrupadas = fatos.annotate(
+        periodo=periodo
+    ).values('periodo').annotate(
+        total=Sum('valor_total'),
+        quantidade=Sum('quantidade_vendas')
+    ).order_by('periodo')
     
     # Lista detalhada
-    vendas_lista = vendas.select_related('cliente').order_by('-data_venda')[:100]
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
+    vendas_lista = Venda.objects.filter(
+        data_venda__gte=inicio,
+        data_venda__lt=fim,
+        status='F'
+    ).select_related('cliente').order_by('-data_venda')[:100]
     
     context = {
         'data_inicio': data_inicio,
@@ -3276,7 +3009,7 @@ def relatorio_vendas_periodo(request):
 @login_required
 def relatorio_vendas_pagamento(request):
     """Relatório de vendas por forma de pagamento"""
-    from vendas.models import Venda
+    from vendas.models import FatoVendaDia
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.replace(day=1).strftime('%Y-%m-%d'))
@@ -3289,20 +3022,17 @@ def relatorio_vendas_pagamento(request):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
-    vendas = Venda.objects.filter(
-        data_venda__date__gte=data_inicio,
-        data_venda__date__lte=data_fim,
-        status='F'
-    )
+    fatos = FatoVendaDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
     
     # Total geral
-    total_geral = vendas.aggregate(total=Sum('total'))['total'] or Decimal('0')
+    totais = fatos.aggregate(total=Sum('valor_total'), quantidade=Sum('quantidade_vendas'))
+    total_geral = totais['total'] or Decimal('0')
     
     # Por forma de pagamento
-    formas_pagamento = vendas.values('forma_pagamento').annotate(
-        total=Sum('total'),
-        quantidade=Count('id')
-    ).order_by('-total')
+    formas_pagamento = fatos.values('forma_pagamento').annotate(
+        total=Sum('valor_total'),
+        quantidade=Sum('quantidade_vendas')
+    ).filter(quantidade__gt=0).order_by('-total')
     
     # Adicionar percentual e nome legível
     FORMAS_NOME = {
@@ -3323,7 +3053,7 @@ def relatorio_vendas_pagamento(request):
         'data_fim': data_fim,
         'total_geral': total_geral,
         'formas_pagamento': formas_pagamento,
-        'qtd_vendas': vendas.count(),
+        'qtd_vendas': totais['quantidade'] or 0,
     }
     
     return render(request, 'core/relatorios/vendas_pagamento.html', context)
@@ -3333,6 +3063,7 @@ def relatorio_vendas_pagamento(request):
 def relatorio_vendas_cliente(request):
     """Relatório de vendas por cliente (ranking)"""
     from vendas.models import Venda
+    from vendas.fatos import intervalo_datas
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.replace(day=1).strftime('%Y-%m-%d'))
@@ -3345,9 +3076,10 @@ def relatorio_vendas_cliente(request):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
     vendas = Venda.objects.filter(
-        data_venda__date__gte=data_inicio,
-        data_venda__date__lte=data_fim,
+        data_venda__gte=inicio,
+        data_venda__lt=fim,
         status='F'
     )
     
@@ -3377,7 +3109,8 @@ def relatorio_vendas_cliente(request):
 @login_required
 def relatorio_ticket_medio(request):
     """Relatório de ticket médio"""
-    from vendas.models import Venda
+    from vendas.models import Venda, FatoVendaDia
+    from vendas.fatos import intervalo_datas
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.replace(day=1).strftime('%Y-%m-%d'))
@@ -3390,19 +3123,24 @@ def relatorio_ticket_medio(request):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
-    vendas = Venda.objects.filter(
-        data_venda__date__gte=data_inicio,
-        data_venda__date__lte=data_fim,
-        status='F'
-    )
+    fatos = FatoVendaDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
     
     # Estatísticas gerais
-    stats = vendas.aggregate(
-        total_vendas=Sum('total'),
-        qtd_vendas=Count('id'),
+    stats = fatos.aggregate(
+        total_vendas=Sum('valor_total'),
+        qtd_vendas=Sum('quantidade_vendas')
+    )
+    
+    # Maior/menor venda precisam das vendas individuais (filtro por índice)
+    inicio, fim = intervalo_datas(data_inicio, data_fim)
+    stats.update(Venda.objects.filter(
+        data_venda__gte=inicio,
+        data_venda__lt=fim,
+        status='F'
+    ).aggregate(
         maior_venda=Max('total'),
         menor_venda=Min('total')
-    )
+    ))
     
     # Calcular ticket médio manualmente
     if stats['qtd_vendas'] and stats['qtd_vendas'] > 0:
@@ -3411,12 +3149,10 @@ def relatorio_ticket_medio(request):
         stats['ticket_medio'] = Decimal('0')
     
     # Ticket médio por dia
-    ticket_por_dia_qs = vendas.annotate(
-        dia=TruncDate('data_venda')
-    ).values('dia').annotate(
-        soma_total=Sum('total'),
-        qtd=Count('id')
-    ).order_by('dia')
+    ticket_por_dia_qs = fatos.values(dia=F('data')).annotate(
+        soma_total=Sum('valor_total'),
+        qtd=Sum('quantidade_vendas')
+    ).filter(qtd__gt=0).order_by('dia')
     
     # Calcular ticket manualmente para cada dia
     ticket_por_dia = []
@@ -3429,10 +3165,10 @@ def relatorio_ticket_medio(request):
         })
     
     # Ticket médio por forma de pagamento
-    ticket_forma_qs = vendas.values('forma_pagamento').annotate(
-        soma_total=Sum('total'),
-        qtd=Count('id')
-    ).order_by('-soma_total')
+    ticket_forma_qs = fatos.values('forma_pagamento').annotate(
+        soma_total=Sum('valor_total'),
+        qtd=Sum('quantidade_vendas')
+    ).filter(qtd__gt=0).order_by('-soma_total')
     
     FORMAS_NOME = {
         'DI': 'Dinheiro', 'CD': 'Débito', 'CC': 'Crédito',
@@ -3464,7 +3200,7 @@ def relatorio_ticket_medio(request):
 @login_required
 def relatorio_comparativo(request):
     """Relatório comparativo de períodos"""
-    from vendas.models import Venda
+    from vendas.models import FatoVendaDia
     
     hoje = date.today()
     
@@ -3486,14 +3222,12 @@ def relatorio_comparativo(request):
         pass
     
     # Dados período 1
-    vendas_p1 = Venda.objects.filter(
-        data_venda__date__gte=p1_inicio,
-        data_venda__date__lte=p1_fim,
-        status='F'
-    )
-    agg_p1 = vendas_p1.aggregate(
-        soma_total=Sum('total'),
-        qtd=Count('id')
+    agg_p1 = FatoVendaDia.objects.filter(
+        data__gte=p1_inicio,
+        data__lte=p1_fim
+    ).aggregate(
+        soma_total=Sum('valor_total'),
+        qtd=Sum('quantidade_vendas')
     )
     stats_p1 = {
         'total': agg_p1['soma_total'] or Decimal('0'),
@@ -3502,14 +3236,12 @@ def relatorio_comparativo(request):
     }
     
     # Dados período 2
-    vendas_p2 = Venda.objects.filter(
-        data_venda__date__gte=p2_inicio,
-        data_venda__date__lte=p2_fim,
-        status='F'
-    )
-    agg_p2 = vendas_p2.aggregate(
-        soma_total=Sum('total'),
-        qtd=Count('id')
+    agg_p2 = FatoVendaDia.objects.filter(
+        data__gte=p2_inicio,
+        data__lte=p2_fim
+    ).aggregate(
+        soma_total=Sum('valor_total'),
+        qtd=Sum('quantidade_vendas')
     )
     stats_p2 = {
         'total': agg_p2['soma_total'] or Decimal('0'),
@@ -3549,8 +3281,7 @@ def relatorio_comparativo(request):
 @login_required
 def relatorio_produtos_vendidos(request):
     """Relatório de produtos mais vendidos"""
-    from vendas.models import ItemVenda
-    from estoque.models import Produto
+    from vendas.models import FatoVendaProdutoDia
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.replace(day=1).strftime('%Y-%m-%d'))
@@ -3564,29 +3295,23 @@ def relatorio_produtos_vendidos(request):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
+    fatos = FatoVendaProdutoDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+    
     # Produtos mais vendidos
-    produtos_vendidos = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=data_inicio,
-        venda__data_venda__date__lte=data_fim,
-        venda__status='F'
-    ).values(
+    produtos_vendidos = fatos.values(
         'produto__id',
         'produto__codigo',
         'produto__descricao',
         'produto__categoria__nome'
     ).annotate(
         qtd_vendida=Sum('quantidade'),
-        total_vendido=Sum('total')
-    ).order_by('-qtd_vendida')[:limite]
+        total_vendido=Sum('valor_total')
+    ).filter(qtd_vendida__gt=0).order_by('-qtd_vendida')[:limite]
     
     # Totais
-    totais = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=data_inicio,
-        venda__data_venda__date__lte=data_fim,
-        venda__status='F'
-    ).aggregate(
+    totais = fatos.aggregate(
         qtd_total=Sum('quantidade'),
-        valor_total=Sum('total')
+        valor_total=Sum('valor_total')
     )
     
     context = {
@@ -3603,16 +3328,16 @@ def relatorio_produtos_vendidos(request):
 @login_required
 def relatorio_produtos_parados(request):
     """Relatório de produtos sem venda"""
-    from vendas.models import ItemVenda
+    from vendas.models import FatoVendaProdutoDia
     from estoque.models import Produto
     
     dias = int(request.GET.get('dias', 90))
     data_limite = date.today() - timedelta(days=dias)
     
     # Produtos vendidos no período
-    produtos_vendidos_ids = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=data_limite,
-        venda__status='F'
+    produtos_vendidos_ids = FatoVendaProdutoDia.objects.filter(
+        data__gte=data_limite,
+        quantidade__gt=0
     ).values_list('produto_id', flat=True).distinct()
     
     # Produtos não vendidos (com estoque > 0)
@@ -3675,8 +3400,7 @@ def relatorio_estoque_critico(request):
 @login_required
 def relatorio_curva_abc(request):
     """Relatório de Curva ABC"""
-    from vendas.models import ItemVenda
-    from estoque.models import Produto
+    from vendas.models import FatoVendaProdutoDia
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', (hoje - timedelta(days=90)).strftime('%Y-%m-%d'))
@@ -3690,17 +3414,16 @@ def relatorio_curva_abc(request):
         data_fim = hoje
     
     # Vendas por produto
-    vendas_produto = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=data_inicio,
-        venda__data_venda__date__lte=data_fim,
-        venda__status='F'
+    vendas_produto = FatoVendaProdutoDia.objects.filter(
+        data__gte=data_inicio,
+        data__lte=data_fim
     ).values(
         'produto__id',
         'produto__codigo',
         'produto__descricao'
     ).annotate(
-        total_vendido=Sum('total')
-    ).order_by('-total_vendido')
+        total_vendido=Sum('valor_total')
+    ).filter(total_vendido__gt=0).order_by('-total_vendido')
     
     # Calcular total geral
     total_geral = sum(v['total_vendido'] or 0 for v in vendas_produto)
@@ -3750,16 +3473,15 @@ def relatorio_curva_abc(request):
 @login_required
 def relatorio_giro_estoque(request):
     """Relatório de giro de estoque"""
-    from vendas.models import ItemVenda
+    from vendas.models import FatoVendaProdutoDia
     from estoque.models import Produto
     
     dias = int(request.GET.get('dias', 30))
     data_inicio = date.today() - timedelta(days=dias)
     
     # Vendas por produto no período
-    vendas_produto = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=data_inicio,
-        venda__status='F'
+    vendas_produto = FatoVendaProdutoDia.objects.filter(
+        data__gte=data_inicio
     ).values('produto_id').annotate(
         qtd_vendida=Sum('quantidade')
     )
@@ -3857,7 +3579,7 @@ def relatorio_movimentacao(request):
 @login_required
 def relatorio_reposicao(request):
     """Relatório de reposição de estoque"""
-    from vendas.models import ItemVenda
+    from vendas.models import FatoVendaProdutoDia
     from estoque.models import Produto
     
     metodo = request.GET.get('metodo', 'minimo')  # minimo, maximo, vendido, media
@@ -3866,9 +3588,8 @@ def relatorio_reposicao(request):
     data_inicio = date.today() - timedelta(days=dias)
     
     # Vendas por produto no período
-    vendas_produto = ItemVenda.objects.filter(
-        venda__data_venda__date__gte=data_inicio,
-        venda__status='F'
+    vendas_produto = FatoVendaProdutoDia.objects.filter(
+        data__gte=data_inicio
     ).values('produto_id').annotate(
         qtd_vendida=Sum('quantidade')
     )
@@ -4001,7 +3722,7 @@ def relatorio_fluxo_caixa(request):
 @login_required
 def relatorio_lucro_bruto(request):
     """Relatório de lucro bruto"""
-    from vendas.models import Venda, ItemVenda
+    from financeiro import lucro
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.replace(day=1).strftime('%Y-%m-%d'))
@@ -4014,53 +3735,23 @@ def relatorio_lucro_bruto(request):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
-    # Vendas finalizadas no período
-    vendas = Venda.objects.filter(
-        data_venda__date__gte=data_inicio,
-        data_venda__date__lte=data_fim,
-        status='F'
-    )
-    
-    total_vendas = vendas.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    qtd_vendas = vendas.count()
-    
-    # Calcular custo dos produtos vendidos
-    itens = ItemVenda.objects.filter(
-        venda__in=vendas
-    ).select_related('produto')
-    
-    custo_total = Decimal('0')
-    for item in itens:
-        custo_unit = item.produto.preco_custo or Decimal('0')
-        custo_total += custo_unit * item.quantidade
-    
-    lucro_bruto = total_vendas - custo_total
-    margem = (lucro_bruto / total_vendas * 100) if total_vendas > 0 else Decimal('0')
+    resumo = lucro.lucro_bruto(data_inicio, data_fim)
+    total_vendas = resumo['faturamento']
+    custo_total = resumo['custo_mercadorias']
+    lucro_bruto = resumo['lucro_bruto']
+    margem = resumo['margem']
+    qtd_vendas = resumo['qtd_vendas']
     
     # Lucro por dia
-    lucro_por_dia = []
-    vendas_por_dia = vendas.annotate(
-        dia=TruncDate('data_venda')
-    ).values('dia').annotate(
-        faturamento=Sum('total')
-    ).order_by('dia')
-    
-    for v in vendas_por_dia:
-        # Calcular custo do dia
-        itens_dia = ItemVenda.objects.filter(
-            venda__data_venda__date=v['dia'],
-            venda__status='F'
-        ).select_related('produto')
-        
-        custo_dia = sum((i.produto.preco_custo or 0) * i.quantidade for i in itens_dia)
-        lucro_dia = (v['faturamento'] or 0) - custo_dia
-        
-        lucro_por_dia.append({
+    lucro_por_dia = [
+        {
             'dia': v['dia'].isoformat() if v['dia'] else None,
-            'faturamento': float(v['faturamento'] or 0),
-            'custo': float(custo_dia),
-            'lucro': float(lucro_dia)
-        })
+            'faturamento': float(v['faturamento']),
+            'custo': float(v['custo']),
+            'lucro': float(v['lucro'])
+        }
+        for v in lucro.lucro_bruto_por_dia(data_inicio, data_fim)
+    ]
     
     import json
     context = {
@@ -4080,8 +3771,7 @@ def relatorio_lucro_bruto(request):
 @login_required
 def relatorio_lucro_liquido(request):
     """Relatório de lucro líquido real"""
-    from vendas.models import Venda, ItemVenda
-    from financeiro.models import ContaPagar, DespesaFixa, TaxaCartao, ConfiguracaoTributo
+    from financeiro import lucro
     
     hoje = date.today()
     data_inicio = request.GET.get('data_inicio', hoje.replace(day=1).strftime('%Y-%m-%d'))
@@ -4094,101 +3784,12 @@ def relatorio_lucro_liquido(request):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
-    # 1. Faturamento
-    vendas = Venda.objects.filter(
-        data_venda__date__gte=data_inicio,
-        data_venda__date__lte=data_fim,
-        status='F'
-    )
-    faturamento = vendas.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    
-    # 2. Custo das mercadorias
-    itens = ItemVenda.objects.filter(venda__in=vendas).select_related('produto')
-    custo_mercadorias = sum((i.produto.preco_custo or 0) * i.quantidade for i in itens)
-    
-    # 3. Lucro Bruto
-    lucro_bruto = faturamento - Decimal(str(custo_mercadorias))
-    
-    # 4. Taxas de cartão (estimativa por forma de pagamento)
-    taxas_cartao = Decimal('0')
-    vendas_por_forma = vendas.values('forma_pagamento').annotate(total=Sum('total'))
-    
-    for v in vendas_por_forma:
-        forma = v['forma_pagamento']
-        valor = v['total'] or Decimal('0')
-        
-        # Buscar taxa configurada
-        try:
-            if forma == 'CD':  # Débito
-                taxa = TaxaCartao.objects.filter(tipo='DEBITO').first()
-            elif forma == 'CC':  # Crédito
-                taxa = TaxaCartao.objects.filter(tipo='CREDITO').first()
-            elif forma == 'PI':  # PIX
-                taxa = TaxaCartao.objects.filter(tipo='PIX').first()
-            else:
-                taxa = None
-            
-            if taxa:
-                taxas_cartao += valor * (taxa.taxa_percentual / 100)
-        except:
-            pass
-    
-    # 5. Despesas fixas (proporcional ao período)
-    dias_periodo = (data_fim - data_inicio).days + 1
-    dias_mes = 30
-    
-    despesas_fixas_total = Decimal('0')
-    try:
-        despesas_fixas = DespesaFixa.objects.filter(ativo=True)
-        for df in despesas_fixas:
-            despesas_fixas_total += (df.valor / dias_mes) * dias_periodo
-    except:
-        pass
-    
-    # 6. Despesas variáveis (contas pagas no período)
-    despesas_variaveis = Decimal('0')
-    try:
-        contas_pagas = ContaPagar.objects.filter(
-            data_pagamento__gte=data_inicio,
-            data_pagamento__lte=data_fim,
-            status='PG'
-        ).exclude(categoria__icontains='fix')
-        despesas_variaveis = contas_pagas.aggregate(total=Sum('valor'))['total'] or Decimal('0')
-    except:
-        pass
-    
-    # 7. Impostos (Simples Nacional - 4% padrão)
-    aliquota_imposto = Decimal('4.0')
-    try:
-        config_tributo = ConfiguracaoTributo.objects.first()
-        if config_tributo:
-            aliquota_imposto = config_tributo.aliquota
-    except:
-        pass
-    
-    impostos = faturamento * (aliquota_imposto / 100)
-    
-    # 8. Lucro Líquido
-    total_deducoes = taxas_cartao + despesas_fixas_total + despesas_variaveis + impostos
-    lucro_liquido = lucro_bruto - total_deducoes
-    
-    margem_liquida = (lucro_liquido / faturamento * 100) if faturamento > 0 else Decimal('0')
-    
-    context = {
+    # Faturamento, CMV, taxas, despesas fixas/variáveis e impostos
+    context = lucro.lucro_liquido(data_inicio, data_fim)
+    context.update({
         'data_inicio': data_inicio,
         'data_fim': data_fim,
-        'faturamento': faturamento,
-        'custo_mercadorias': custo_mercadorias,
-        'lucro_bruto': lucro_bruto,
-        'taxas_cartao': taxas_cartao,
-        'despesas_fixas': despesas_fixas_total,
-        'despesas_variaveis': despesas_variaveis,
-        'aliquota_imposto': aliquota_imposto,
-        'impostos': impostos,
-        'total_deducoes': total_deducoes,
-        'lucro_liquido': lucro_liquido,
-        'margem_liquida': margem_liquida,
-    }
+    })
     
     return render(request, 'core/relatorios/lucro_liquido.html', context)
 
@@ -4392,68 +3993,13 @@ def relatorio_contas_receber(request):
 @login_required
 def relatorio_dre(request):
     """DRE Simplificado"""
-    from vendas.models import Venda, ItemVenda
-    from financeiro.models import ContaPagar, DespesaFixa, ConfiguracaoTributo
+    from financeiro import lucro
     
     hoje = date.today()
     mes = int(request.GET.get('mes', hoje.month))
     ano = int(request.GET.get('ano', hoje.year))
     
-    # Primeiro e último dia do mês
-    primeiro_dia = date(ano, mes, 1)
-    if mes == 12:
-        ultimo_dia = date(ano + 1, 1, 1) - timedelta(days=1)
-    else:
-        ultimo_dia = date(ano, mes + 1, 1) - timedelta(days=1)
-    
-    # 1. Receita Bruta
-    vendas = Venda.objects.filter(
-        data_venda__date__gte=primeiro_dia,
-        data_venda__date__lte=ultimo_dia,
-        status='F'
-    )
-    receita_bruta = vendas.aggregate(total=Sum('total'))['total'] or Decimal('0')
-    
-    # 2. Deduções (descontos)
-    descontos = vendas.aggregate(total=Sum('desconto'))['total'] or Decimal('0')
-    
-    # 3. Receita Líquida
-    receita_liquida = receita_bruta - descontos
-    
-    # 4. CMV (Custo das Mercadorias Vendidas)
-    itens = ItemVenda.objects.filter(venda__in=vendas).select_related('produto')
-    cmv = sum((i.produto.preco_custo or 0) * i.quantidade for i in itens)
-    
-    # 5. Lucro Bruto
-    lucro_bruto = receita_liquida - Decimal(str(cmv))
-    
-    # 6. Despesas Operacionais
-    despesas_fixas = DespesaFixa.objects.filter(ativo=True).aggregate(t=Sum('valor'))['t'] or Decimal('0')
-    
-    despesas_variaveis = ContaPagar.objects.filter(
-        data_pagamento__gte=primeiro_dia,
-        data_pagamento__lte=ultimo_dia,
-        status='PG'
-    ).aggregate(t=Sum('valor'))['t'] or Decimal('0')
-    
-    despesas_operacionais = despesas_fixas + despesas_variaveis
-    
-    # 7. Resultado Operacional
-    resultado_operacional = lucro_bruto - despesas_operacionais
-    
-    # 8. Impostos
-    aliquota = Decimal('4.0')
-    try:
-        config = ConfiguracaoTributo.objects.first()
-        if config:
-            aliquota = config.aliquota
-    except:
-        pass
-    
-    impostos = receita_bruta * (aliquota / 100)
-    
-    # 9. Resultado Líquido
-    resultado_liquido = resultado_operacional - impostos
+    linhas = lucro.dre_mensal(ano, mes)
     
     # Lista de meses para o select
     meses = [
@@ -4467,18 +4013,7 @@ def relatorio_dre(request):
         'ano': ano,
         'meses': meses,
         'anos': range(hoje.year - 2, hoje.year + 1),
-        'receita_bruta': receita_bruta,
-        'descontos': descontos,
-        'receita_liquida': receita_liquida,
-        'cmv': cmv,
-        'lucro_bruto': lucro_bruto,
-        'despesas_fixas': despesas_fixas,
-        'despesas_variaveis': despesas_variaveis,
-        'despesas_operacionais': despesas_operacionais,
-        'resultado_operacional': resultado_operacional,
-        'aliquota': aliquota,
-        'impostos': impostos,
-        'resultado_liquido': resultado_liquido,
+        **linhas,
     }
     
     return render(request, 'core/relatorios/dre.html', context)
@@ -4488,57 +4023,54 @@ def relatorio_dre(request):
 def relatorio_inadimplencia(request):
     """Relatório de inadimplência"""
     from financeiro.models import ContaReceber
+    from financeiro.encargos import EM_ABERTO, anotar_encargos, encargos_por, totais_encargos
     
     hoje = date.today()
     dias_atraso = int(request.GET.get('dias', 0))
     
-    # Contas vencidas
+    # Contas vencidas em aberto (PENDENTE ainda não varrida ou ATRASADO)
     contas_vencidas = ContaReceber.objects.filter(
-        status='PE',
+        status__in=EM_ABERTO,
         data_vencimento__lt=hoje
-    ).select_related('cliente').order_by('data_vencimento')
+    )
     
     if dias_atraso > 0:
         data_limite = hoje - timedelta(days=dias_atraso)
         contas_vencidas = contas_vencidas.filter(data_vencimento__lte=data_limite)
     
-    # Calcular dias de atraso e agrupar por cliente
-    clientes_inadimplentes = {}
-    total_inadimplente = Decimal('0')
-    
-    for conta in contas_vencidas:
-        dias = (hoje - conta.data_vencimento).days
-        total_inadimplente += conta.valor
-        
-        cliente_id = conta.cliente_id
-        if cliente_id not in clientes_inadimplentes:
-            clientes_inadimplentes[cliente_id] = {
-                'cliente': conta.cliente,
-                'total': Decimal('0'),
-                'qtd_contas': 0,
-                'maior_atraso': 0
-            }
-        
-        clientes_inadimplentes[cliente_id]['total'] += conta.valor
-        clientes_inadimplentes[cliente_id]['qtd_contas'] += 1
-        clientes_inadimplentes[cliente_id]['maior_atraso'] = max(
-            clientes_inadimplentes[cliente_id]['maior_atraso'], dias
-        )
+    # Totais com juros/multa por cliente e gerais, calculados no banco
+    por_cliente = encargos_por(contas_vencidas, 'cliente', hoje)
+    totais = totais_encargos(contas_vencidas, hoje)
+    clientes = Cliente.objects.in_bulk([pk for pk in por_cliente if pk is not None])
     
-    # Ordenar por valor
     clientes_lista = sorted(
-        clientes_inadimplentes.values(),
-        key=lambda x: x['total'],
+        (
+            {
+                'cliente': clientes.get(cliente_id),
+                'total': linha['valor_total'],
+                'total_devido': linha['total_devido'],
+                'qtd_contas': linha['qtd'],
+                'maior_atraso': linha['maior_atraso'],
+            }
+            for cliente_id, linha in por_cliente.items()
+        ),
+        key=lambda x: x['total_devido'],
         reverse=True
     )
     
+    detalhadas = anotar_encargos(
+        contas_vencidas.select_related('cliente').order_by('data_vencimento'), hoje
+    ).annotate(encargos=F('total_devido') - F('valor'))
+    
     context = {
         'dias_atraso': dias_atraso,
-        'contas_vencidas': contas_vencidas[:100],
+        'contas_vencidas': detalhadas[:100],
         'clientes_inadimplentes': clientes_lista,
-        'total_inadimplente': total_inadimplente,
+        'total_inadimplente': totais['valor_total'],
+        'total_encargos': totais['juros'] + totais['multa'],
+        'total_devido': totais['total_devido'],
         'qtd_clientes': len(clientes_lista),
-        'qtd_contas': contas_vencidas.count(),
+        'qtd_contas': totais['qtd'],
         'hoje': hoje,
     }
     
@@ -1,13 +1,17 @@
 from django.utils.safestring import mark_safe
 from django.contrib import admin
 from django.utils.html import format_html
-from django.urls import reverse
+from django.urls import path, reverse
+from django.contrib import messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
 from decimal import Decimal
 from .models import (
     Categoria, Subcategoria, Grupo, Subgrupo, Aplicacao, Fabricante, Fornecedor,
     Produto, MovimentacaoEstoque, HistoricoPreco,
     Montadora, VeiculoModelo, VeiculoVersao
 )
+from .precos import recalcular_grades
 
 # Verificar se CotacaoFornecedor existe
 try:
@@ -206,6 +210,7 @@ class HistoricoPrecoInline(admin.TabularInline):
 class ProdutoAdmin(admin.ModelAdmin):
      # ADICIONE ESTA LINHA:
     change_form_template = 'admin/estoque/produto/change_form.html'
+    change_list_template = 'admin/estoque/produto/change_list.html'
     list_display = [
         'codigo', 'descricao_curta', 'categoria', 'fabricante',
         'estoque_badge', 'preco_display', 'tem_customizacao', 'ativo'
@@ -504,7 +509,9 @@ class ProdutoAdmin(admin.ModelAdmin):
     
     def ativar_imposto_4(self, request, queryset):
         """Ativa imposto de 4% nos produtos selecionados"""
-        count = queryset.update(aplicar_imposto_4=True)
+        ids = list(queryset.values_list('pk', flat=True))
+        count = Produto.objects.filter(pk__in=ids).update(aplicar_imposto_4=True)
+        recalcular_grades(Produto.objects.filter(pk__in=ids))
         self.message_user(
             request,
             f'Imposto de 4% ATIVADO em {count} produto(s)!'
@@ -513,13 +520,73 @@ class ProdutoAdmin(admin.ModelAdmin):
     
     def desativar_imposto_4(self, request, queryset):
         """Desativa imposto de 4% nos produtos selecionados"""
-        count = queryset.update(aplicar_imposto_4=False)
+        ids = list(queryset.values_list('pk', flat=True))
+        count = Produto.objects.filter(pk__in=ids).update(aplicar_imposto_4=False)
+        recalcular_grades(Produto.objects.filter(pk__in=ids))
         self.message_user(
             request,
             f'Imposto de 4% DESATIVADO em {count} produto(s)!'
         )
     desativar_imposto_4.short_description = ' Desativar imposto 4%%'
     
+    # ========== PARÂMETROS DE ESTOQUE EM LOTE ==========
+    
+    def get_urls(self):
+        urls = [
+            path(
+                'importar-parametros/',
+                self.admin_site.admin_view(self.importar_parametros_view),
+                name='estoque_produto_importar_parametros',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def importar_parametros_view(self, request):
+        """Upload de planilha com estoque mínimo/máximo/reposição (ver estoque/parametros.py)"""
+        from .forms import ParametrosEstoqueForm
+        from .parametros import aplicar_parametros, ler_parametros, limpar_parametros
+        
+        if not self.has_change_permission(request):
+            return redirect('admin:estoque_produto_changelist')
+        
+        resumo = None
+        erros = []
+        if request.method == 'POST':
+            form = ParametrosEstoqueForm(request.POST, request.FILES)
+            if form.is_valid():
+                try:
+                    df = ler_parametros(form.cleaned_data['arquivo'])
+                except (OSError, ValueError) as e:
+                    form.add_error('arquivo', str(e))
+                else:
+                    df, erros = limpar_parametros(df)
+                    simular = form.cleaned_data['simular']
+                    resumo = aplicar_parametros(df, simular=simular)
+                    prefixo = 'SIMULAÇÃO (nada foi gravado): ' if simular else ''
+                    self.message_user(
+                        request,
+                        f"{prefixo}{resumo['atualizados']} produto(s) atualizado(s), "
+                        f"{resumo['inalterados']} sem alteração, "
+                        f"{len(resumo['desconhecidos'])} código(s) não encontrado(s), "
+                        f"{len(erros)} linha(s) com erro.",
+                        messages.WARNING if erros or resumo['desconhecidos'] else messages.SUCCESS,
+                    )
+                    if not erros and not resumo['desconhecidos'] and not simular:
+                        return redirect('admin:estoque_produto_changelist')
+        else:
+            form = ParametrosEstoqueForm()
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar parâmetros de estoque',
+            'form': form,
+            'resumo': resumo,
+            'erros': erros[:200],
+            'total_erros': len(erros),
+        }
+        return TemplateResponse(request, 'admin/estoque/produto/importar_parametros.html', context)
+    
     # ========== CONFIGURAÇÕES ADICIONAIS ==========
     
     class Media:
@@ -747,16 +747,9 @@ class ProdutoSimplificadoForm(forms.ModelForm):
         """Gerar código automaticamente se não informado"""
         codigo = self.cleaned_data.get('codigo')
         
-        # Se não informou código, gerar automaticamente
+        # Se não informou código, o Produto.save() gera pela sequência
         if not codigo:
-            # Pegar último código e incrementar
-            ultimo_produto = Produto.objects.order_by('-id').first()
-            if ultimo_produto and ultimo_produto.codigo.isdigit():
-                proximo_numero = int(ultimo_produto.codigo) + 1
-            else:
-                proximo_numero = 1
-            
-            codigo = str(proximo_numero).zfill(6)  # Ex: 000001
+            return ''
         
         # Verificar se já existe (exceto se estiver editando)
         if Produto.objects.filter(codigo=codigo).exclude(pk=self.instance.pk).exists():
@@ -786,4 +779,26 @@ class ProdutoSimplificadoForm(forms.ModelForm):
                 self.add_error('estoque_maximo',
                     'O estoque máximo deve ser maior que o estoque mínimo!')
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+# ============================================
+# PARÂMETROS DE ESTOQUE EM LOTE (ADMIN)
+# ============================================
+
+class ParametrosEstoqueForm(forms.Form):
+    """Upload da planilha de estoque mínimo/máximo/reposição"""
+
+    arquivo = forms.FileField(
+        label='Planilha',
+        help_text='CSV, XLS ou XLSX com as colunas CÓDIGO, MÍNIMO, MÁXIMO e REPOSIÇÃO',
+    )
+    simular = forms.BooleanField(
+        label='Apenas simular (não grava nada)',
+        required=False,
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith(('.csv', '.xls', '.xlsx')):
+            raise forms.ValidationError('Envie um arquivo .csv, .xls ou .xlsx')
+        return arquivo
@@ -0,0 +1,400 @@
+"""
+Importação de produtos a partir de planilhas (Excel/CSV)
+
+Substitui os scripts que percorriam a planilha linha a linha com uma
+consulta (ou get_or_create/update_or_create) por produto. Aqui:
+
+1. A planilha é lida uma vez e as colunas são limpas com operações
+   vetorizadas do pandas (texto, números no formato brasileiro, categorias)
+2. Categorias, fabricantes e produtos existentes são carregados de uma vez;
+   as categorias/fabricantes que faltam são criados com um bulk_create
+3. Produtos novos e existentes são separados pelo código (diferença de
+   conjuntos) e gravados com bulk_create/bulk_update em lotes, só com os
+   produtos que realmente mudaram
+4. Linhas com problema não interrompem a importação: vão para o relatório
+   de erros com o número da linha na planilha
+
+Layouts suportados:
+- 'lc': relatório de estoque do LC Sistemas (estoque.xls), sem cabeçalho,
+  colunas por posição, com cabeçalhos de página repetidos no meio
+- 'cabecalho': planilha com uma linha de títulos (CÓDIGO, DESCRIÇÃO,
+  CATEGORIA, FABRICANTE, BARRAS, REFERÊNCIA, ESTOQUE, CUSTO, PREÇO...)
+"""
+
+import csv
+import io
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .search.normalizacao import normalizar_codigo
+
+
+TAMANHO_LOTE = 1000
+
+CATEGORIA_PADRAO = 'PADRAO'
+FABRICANTE_PADRAO = 'DIVERSOS'
+
+# Grafias erradas que aparecem no relatório do sistema antigo
+CORRECOES_CATEGORIA = {
+    'SUSPESAO': 'SUSPENSAO',
+    'TRANSMICAO': 'TRANSMISSAO',
+    'LIMPEZA E': 'LIMPEZA',
+}
+
+# Layout 'lc': posição da coluna -> campo
+COLUNAS_LC = {
+    1: 'codigo',
+    2: 'descricao',
+    5: 'categoria',
+    7: 'estoque_atual',
+    10: 'preco_custo',
+    13: 'preco_venda_dinheiro',
+}
+LINHAS_CABECALHO_LC = 13
+
+# Linhas usadas para detectar o separador do CSV
+LINHAS_AMOSTRA_CSV = 100
+
+# Layout 'cabecalho': título normalizado (sem acento/espaço) -> campo
+TITULOS = {
+    'codigo': 'codigo', 'cod': 'codigo', 'codigointerno': 'codigo', 'int': 'codigo',
+    'descricao': 'descricao', 'produto': 'descricao', 'nome': 'descricao',
+    'categoria': 'categoria', 'grupo': 'categoria',
+    'fabricante': 'fabricante', 'marca': 'fabricante',
+    'barras': 'codigo_barras', 'codigobarras': 'codigo_barras', 'ean': 'codigo_barras', 'gtin': 'codigo_barras',
+    'referencia': 'referencia_fabricante', 'referenciafabricante': 'referencia_fabricante', 'ref': 'referencia_fabricante',
+    'estoque': 'estoque_atual', 'quantidade': 'estoque_atual', 'qtd': 'estoque_atual', 'saldo': 'estoque_atual',
+    'custo': 'preco_custo', 'precocusto': 'preco_custo',
+    'preco': 'preco_venda_dinheiro', 'precovenda': 'preco_venda_dinheiro', 'venda': 'preco_venda_dinheiro',
+}
+
+CAMPOS_TEXTO = {
+    'codigo': 50,
+    'descricao': 200,
+    'codigo_barras': 50,
+    'referencia_fabricante': 100,
+}
+CAMPOS_DECIMAIS = ['preco_custo', 'preco_venda_dinheiro']
+CAMPOS_INTEIROS = ['estoque_atual']
+
+# Campos que a planilha atualiza em produtos já cadastrados
+CAMPOS_ATUALIZAVEIS = [
+    'descricao', 'categoria_id', 'fabricante_id', 'codigo_barras', 'referencia_fabricante',
+    'estoque_atual', 'preco_custo', 'preco_venda_dinheiro',
+]
+
+
+# ============================================
+# LEITURA E LIMPEZA
+# ============================================
+
+def _separador(texto):
+    """
+    Separador do CSV detectado nas primeiras linhas (não só na primeira:
+    o relatório do LC tem linhas de cabeçalho e descrições com vírgula)
+    """
+    amostra = '\n'.join(texto.splitlines()[:LINHAS_AMOSTRA_CSV])
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=';,\t').delimiter
+    except csv.Error:
+        return ','
+
+
+def _ler_tabela(arquivo, **opcoes):
+    """
+    Lê CSV ou Excel como texto (dtype=object)
+
+    No CSV o separador é detectado (';' do Excel em português, ',' ou
+    tab) e a codificação cai para latin-1 quando não é UTF-8. Arquivos ilegíveis
+    viram ValueError, que os comandos e o admin mostram como erro.
+
+    Args:
+        arquivo: caminho ou arquivo enviado (UploadedFile)
+    """
+    nome = str(getattr(arquivo, 'name', arquivo)).lower()
+    try:
+        if nome.endswith('.csv'):
+            conteudo = arquivo.read() if hasattr(arquivo, 'read') else Path(arquivo).read_bytes()
+            try:
+                texto = conteudo.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                # CSV salvo pelo Excel em português
+                texto = conteudo.decode('latin-1')
+            return pd.read_csv(io.StringIO(texto), sep=_separador(texto), dtype=object, **opcoes)
+        return pd.read_excel(arquivo, dtype=object, **opcoes)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, csv.Error, zipfile.BadZipFile) as e:
+        raise ValueError(f'Não foi possível ler a planilha: {e}') from e
+
+
+def ler_planilha(caminho, layout='lc'):
+    """
+    Lê a planilha no layout informado
+
+    Returns:
+        DataFrame com as colunas canônicas presentes e o índice igual ao
+        número da linha na planilha
+    """
+    if layout == 'lc':
+        df = _ler_tabela(caminho, header=None, skiprows=LINHAS_CABECALHO_LC)
+        df = df[[coluna for coluna in COLUNAS_LC if coluna in df.columns]].rename(columns=COLUNAS_LC)
+        df.index = df.index + LINHAS_CABECALHO_LC + 1
+    elif layout == 'cabecalho':
+        df = _ler_tabela(caminho)
+        colunas = {}
+        for titulo in df.columns:
+            campo = TITULOS.get(normalizar_codigo(titulo))
+            if campo and campo not in colunas.values():
+                colunas[titulo] = campo
+        df = df[list(colunas)].rename(columns=colunas)
+        df.index = df.index + 2
+    else:
+        raise ValueError(f"Layout desconhecido: {layout}")
+
+    if 'codigo' not in df.columns or 'descricao' not in df.columns:
+        raise ValueError("A planilha precisa das colunas de código e descrição")
+    return df
+
+
+def _texto(serie):
+    """Texto sem espaços nas pontas; vazio para células em branco"""
+    texto = serie.astype('string').str.strip().fillna('')
+    # Códigos lidos como número (104114.0)
+    return texto.str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+
+
+# Formatos aceitos em células de texto (sinal opcional)
+_DECIMAL_VIRGULA = r'-?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?'   # 1.234,56 / 1234,56 / 1.234.567
+_MILHAR_PONTO = r'-?\d{1,3}\.\d{3}'                      # 1.500: milhar ou decimal?
+_DECIMAL_PONTO = r'-?(\d+(\.\d+)?|\.\d+)'                # 9.9 / 10.50 / 2.0
+
+
+def _numero(serie):
+    """
+    Número a partir de células numéricas ou texto (1.234,56 ou 1234.56)
+
+    O ponto só é separador de milhar quando há vírgula decimal ou mais de
+    um grupo de milhar (1.234.567); sem vírgula, 9.9 e 10.50 são decimais.
+    Um único grupo de três dígitos após o ponto (1.500) é ambíguo e volta
+    marcado para o usuário conferir.
+
+    Returns:
+        Tuple (valores, inválidos, ambíguos): células vazias valem 0
+    """
+    e_texto = serie.map(lambda valor: isinstance(valor, str))
+    texto = serie.where(e_texto).astype('string').str.strip().fillna('')
+
+    com_virgula = texto.str.contains(',', regex=False)
+    ambiguos = e_texto & ~com_virgula & texto.str.fullmatch(_MILHAR_PONTO)
+    brasileiro = e_texto & texto.str.fullmatch(_DECIMAL_VIRGULA) & (com_virgula | texto.str.count(r'\.').gt(1))
+    decimal_ponto = e_texto & ~brasileiro & ~ambiguos & texto.str.fullmatch(_DECIMAL_PONTO)
+
+    normalizado = texto.where(
+        ~brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    ).where(brasileiro | decimal_ponto, None)
+    valores = pd.to_numeric(normalizado, errors='coerce').where(
+        e_texto, pd.to_numeric(serie.where(~e_texto), errors='coerce')
+    )
+    preenchido = serie.notna() & ~(e_texto & texto.eq(''))
+    invalidos = preenchido & valores.isna() & ~ambiguos
+    return valores.fillna(0), invalidos, ambiguos.astype(bool)
+
+
+def limpar(df):
+    """
+    Normaliza as colunas e separa as linhas com erro
+
+    Returns:
+        Tuple (DataFrame limpo, lista de erros [(linha, codigo, mensagem)])
+    """
+    df = df.copy()
+    for campo, tamanho in CAMPOS_TEXTO.items():
+        if campo in df.columns:
+            df[campo] = _texto(df[campo]).str.slice(0, tamanho)
+
+    # Só linhas de produto (o relatório repete cabeçalhos e rodapés de página)
+    df = df[df['codigo'].ne('') & df['codigo'].ne('INT') & df['descricao'].ne('')]
+
+    erros = pd.Series('', index=df.index, dtype=object)
+    for campo in CAMPOS_DECIMAIS + CAMPOS_INTEIROS:
+        if campo not in df.columns:
+            continue
+        valores, invalidos, ambiguos = _numero(df[campo])
+        erros[invalidos & erros.eq('')] = f'valor inválido em {campo}'
+        erros[ambiguos & erros.eq('')] = f'valor ambíguo em {campo} (use 1.500,00 ou 1500.00)'
+        erros[valores.lt(0) & erros.eq('')] = f'{campo} negativo'
+        df[campo] = valores.round(0 if campo in CAMPOS_INTEIROS else 2)
+
+    for campo in ('categoria', 'fabricante'):
+        if campo in df.columns:
+            nomes = _texto(df[campo]).str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+            df[campo] = nomes.replace(CORRECOES_CATEGORIA) if campo == 'categoria' else nomes
+
+    repetidos = df['codigo'].duplicated(keep='last')
+    erros[repetidos & erros.eq('')] = 'código repetido na planilha (vale a última linha)'
+
+    lista_erros = [
+        (linha, df.at[linha, 'codigo'], mensagem)
+        for linha, mensagem in erros[erros.ne('')].items()
+    ]
+    return df[erros.eq('')], lista_erros
+
+
+# ============================================
+# GRAVAÇÃO
+# ============================================
+
+def _resolver_nomes(model, nomes, padrao, defaults):
+    """
+    {NOME: id} de categorias/fabricantes, criando os que faltam em lote
+    (comparação sem diferenciar maiúsculas)
+    """
+    existentes = {nome.upper(): pk for pk, nome in model.objects.values_list('pk', 'nome')}
+    desejados = {nome for nome in nomes if nome} | {padrao}
+    faltando = sorted(desejados - set(existentes))
+    if faltando:
+        model.objects.bulk_create([model(nome=nome, **defaults(nome)) for nome in faltando])
+        existentes = {nome.upper(): pk for pk, nome in model.objects.values_list('pk', 'nome')}
+    return existentes
+
+
+def _decimal(valor):
+    return Decimal(f'{valor:.2f}')
+
+
+def importar_produtos(df, simular=False, batch_size=TAMANHO_LOTE):
+    """
+    Grava os produtos de um DataFrame já limpo (ver ler_planilha/limpar)
+
+    Args:
+        simular: faz tudo dentro de uma transação desfeita no final
+            (contagens reais, nada gravado)
+
+    Returns:
+        Dict {criados, atualizados, inalterados, categorias_criadas,
+        fabricantes_criados}
+    """
+    from .models import Produto, Categoria, Fabricante
+    from .precos import CAMPOS_GRADE, fatores_taxas, grade_precos
+
+    resumo = {'criados': 0, 'atualizados': 0, 'inalterados': 0,
+              'categorias_criadas': 0, 'fabricantes_criados': 0}
+    if df.empty:
+        return resumo
+
+    with transaction.atomic():
+        total_categorias = Categoria.objects.count()
+        total_fabricantes = Fabricante.objects.count()
+        categorias = _resolver_nomes(
+            Categoria, df['categoria'].unique() if 'categoria' in df.columns else [],
+            CATEGORIA_PADRAO, lambda nome: {'descricao': f'Categoria {nome}', 'ativo': True},
+        )
+        fabricantes = _resolver_nomes(
+            Fabricante, df['fabricante'].unique() if 'fabricante' in df.columns else [],
+            FABRICANTE_PADRAO, lambda nome: {'pais_origem': 'Brasil', 'ativo': True},
+        )
+        resumo['categorias_criadas'] = Categoria.objects.count() - total_categorias
+        resumo['fabricantes_criados'] = Fabricante.objects.count() - total_fabricantes
+
+        # Colunas resolvidas para ids, ainda vetorizado
+        df = df.copy()
+        if 'categoria' in df.columns:
+            df['categoria_id'] = df['categoria'].map(categorias).fillna(categorias[CATEGORIA_PADRAO]).astype(int)
+        if 'fabricante' in df.columns:
+            df['fabricante_id'] = df['fabricante'].map(fabricantes).astype('Int64')
+        campos = [campo for campo in CAMPOS_ATUALIZAVEIS if campo in df.columns]
+
+        codigos = df['codigo'].tolist()
+        existentes = {}
+        for inicio in range(0, len(codigos), batch_size):
+            existentes.update(
+                Produto.objects.only('pk', 'codigo', 'grade_precos', *campos, *CAMPOS_GRADE).in_bulk(
+                    codigos[inicio:inicio + batch_size], field_name='codigo'
+                )
+            )
+        novos = set(codigos) - set(existentes)
+
+        fatores = fatores_taxas()
+        agora = timezone.now()
+        linhas = df[['codigo', *campos]].to_dict('records')
+
+        criar = []
+        alterados = []
+        for linha in linhas:
+            valores = {}
+            for campo in campos:
+                valor = linha[campo]
+                if campo in CAMPOS_DECIMAIS:
+                    valor = _decimal(valor)
+                elif campo in CAMPOS_INTEIROS:
+                    valor = int(valor)
+                elif campo == 'fabricante_id':
+                    valor = None if pd.isna(valor) else int(valor)
+                valores[campo] = valor
+
+            if linha['codigo'] in novos:
+                produto = Produto(
+                    codigo=linha['codigo'],
+                    categoria_id=valores.pop('categoria_id', categorias[CATEGORIA_PADRAO]),
+                    fabricante_id=valores.pop('fabricante_id', None) or fabricantes[FABRICANTE_PADRAO],
+                    estoque_minimo=0,
+                    estoque_maximo=0,
+                    estoque_reservado=0,
+                    loja='1',
+                    unidade_medida='UN',
+                    ativo=True,
+                    **valores,
+                )
+                preco = produto.preco_venda_dinheiro or Decimal('0.00')
+                produto.preco_custo = produto.preco_custo or Decimal('0.00')
+                produto.preco_venda_dinheiro = preco
+                produto.preco_venda_debito = preco
+                produto.preco_venda_credito = preco
+                produto.grade_precos = grade_precos(produto, fatores)
+                criar.append(produto)
+                continue
+
+            produto = existentes[linha['codigo']]
+            # Planilha sem fabricante/EAN/referência não apaga o que já existe
+            mudou = [
+                campo for campo, valor in valores.items()
+                if getattr(produto, campo) != valor
+                and not (campo in ('fabricante_id', 'codigo_barras', 'referencia_fabricante') and not valor)
+            ]
+            if not mudou:
+                resumo['inalterados'] += 1
+                continue
+            for campo in mudou:
+                setattr(produto, campo, valores[campo])
+            produto.grade_precos = grade_precos(produto, fatores)
+            produto.data_atualizacao = agora
+            alterados.append(produto)
+
+        Produto.objects.bulk_create(criar, batch_size=batch_size)
+        if alterados:
+            Produto.objects.bulk_update(alterados, campos + ['grade_precos', 'data_atualizacao'], batch_size=batch_size)
+        resumo['criados'] = len(criar)
+        resumo['atualizados'] = len(alterados)
+
+        if simular:
+            transaction.set_rollback(True)
+        else:
+            transaction.on_commit(_apos_importar)
+
+    return resumo
+
+
+def _apos_importar():
+    """Caches que os signals de save() atualizariam produto a produto"""
+    from core import indicadores
+    from .search import cache_codigo_barras, indice_produtos
+    from .taxonomia import invalidar_taxonomia
+
+    cache_codigo_barras.limpar()
+    indice_produtos.invalidar()
+    invalidar_taxonomia()
+    indicadores.invalidar('estoque')
@@ -0,0 +1,84 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estoque.importacao import TAMANHO_LOTE
+from estoque.parametros import (
+    COBERTURA_DIAS, DIAS_HISTORICO, FATOR_SEGURANCA, PRAZO_REPOSICAO_DIAS,
+    aplicar_parametros, calcular_parametros, ler_parametros, limpar_parametros,
+)
+
+
+class Command(BaseCommand):
+    help = 'Atualiza estoque mínimo, máximo e quantidade de reposição em lote (planilha ou histórico de vendas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', nargs='?', default=None,
+                            help='Planilha .csv/.xls/.xlsx com CÓDIGO, MÍNIMO, MÁXIMO e REPOSIÇÃO')
+        parser.add_argument('--historico', action='store_true',
+                            help='Calcula os parâmetros pelas vendas em vez de ler uma planilha')
+        parser.add_argument('--dias', type=int, default=DIAS_HISTORICO,
+                            help=f'Dias de histórico considerados (padrão {DIAS_HISTORICO})')
+        parser.add_argument('--prazo', type=int, default=PRAZO_REPOSICAO_DIAS,
+                            help=f'Prazo de reposição do fornecedor em dias (padrão {PRAZO_REPOSICAO_DIAS})')
+        parser.add_argument('--cobertura', type=int, default=COBERTURA_DIAS,
+                            help=f'Dias de venda que o máximo deve cobrir (padrão {COBERTURA_DIAS})')
+        parser.add_argument('--fator-seguranca', type=float, default=FATOR_SEGURANCA,
+                            help=f'Desvios padrão de estoque de segurança (padrão {FATOR_SEGURANCA})')
+        parser.add_argument('--simular', action='store_true',
+                            help='Mostra o que seria feito sem gravar nada')
+        parser.add_argument('--batch-size', type=int, default=TAMANHO_LOTE,
+                            help=f'Produtos gravados por lote (padrão {TAMANHO_LOTE})')
+        parser.add_argument('--relatorio', default=None,
+                            help='Grava linhas com erro e códigos não encontrados neste CSV')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        erros = []
+
+        if options['historico']:
+            if options['arquivo']:
+                raise CommandError('Informe uma planilha ou --historico, não os dois')
+            if options['dias'] < 1 or options['prazo'] < 1:
+                raise CommandError('--dias e --prazo precisam ser maiores que zero')
+            df = calcular_parametros(
+                dias=options['dias'], prazo_dias=options['prazo'],
+                cobertura_dias=options['cobertura'], fator_seguranca=options['fator_seguranca'],
+            )
+            self.stdout.write(f"{len(df)} produto(s) com vendas nos últimos {options['dias']} dia(s).")
+        elif options['arquivo']:
+            try:
+                df = ler_parametros(options['arquivo'])
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+            df, erros = limpar_parametros(df)
+            self.stdout.write(f'{len(df)} linha(s) válidas, {len(erros)} linha(s) com erro.')
+        else:
+            raise CommandError('Informe a planilha ou use --historico')
+
+        resumo = aplicar_parametros(df, simular=options['simular'], batch_size=options['batch_size'])
+
+        for linha, codigo, mensagem in erros[:20]:
+            self.stdout.write(self.style.WARNING(f'   Linha {linha} ({codigo}): {mensagem}'))
+        if len(erros) > 20:
+            self.stdout.write(self.style.WARNING(f'   ... e mais {len(erros) - 20} linha(s)'))
+
+        desconhecidos = resumo['desconhecidos']
+        if desconhecidos:
+            amostra = ', '.join(desconhecidos[:20])
+            resto = f' e mais {len(desconhecidos) - 20}' if len(desconhecidos) > 20 else ''
+            self.stdout.write(self.style.WARNING(f'   Códigos não encontrados: {amostra}{resto}'))
+
+        if options['relatorio']:
+            with open(options['relatorio'], 'w', newline='', encoding='utf-8') as arquivo:
+                escritor = csv.writer(arquivo, delimiter=';')
+                escritor.writerow(['linha', 'codigo', 'erro'])
+                escritor.writerows(erros)
+                escritor.writerows(('', codigo, 'código não encontrado') for codigo in desconhecidos)
+
+        prefixo = 'SIMULAÇÃO (nada foi gravado): ' if options['simular'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}{resumo['atualizados']} atualizado(s), {resumo['inalterados']} sem alteração, "
+            f"{len(desconhecidos)} código(s) não encontrado(s) em {time.monotonic() - inicio:.1f}s."
+        ))
@@ -0,0 +1,52 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estoque.importacao import TAMANHO_LOTE, importar_produtos, ler_planilha, limpar
+
+
+class Command(BaseCommand):
+    help = 'Importa/atualiza produtos de uma planilha (Excel ou CSV) em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Planilha .xls/.xlsx/.csv')
+        parser.add_argument('--layout', choices=['lc', 'cabecalho'], default='lc',
+                            help="'lc' = relatório de estoque do LC Sistemas (padrão); "
+                                 "'cabecalho' = planilha com linha de títulos")
+        parser.add_argument('--simular', action='store_true',
+                            help='Mostra o que seria feito sem gravar nada')
+        parser.add_argument('--batch-size', type=int, default=TAMANHO_LOTE,
+                            help=f'Produtos gravados por lote (padrão {TAMANHO_LOTE})')
+        parser.add_argument('--relatorio-erros', default=None,
+                            help='Grava todas as linhas com erro neste CSV')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            df = ler_planilha(options['arquivo'], options['layout'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        df, erros = limpar(df)
+        self.stdout.write(f'{len(df)} produto(s) válidos, {len(erros)} linha(s) com erro.')
+
+        resumo = importar_produtos(df, simular=options['simular'], batch_size=options['batch_size'])
+
+        for linha, codigo, mensagem in erros[:20]:
+            self.stdout.write(self.style.WARNING(f'   Linha {linha} ({codigo}): {mensagem}'))
+        if len(erros) > 20:
+            self.stdout.write(self.style.WARNING(f'   ... e mais {len(erros) - 20} linha(s)'))
+
+        if options['relatorio_erros']:
+            with open(options['relatorio_erros'], 'w', newline='', encoding='utf-8') as arquivo:
+                escritor = csv.writer(arquivo, delimiter=';')
+                escritor.writerow(['linha', 'codigo', 'erro'])
+                escritor.writerows(erros)
+
+        prefixo = 'SIMULAÇÃO (nada foi gravado): ' if options['simular'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}{resumo['criados']} criado(s), {resumo['atualizados']} atualizado(s), "
+            f"{resumo['inalterados']} sem alteração, {resumo['categorias_criadas']} categoria(s) e "
+            f"{resumo['fabricantes_criados']} fabricante(s) novos em {time.monotonic() - inicio:.1f}s."
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from estoque.precos import recalcular_grades
+
+
+class Command(BaseCommand):
+    help = ('Recalcula a grade de preços (dinheiro, PIX, débito e crédito 1x a 12x) de todos os produtos. '
+            'Rode depois de alterar as taxas de cartão (até lá o PDV calcula as grades velhas na hora)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Produtos gravados por lote (padrão 500)')
+
+    def handle(self, *args, **options):
+        total = recalcular_grades(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído! {total} produto(s) com a grade de preços atualizada.'
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+def preencher_grades(apps, schema_editor):
+    """
+    Grava a grade de preços de todos os produtos com as taxas atuais.
+    O comando recalcular_grade_precos faz o mesmo a qualquer momento.
+    """
+    from estoque.precos import fatores_taxas, recalcular_grades
+
+    TaxaCartao = apps.get_model('financeiro', 'TaxaCartao')
+    Produto = apps.get_model('estoque', 'Produto')
+    tabela = {
+        (tipo, parcelas): taxa
+        for tipo, parcelas, taxa in TaxaCartao.objects.filter(ativo=True).values_list(
+            'tipo', 'parcelas', 'taxa_percentual'
+        )
+    }
+    recalcular_grades(Produto.objects.all(), fatores_taxas(tabela))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0009_produto_tem_st'),
+        ('financeiro', '0004_contafinanceira_resumodiariovendas_fechamentocaixa_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='grade_precos',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Grade de Preços'),
+        ),
+        migrations.RunPython(preencher_grades, migrations.RunPython.noop),
+    ]
@@ -775,6 +775,15 @@ class Produto(models.Model):
         verbose_name='Preço Crédito 12x'
     )
 
+    # Preços finais de todas as formas de pagamento (estoque.precos), já em
+    # centavos, gravados no save e regravados em lote quando as taxas mudam
+    grade_precos = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Grade de Preços'
+    )
+
     # ========== OBSERVAÇÕES ==========
     observacoes = models.TextField(
         blank=True, 
@@ -813,19 +822,13 @@ class Produto(models.Model):
         Override save para:
         1. Gerar código automaticamente se vazio
         2. Garantir valores default para campos numéricos
+        3. Recalcular a grade de preços por forma de pagamento
         """
+        from .precos import CAMPOS_GRADE, grade_precos
+
         # Gerar código se não informado
         if not self.codigo:
-            ultimo_produto = Produto.objects.order_by('-id').first()
-            if ultimo_produto:
-                try:
-                    # Tenta extrair número do último código
-                    ultimo_num = int(''.join(filter(str.isdigit, ultimo_produto.codigo or '0')))
-                    self.codigo = str(ultimo_num + 1).zfill(6)
-                except ValueError:
-                    self.codigo = str(Produto.objects.count() + 1).zfill(6)
-            else:
-                self.codigo = '000001'
+            self.codigo = Produto.gerar_proximo_codigo()
         
         # Garantir valores default para campos numéricos
         if self.preco_custo is None:
@@ -838,9 +841,47 @@ class Produto(models.Model):
             self.estoque_minimo = 0
         if self.estoque_maximo is None:
             self.estoque_maximo = 0
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(CAMPOS_GRADE):
+            self.grade_precos = grade_precos(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'grade_precos'}
         
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def _maior_codigo_numerico():
+        """Maior código numérico de 6 dígitos (executado só ao criar a sequência)"""
+        codigos = Produto.objects.filter(codigo__regex=r'^[0-9]{6}$').values_list('codigo', flat=True)
+        return max((int(codigo) for codigo in codigos), default=0)
+
+    @classmethod
+    def gerar_proximo_codigo(cls, quantidade=None):
+        """
+        Próximo código sequencial (000001) da sequência 'produto_codigo'.
+        Com `quantidade`, reserva um bloco e retorna a lista de códigos.
+        """
+        from core.sequencias import reservar_intervalo
+
+        total = quantidade or 1
+        codigos = []
+        while len(codigos) < total:
+            faltam = total - len(codigos)
+            candidatos = [
+                str(valor).zfill(6)
+                for valor in reservar_intervalo(
+                    'produto_codigo', faltam, inicial=cls._maior_codigo_numerico
+                )
+            ]
+            # Pula códigos digitados manualmente que já existem
+            existentes = set(
+                cls.objects.filter(codigo__in=candidatos).values_list('codigo', flat=True)
+            )
+            codigos.extend(c for c in candidatos if c not in existentes)
+
+        return codigos if quantidade else codigos[0]
+
     # ========== PROPRIEDADES CALCULADAS ==========
     @property
     def estoque_disponivel(self):
@@ -954,16 +995,10 @@ class Produto(models.Model):
     def get_todos_precos_cartao(self):
         """
         Retorna dicionário com todos os preços possíveis
+        (para vários produtos, use estoque.precos.matriz_precos)
         """
-        return {
-            'pix': self.get_preco_cartao('PIX', 1),
-            'dinheiro': self.preco_venda_dinheiro or Decimal('0.00'),
-            'debito': self.get_preco_cartao('DEBITO', 1),
-            'credito': {
-                parcela: self.get_preco_cartao('CREDITO', parcela)
-                for parcela in range(1, 13)
-            }
-        }
+        from .precos import precos_produto
+        return precos_produto(self)
 
 
     def calcular_lucro_liquido(self, preco_venda, tipo_pagamento='PIX', parcelas=1):
@@ -1851,6 +1886,41 @@ class MovimentacaoCasco(models.Model):
             
             estoque.save()
 
+    @classmethod
+    def registrar_em_lote(cls, movimentacoes):
+        """
+        Grava várias movimentações com um bulk_create e aplica o saldo
+        consolidado por amperagem com UPDATE atômico (F()).
+        O save() individual não é chamado.
+        """
+        if not movimentacoes:
+            return []
+        
+        criadas = cls.objects.bulk_create(movimentacoes)
+        
+        saldos = {}
+        for mov in movimentacoes:
+            delta = mov.quantidade if mov.tipo == 'E' else -mov.quantidade
+            saldos[mov.amperagem_id] = saldos.get(mov.amperagem_id, 0) + delta
+        
+        for amperagem_id, delta in saldos.items():
+            if delta == 0:
+                continue
+            atualizados = EstoqueCasco.objects.filter(
+                amperagem_id=amperagem_id
+            ).update(quantidade=models.F('quantidade') + delta)
+            if not atualizados:
+                estoque, created = EstoqueCasco.objects.get_or_create(
+                    amperagem_id=amperagem_id,
+                    defaults={'quantidade': delta}
+                )
+                if not created:
+                    EstoqueCasco.objects.filter(pk=estoque.pk).update(
+                        quantidade=models.F('quantidade') + delta
+                    )
+        
+        return criadas
+
 
 # ==========================================
 # MODELO: ITEM VENDA BATERIA (extensão)
@@ -0,0 +1,237 @@
+"""
+Parâmetros de estoque em lote (mínimo, máximo e quantidade de reposição)
+
+Substitui o script atualizar_estoque.py, que trazia os valores fixos no
+código e fazia um get() + save() por produto. Aqui:
+
+1. Os parâmetros vêm de uma planilha (CSV/XLSX com linha de títulos) ou
+   são calculados a partir do histórico de vendas (FatoVendaProdutoDia)
+2. Os valores atuais de todos os produtos são lidos em uma consulta e
+   cruzados com a planilha pelo código (merge do pandas)
+3. Só os produtos que mudaram são gravados, com bulk_update em lotes;
+   códigos que não existem no cadastro voltam no resumo
+"""
+
+import math
+from datetime import timedelta
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .importacao import TAMANHO_LOTE, _ler_tabela, _numero, _texto
+from .search.normalizacao import normalizar_codigo
+
+
+CAMPOS_PARAMETROS = ['estoque_minimo', 'estoque_maximo', 'quantidade_reposicao']
+
+# Título normalizado (sem acento/espaço) -> campo
+TITULOS_PARAMETROS = {
+    'codigo': 'codigo', 'cod': 'codigo', 'codigointerno': 'codigo', 'int': 'codigo',
+    'minimo': 'estoque_minimo', 'min': 'estoque_minimo', 'estmin': 'estoque_minimo',
+    'estoqueminimo': 'estoque_minimo',
+    'maximo': 'estoque_maximo', 'max': 'estoque_maximo', 'estmax': 'estoque_maximo',
+    'estoquemaximo': 'estoque_maximo',
+    'reposicao': 'quantidade_reposicao', 'qtdrep': 'quantidade_reposicao',
+    'qtdreposicao': 'quantidade_reposicao', 'quantidadereposicao': 'quantidade_reposicao',
+}
+
+# Cálculo pelo histórico
+DIAS_HISTORICO = 90
+PRAZO_REPOSICAO_DIAS = 7
+COBERTURA_DIAS = 30
+FATOR_SEGURANCA = 1.65  # ~95% de nível de serviço
+
+
+# ============================================
+# LEITURA
+# ============================================
+
+def ler_parametros(arquivo):
+    """
+    Lê uma planilha de parâmetros (CSV com ';' ou ',', XLS ou XLSX)
+
+    Args:
+        arquivo: caminho ou arquivo enviado (UploadedFile)
+
+    Returns:
+        DataFrame com 'codigo' e as colunas de parâmetro presentes, com o
+        índice igual ao número da linha na planilha
+    """
+    df = _ler_tabela(arquivo)
+
+    colunas = {}
+    for titulo in df.columns:
+        campo = TITULOS_PARAMETROS.get(normalizar_codigo(titulo))
+        if campo and campo not in colunas.values():
+            colunas[titulo] = campo
+    df = df[list(colunas)].rename(columns=colunas)
+    df.index = df.index + 2
+
+    if 'codigo' not in df.columns:
+        raise ValueError("A planilha precisa da coluna de código")
+    if not any(campo in df.columns for campo in CAMPOS_PARAMETROS):
+        raise ValueError("A planilha precisa de ao menos uma coluna: mínimo, máximo ou reposição")
+    return df
+
+
+def limpar_parametros(df):
+    """
+    Normaliza código e números e separa as linhas com erro
+
+    Returns:
+        Tuple (DataFrame limpo, lista de erros [(linha, codigo, mensagem)])
+    """
+    df = df.copy()
+    df['codigo'] = _texto(df['codigo']).str.slice(0, 50)
+    df = df[df['codigo'].ne('')]
+
+    erros = pd.Series('', index=df.index, dtype=object)
+    for campo in CAMPOS_PARAMETROS:
+        if campo not in df.columns:
+            continue
+        valores, invalidos, ambiguos = _numero(df[campo])
+        erros[invalidos & erros.eq('')] = f'valor inválido em {campo}'
+        erros[ambiguos & erros.eq('')] = f'valor ambíguo em {campo} (use 1500, sem ponto)'
+        erros[valores.lt(0) & erros.eq('')] = f'{campo} negativo'
+        df[campo] = valores.round(0).astype(int)
+
+    if 'estoque_minimo' in df.columns and 'estoque_maximo' in df.columns:
+        # Mesma regra do ProdutoForm
+        invertidos = (
+            df['estoque_minimo'].gt(0) & df['estoque_maximo'].gt(0)
+            & df['estoque_maximo'].le(df['estoque_minimo'])
+        )
+        erros[invertidos & erros.eq('')] = 'estoque máximo deve ser maior que o mínimo'
+
+    repetidos = df['codigo'].duplicated(keep='last')
+    erros[repetidos & erros.eq('')] = 'código repetido na planilha (vale a última linha)'
+
+    lista_erros = [
+        (linha, df.at[linha, 'codigo'], mensagem)
+        for linha, mensagem in erros[erros.ne('')].items()
+    ]
+    return df[erros.eq('')], lista_erros
+
+
+# ============================================
+# CÁLCULO PELO HISTÓRICO DE VENDAS
+# ============================================
+
+def calcular_parametros(dias=DIAS_HISTORICO, prazo_dias=PRAZO_REPOSICAO_DIAS,
+                        cobertura_dias=COBERTURA_DIAS, fator_seguranca=FATOR_SEGURANCA,
+                        hoje=None):
+    """
+    Calcula os parâmetros dos produtos ativos que venderam no período
+
+    Com a demanda diária média (d) e o desvio padrão diário (σ), contando
+    os dias sem venda como zero:
+        mínimo    = ⌈d × prazo + fator × σ × √prazo⌉  (ponto de pedido)
+        máximo    = ⌈mínimo + d × cobertura⌉
+        reposição = máximo − mínimo
+
+    Usa os fatos diários de vendas (comando reconstruir_fatos_vendas se
+    estiverem desatualizados). Produtos sem venda no período ficam de fora
+    e mantêm os valores atuais.
+
+    Returns:
+        DataFrame no mesmo formato de limpar_parametros
+    """
+    from django.db.models import Sum
+    from vendas.models import FatoVendaProdutoDia
+
+    hoje = hoje or timezone.localdate()
+    inicio = hoje - timedelta(days=dias - 1)
+
+    diario = pd.DataFrame.from_records(
+        FatoVendaProdutoDia.objects.filter(
+            data__range=(inicio, hoje), produto__ativo=True
+        ).values('produto__codigo', 'data').annotate(quantidade=Sum('quantidade')).values_list(
+            'produto__codigo', 'quantidade'
+        ),
+        columns=['codigo', 'quantidade'],
+    )
+    diario = diario[diario['quantidade'] > 0]
+    if diario.empty:
+        return pd.DataFrame(columns=['codigo', *CAMPOS_PARAMETROS])
+
+    diario['quadrado'] = diario['quantidade'].astype(float) ** 2
+    por_produto = diario.groupby('codigo').agg(total=('quantidade', 'sum'), quadrados=('quadrado', 'sum'))
+
+    media = por_produto['total'] / dias
+    desvio = (por_produto['quadrados'] / dias - media ** 2).clip(lower=0) ** 0.5
+
+    minimo = (media * prazo_dias + fator_seguranca * desvio * math.sqrt(prazo_dias)).apply(math.ceil)
+    minimo = minimo.clip(lower=1)
+    maximo = (minimo + media * cobertura_dias).apply(math.ceil)
+    maximo = maximo.where(maximo > minimo, minimo + 1)
+
+    return pd.DataFrame({
+        'codigo': por_produto.index,
+        'estoque_minimo': minimo.astype(int).values,
+        'estoque_maximo': maximo.astype(int).values,
+        'quantidade_reposicao': (maximo - minimo).astype(int).values,
+    })
+
+
+# ============================================
+# GRAVAÇÃO
+# ============================================
+
+def aplicar_parametros(df, simular=False, batch_size=TAMANHO_LOTE):
+    """
+    Grava os parâmetros de um DataFrame já limpo (ver limpar_parametros ou
+    calcular_parametros). Colunas ausentes não são alteradas.
+
+    Args:
+        simular: faz tudo dentro de uma transação desfeita no final
+
+    Returns:
+        Dict {atualizados, inalterados, desconhecidos: [códigos]}
+    """
+    from .models import Produto
+
+    resumo = {'atualizados': 0, 'inalterados': 0, 'desconhecidos': []}
+    if df.empty:
+        return resumo
+
+    campos = [campo for campo in CAMPOS_PARAMETROS if campo in df.columns]
+    atuais = pd.DataFrame.from_records(
+        Produto.objects.values_list('pk', 'codigo', *campos),
+        columns=['pk', 'codigo', *campos],
+    )
+    unido = df[['codigo', *campos]].merge(atuais, on='codigo', how='left', suffixes=('', '_atual'))
+
+    conhecidos = unido['pk'].notna()
+    resumo['desconhecidos'] = unido.loc[~conhecidos, 'codigo'].tolist()
+    unido = unido[conhecidos]
+
+    mudou = pd.Series(False, index=unido.index)
+    for campo in campos:
+        mudou |= unido[campo].ne(unido[f'{campo}_atual'])
+    resumo['inalterados'] = int((~mudou).sum())
+
+    agora = timezone.now()
+    alterados = [
+        Produto(pk=int(linha['pk']), data_atualizacao=agora, **{campo: int(linha[campo]) for campo in campos})
+        for linha in unido.loc[mudou, ['pk', *campos]].to_dict('records')
+    ]
+
+    with transaction.atomic():
+        if alterados:
+            Produto.objects.bulk_update(alterados, campos + ['data_atualizacao'], batch_size=batch_size)
+        resumo['atualizados'] = len(alterados)
+
+        if simular:
+            transaction.set_rollback(True)
+        elif alterados:
+            transaction.on_commit(_apos_aplicar)
+
+    return resumo
+
+
+def _apos_aplicar():
+    """Indicadores de estoque baixo/crítico dependem do mínimo"""
+    from core import indicadores
+
+    indicadores.invalidar('estoque')
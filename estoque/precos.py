@@ -0,0 +1,202 @@
+"""
+Preços finais por forma de pagamento, calculados em lote
+
+Os fatores de taxa (1 + taxa/100) e o fator do imposto de 4% são montados
+uma única vez a partir da tabela em memória de TaxaCartao, e cada produto
+da lista é resolvido só com multiplicações, sem nenhuma consulta. As
+regras são as mesmas de Produto.get_preco_cartao (preços customizados,
+preço de débito/crédito à vista informado e imposto de 4%).
+
+Os valores continuam em Decimal: são preços exibidos e cobrados, e uma
+diferença de arredondamento de ponto flutuante apareceria no caixa.
+
+A grade já arredondada em centavos fica gravada em Produto.grade_precos
+(recalculada no save do produto), com a versão da tabela de taxas usada.
+Quando uma taxa muda, as grades gravadas ficam velhas e grade_atual passa
+a calculá-las na hora (só multiplicações) até o comando
+`recalcular_grade_precos` regravar o catálogo; o admin de taxas não
+espera a regravação.
+"""
+
+import hashlib
+from decimal import Decimal, ROUND_HALF_UP
+
+
+PARCELAS = range(1, 13)
+
+FATOR_IMPOSTO_4 = Decimal('1.04')
+
+ZERO = Decimal('0.00')
+
+CENTAVO = Decimal('0.01')
+
+# Campos de Produto que entram no cálculo da grade
+CAMPOS_GRADE = [
+    'preco_venda_dinheiro', 'preco_venda_debito', 'preco_venda_credito',
+    'aplicar_imposto_4', 'preco_customizado_cartao',
+] + [f'preco_credito_{parcela}x' for parcela in range(2, 13)]
+
+
+# Última tabela de taxas e sua versão, trocadas juntas em uma atribuição
+# (a tabela em memória de TaxaCartao é o mesmo dict até ser recarregada)
+_versao_calculada = {'ultima': (None, None)}
+
+
+def versao_taxas(tabela):
+    """Identificador curto do conteúdo da tabela de taxas"""
+    ultima_tabela, versao = _versao_calculada['ultima']
+    if ultima_tabela is not tabela:
+        versao = hashlib.md5(repr(sorted(tabela.items())).encode()).hexdigest()[:12]
+        _versao_calculada['ultima'] = (tabela, versao)
+    return versao
+
+
+def fatores_taxas(tabela=None):
+    """
+    Fatores multiplicadores das taxas ativas
+
+    Args:
+        tabela: {(tipo, parcelas): taxa}; por padrão TaxaCartao.tabela()
+
+    Returns:
+        Dict {'debito': Decimal, 'credito': {parcelas: Decimal}, 'versao': str}
+    """
+    if tabela is None:
+        from financeiro.models import TaxaCartao
+        tabela = TaxaCartao.tabela()
+
+    def fator(tipo, parcelas):
+        return Decimal('1') + tabela.get((tipo, parcelas), ZERO) / Decimal('100')
+
+    return {
+        'debito': fator('DEBITO', 1),
+        'credito': {parcela: fator('CREDITO', parcela) for parcela in PARCELAS},
+        'versao': versao_taxas(tabela),
+    }
+
+
+def _preenchido(valor):
+    return valor if valor and valor > 0 else None
+
+
+def precos_produto(produto, fatores=None):
+    """
+    Todos os preços de um produto
+
+    Returns:
+        Dict {'dinheiro', 'pix', 'debito', 'credito': {1..12: preço}}
+    """
+    if fatores is None:
+        fatores = fatores_taxas()
+
+    dinheiro = produto.preco_venda_dinheiro or ZERO
+    imposto = FATOR_IMPOSTO_4 if produto.aplicar_imposto_4 else Decimal('1')
+
+    debito = _preenchido(produto.preco_venda_debito) or dinheiro * fatores['debito']
+
+    credito = {}
+    for parcela in PARCELAS:
+        preco = None
+        if parcela == 1:
+            preco = _preenchido(produto.preco_venda_credito)
+        elif produto.preco_customizado_cartao:
+            preco = _preenchido(getattr(produto, f'preco_credito_{parcela}x', None))
+        if preco is None:
+            preco = dinheiro * fatores['credito'][parcela]
+        credito[parcela] = preco * imposto
+
+    return {
+        'dinheiro': dinheiro,
+        'pix': dinheiro * imposto,
+        'debito': debito * imposto,
+        'credito': credito,
+    }
+
+
+def matriz_precos(produtos):
+    """
+    Preços de vários produtos em uma passada (nenhuma consulta além da
+    tabela de taxas, que normalmente já está em memória)
+
+    Returns:
+        Dict {produto_id: precos_produto(produto)}
+    """
+    fatores = fatores_taxas()
+    return {produto.pk: precos_produto(produto, fatores) for produto in produtos}
+
+
+def _centavos(valor):
+    return float(valor.quantize(CENTAVO, rounding=ROUND_HALF_UP))
+
+
+def serializar_precos(precos):
+    """Converte o resultado de precos_produto para JSON (centavos, chaves 'Nx')"""
+    return {
+        'dinheiro': _centavos(precos['dinheiro']),
+        'pix': _centavos(precos['pix']),
+        'debito': _centavos(precos['debito']),
+        'credito': {f'{parcela}x': _centavos(valor) for parcela, valor in precos['credito'].items()},
+    }
+
+
+# ============================================
+# GRADE GRAVADA NO PRODUTO
+# ============================================
+
+def grade_precos(produto, fatores=None):
+    """Grade pronta para Produto.grade_precos / payload do PDV"""
+    if fatores is None:
+        fatores = fatores_taxas()
+    grade = serializar_precos(precos_produto(produto, fatores))
+    grade['versao'] = fatores['versao']
+    return grade
+
+
+def grade_atual(produto, fatores=None):
+    """
+    Grade gravada no produto, ou calculada na hora se foi gravada com outra
+    tabela de taxas (ainda não regravada pelo recalcular_grade_precos)
+    """
+    if fatores is None:
+        fatores = fatores_taxas()
+    grade = produto.grade_precos
+    if grade and grade.get('versao') == fatores['versao']:
+        return grade
+    return grade_precos(produto, fatores)
+
+
+def recalcular_grades(produtos=None, fatores=None, batch_size=500):
+    """
+    Regrava Produto.grade_precos em lote, só nos produtos cuja grade mudou
+
+    Args:
+        produtos: queryset de Produto (todos, se omitido)
+        fatores: fatores_taxas() já montados (usado pela migração)
+
+    Returns:
+        Quantidade de produtos atualizados
+    """
+    from .models import Produto
+
+    if produtos is None:
+        produtos = Produto.objects.all()
+    if fatores is None:
+        fatores = fatores_taxas()
+
+    modelo = produtos.model
+    alterados = []
+    total = 0
+    for produto in produtos.only('pk', 'grade_precos', *CAMPOS_GRADE).order_by().iterator(chunk_size=batch_size):
+        grade = grade_precos(produto, fatores)
+        if grade != produto.grade_precos:
+            produto.grade_precos = grade
+            alterados.append(produto)
+        if len(alterados) >= batch_size:
+            modelo.objects.bulk_update(alterados, ['grade_precos'])
+            total += len(alterados)
+            alterados = []
+
+    if alterados:
+        modelo.objects.bulk_update(alterados, ['grade_precos'])
+        total += len(alterados)
+    return total
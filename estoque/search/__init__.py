@@ -0,0 +1,57 @@
+"""
+Motor de busca de produtos (PDV, estoque, orçamentos)
+"""
+
+from .codigo_barras import cache_codigo_barras, eh_codigo_barras, variantes_gtin
+from .indice import IndiceProdutos, indice_produtos
+from .normalizacao import normalizar, normalizar_codigo, tokenizar
+
+
+# Teto de IDs levados ao banco (o IN e o CASE viram parâmetros da consulta,
+# e o SQLite limita o número de variáveis)
+MAXIMO_RESULTADOS = 200
+
+
+def buscar_produtos(termo, limite=50, somente_ativos=True):
+    """Retorna os IDs dos produtos encontrados, ordenados por relevância"""
+    return indice_produtos.buscar(termo, limite=limite, somente_ativos=somente_ativos)
+
+
+def ordenar_por_relevancia(queryset, ids, maximo=MAXIMO_RESULTADOS):
+    """
+    Filtra o queryset pelos primeiros `maximo` IDs encontrados, na ordem
+    de relevância.
+
+    Os IDs são cruzados com os pks do queryset antes do teto, para que os
+    filtros já aplicados (ativo, categoria, montadora...) não deixem de
+    fora resultados que estão além dos primeiros `maximo` do índice.
+    """
+    from django.db.models import Case, When, IntegerField
+
+    if len(ids) > maximo:
+        permitidos = set(queryset.order_by().values_list('pk', flat=True))
+        ids = [pk for pk in ids if pk in permitidos]
+    ids = list(ids[:maximo])
+    queryset = queryset.filter(pk__in=ids)
+    if not ids:
+        return queryset
+    ordem = Case(
+        *[When(pk=pk, then=posicao) for posicao, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.order_by(ordem, 'descricao')
+
+
+__all__ = [
+    'IndiceProdutos',
+    'indice_produtos',
+    'buscar_produtos',
+    'ordenar_por_relevancia',
+    'MAXIMO_RESULTADOS',
+    'cache_codigo_barras',
+    'eh_codigo_barras',
+    'variantes_gtin',
+    'normalizar',
+    'normalizar_codigo',
+    'tokenizar',
+]
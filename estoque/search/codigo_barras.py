@@ -0,0 +1,110 @@
+"""
+Códigos de barras (EAN-8, EAN-13, UPC-A / GTIN-12 e GTIN-14)
+
+Detecção da leitura do scanner e cache LRU por processo de
+código de barras -> payload do produto já serializado para o PDV.
+As entradas são invalidadas pelos signals de Produto e expiram após
+ESTOQUE_CACHE_EAN_TTL segundos (alterações feitas em outros processos).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+TAMANHOS_GTIN = (8, 12, 13, 14)
+
+
+def digito_verificador_valido(codigo):
+    """Valida o dígito verificador GTIN (módulo 10, pesos 3/1)"""
+    corpo, digito = codigo[:-1], int(codigo[-1])
+    soma = sum(
+        int(c) * (3 if i % 2 == 0 else 1)
+        for i, c in enumerate(reversed(corpo))
+    )
+    return (10 - soma % 10) % 10 == digito
+
+
+def eh_codigo_barras(texto):
+    """Verifica se o texto é um EAN/GTIN numérico válido"""
+    texto = (texto or '').strip()
+    return (
+        texto.isdigit()
+        and len(texto) in TAMANHOS_GTIN
+        and digito_verificador_valido(texto)
+    )
+
+
+def variantes_gtin(codigo):
+    """
+    Formas equivalentes do mesmo GTIN, para casar com o que foi cadastrado
+    (ex.: GTIN-14 com zero à esquerda de um EAN-13, UPC-A sem o zero).
+    """
+    base = codigo.lstrip('0') or '0'
+    variantes = {codigo}
+    for tamanho in TAMANHOS_GTIN:
+        if len(base) <= tamanho:
+            variantes.add(base.zfill(tamanho))
+    return sorted(variantes)
+
+
+class CacheCodigoBarras:
+    """LRU thread-safe de código de barras -> (produto_id, payload, expiração)"""
+
+    def __init__(self, tamanho_maximo=None, ttl=None):
+        self.tamanho_maximo = tamanho_maximo or getattr(
+            settings, 'ESTOQUE_CACHE_EAN_TAMANHO', 5000
+        )
+        self.ttl = ttl if ttl is not None else getattr(settings, 'ESTOQUE_CACHE_EAN_TTL', 60)
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self._por_produto = {}
+
+    def obter(self, codigo):
+        with self._lock:
+            item = self._itens.get(codigo)
+            if item is None:
+                return None
+            if self.ttl and time.monotonic() > item[2]:
+                self._itens.pop(codigo, None)
+                return None
+            self._itens.move_to_end(codigo)
+            return item[1]
+
+    def guardar(self, codigo, produto_id, payload):
+        with self._lock:
+            self._itens[codigo] = (produto_id, payload, time.monotonic() + (self.ttl or 0))
+            self._itens.move_to_end(codigo)
+            self._por_produto.setdefault(produto_id, set()).add(codigo)
+            while len(self._itens) > self.tamanho_maximo:
+                antigo, (antigo_id, _, _) = self._itens.popitem(last=False)
+                codigos = self._por_produto.get(antigo_id)
+                if codigos:
+                    codigos.discard(antigo)
+                    if not codigos:
+                        del self._por_produto[antigo_id]
+
+    def invalidar_produto(self, produto_id):
+        """Remove todas as entradas de um produto (chamado no save/delete)"""
+        with self._lock:
+            for codigo in self._por_produto.pop(produto_id, ()):
+                self._itens.pop(codigo, None)
+
+    def invalidar_codigo(self, codigo):
+        """Remove uma entrada (ex.: novo produto cadastrado com o mesmo EAN)"""
+        with self._lock:
+            item = self._itens.pop(codigo, None)
+            if item:
+                codigos = self._por_produto.get(item[0])
+                if codigos:
+                    codigos.discard(codigo)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._por_produto.clear()
+
+
+cache_codigo_barras = CacheCodigoBarras()
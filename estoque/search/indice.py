@@ -0,0 +1,250 @@
+"""
+Índice invertido de produtos em memória
+
+Mantém, por processo, um índice dos produtos com os termos normalizados de
+descrição, aplicação e códigos. É carregado sob demanda na primeira busca,
+atualizado incrementalmente pelos signals de Produto (estoque/signals.py) e
+recarregado por completo após ESTOQUE_BUSCA_TTL segundos, o que cobre
+alterações feitas por outros processos ou via queryset.update().
+
+Ranking (maior pontuação primeiro):
+    1. Código / SKU / EAN / referência idêntico ao termo buscado
+    2. Token idêntico
+    3. Prefixo de token
+    4. Token aproximado (1 ou 2 letras de diferença)
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .normalizacao import normalizar_codigo, tokenizar, distancia_limitada
+
+
+# Pontuação por tipo de acerto
+PESO_CODIGO_EXATO = 1000
+PESO_CODIGO_PREFIXO = 50
+PESO_TOKEN_EXATO = 10
+PESO_TOKEN_PREFIXO = 5
+PESO_TOKEN_APROXIMADO = 1
+
+CAMPOS_CODIGO = ('codigo', 'codigo_sku', 'codigo_barras', 'referencia_fabricante')
+CAMPOS_TEXTO = ('descricao', 'aplicacao_generica')
+
+
+class IndiceProdutos:
+    """Índice invertido thread-safe de produtos"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'ESTOQUE_BUSCA_TTL', 300)
+        self._lock = threading.RLock()
+        self._carregado_em = None
+        self._limpar()
+
+    def _limpar(self):
+        self._documentos = {}      # id -> (ativo, descricao, tokens, codigos)
+        self._termos = {}          # token -> set(ids)
+        self._vocabulario = []     # tokens ordenados (busca por prefixo)
+        self._codigos = {}         # código normalizado -> set(ids)
+        self._lista_codigos = []   # códigos ordenados (busca por prefixo)
+
+    # ============================================
+    # CARGA E MANUTENÇÃO
+    # ============================================
+
+    def carregar(self):
+        """Reconstrói o índice a partir do banco"""
+        from estoque.models import Produto
+
+        campos = ('id', 'ativo') + CAMPOS_CODIGO + CAMPOS_TEXTO
+        with self._lock:
+            self._limpar()
+            for linha in Produto.objects.values(*campos).iterator(chunk_size=2000):
+                self._adicionar(linha, ordenar=False)
+            self._vocabulario = sorted(self._termos)
+            self._lista_codigos = sorted(self._codigos)
+            self._carregado_em = time.monotonic()
+
+    def invalidar(self):
+        """Força a recarga completa na próxima busca"""
+        with self._lock:
+            self._carregado_em = None
+
+    def _garantir_carregado(self):
+        if self._carregado_em is None or (
+            self.ttl and time.monotonic() - self._carregado_em > self.ttl
+        ):
+            self.carregar()
+
+    def atualizar_produto(self, produto):
+        """Atualiza (ou inclui) um produto no índice"""
+        with self._lock:
+            if self._carregado_em is None:
+                return
+            self._remover(produto.pk)
+            linha = {'id': produto.pk, 'ativo': produto.ativo}
+            for campo in CAMPOS_CODIGO + CAMPOS_TEXTO:
+                linha[campo] = getattr(produto, campo, '')
+            self._adicionar(linha, ordenar=True)
+
+    def remover_produto(self, produto_id):
+        """Remove um produto do índice"""
+        with self._lock:
+            if self._carregado_em is None:
+                return
+            self._remover(produto_id)
+
+    def _adicionar(self, linha, ordenar):
+        codigos = set()
+        for campo in CAMPOS_CODIGO:
+            codigo = normalizar_codigo(linha.get(campo))
+            if codigo:
+                codigos.add(codigo)
+
+        tokens = set()
+        for campo in CAMPOS_TEXTO + CAMPOS_CODIGO:
+            tokens.update(tokenizar(linha.get(campo)))
+        tokens.update(codigos)
+
+        produto_id = linha['id']
+        self._documentos[produto_id] = (bool(linha.get('ativo')), tokens, codigos)
+
+        for token in tokens:
+            ids = self._termos.get(token)
+            if ids is None:
+                self._termos[token] = {produto_id}
+                if ordenar:
+                    self._inserir_ordenado(self._vocabulario, token)
+            else:
+                ids.add(produto_id)
+
+        for codigo in codigos:
+            ids = self._codigos.get(codigo)
+            if ids is None:
+                self._codigos[codigo] = {produto_id}
+                if ordenar:
+                    self._inserir_ordenado(self._lista_codigos, codigo)
+            else:
+                ids.add(produto_id)
+
+    def _remover(self, produto_id):
+        documento = self._documentos.pop(produto_id, None)
+        if documento is None:
+            return
+        _, tokens, codigos = documento
+
+        for token in tokens:
+            ids = self._termos.get(token)
+            if ids is not None:
+                ids.discard(produto_id)
+                if not ids:
+                    del self._termos[token]
+                    self._remover_ordenado(self._vocabulario, token)
+
+        for codigo in codigos:
+            ids = self._codigos.get(codigo)
+            if ids is not None:
+                ids.discard(produto_id)
+                if not ids:
+                    del self._codigos[codigo]
+                    self._remover_ordenado(self._lista_codigos, codigo)
+
+    @staticmethod
+    def _inserir_ordenado(lista, valor):
+        posicao = bisect_left(lista, valor)
+        if posicao == len(lista) or lista[posicao] != valor:
+            lista.insert(posicao, valor)
+
+    @staticmethod
+    def _remover_ordenado(lista, valor):
+        posicao = bisect_left(lista, valor)
+        if posicao < len(lista) and lista[posicao] == valor:
+            del lista[posicao]
+
+    # ============================================
+    # CONSULTA
+    # ============================================
+
+    @staticmethod
+    def _com_prefixo(lista, prefixo):
+        """Itera os valores da lista ordenada que começam com `prefixo`"""
+        posicao = bisect_left(lista, prefixo)
+        while posicao < len(lista) and lista[posicao].startswith(prefixo):
+            yield lista[posicao]
+            posicao += 1
+
+    def _pontuar_palavra(self, palavra):
+        """Retorna {id: pontuação} dos produtos que casam com uma palavra"""
+        pontos = {}
+
+        def somar(ids, peso):
+            for produto_id in ids:
+                if pontos.get(produto_id, 0) < peso:
+                    pontos[produto_id] = peso
+
+        for token in self._com_prefixo(self._vocabulario, palavra):
+            peso = PESO_TOKEN_EXATO if token == palavra else PESO_TOKEN_PREFIXO
+            somar(self._termos[token], peso)
+
+        if not pontos and len(palavra) >= 4:
+            limite = 2 if len(palavra) >= 8 else 1
+            inicio = palavra[0]
+            for token in self._com_prefixo(self._vocabulario, inicio):
+                if distancia_limitada(palavra, token, limite) <= limite:
+                    somar(self._termos[token], PESO_TOKEN_APROXIMADO)
+
+        return pontos
+
+    def buscar(self, termo, limite=50, somente_ativos=True):
+        """
+        Busca produtos pelo termo informado.
+
+        Todas as palavras do termo devem ser encontradas (em qualquer campo).
+        Retorna a lista de IDs ordenada por relevância.
+        """
+        # Ignora palavras de 1 letra (mesmo critério do busca_fuzzy)
+        palavras = [p for p in tokenizar(termo) if len(p) >= 2]
+        codigo = normalizar_codigo(termo)
+        if not palavras and not codigo:
+            return []
+
+        with self._lock:
+            self._garantir_carregado()
+
+            pontuacao = None
+            for palavra in palavras:
+                pontos_palavra = self._pontuar_palavra(palavra)
+                if pontuacao is None:
+                    pontuacao = pontos_palavra
+                else:
+                    pontuacao = {
+                        produto_id: pontos + pontos_palavra[produto_id]
+                        for produto_id, pontos in pontuacao.items()
+                        if produto_id in pontos_palavra
+                    }
+                if not pontuacao:
+                    break
+            pontuacao = pontuacao or {}
+
+            # Códigos completos (com separadores removidos) têm prioridade
+            if codigo:
+                for valor in self._com_prefixo(self._lista_codigos, codigo):
+                    peso = PESO_CODIGO_EXATO if valor == codigo else PESO_CODIGO_PREFIXO
+                    for produto_id in self._codigos[valor]:
+                        pontuacao[produto_id] = pontuacao.get(produto_id, 0) + peso
+
+            documentos = self._documentos
+            if somente_ativos:
+                candidatos = [pid for pid in pontuacao if documentos[pid][0]]
+            else:
+                candidatos = list(pontuacao)
+
+        candidatos.sort(key=lambda pid: (-pontuacao[pid], pid))
+        if limite:
+            candidatos = candidatos[:limite]
+        return candidatos
+
+
+indice_produtos = IndiceProdutos()
@@ -0,0 +1,56 @@
+"""
+Normalização de texto para a busca de produtos
+
+Remove acentos, converte para minúsculas e quebra o texto em tokens
+alfanuméricos, de forma que "Óleo 20W50" e "oleo 20w50" gerem os mesmos termos.
+"""
+
+import re
+import unicodedata
+
+
+_RE_TOKEN = re.compile(r'[a-z0-9]+')
+_RE_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9]')
+
+
+def normalizar(texto):
+    """Remove acentos e converte para minúsculas"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def tokenizar(texto):
+    """Retorna a lista de tokens alfanuméricos do texto normalizado"""
+    return _RE_TOKEN.findall(normalizar(texto))
+
+
+def normalizar_codigo(codigo):
+    """Normaliza um código (interno, SKU, EAN) removendo separadores"""
+    return _RE_NAO_ALFANUMERICO.sub('', normalizar(codigo))
+
+
+def distancia_limitada(a, b, limite):
+    """
+    Distância de Levenshtein entre `a` e `b`, interrompida assim que
+    ultrapassa `limite` (retorna limite + 1 nesse caso).
+    """
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        menor = i
+        for j, cb in enumerate(b, 1):
+            custo = 0 if ca == cb else 1
+            valor = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + custo)
+            atual.append(valor)
+            if valor < menor:
+                menor = valor
+        if menor > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
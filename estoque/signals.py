@@ -0,0 +1,50 @@
+"""
+Signals do módulo de estoque
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Produto, Categoria, Subcategoria, Grupo, Subgrupo,
+    Montadora, VeiculoModelo, VeiculoVersao,
+)
+from .search import cache_codigo_barras, indice_produtos
+from .taxonomia import invalidar_taxonomia
+
+
+@receiver(post_save, sender=Produto)
+def atualizar_indice_busca(sender, instance, **kwargs):
+    """Mantém o índice de busca e o cache de códigos de barras do PDV atualizados"""
+    cache_codigo_barras.invalidar_produto(instance.pk)
+    if instance.codigo_barras:
+        cache_codigo_barras.invalidar_codigo(instance.codigo_barras.strip())
+    transaction.on_commit(lambda: indice_produtos.atualizar_produto(instance))
+
+
+@receiver(post_delete, sender=Produto)
+def remover_indice_busca(sender, instance, **kwargs):
+    """Remove o produto excluído do índice de busca"""
+    produto_id = instance.pk
+    cache_codigo_barras.invalidar_produto(produto_id)
+    transaction.on_commit(lambda: indice_produtos.remover_produto(produto_id))
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_save, sender=Subcategoria)
+@receiver(post_save, sender=Grupo)
+@receiver(post_save, sender=Subgrupo)
+@receiver(post_save, sender=Montadora)
+@receiver(post_save, sender=VeiculoModelo)
+@receiver(post_save, sender=VeiculoVersao)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Subcategoria)
+@receiver(post_delete, sender=Grupo)
+@receiver(post_delete, sender=Subgrupo)
+@receiver(post_delete, sender=Montadora)
+@receiver(post_delete, sender=VeiculoModelo)
+@receiver(post_delete, sender=VeiculoVersao)
+def atualizar_taxonomia(sender, **kwargs):
+    """Descarta a árvore de filtros em cache após alterações (inclusive no admin)"""
+    transaction.on_commit(invalidar_taxonomia)
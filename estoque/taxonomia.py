@@ -0,0 +1,192 @@
+"""
+Árvore de categorias e de veículos em cache
+
+Categoria → Subcategoria → Grupo → Subgrupo e Montadora → Modelo → Versão
+são montadas já serializadas (listas de dicts prontas para template/JSON)
+e guardadas no cache do Django sob um número de versão. Qualquer alteração
+nesses models (inclusive pelo admin) incrementa a versão nos signals, e as
+entradas antigas simplesmente deixam de ser lidas.
+
+Com o cache em memória (padrão) a versão é de cada processo: os demais
+só veem a alteração quando a árvore expira, por isso o TTL padrão é curto
+nesse caso (ESTOQUE_TAXONOMIA_TTL no settings).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CHAVE_VERSAO = 'estoque:taxonomia:versao'
+
+
+def _ttl():
+    return getattr(settings, 'ESTOQUE_TAXONOMIA_TTL', 5 * 60)
+
+
+def _versao():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        # Versão nova a partir do relógio: se a chave foi descartada pelo
+        # cache (MAX_ENTRIES), não volta a um número cujas árvores antigas
+        # ainda podem estar guardadas
+        cache.add(CHAVE_VERSAO, time.time_ns(), None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def invalidar_taxonomia():
+    """Descarta a árvore em cache (chamado pelos signals)"""
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+def _ids(valores):
+    """Converte ids vindos da querystring, ignorando valores inválidos"""
+    ids = set()
+    for valor in valores or []:
+        try:
+            ids.add(int(valor))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+# ============================================
+# CATEGORIAS E MONTADORAS
+# ============================================
+
+def _montar_arvore():
+    from .models import Categoria, Subcategoria, Grupo, Subgrupo, Montadora, VeiculoModelo
+
+    modelos = {}
+    for m in VeiculoModelo.objects.filter(ativo=True).order_by('-popular', 'nome'):
+        modelos.setdefault(m.montadora_id, []).append({
+            'id': m.id,
+            'nome': m.nome,
+            'descricao': m.nome,
+            'popular': m.popular,
+        })
+
+    return {
+        'categorias': [
+            {'id': c.id, 'nome': c.nome}
+            for c in Categoria.objects.filter(ativo=True).order_by('nome')
+        ],
+        'subcategorias': [
+            {'id': s.id, 'nome': s.nome, 'categoria_id': s.categoria_id}
+            for s in Subcategoria.objects.filter(ativo=True).order_by('nome')
+        ],
+        'grupos': [
+            {'id': g.id, 'nome': g.nome, 'subcategoria_id': g.subcategoria_id}
+            for g in Grupo.objects.filter(ativo=True).order_by('nome')
+        ],
+        'subgrupos': [
+            {'id': s.id, 'nome': s.nome, 'grupo_id': s.grupo_id}
+            for s in Subgrupo.objects.filter(ativo=True).order_by('nome')
+        ],
+        'montadoras': [
+            {'id': m.id, 'nome': m.nome}
+            for m in Montadora.objects.filter(ativa=True).order_by('ordem', 'nome')
+        ],
+        'modelos': modelos,
+    }
+
+
+def arvore_taxonomia():
+    """
+    Árvore completa dos filtros de produtos
+
+    Returns:
+        Dict com listas categorias, subcategorias, grupos, subgrupos,
+        montadoras e o dict modelos {montadora_id: [...]}
+    """
+    chave = f'estoque:taxonomia:{_versao()}:arvore'
+    arvore = cache.get(chave)
+    if arvore is None:
+        arvore = _montar_arvore()
+        cache.set(chave, arvore, _ttl())
+    return arvore
+
+
+def _filtrar(lista, campo, ids):
+    ids = _ids(ids)
+    if not ids:
+        return lista
+    return [item for item in lista if item[campo] in ids]
+
+
+def subcategorias(categorias_ids=None):
+    return _filtrar(arvore_taxonomia()['subcategorias'], 'categoria_id', categorias_ids)
+
+
+def grupos(subcategorias_ids=None):
+    return _filtrar(arvore_taxonomia()['grupos'], 'subcategoria_id', subcategorias_ids)
+
+
+def subgrupos(grupos_ids=None):
+    return _filtrar(arvore_taxonomia()['subgrupos'], 'grupo_id', grupos_ids)
+
+
+def modelos_da_montadora(montadora_id):
+    ids = _ids([montadora_id])
+    if not ids:
+        return []
+    return arvore_taxonomia()['modelos'].get(ids.pop(), [])
+
+
+# ============================================
+# VERSÕES (por modelo, carregadas sob demanda)
+# ============================================
+
+def _serializar_versao(v):
+    return {
+        'id': v.id,
+        'nome': v.nome,
+        'modelo': v.modelo.nome,
+        'montadora': v.modelo.montadora.nome,
+        'descricao': v.get_descricao_completa(),
+        'ano_inicial': v.ano_inicial,
+        'ano_final': v.ano_final,
+        'anos_range': v.get_anos_range(),
+        'motorizacoes': v.motorizacoes,
+    }
+
+
+def versoes_dos_modelos(modelos_ids):
+    """
+    Versões ativas dos modelos informados, na ordenação do model
+    (montadora, modelo, ano inicial decrescente, nome)
+    """
+    from .models import VeiculoVersao
+
+    ids = sorted(_ids(modelos_ids))
+    if not ids:
+        return []
+
+    versao = _versao()
+    chaves = {modelo_id: f'estoque:taxonomia:{versao}:versoes:{modelo_id}' for modelo_id in ids}
+    encontrados = cache.get_many(list(chaves.values()))
+
+    por_modelo = {
+        modelo_id: encontrados[chave]
+        for modelo_id, chave in chaves.items() if chave in encontrados
+    }
+    faltando = [modelo_id for modelo_id in ids if modelo_id not in por_modelo]
+
+    if faltando:
+        novos = {modelo_id: [] for modelo_id in faltando}
+        for v in VeiculoVersao.objects.filter(
+            modelo_id__in=faltando,
+            ativo=True
+        ).select_related('modelo', 'modelo__montadora'):
+            novos[v.modelo_id].append(_serializar_versao(v))
+        cache.set_many({chaves[modelo_id]: lista for modelo_id, lista in novos.items()}, _ttl())
+        por_modelo.update(novos)
+
+    resultado = [v for lista in por_modelo.values() for v in lista]
+    resultado.sort(key=lambda v: (v['montadora'], v['modelo'], -v['ano_inicial'], v['nome']))
+    return resultado
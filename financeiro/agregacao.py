@@ -0,0 +1,59 @@
+"""
+Somas condicionais em uma consulta
+
+Os fechamentos faziam um aggregate() por forma de pagamento/categoria
+sobre o mesmo conjunto de linhas (8 consultas no fechamento de caixa, 5
+no resumo de vendas). Aqui cada total vira um Sum(campo, filter=Q(...))
+e todos saem do mesmo SELECT, para um dia (totalizar) ou agrupados por
+dia/mês/campo (totalizar_por).
+
+Exemplo:
+    baldes = {'dinheiro': Q(forma_pagamento='DI'), 'pix': Q(forma_pagamento='PI')}
+    totalizar(vendas, somas_condicionais('total', baldes), qtd=Count('id'))
+"""
+
+from decimal import Decimal
+
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def somas_condicionais(campo, baldes):
+    """
+    Um Sum(campo, filter=Q) por balde, com zero quando não há linhas
+
+    Args:
+        baldes: dict {nome: Q}
+
+    Returns:
+        Dict {nome: expressão de agregação}
+    """
+    return {nome: Coalesce(Sum(campo, filter=filtro), ZERO) for nome, filtro in baldes.items()}
+
+
+def totalizar(queryset, agregados, **extras):
+    """Todos os agregados (e extras, ex.: qtd=Count('id')) em uma consulta"""
+    return queryset.order_by().aggregate(**agregados, **extras)
+
+
+def totalizar_por(queryset, grupo, agregados, **extras):
+    """
+    Os mesmos agregados de totalizar, agrupados em uma consulta
+
+    Args:
+        grupo: nome de campo ou expressão (ex.: TruncDate('data_venda'))
+
+    Returns:
+        Dict {valor do grupo: {nome: total}}
+    """
+    if isinstance(grupo, str):
+        linhas = queryset.order_by().values(grupo)
+        chave = grupo
+    else:
+        linhas = queryset.order_by().annotate(_grupo=grupo).values('_grupo')
+        chave = '_grupo'
+    linhas = linhas.annotate(**agregados, **extras)
+    return {linha.pop(chave): linha for linha in linhas}
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class FinanceiroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'financeiro'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        from .vencimentos import iniciar_agendador
+        iniciar_agendador(getattr(settings, 'FINANCEIRO_VARREDURA_INTERVALO', None))
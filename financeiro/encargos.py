@@ -0,0 +1,156 @@
+"""
+Juros e multa de contas a receber calculados no banco
+
+ContaReceber.valor_total_devido chama calcular_juros_multa() conta a conta;
+nas telas de cobrança (inadimplência, crediário, pendências do cliente)
+isso virava um cálculo em Python por linha, além das consultas por linha
+dos templates. Aqui a mesma regra vira expressões do ORM:
+
+    dias de atraso = hoje − vencimento (só contas em aberto e vencidas)
+    juros          = valor × % juros ao dia × dias
+    multa          = valor × % multa (uma vez, independente dos dias)
+    total devido   = valor + juros + multa
+
+Juros e multa são arredondados em centavos, como varrer_vencimentos grava
+em valor_juros/valor_multa. As expressões podem ser anotadas em qualquer
+queryset de ContaReceber ou somadas por cliente/crediário em uma consulta.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import (
+    Case, Count, DateField, DecimalField, ExpressionWrapper, F, Func, IntegerField, Max, Q, Sum,
+    Value, When,
+)
+from django.db.models.functions import Coalesce, Round
+
+
+EM_ABERTO = ['PENDENTE', 'ATRASADO']
+
+DINHEIRO = DecimalField(max_digits=14, decimal_places=2)
+ZERO = Value(Decimal('0'), output_field=DINHEIRO)
+# Multiplicar por 0,01 (e não dividir por 100) evita a divisão inteira do
+# SQLite quando valor e percentual estão gravados sem casas decimais
+PERCENTUAL = Value(Decimal('0.01'), output_field=DINHEIRO)
+
+
+class DiasEntre(Func):
+    """Dias corridos de `inicio` até `fim` (fim − início), como inteiro"""
+    output_field = IntegerField()
+    arity = 2
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+
+    def __init__(self, inicio, fim, **extra):
+        super().__init__(fim, inicio, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='DATEDIFF(%(expressions)s)', arg_joiner=', ', **extra_context
+        )
+
+
+# ============================================
+# EXPRESSÕES
+# ============================================
+
+def expressoes(hoje=None):
+    """
+    Expressões de dias de atraso, juros, multa e total devido para a data
+
+    Returns:
+        Dict {dias, juros, multa, total}
+    """
+    hoje = hoje or date.today()
+    vencida = Q(status__in=EM_ABERTO, data_vencimento__lt=hoje)
+
+    dias = Case(
+        When(vencida, then=DiasEntre(F('data_vencimento'), Value(hoje, output_field=DateField()))),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    juros = Case(
+        When(
+            vencida & Q(aplica_juros=True, percentual_juros_dia__gt=0),
+            then=Round(F('valor') * F('percentual_juros_dia') * PERCENTUAL * dias, 2),
+        ),
+        default=ZERO,
+        output_field=DINHEIRO,
+    )
+    multa = Case(
+        When(
+            vencida & Q(aplica_multa=True, percentual_multa__gt=0),
+            then=Round(F('valor') * F('percentual_multa') * PERCENTUAL, 2),
+        ),
+        default=ZERO,
+        output_field=DINHEIRO,
+    )
+    total = ExpressionWrapper(F('valor') + juros + multa, output_field=DINHEIRO)
+    return {'dias': dias, 'juros': juros, 'multa': multa, 'total': total}
+
+
+def anotar_encargos(queryset, hoje=None):
+    """
+    Anota em cada conta: dias_em_atraso, juros_calculado, multa_calculada
+    e total_devido (mesma regra de ContaReceber.valor_total_devido)
+    """
+    e = expressoes(hoje)
+    return queryset.annotate(
+        dias_em_atraso=e['dias'],
+        juros_calculado=e['juros'],
+        multa_calculada=e['multa'],
+        total_devido=e['total'],
+    )
+
+
+# ============================================
+# TOTAIS
+# ============================================
+
+def _agregados(hoje):
+    e = expressoes(hoje)
+    vencida = Q(status__in=EM_ABERTO, data_vencimento__lt=hoje)
+    return {
+        'qtd': Count('id'),
+        'valor_total': Coalesce(Sum('valor'), ZERO),
+        'valor_atrasado': Coalesce(Sum('valor', filter=vencida), ZERO),
+        'juros': Coalesce(Sum(e['juros']), ZERO),
+        'multa': Coalesce(Sum(e['multa']), ZERO),
+        'total_devido': Coalesce(Sum(e['total']), ZERO),
+        'maior_atraso': Coalesce(Max(e['dias']), Value(0)),
+        'qtd_atrasadas': Count('id', filter=vencida),
+    }
+
+
+def totais_encargos(queryset, hoje=None):
+    """
+    Totais do queryset em uma consulta
+
+    Returns:
+        Dict {qtd, valor_total, valor_atrasado, juros, multa, total_devido,
+        maior_atraso, qtd_atrasadas}
+    """
+    hoje = hoje or date.today()
+    return queryset.order_by().aggregate(**_agregados(hoje))
+
+
+def encargos_por(queryset, campo, hoje=None):
+    """
+    Os mesmos totais de totais_encargos agrupados por um campo
+    (ex.: 'cliente', 'venda_parcelada'), em uma consulta
+
+    Returns:
+        Dict {valor do campo: totais}
+    """
+    hoje = hoje or date.today()
+    linhas = queryset.order_by().values(campo).annotate(**_agregados(hoje))
+    return {linha.pop(campo): linha for linha in linhas}
@@ -0,0 +1,301 @@
+"""
+Cálculo de lucro (bruto, líquido e DRE)
+
+Faturamento e custo das mercadorias vêm dos fatos diários de vendas
+(vendas.fatos), já somados por dia no banco. Nenhuma função carrega
+ItemVenda em memória: um DRE de 12 meses custa poucas consultas,
+independente do número de vendas.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ContaPagar, DespesaFixa, TaxaCartao, ConfiguracaoTributo
+
+
+# Venda.forma_pagamento -> TaxaCartao.tipo
+TAXA_POR_FORMA_PAGAMENTO = {
+    'CD': 'DEBITO',
+    'CC': 'CREDITO',
+    'PI': 'PIX',
+}
+
+ALIQUOTA_PADRAO = Decimal('4.0')
+
+DIAS_MES = 30
+
+
+# ============================================
+# COMPONENTES
+# ============================================
+
+def _fatos_dia(data_inicio, data_fim):
+    from vendas.models import FatoVendaDia
+    return FatoVendaDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+
+
+def _fatos_produto(data_inicio, data_fim):
+    from vendas.models import FatoVendaProdutoDia
+    return FatoVendaProdutoDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+
+
+def resumo_vendas(data_inicio, data_fim):
+    """
+    Totais de vendas finalizadas no período (1 consulta)
+
+    Returns:
+        Dict com subtotal, descontos, faturamento e qtd_vendas
+    """
+    totais = _fatos_dia(data_inicio, data_fim).aggregate(
+        subtotal=Sum('valor_subtotal'),
+        descontos=Sum('valor_desconto'),
+        faturamento=Sum('valor_total'),
+        qtd_vendas=Sum('quantidade_vendas'),
+    )
+    return {
+        'subtotal': totais['subtotal'] or Decimal('0'),
+        'descontos': totais['descontos'] or Decimal('0'),
+        'faturamento': totais['faturamento'] or Decimal('0'),
+        'qtd_vendas': totais['qtd_vendas'] or 0,
+    }
+
+
+def custo_mercadorias(data_inicio, data_fim):
+    """Custo das mercadorias vendidas no período (1 consulta)"""
+    total = _fatos_produto(data_inicio, data_fim).aggregate(
+        total=Sum('custo_total')
+    )['total']
+    return total or Decimal('0')
+
+
+def custo_por_dia(data_inicio, data_fim):
+    """{data: custo} das mercadorias vendidas em cada dia (1 consulta)"""
+    return {
+        linha['data']: linha['custo'] or Decimal('0')
+        for linha in _fatos_produto(data_inicio, data_fim).values('data').annotate(
+            custo=Sum('custo_total')
+        ).order_by()
+    }
+
+
+def lucro_bruto_por_dia(data_inicio, data_fim):
+    """
+    Faturamento, custo e lucro bruto de cada dia com venda (2 consultas)
+
+    Returns:
+        Lista de dicts {dia, faturamento, custo, lucro} ordenada por dia
+    """
+    custos = custo_por_dia(data_inicio, data_fim)
+    dias = _fatos_dia(data_inicio, data_fim).values(dia=F('data')).annotate(
+        faturamento=Sum('valor_total'),
+        quantidade=Sum('quantidade_vendas'),
+    ).filter(quantidade__gt=0).order_by('dia')
+
+    resultado = []
+    for linha in dias:
+        faturamento = linha['faturamento'] or Decimal('0')
+        custo = custos.get(linha['dia'], Decimal('0'))
+        resultado.append({
+            'dia': linha['dia'],
+            'faturamento': faturamento,
+            'custo': custo,
+            'lucro': faturamento - custo,
+        })
+    return resultado
+
+
+def taxas_cartao(data_inicio, data_fim):
+    """
+    Estimativa das taxas de cartão/PIX pagas sobre as vendas do período,
+    usando a taxa à vista de cada tipo (1 consulta; as taxas vêm da tabela
+    em memória de TaxaCartao)
+    """
+    tabela = TaxaCartao.tabela()
+
+    total = Decimal('0')
+    for linha in _fatos_dia(data_inicio, data_fim).values('forma_pagamento').annotate(
+        valor=Sum('valor_total')
+    ).order_by():
+        percentual = tabela.get((TAXA_POR_FORMA_PAGAMENTO.get(linha['forma_pagamento']), 1))
+        if percentual:
+            total += (linha['valor'] or Decimal('0')) * (percentual / 100)
+    return total
+
+
+def despesas_fixas_mensais():
+    """Soma mensal das despesas fixas ativas (1 consulta)"""
+    return DespesaFixa.objects.filter(ativo=True).aggregate(
+        total=Sum('valor')
+    )['total'] or Decimal('0')
+
+
+def despesas_fixas_proporcionais(data_inicio, data_fim):
+    """Despesas fixas rateadas pelos dias do período (mês de 30 dias)"""
+    dias_periodo = (data_fim - data_inicio).days + 1
+    return despesas_fixas_mensais() / DIAS_MES * dias_periodo
+
+
+def despesas_variaveis(data_inicio, data_fim):
+    """
+    Contas pagas no período, exceto as geradas por despesa fixa (que
+    entram pelo valor mensal cadastrado)
+    """
+    return ContaPagar.objects.filter(
+        data_pagamento__gte=data_inicio,
+        data_pagamento__lte=data_fim,
+        status='PAGO'
+    ).exclude(tipo='FIXA').aggregate(total=Sum('valor'))['total'] or Decimal('0')
+
+
+def aliquota_imposto():
+    """Alíquota do Simples Nacional configurada (4% se não houver)"""
+    config = ConfiguracaoTributo.objects.first()
+    return config.aliquota if config else ALIQUOTA_PADRAO
+
+
+# ============================================
+# LUCRO
+# ============================================
+
+def lucro_bruto(data_inicio, data_fim):
+    """
+    Faturamento, custo, lucro bruto e margem do período (2 consultas)
+    """
+    vendas = resumo_vendas(data_inicio, data_fim)
+    custo = custo_mercadorias(data_inicio, data_fim)
+    lucro = vendas['faturamento'] - custo
+
+    return {
+        'faturamento': vendas['faturamento'],
+        'qtd_vendas': vendas['qtd_vendas'],
+        'custo_mercadorias': custo,
+        'lucro_bruto': lucro,
+        'margem': (lucro / vendas['faturamento'] * 100) if vendas['faturamento'] > 0 else Decimal('0'),
+    }
+
+
+def lucro_liquido(data_inicio, data_fim):
+    """
+    Lucro líquido real do período: lucro bruto menos taxas de cartão,
+    despesas fixas (rateadas), despesas variáveis pagas e impostos
+    """
+    bruto = lucro_bruto(data_inicio, data_fim)
+    faturamento = bruto['faturamento']
+
+    taxas = taxas_cartao(data_inicio, data_fim)
+    fixas = despesas_fixas_proporcionais(data_inicio, data_fim)
+    variaveis = despesas_variaveis(data_inicio, data_fim)
+    aliquota = aliquota_imposto()
+    impostos = faturamento * (aliquota / 100)
+
+    total_deducoes = taxas + fixas + variaveis + impostos
+    liquido = bruto['lucro_bruto'] - total_deducoes
+
+    return {
+        'faturamento': faturamento,
+        'custo_mercadorias': bruto['custo_mercadorias'],
+        'lucro_bruto': bruto['lucro_bruto'],
+        'taxas_cartao': taxas,
+        'despesas_fixas': fixas,
+        'despesas_variaveis': variaveis,
+        'aliquota_imposto': aliquota,
+        'impostos': impostos,
+        'total_deducoes': total_deducoes,
+        'lucro_liquido': liquido,
+        'margem_liquida': (liquido / faturamento * 100) if faturamento > 0 else Decimal('0'),
+    }
+
+
+# ============================================
+# DRE
+# ============================================
+
+def linhas_dre(receita_bruta, descontos, cmv, despesas_fixas, despesas_variaveis, aliquota):
+    """Monta as linhas do DRE simplificado a partir dos totais"""
+    receita_liquida = receita_bruta - descontos
+    lucro = receita_liquida - cmv
+    despesas_operacionais = despesas_fixas + despesas_variaveis
+    resultado_operacional = lucro - despesas_operacionais
+    impostos = receita_liquida * (aliquota / 100)
+
+    return {
+        'receita_bruta': receita_bruta,
+        'descontos': descontos,
+        'receita_liquida': receita_liquida,
+        'cmv': cmv,
+        'lucro_bruto': lucro,
+        'despesas_fixas': despesas_fixas,
+        'despesas_variaveis': despesas_variaveis,
+        'despesas_operacionais': despesas_operacionais,
+        'resultado_operacional': resultado_operacional,
+        'aliquota': aliquota,
+        'impostos': impostos,
+        'resultado_liquido': resultado_operacional - impostos,
+    }
+
+
+def dre_por_mes(data_inicio, data_fim):
+    """
+    DRE de cada mês do período com 5 consultas no total (receitas, CMV e
+    despesas variáveis agrupadas por mês no banco)
+
+    Returns:
+        Lista de dicts {mes (date do 1º dia), **linhas_dre} em ordem
+    """
+    receitas = {
+        linha['mes']: linha
+        for linha in _fatos_dia(data_inicio, data_fim).annotate(
+            mes=TruncMonth('data')
+        ).values('mes').annotate(
+            subtotal=Sum('valor_subtotal'),
+            descontos=Sum('valor_desconto'),
+        ).order_by()
+    }
+    cmv = {
+        linha['mes']: linha['custo']
+        for linha in _fatos_produto(data_inicio, data_fim).annotate(
+            mes=TruncMonth('data')
+        ).values('mes').annotate(custo=Sum('custo_total')).order_by()
+    }
+    variaveis = {
+        linha['mes']: linha['total']
+        for linha in ContaPagar.objects.filter(
+            data_pagamento__gte=data_inicio,
+            data_pagamento__lte=data_fim,
+            status='PAGO'
+        ).exclude(tipo='FIXA').annotate(
+            mes=TruncMonth('data_pagamento')
+        ).values('mes').annotate(total=Sum('valor')).order_by()
+    }
+    fixas = despesas_fixas_mensais()
+    aliquota = aliquota_imposto()
+
+    meses = []
+    mes = data_inicio.replace(day=1)
+    while mes <= data_fim:
+        receita = receitas.get(mes, {})
+        linhas = linhas_dre(
+            receita.get('subtotal') or Decimal('0'),
+            receita.get('descontos') or Decimal('0'),
+            cmv.get(mes) or Decimal('0'),
+            fixas,
+            variaveis.get(mes) or Decimal('0'),
+            aliquota,
+        )
+        linhas['mes'] = mes
+        meses.append(linhas)
+        mes = (mes + timedelta(days=32)).replace(day=1)
+
+    return meses
+
+
+def dre_mensal(ano, mes):
+    """Linhas do DRE de um mês"""
+    primeiro_dia = date(ano, mes, 1)
+    ultimo_dia = (primeiro_dia + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    linhas = dre_por_mes(primeiro_dia, ultimo_dia)[0]
+    del linhas['mes']
+    return linhas
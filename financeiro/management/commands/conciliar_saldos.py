@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.razao import TAMANHO_LOTE, conciliar
+
+
+class Command(BaseCommand):
+    help = 'Confere o saldo corrido das movimentações e o saldo atual das contas financeiras'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corrigir', action='store_true',
+                            help='Regrava os saldos divergentes com os valores recalculados')
+        parser.add_argument('--batch-size', type=int, default=TAMANHO_LOTE,
+                            help=f'Movimentações por UPDATE ao corrigir (padrão {TAMANHO_LOTE})')
+        parser.add_argument('--limite', type=int, default=20,
+                            help='Máximo de movimentações divergentes listadas (padrão 20)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size precisa ser maior que zero')
+
+        resultado = conciliar(corrigir=options['corrigir'], batch_size=options['batch_size'])
+        movimentacoes = resultado['movimentacoes']
+        contas = resultado['contas']
+
+        for pk, campo, gravado, calculado in movimentacoes[:options['limite']]:
+            self.stdout.write(f'  Movimentação #{pk} {campo}: gravado {gravado}, calculado {calculado}')
+        if len(movimentacoes) > options['limite']:
+            self.stdout.write(f'  ... e mais {len(movimentacoes) - options["limite"]}')
+        for conta, gravado, calculado in contas:
+            self.stdout.write(f'  Conta {conta.nome}: saldo atual {gravado}, pelo razão {calculado}')
+
+        if not movimentacoes and not contas:
+            self.stdout.write(self.style.SUCCESS('Concluído! Razão e saldos das contas conferem.'))
+        elif options['corrigir']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Concluído! {len(movimentacoes)} saldo(s) de movimentação e {len(contas)} conta(s) corrigidos.'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(movimentacoes)} saldo(s) de movimentação e {len(contas)} conta(s) divergentes. '
+                'Use --corrigir para regravar.'
+            ))
@@ -0,0 +1,42 @@
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.models import ResumoDiarioVendas
+
+
+class Command(BaseCommand):
+    help = 'Consolida os resumos diários de vendas de um período (reprocessar dias que ficaram sem resumo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mês inteiro no formato AAAA-MM (padrão: mês atual até hoje)')
+        parser.add_argument('--inicio', help='Data inicial AAAA-MM-DD')
+        parser.add_argument('--fim', help='Data final AAAA-MM-DD (padrão: hoje)')
+
+    def _data(self, texto, formato, opcao):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            raise CommandError(f'{opcao} inválido: {texto}')
+
+    def handle(self, *args, **options):
+        hoje = date.today()
+        if options['mes'] and (options['inicio'] or options['fim']):
+            raise CommandError('Use --mes ou --inicio/--fim, não os dois')
+
+        if options['inicio']:
+            inicio = self._data(options['inicio'], '%Y-%m-%d', '--inicio')
+            fim = self._data(options['fim'], '%Y-%m-%d', '--fim') if options['fim'] else hoje
+        else:
+            inicio = self._data(options['mes'], '%Y-%m', '--mes') if options['mes'] else hoje.replace(day=1)
+            proximo = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+            fim = min(proximo - timedelta(days=1), hoje)
+        if fim < inicio:
+            raise CommandError('A data final é anterior à inicial')
+
+        resumos = ResumoDiarioVendas.consolidar_periodo(inicio, fim)
+        com_vendas = sum(1 for resumo in resumos if resumo.quantidade_vendas)
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído! {len(resumos)} dia(s) de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} consolidados "
+            f"({com_vendas} com vendas)."
+        ))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from financeiro.models import TaxaCartao
 from decimal import Decimal
 
@@ -6,6 +7,7 @@ from decimal import Decimal
 class Command(BaseCommand):
     help = 'Popula as taxas de cartão de crédito e débito'
 
+    @transaction.atomic
     def handle(self, *args, **options):
         # Taxas conforme informado
         taxas = [
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.vencimentos import TAMANHO_LOTE, varredura_pendente, varrer_vencimentos
+
+
+class Command(BaseCommand):
+    help = 'Marca contas vencidas como atrasadas e recalcula juros/multa (agendar 1x por dia ou por hora)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TAMANHO_LOTE,
+                            help=f'Contas alteradas por transação (padrão {TAMANHO_LOTE})')
+        parser.add_argument('--se-pendente', type=int, default=None, metavar='SEGUNDOS',
+                            help='Só varre se a última varredura tiver mais que SEGUNDOS (ou for de outro dia)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size precisa ser maior que zero')
+
+        intervalo = options['se_pendente']
+        if intervalo is not None and not varredura_pendente(intervalo):
+            self.stdout.write('Varredura recente; nada a fazer.')
+            return
+
+        inicio = time.monotonic()
+        resumo = varrer_vencimentos(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído! {resumo['pagar_atrasadas']} conta(s) a pagar e "
+            f"{resumo['receber_atrasadas']} conta(s) a receber marcadas como atrasadas, "
+            f"{resumo['juros_recalculados']} com juros/multa recalculados em {time.monotonic() - inicio:.1f}s."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0004_contafinanceira_resumodiariovendas_fechamentocaixa_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracaofinanceiro',
+            name='ultima_varredura_vencimentos',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Última Varredura de Vencimentos'),
+        ),
+    ]
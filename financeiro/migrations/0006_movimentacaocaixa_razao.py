@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_saldos(apps, schema_editor):
+    """Saldo corrido das movimentações existentes, a partir do saldo inicial de cada conta"""
+    ContaFinanceira = apps.get_model('financeiro', 'ContaFinanceira')
+    MovimentacaoCaixa = apps.get_model('financeiro', 'MovimentacaoCaixa')
+
+    saldos = dict(ContaFinanceira.objects.values_list('pk', 'saldo_inicial'))
+    alteradas = []
+    for mov in MovimentacaoCaixa.objects.order_by('data', 'pk').only(
+        'pk', 'conta_id', 'conta_destino_id', 'tipo', 'categoria', 'valor'
+    ):
+        saldos[mov.conta_id] += mov.valor if mov.tipo == 'ENTRADA' else -mov.valor
+        mov.saldo_apos = saldos[mov.conta_id]
+        if mov.categoria == 'TRANSFERENCIA' and mov.conta_destino_id:
+            saldos[mov.conta_destino_id] += mov.valor
+            mov.saldo_destino_apos = saldos[mov.conta_destino_id]
+        alteradas.append(mov)
+    MovimentacaoCaixa.objects.bulk_update(alteradas, ['saldo_apos', 'saldo_destino_apos'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0005_configuracaofinanceiro_ultima_varredura'),
+        ('vendas', '0004_custo_unitario_itens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimentacaocaixa',
+            name='saldo_apos',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Saldo Após'),
+        ),
+        migrations.AddField(
+            model_name='movimentacaocaixa',
+            name='saldo_destino_apos',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Saldo Após (Conta Destino)'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaocaixa',
+            index=models.Index(fields=['conta', 'data'], name='financeiro__conta_i_6fa17b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaocaixa',
+            index=models.Index(fields=['conta_destino', 'data'], name='financeiro__conta_d_07c5d2_idx'),
+        ),
+        migrations.RunPython(preencher_saldos, migrations.RunPython.noop),
+    ]
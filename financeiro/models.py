@@ -1,4 +1,7 @@
-from django.db import models
+import threading
+import time
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from decimal import Decimal
 from django.utils import timezone
@@ -39,14 +42,66 @@ class TaxaCartao(models.Model):
             return f"PIX - {self.taxa_percentual}%"
         return f"Crédito {self.parcelas}x - {self.taxa_percentual}%"
 
+    # Cópia da tabela de taxas ativas mantida por processo. A cada
+    # TTL_TABELA_LOCAL segundos a versão é conferida no próprio banco
+    # (quantidade de taxas + última data_atualizacao, uma consulta leve), de
+    # modo que a alteração feita em um processo (admin) chega aos demais
+    # com qualquer backend de cache. RECARGA_MAXIMA_TABELA recarrega mesmo
+    # sem mudança de versão (ex.: alterações feitas com queryset.update()).
+    TTL_TABELA_LOCAL = 5
+    RECARGA_MAXIMA_TABELA = 300
+    _tabela = {'versao': None, 'conferida_em': 0.0, 'carregada_em': 0.0, 'taxas': None}
+    _tabela_lock = threading.Lock()
+
+    @classmethod
+    def _versao_tabela(cls):
+        versao = cls.objects.aggregate(
+            quantidade=models.Count('id'), atualizacao=models.Max('data_atualizacao')
+        )
+        return versao['quantidade'], versao['atualizacao']
+
+    @classmethod
+    def tabela(cls):
+        """
+        Taxas ativas em memória: {(tipo, parcelas): taxa_percentual}
+
+        Carregada uma vez por processo e recarregada quando a versão no
+        banco muda, no máximo a cada RECARGA_MAXIMA_TABELA segundos ou
+        quando os signals de TaxaCartao chamam invalidar_tabela.
+        """
+        agora = time.monotonic()
+        snapshot = cls._tabela
+        if snapshot['taxas'] is not None and agora - snapshot['conferida_em'] < cls.TTL_TABELA_LOCAL:
+            return snapshot['taxas']
+
+        with cls._tabela_lock:
+            versao = cls._versao_tabela()
+            if (
+                snapshot['taxas'] is None
+                or snapshot['versao'] != versao
+                or agora - snapshot['carregada_em'] >= cls.RECARGA_MAXIMA_TABELA
+            ):
+                snapshot['taxas'] = {
+                    (tipo, parcelas): taxa
+                    for tipo, parcelas, taxa in cls.objects.filter(ativo=True).values_list(
+                        'tipo', 'parcelas', 'taxa_percentual'
+                    )
+                }
+                snapshot['versao'] = versao
+                snapshot['carregada_em'] = agora
+            snapshot['conferida_em'] = agora
+            return snapshot['taxas']
+
+    @classmethod
+    def invalidar_tabela(cls):
+        """Força a releitura da tabela de taxas neste processo (os demais percebem pela versão no banco)"""
+        with cls._tabela_lock:
+            cls._tabela['taxas'] = None
+
     @classmethod
     def get_taxa(cls, tipo, parcelas=1):
         """Retorna a taxa para um tipo e número de parcelas"""
-        try:
-            taxa = cls.objects.get(tipo=tipo, parcelas=parcelas, ativo=True)
-            return taxa.taxa_percentual
-        except cls.DoesNotExist:
-            return Decimal('0.00')
+        return cls.tabela().get((tipo, parcelas), Decimal('0.00'))
 
     @classmethod
     def get_todas_taxas(cls):
@@ -881,6 +936,10 @@ class ConfiguracaoFinanceiro(models.Model):
     dias_alerta_vencimento = models.IntegerField(default=7, 
                                                   verbose_name='Dias para Alerta de Vencimento')
     
+    # Última execução de financeiro.vencimentos.varrer_vencimentos
+    ultima_varredura_vencimentos = models.DateTimeField(blank=True, null=True,
+                                                        verbose_name='Última Varredura de Vencimentos')
+    
     data_atualizacao = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -929,12 +988,20 @@ class ContaFinanceira(models.Model):
         return f"{self.nome} - R$ {self.saldo_atual:.2f}"
     
     def atualizar_saldo(self, valor, tipo_operacao):
-        """Atualiza o saldo da conta (ENTRADA ou SAIDA)"""
-        if tipo_operacao == 'ENTRADA':
-            self.saldo_atual += valor
-        elif tipo_operacao == 'SAIDA':
-            self.saldo_atual -= valor
-        self.save()
+        """
+        Atualiza o saldo da conta (ENTRADA ou SAIDA) direto no banco, sem
+        passar pelo razão; as movimentações usam financeiro.razao.lancar
+        """
+        if tipo_operacao not in ('ENTRADA', 'SAIDA'):
+            return
+        variacao = valor if tipo_operacao == 'ENTRADA' else -valor
+        ContaFinanceira.objects.filter(pk=self.pk).update(saldo_atual=models.F('saldo_atual') + variacao)
+        self.refresh_from_db(fields=['saldo_atual'])
+    
+    def saldo_em(self, dia=None):
+        """Saldo no fim do dia, lido do razão"""
+        from .razao import saldo_em
+        return saldo_em(self, dia)
     
     @classmethod
     def get_saldo_total(cls):
@@ -1014,26 +1081,63 @@ class MovimentacaoCaixa(models.Model):
                                 verbose_name='Usuário')
     data_cadastro = models.DateTimeField(auto_now_add=True)
     
+    # Razão (ver financeiro/razao.py): saldo da conta logo após esta movimentação
+    saldo_apos = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True,
+                                     editable=False, verbose_name='Saldo Após')
+    saldo_destino_apos = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True,
+                                             editable=False, verbose_name='Saldo Após (Conta Destino)')
+    
     class Meta:
         verbose_name = 'Movimentação de Caixa'
         verbose_name_plural = 'Movimentações de Caixa'
         ordering = ['-data', '-hora']
+        indexes = [
+            models.Index(fields=['conta', 'data']),
+            models.Index(fields=['conta_destino', 'data']),
+        ]
     
     def __str__(self):
         sinal = '+' if self.tipo == 'ENTRADA' else '-'
         return f"{self.data} | {sinal} R$ {self.valor:.2f} | {self.descricao}"
     
+    def _efeitos(self):
+        from .razao import efeitos
+        return efeitos(self.conta_id, self.conta_destino_id, self.tipo, self.categoria, self.valor)
+    
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+        from . import razao
         
-        # Atualizar saldo da conta automaticamente apenas em novos registros
-        if is_new:
-            self.conta.atualizar_saldo(self.valor, self.tipo)
+        with transaction.atomic():
+            anterior = None
+            if self.pk is not None:
+                anterior = MovimentacaoCaixa.objects.filter(pk=self.pk).values(
+                    'conta_id', 'conta_destino_id', 'tipo', 'categoria', 'valor', 'data'
+                ).first()
+            super().save(*args, **kwargs)
             
-            # Se for transferência, atualizar conta destino também
-            if self.categoria == 'TRANSFERENCIA' and self.conta_destino:
-                self.conta_destino.atualizar_saldo(self.valor, 'ENTRADA')
+            # Saldo das contas e razão: no lançamento e quando muda algo que afeta o saldo
+            if anterior is None:
+                razao.lancar(self)
+            else:
+                efeitos_anteriores = razao.efeitos(
+                    anterior['conta_id'], anterior['conta_destino_id'],
+                    anterior['tipo'], anterior['categoria'], anterior['valor'],
+                )
+                if efeitos_anteriores != self._efeitos() or anterior['data'] != self.data:
+                    razao.estornar(self.pk, anterior['data'], efeitos_anteriores)
+                    razao.lancar(self)
+        
+        # Os objetos de conta carregados ficaram com o saldo antigo
+        for conta in (self._state.fields_cache.get('conta'), self._state.fields_cache.get('conta_destino')):
+            if conta is not None:
+                conta.refresh_from_db(fields=['saldo_atual'])
+    
+    def delete(self, *args, **kwargs):
+        from . import razao
+        
+        with transaction.atomic():
+            razao.estornar(self.pk, self.data, self._efeitos())
+            return super().delete(*args, **kwargs)
 
 
 # ==========================================
@@ -1193,46 +1297,28 @@ class FechamentoCaixa(models.Model):
     def __str__(self):
         return f"Fechamento {self.data.strftime('%d/%m/%Y')} - {self.get_status_display()}"
     
+    # Total do fechamento -> movimentações do dia que entram nele
+    BALDES = {
+        'total_vendas_dinheiro': models.Q(categoria='VENDA', forma_pagamento='DINHEIRO'),
+        'total_vendas_pix': models.Q(categoria='VENDA', forma_pagamento='PIX'),
+        'total_vendas_debito': models.Q(categoria='VENDA', forma_pagamento='DEBITO'),
+        'total_vendas_credito': models.Q(categoria='VENDA', forma_pagamento='CREDITO'),
+        'total_suprimentos': models.Q(categoria='SUPRIMENTO'),
+        'total_sangrias': models.Q(categoria='SANGRIA'),
+        'total_pagamentos': models.Q(categoria='PAGAMENTO'),
+        'total_recebimentos': models.Q(categoria='RECEBIMENTO'),
+    }
+    
     def calcular_totais(self):
-        """Calcula os totais baseado nas movimentações do dia"""
-        movimentacoes = MovimentacaoCaixa.objects.filter(data=self.data)
-        
-        # Vendas por forma de pagamento
-        self.total_vendas_dinheiro = movimentacoes.filter(
-            categoria='VENDA', forma_pagamento='DINHEIRO'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
-        
-        self.total_vendas_pix = movimentacoes.filter(
-            categoria='VENDA', forma_pagamento='PIX'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
-        
-        self.total_vendas_debito = movimentacoes.filter(
-            categoria='VENDA', forma_pagamento='DEBITO'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
+        """Calcula os totais baseado nas movimentações do dia (1 consulta)"""
+        from .agregacao import somas_condicionais, totalizar
         
-        self.total_vendas_credito = movimentacoes.filter(
-            categoria='VENDA', forma_pagamento='CREDITO'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
-        
-        # Suprimentos
-        self.total_suprimentos = movimentacoes.filter(
-            categoria='SUPRIMENTO'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
-        
-        # Sangrias
-        self.total_sangrias = movimentacoes.filter(
-            categoria='SANGRIA'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
-        
-        # Pagamentos
-        self.total_pagamentos = movimentacoes.filter(
-            categoria='PAGAMENTO'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
-        
-        # Recebimentos (outros)
-        self.total_recebimentos = movimentacoes.filter(
-            categoria='RECEBIMENTO'
-        ).aggregate(total=models.Sum('valor'))['total'] or Decimal('0')
+        totais = totalizar(
+            MovimentacaoCaixa.objects.filter(data=self.data),
+            somas_condicionais('valor', self.BALDES),
+        )
+        for campo, total in totais.items():
+            setattr(self, campo, total)
         
         # Calcular saldos esperados
         self.saldo_esperado_dinheiro = (
@@ -1266,15 +1352,24 @@ class FechamentoCaixa(models.Model):
     def get_ou_criar_hoje(cls):
         """Retorna o fechamento de hoje ou cria um novo"""
         hoje = date.today()
+        fechamento = cls.objects.filter(data=hoje).first()
+        if fechamento:
+            return fechamento
+        
+        # Saldo inicial = saldo no fim de ontem, lido do razão (não inclui o que
+        # já entrou hoje, como acontecia com o saldo_atual)
+        from .razao import saldos_em
+        contas = list(ContaFinanceira.objects.filter(ativo=True, tipo__in=['DINHEIRO', 'BANCO']))
+        saldos = saldos_em(hoje - timedelta(days=1), contas)
         fechamento, created = cls.objects.get_or_create(
             data=hoje,
             defaults={
-                'saldo_inicial_dinheiro': ContaFinanceira.objects.filter(
-                    tipo='DINHEIRO', ativo=True
-                ).aggregate(total=models.Sum('saldo_atual'))['total'] or Decimal('0'),
-                'saldo_inicial_banco': ContaFinanceira.objects.filter(
-                    tipo='BANCO', ativo=True
-                ).aggregate(total=models.Sum('saldo_atual'))['total'] or Decimal('0'),
+                'saldo_inicial_dinheiro': sum(
+                    (saldos[c.pk] for c in contas if c.tipo == 'DINHEIRO'), Decimal('0')
+                ),
+                'saldo_inicial_banco': sum(
+                    (saldos[c.pk] for c in contas if c.tipo == 'BANCO'), Decimal('0')
+                ),
             }
         )
         return fechamento
@@ -1337,10 +1432,58 @@ class ResumoDiarioVendas(models.Model):
     def __str__(self):
         return f"Resumo {self.data.strftime('%d/%m/%Y')} - R$ {self.total_liquido:.2f}"
     
+    # Total bruto do resumo -> forma de pagamento da venda
+    BALDES = {
+        'total_dinheiro': models.Q(forma_pagamento='DI'),
+        'total_pix': models.Q(forma_pagamento='PI'),
+        'total_debito_bruto': models.Q(forma_pagamento='CD'),
+        'total_credito_bruto': models.Q(forma_pagamento='CC'),
+    }
+    
+    @classmethod
+    def _agregados(cls):
+        from .agregacao import somas_condicionais
+        return {**somas_condicionais('total', cls.BALDES), 'quantidade_vendas': models.Count('id')}
+    
+    @staticmethod
+    def _taxas():
+        return {
+            'pix': TaxaCartao.get_taxa('PIX', 1),
+            'debito': TaxaCartao.get_taxa('DEBITO', 1),
+            'credito': TaxaCartao.get_taxa('CREDITO', 1),
+        }
+    
+    def _aplicar_totais(self, totais, taxas):
+        """Preenche brutos, taxas, líquidos e totais gerais a partir das somas do dia"""
+        for campo in self.BALDES:
+            setattr(self, campo, totais.get(campo) or Decimal('0'))
+        self.quantidade_vendas = totais.get('quantidade_vendas') or 0
+        
+        # Calcular taxas
+        self.taxa_pix = self.total_pix * (taxas['pix'] / Decimal('100'))
+        self.taxa_debito = self.total_debito_bruto * (taxas['debito'] / Decimal('100'))
+        self.taxa_credito = self.total_credito_bruto * (taxas['credito'] / Decimal('100'))
+        
+        # Calcular valores líquidos
+        self.total_pix_liquido = self.total_pix - self.taxa_pix
+        self.total_debito_liquido = self.total_debito_bruto - self.taxa_debito
+        self.total_credito_liquido = self.total_credito_bruto - self.taxa_credito
+        
+        # Totais gerais
+        self.total_bruto = (
+            self.total_dinheiro +
+            self.total_pix +
+            self.total_debito_bruto +
+            self.total_credito_bruto
+        )
+        self.total_taxas = self.taxa_pix + self.taxa_debito + self.taxa_credito
+        self.total_liquido = self.total_bruto - self.total_taxas
+    
     @classmethod
     def consolidar_dia(cls, data):
-        """Consolida as vendas de um dia específico"""
+        """Consolida as vendas de um dia específico (1 consulta de vendas)"""
         from vendas.models import Venda
+        from .agregacao import totalizar
         
         vendas = Venda.objects.filter(
             data_venda__date=data,
@@ -1348,50 +1491,50 @@ class ResumoDiarioVendas(models.Model):
         )
         
         resumo, created = cls.objects.get_or_create(data=data)
+        resumo._aplicar_totais(totalizar(vendas, cls._agregados()), cls._taxas())
+        resumo.save()
+        return resumo
+    
+    @classmethod
+    def consolidar_periodo(cls, inicio, fim):
+        """
+        Consolida todos os dias de `inicio` a `fim` (inclusive) de uma vez,
+        para reprocessar dias que ficaram sem resumo: uma consulta de
+        vendas agrupada por dia, uma dos resumos existentes e as gravações
+        em lote. Dias sem venda ficam com resumo zerado, como em consolidar_dia.
         
-        # Calcular totais por forma de pagamento
-        resumo.total_dinheiro = vendas.filter(
-            forma_pagamento='DI'
-        ).aggregate(total=models.Sum('total'))['total'] or Decimal('0')
-        
-        resumo.total_pix = vendas.filter(
-            forma_pagamento='PI'
-        ).aggregate(total=models.Sum('total'))['total'] or Decimal('0')
-        
-        resumo.total_debito_bruto = vendas.filter(
-            forma_pagamento='CD'
-        ).aggregate(total=models.Sum('total'))['total'] or Decimal('0')
-        
-        resumo.total_credito_bruto = vendas.filter(
-            forma_pagamento='CC'
-        ).aggregate(total=models.Sum('total'))['total'] or Decimal('0')
-        
-        # Buscar taxas
-        taxa_pix = TaxaCartao.get_taxa('PIX', 1)
-        taxa_debito = TaxaCartao.get_taxa('DEBITO', 1)
-        taxa_credito = TaxaCartao.get_taxa('CREDITO', 1)
-        
-        # Calcular taxas
-        resumo.taxa_pix = resumo.total_pix * (taxa_pix / Decimal('100'))
-        resumo.taxa_debito = resumo.total_debito_bruto * (taxa_debito / Decimal('100'))
-        resumo.taxa_credito = resumo.total_credito_bruto * (taxa_credito / Decimal('100'))
-        
-        # Calcular valores líquidos
-        resumo.total_pix_liquido = resumo.total_pix - resumo.taxa_pix
-        resumo.total_debito_liquido = resumo.total_debito_bruto - resumo.taxa_debito
-        resumo.total_credito_liquido = resumo.total_credito_bruto - resumo.taxa_credito
+        Returns:
+            Lista dos resumos do período, em ordem de data
+        """
+        from django.db.models.functions import TruncDate
+        from vendas.models import Venda
+        from .agregacao import totalizar_por
         
-        # Totais gerais
-        resumo.total_bruto = (
-            resumo.total_dinheiro +
-            resumo.total_pix +
-            resumo.total_debito_bruto +
-            resumo.total_credito_bruto
+        por_dia = totalizar_por(
+            Venda.objects.filter(data_venda__date__range=(inicio, fim), status='F'),
+            TruncDate('data_venda'),
+            cls._agregados(),
         )
-        resumo.total_taxas = resumo.taxa_pix + resumo.taxa_debito + resumo.taxa_credito
-        resumo.total_liquido = resumo.total_bruto - resumo.total_taxas
+        existentes = {resumo.data: resumo for resumo in cls.objects.filter(data__range=(inicio, fim))}
+        taxas = cls._taxas()
+        agora = timezone.now()
         
-        resumo.quantidade_vendas = vendas.count()
+        resumos, novos = [], []
+        dia = inicio
+        while dia <= fim:
+            resumo = existentes.get(dia)
+            if resumo is None:
+                resumo = cls(data=dia)
+                novos.append(resumo)
+            resumo._aplicar_totais(por_dia.get(dia, {}), taxas)
+            resumo.data_atualizacao = agora
+            resumos.append(resumo)
+            dia += timedelta(days=1)
         
-        resumo.save()
-        return resumo
\ No newline at end of file
+        campos = [*cls.BALDES, 'quantidade_vendas', 'taxa_pix', 'taxa_debito', 'taxa_credito',
+                  'total_pix_liquido', 'total_debito_liquido', 'total_credito_liquido',
+                  'total_bruto', 'total_taxas', 'total_liquido', 'data_atualizacao']
+        with transaction.atomic():
+            cls.objects.bulk_create(novos)
+            cls.objects.bulk_update(list(existentes.values()), campos, batch_size=500)
+        return resumos
\ No newline at end of file
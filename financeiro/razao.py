@@ -0,0 +1,234 @@
+"""
+Razão das contas financeiras (saldo corrido por movimentação)
+
+MovimentacaoCaixa.save() chamava ContaFinanceira.atualizar_saldo(), que lia
+o saldo, somava em Python e gravava a conta inteira: dois caixas lançando
+ao mesmo tempo perdiam um dos lançamentos. Aqui:
+
+- O saldo da conta muda com UPDATE saldo_atual = saldo_atual + valor, na
+  mesma transação da movimentação (o UPDATE também trava a conta até o
+  fim da transação, o que serializa os lançamentos da mesma conta)
+- Cada movimentação guarda o saldo da conta logo depois dela (saldo_apos
+  e, nas transferências, saldo_destino_apos na conta de destino), na
+  ordem (data, id). Lançamentos com data retroativa deslocam os saldos
+  das movimentações posteriores com um único UPDATE
+- O saldo de qualquer conta em qualquer dia é o da última movimentação
+  até aquele dia, sem somar o histórico (saldo_em / saldos_em)
+
+O comando `conciliar_saldos` confere o razão inteiro em uma passada.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+
+
+TRANSFERENCIA = 'TRANSFERENCIA'
+TAMANHO_LOTE = 500
+
+
+# ============================================
+# EFEITOS DE UMA MOVIMENTAÇÃO
+# ============================================
+
+def efeitos(conta_id, conta_destino_id, tipo, categoria, valor):
+    """
+    Variações de saldo de uma movimentação
+
+    Returns:
+        Lista [(conta_id, campo do saldo na movimentação, variação)]
+    """
+    valor = valor or Decimal('0')
+    lista = [(conta_id, 'saldo_apos', valor if tipo == 'ENTRADA' else -valor)]
+    # Transferência: a conta destino sempre recebe o valor
+    if categoria == TRANSFERENCIA and conta_destino_id:
+        lista.append((conta_destino_id, 'saldo_destino_apos', valor))
+    return lista
+
+
+def _efeitos_de(movimentacao):
+    return efeitos(
+        movimentacao.conta_id, movimentacao.conta_destino_id,
+        movimentacao.tipo, movimentacao.categoria, movimentacao.valor,
+    )
+
+
+def _da_conta(conta_id):
+    """Movimentações que mexem no saldo da conta"""
+    return Q(conta_id=conta_id) | Q(conta_destino_id=conta_id, categoria=TRANSFERENCIA)
+
+
+def _saldo_da_conta(conta_id):
+    """Saldo da conta gravado na movimentação (origem ou destino)"""
+    return Case(When(conta_id=conta_id, then=F('saldo_apos')), default=F('saldo_destino_apos'))
+
+
+# ============================================
+# LANÇAMENTO E ESTORNO
+# ============================================
+
+def _saldo_anterior(conta_id, dia, pk):
+    """Saldo da conta logo antes da posição (dia, pk) do razão"""
+    from .models import ContaFinanceira, MovimentacaoCaixa
+
+    saldo = MovimentacaoCaixa.objects.filter(
+        _da_conta(conta_id), Q(data__lt=dia) | Q(data=dia, pk__lt=pk)
+    ).order_by('-data', '-pk').annotate(
+        saldo_conta=_saldo_da_conta(conta_id)
+    ).values_list('saldo_conta', flat=True).first()
+    if saldo is None:
+        saldo = ContaFinanceira.objects.filter(pk=conta_id).values_list('saldo_inicial', flat=True).first()
+    return saldo or Decimal('0')
+
+
+def _deslocar_posteriores(conta_id, dia, pk, variacao):
+    """Soma a variação no saldo das movimentações depois de (dia, pk)"""
+    from .models import MovimentacaoCaixa
+
+    depois = Q(data__gt=dia) | Q(data=dia, pk__gt=pk)
+    MovimentacaoCaixa.objects.filter(depois, conta_id=conta_id).update(
+        saldo_apos=F('saldo_apos') + variacao
+    )
+    MovimentacaoCaixa.objects.filter(
+        depois, conta_destino_id=conta_id, categoria=TRANSFERENCIA
+    ).update(saldo_destino_apos=F('saldo_destino_apos') + variacao)
+
+
+def lancar(movimentacao):
+    """
+    Aplica uma movimentação já gravada ao saldo das contas e ao razão
+    (chamado por MovimentacaoCaixa.save dentro de uma transação)
+    """
+    from .models import ContaFinanceira, MovimentacaoCaixa
+
+    saldos = {}
+    for conta_id, campo, variacao in _efeitos_de(movimentacao):
+        ContaFinanceira.objects.filter(pk=conta_id).update(saldo_atual=F('saldo_atual') + variacao)
+        saldos[campo] = _saldo_anterior(conta_id, movimentacao.data, movimentacao.pk) + variacao
+        _deslocar_posteriores(conta_id, movimentacao.data, movimentacao.pk, variacao)
+
+    MovimentacaoCaixa.objects.filter(pk=movimentacao.pk).update(**saldos)
+    for campo, saldo in saldos.items():
+        setattr(movimentacao, campo, saldo)
+
+
+def estornar(pk, data, lista_efeitos):
+    """
+    Desfaz os efeitos de uma movimentação (antes de excluir ou de regravar
+    com outros valores)
+    """
+    from .models import ContaFinanceira
+
+    for conta_id, _campo, variacao in lista_efeitos:
+        ContaFinanceira.objects.filter(pk=conta_id).update(saldo_atual=F('saldo_atual') - variacao)
+        _deslocar_posteriores(conta_id, data, pk, -variacao)
+
+
+# ============================================
+# CONSULTAS
+# ============================================
+
+def saldos_em(dia, contas=None):
+    """
+    Saldo de cada conta no fim do dia (última movimentação até a data,
+    uma consulta indexada por conta)
+
+    Args:
+        contas: queryset/lista de ContaFinanceira (padrão: todas)
+
+    Returns:
+        Dict {conta_id: Decimal}
+    """
+    from .models import ContaFinanceira, MovimentacaoCaixa
+
+    if contas is None:
+        contas = ContaFinanceira.objects.all()
+    saldos = {}
+    for conta in contas:
+        saldo = MovimentacaoCaixa.objects.filter(_da_conta(conta.pk), data__lte=dia).order_by(
+            '-data', '-pk'
+        ).annotate(saldo_conta=_saldo_da_conta(conta.pk)).values_list('saldo_conta', flat=True).first()
+        saldos[conta.pk] = conta.saldo_inicial if saldo is None else saldo
+    return saldos
+
+
+def saldo_em(conta, dia=None):
+    """Saldo de uma conta no fim do dia"""
+    return saldos_em(dia or date.today(), [conta])[conta.pk]
+
+
+def extrato(conta, inicio=None, fim=None):
+    """
+    Movimentações da conta em ordem cronológica, com `variacao` e `saldo`
+    (saldo da conta depois de cada uma) anotados
+    """
+    from .models import MovimentacaoCaixa
+
+    movimentacoes = MovimentacaoCaixa.objects.filter(_da_conta(conta.pk))
+    if inicio:
+        movimentacoes = movimentacoes.filter(data__gte=inicio)
+    if fim:
+        movimentacoes = movimentacoes.filter(data__lte=fim)
+    return movimentacoes.annotate(
+        saldo=_saldo_da_conta(conta.pk),
+        variacao=Case(
+            When(conta_id=conta.pk, tipo='SAIDA', then=-F('valor')),
+            default=F('valor'),
+        ),
+    ).order_by('data', 'pk')
+
+
+# ============================================
+# CONCILIAÇÃO
+# ============================================
+
+def conciliar(corrigir=False, batch_size=TAMANHO_LOTE):
+    """
+    Refaz o saldo corrido de todas as contas em uma passada pelas
+    movimentações (ordem data, id) e compara com o que está gravado
+
+    Args:
+        corrigir: regrava os saldos divergentes (movimentações e saldo_atual)
+
+    Returns:
+        Dict {movimentacoes: [(pk, campo, gravado, calculado)],
+        contas: [(conta, gravado, calculado)]}
+    """
+    from .models import ContaFinanceira, MovimentacaoCaixa
+
+    contas = {conta.pk: conta for conta in ContaFinanceira.objects.all()}
+    correntes = {pk: conta.saldo_inicial for pk, conta in contas.items()}
+
+    divergentes = []
+    resultado = {'movimentacoes': [], 'contas': []}
+    linhas = MovimentacaoCaixa.objects.order_by('data', 'pk').values_list(
+        'pk', 'conta_id', 'conta_destino_id', 'tipo', 'categoria', 'valor',
+        'saldo_apos', 'saldo_destino_apos',
+    )
+    for pk, conta_id, destino_id, tipo, categoria, valor, saldo_apos, saldo_destino in linhas.iterator():
+        gravados = {'saldo_apos': saldo_apos, 'saldo_destino_apos': saldo_destino}
+        calculados = {'saldo_apos': None, 'saldo_destino_apos': None}
+        for conta, campo, variacao in efeitos(conta_id, destino_id, tipo, categoria, valor):
+            correntes[conta] += variacao
+            calculados[campo] = correntes[conta]
+        if calculados != gravados:
+            divergentes.append(MovimentacaoCaixa(pk=pk, **calculados))
+            resultado['movimentacoes'].extend(
+                (pk, campo, gravados[campo], calculado)
+                for campo, calculado in calculados.items() if calculado != gravados[campo]
+            )
+
+    for pk, conta in contas.items():
+        if conta.saldo_atual != correntes[pk]:
+            resultado['contas'].append((conta, conta.saldo_atual, correntes[pk]))
+
+    if corrigir and (divergentes or resultado['contas']):
+        with transaction.atomic():
+            MovimentacaoCaixa.objects.bulk_update(
+                divergentes, ['saldo_apos', 'saldo_destino_apos'], batch_size=batch_size
+            )
+            for conta, _gravado, calculado in resultado['contas']:
+                ContaFinanceira.objects.filter(pk=conta.pk).update(saldo_atual=calculado)
+    return resultado
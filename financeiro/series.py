@@ -0,0 +1,212 @@
+"""
+Séries temporais dos gráficos financeiros
+
+Os gráficos faziam uma ou duas consultas por dia/mês do período (90 dias
+de fluxo = 180 consultas) e os mensais andavam de 30 em 30 dias, o que
+pula ou repete meses. Aqui cada fonte é lida com um único GROUP BY por
+período (dia ou mês) no intervalo pedido; os períodos sem movimento são
+preenchidos com zero em Python.
+
+Fontes (séries):
+    entradas, saidas  MovimentacaoCaixa por data (uma consulta para as duas)
+    despesas          ContaPagar não cancelada por data de vencimento
+    vendas            faturamento das vendas finalizadas (FatoVendaDia)
+    faturamento       FaturamentoMensal informado (só granularidade 'mes')
+
+O resultado fica no cache do Django por (fontes, intervalo, granularidade)
+sob um número de versão que os signals incrementam quando movimentações,
+contas a pagar ou faturamentos são alterados; as vendas dependem só do
+FINANCEIRO_SERIES_TTL.
+"""
+
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateField, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+GRANULARIDADES = ('dia', 'mes')
+FONTES = ('entradas', 'saidas', 'despesas', 'vendas', 'faturamento')
+# Limite de dias das séries diárias pedidas pelas APIs
+DIAS_MAXIMO = 366
+
+CHAVE_VERSAO = 'financeiro:series:versao'
+CENTAVO = Decimal('0.01')
+
+
+def _ttl():
+    return getattr(settings, 'FINANCEIRO_SERIES_TTL', 300)
+
+
+def _versao():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        # Relógio, e não 1: a chave descartada pelo cache não volta a uma
+        # versão cujas séries antigas ainda estejam guardadas
+        cache.add(CHAVE_VERSAO, time.time_ns(), None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def invalidar_series():
+    """Descarta as séries em cache (chamado pelos signals)"""
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+# ============================================
+# PERÍODOS
+# ============================================
+
+def _somar_meses(dia, meses):
+    indice = dia.year * 12 + dia.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def ultimos_dias(quantidade, hoje=None):
+    """(início, fim) dos últimos `quantidade` dias, incluindo hoje"""
+    hoje = hoje or date.today()
+    return hoje - timedelta(days=quantidade - 1), hoje
+
+
+def ultimos_meses(quantidade, hoje=None):
+    """(primeiro dia, último dia) dos últimos `quantidade` meses, incluindo o atual inteiro"""
+    hoje = hoje or date.today()
+    return _somar_meses(hoje, -(quantidade - 1)), _somar_meses(hoje, 1) - timedelta(days=1)
+
+
+def periodos(inicio, fim, granularidade='dia'):
+    """Lista das datas que abrem cada período (dia, ou dia 1 de cada mês)"""
+    if granularidade == 'dia':
+        return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+    atual = date(inicio.year, inicio.month, 1)
+    lista = []
+    while atual <= fim:
+        lista.append(atual)
+        atual = _somar_meses(atual, 1)
+    return lista
+
+
+def _periodo(campo, granularidade):
+    if granularidade == 'dia':
+        return F(campo)
+    return TruncMonth(campo, output_field=DateField())
+
+
+# ============================================
+# FONTES (1 consulta cada)
+# ============================================
+
+def _movimentacoes(inicio, fim, granularidade):
+    from .models import MovimentacaoCaixa
+
+    linhas = MovimentacaoCaixa.objects.filter(data__range=(inicio, fim)).annotate(
+        periodo=_periodo('data', granularidade)
+    ).values('periodo').annotate(
+        entradas=Sum('valor', filter=Q(tipo='ENTRADA')),
+        saidas=Sum('valor', filter=Q(tipo='SAIDA')),
+    ).order_by()
+    return {
+        linha['periodo']: {'entradas': linha['entradas'], 'saidas': linha['saidas']}
+        for linha in linhas
+    }
+
+
+def _despesas(inicio, fim, granularidade):
+    from .models import ContaPagar
+
+    linhas = ContaPagar.objects.filter(data_vencimento__range=(inicio, fim)).exclude(
+        status='CANCELADO'
+    ).annotate(
+        periodo=_periodo('data_vencimento', granularidade)
+    ).values('periodo').annotate(total=Sum('valor')).order_by()
+    return {linha['periodo']: {'despesas': linha['total']} for linha in linhas}
+
+
+def _vendas(inicio, fim, granularidade):
+    from vendas.models import FatoVendaDia
+
+    linhas = FatoVendaDia.objects.filter(data__range=(inicio, fim)).annotate(
+        periodo=_periodo('data', granularidade)
+    ).values('periodo').annotate(total=Sum('valor_total')).order_by()
+    return {linha['periodo']: {'vendas': linha['total']} for linha in linhas}
+
+
+def _faturamento(inicio, fim, granularidade):
+    from .models import FaturamentoMensal
+
+    if granularidade != 'mes':
+        raise ValueError("A série 'faturamento' só existe por mês")
+    depois_do_inicio = Q(ano__gt=inicio.year) | Q(ano=inicio.year, mes__gte=inicio.month)
+    antes_do_fim = Q(ano__lt=fim.year) | Q(ano=fim.year, mes__lte=fim.month)
+    linhas = FaturamentoMensal.objects.filter(depois_do_inicio & antes_do_fim).values_list(
+        'ano', 'mes', 'valor_faturamento'
+    )
+    return {date(ano, mes, 1): {'faturamento': valor} for ano, mes, valor in linhas}
+
+
+# Série -> função que a calcula (séries da mesma função saem da mesma consulta)
+_LEITORES = {
+    'entradas': _movimentacoes,
+    'saidas': _movimentacoes,
+    'despesas': _despesas,
+    'vendas': _vendas,
+    'faturamento': _faturamento,
+}
+
+
+# ============================================
+# API
+# ============================================
+
+def _calcular(fontes, inicio, fim, granularidade):
+    valores = {}
+    for leitor in dict.fromkeys(_LEITORES[fonte] for fonte in fontes):
+        for periodo, series in leitor(inicio, fim, granularidade).items():
+            valores.setdefault(periodo, {}).update(series)
+
+    resultado = []
+    for periodo in periodos(inicio, fim, granularidade):
+        linha = {'periodo': periodo}
+        existentes = valores.get(periodo, {})
+        for fonte in fontes:
+            # Somas no SQLite voltam com casas decimais a mais
+            linha[fonte] = (existentes.get(fonte) or Decimal('0')).quantize(CENTAVO)
+        resultado.append(linha)
+    return resultado
+
+
+def serie_temporal(fontes, inicio, fim, granularidade='dia'):
+    """
+    Séries de `fontes` de `inicio` a `fim` (inclusive), uma linha por período
+
+    Args:
+        fontes: nomes em FONTES (ex.: ['entradas', 'saidas'])
+        granularidade: 'dia' ou 'mes'
+
+    Returns:
+        Lista [{'periodo': date, fonte: Decimal, ...}] em ordem cronológica,
+        com zero nos períodos sem movimento
+    """
+    fontes = list(fontes)
+    desconhecidas = set(fontes) - set(FONTES)
+    if desconhecidas:
+        raise ValueError(f"Séries desconhecidas: {', '.join(sorted(desconhecidas))}")
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade desconhecida: {granularidade}")
+
+    chave = (
+        f"financeiro:series:{_versao()}:{granularidade}:{inicio.isoformat()}:"
+        f"{fim.isoformat()}:{','.join(fontes)}"
+    )
+    resultado = cache.get(chave)
+    if resultado is None:
+        resultado = _calcular(fontes, inicio, fim, granularidade)
+        cache.set(chave, resultado, _ttl())
+    return resultado
@@ -0,0 +1,39 @@
+"""
+Signals do módulo financeiro
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import TaxaCartao, MovimentacaoCaixa, ContaPagar, FaturamentoMensal
+from .series import invalidar_series
+
+
+def _invalidar_taxas():
+    from estoque.search import cache_codigo_barras
+
+    TaxaCartao.invalidar_tabela()
+    # O payload do PDV guardado por código de barras traz os preços no
+    # cartão. As grades gravadas nos produtos ficam com a versão antiga da
+    # tabela e são calculadas na hora (estoque.precos.grade_atual) até o
+    # comando recalcular_grade_precos regravá-las, fora da requisição
+    cache_codigo_barras.limpar()
+
+
+@receiver(post_save, sender=TaxaCartao)
+@receiver(post_delete, sender=TaxaCartao)
+def atualizar_tabela_taxas(sender, **kwargs):
+    """Descarta a tabela de taxas em memória após alterações (inclusive no admin)"""
+    transaction.on_commit(_invalidar_taxas)
+
+
+@receiver(post_save, sender=MovimentacaoCaixa)
+@receiver(post_delete, sender=MovimentacaoCaixa)
+@receiver(post_save, sender=ContaPagar)
+@receiver(post_delete, sender=ContaPagar)
+@receiver(post_save, sender=FaturamentoMensal)
+@receiver(post_delete, sender=FaturamentoMensal)
+def atualizar_series(sender, **kwargs):
+    """Descarta as séries dos gráficos em cache"""
+    transaction.on_commit(invalidar_series)
@@ -0,0 +1,211 @@
+"""
+Varredura de vencimentos de contas a pagar e a receber
+
+As telas de listagem marcavam como ATRASADO, a cada acesso, todas as contas
+pendentes vencidas (um UPDATE na tabela inteira, que no SQLite segura o
+lock de escrita enquanto o PDV está vendendo). Agora isso é feito aqui,
+fora das requisições:
+
+- Comando `varrer_vencimentos` (agendar no cron/Agendador de Tarefas), ou
+- Agendador dentro do próprio servidor, ligado por
+  FINANCEIRO_VARREDURA_INTERVALO (segundos) no settings
+
+Os status são trocados em lotes pequenos, cada um na sua transação, e os
+juros/multa das contas a receber vencidas são recalculados com
+bulk_update. O horário da última varredura fica em ConfiguracaoFinanceiro,
+o que também evita que dois processos varram ao mesmo tempo sem
+necessidade.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 500
+# Segundos entre a subida do servidor e a primeira conferência
+ATRASO_INICIAL = 15
+CENTAVO = Decimal('0.01')
+
+
+# ============================================
+# CÁLCULO DE JUROS E MULTA
+# ============================================
+
+def juros_multa(valor, dias, aplica_juros, percentual_juros_dia, aplica_multa, percentual_multa):
+    """
+    Mesma regra de ContaReceber.calcular_juros_multa, sem instância
+    (e de financeiro.encargos, que calcula no banco)
+
+    Returns:
+        Tuple (valor_juros, valor_multa) arredondados em centavos
+    """
+    juros = Decimal('0')
+    multa = Decimal('0')
+    if dias > 0:
+        if aplica_juros and percentual_juros_dia > 0:
+            juros = valor * (percentual_juros_dia / 100) * dias
+        if aplica_multa and percentual_multa > 0:
+            multa = valor * (percentual_multa / 100)
+    return juros.quantize(CENTAVO, ROUND_HALF_UP), multa.quantize(CENTAVO, ROUND_HALF_UP)
+
+
+# ============================================
+# VARREDURA
+# ============================================
+
+def _marcar_atrasadas(model, hoje, batch_size):
+    """PENDENTE -> ATRASADO em lotes; cada lote é uma transação curta"""
+    pendentes = model.objects.filter(status='PENDENTE', data_vencimento__lt=hoje)
+    total = 0
+    while True:
+        ids = list(pendentes.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += model.objects.filter(pk__in=ids, status='PENDENTE').update(status='ATRASADO')
+
+
+def _recalcular_juros_multa(hoje, batch_size):
+    """Regrava valor_juros/valor_multa das contas a receber vencidas em aberto"""
+    from django.db.models import Q
+    from .models import ContaReceber
+
+    vencidas = ContaReceber.objects.filter(
+        Q(aplica_juros=True) | Q(aplica_multa=True),
+        status__in=['PENDENTE', 'ATRASADO'],
+        data_vencimento__lt=hoje,
+    ).order_by('pk')
+    campos = (
+        'pk', 'valor', 'data_vencimento', 'aplica_juros', 'percentual_juros_dia',
+        'aplica_multa', 'percentual_multa', 'valor_juros', 'valor_multa',
+    )
+
+    total = 0
+    ultimo = 0
+    while True:
+        linhas = list(vencidas.filter(pk__gt=ultimo).values_list(*campos)[:batch_size])
+        if not linhas:
+            return total
+        ultimo = linhas[-1][0]
+
+        alteradas = []
+        for pk, valor, vencimento, aplica_juros, juros_dia, aplica_multa, multa, juros_atual, multa_atual in linhas:
+            juros, valor_multa = juros_multa(
+                valor, (hoje - vencimento).days, aplica_juros, juros_dia, aplica_multa, multa
+            )
+            if juros != juros_atual or valor_multa != multa_atual:
+                alteradas.append(ContaReceber(pk=pk, valor_juros=juros, valor_multa=valor_multa))
+
+        if alteradas:
+            with transaction.atomic():
+                ContaReceber.objects.bulk_update(alteradas, ['valor_juros', 'valor_multa'])
+            total += len(alteradas)
+
+
+def varrer_vencimentos(hoje=None, batch_size=TAMANHO_LOTE):
+    """
+    Marca como ATRASADO as contas pendentes vencidas (a pagar e a receber)
+    e recalcula juros/multa das contas a receber em atraso
+
+    Returns:
+        Dict {pagar_atrasadas, receber_atrasadas, juros_recalculados}
+    """
+    from core import indicadores
+    from .models import ConfiguracaoFinanceiro, ContaPagar, ContaReceber
+
+    hoje = hoje or date.today()
+    resumo = {
+        'pagar_atrasadas': _marcar_atrasadas(ContaPagar, hoje, batch_size),
+        'receber_atrasadas': _marcar_atrasadas(ContaReceber, hoje, batch_size),
+        'juros_recalculados': _recalcular_juros_multa(hoje, batch_size),
+    }
+
+    config = ConfiguracaoFinanceiro.get_config()
+    ConfiguracaoFinanceiro.objects.filter(pk=config.pk).update(ultima_varredura_vencimentos=timezone.now())
+
+    # .update()/bulk_update não disparam os signals que limpam os indicadores
+    if any(resumo.values()):
+        indicadores.invalidar('financeiro')
+    return resumo
+
+
+def varredura_pendente(intervalo):
+    """True se a última varredura foi há mais de `intervalo` segundos ou em outro dia"""
+    from .models import ConfiguracaoFinanceiro
+
+    ultima = ConfiguracaoFinanceiro.objects.filter(pk=1).values_list(
+        'ultima_varredura_vencimentos', flat=True
+    ).first()
+    if ultima is None:
+        return True
+    agora = timezone.now()
+    return (
+        agora - ultima >= timedelta(seconds=intervalo)
+        or timezone.localtime(ultima).date() != timezone.localtime(agora).date()
+    )
+
+
+# ============================================
+# AGENDADOR NO PROCESSO DO SERVIDOR
+# ============================================
+
+SERVIDORES_WSGI = ('waitress', 'gunicorn', 'uwsgi', 'daphne', 'uvicorn')
+
+_agendador = {'thread': None}
+_agendador_lock = threading.Lock()
+
+
+def _e_processo_servidor():
+    """
+    Só o processo que atende as requisições agenda a varredura: não os
+    comandos do manage.py nem o processo vigia do autoreload do runserver
+    """
+    programa = os.path.basename(sys.argv[0])
+    if programa.startswith(SERVIDORES_WSGI):
+        return True
+    if sys.argv[1:2] != ['runserver']:
+        return False
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
+
+def _executar_agendador(intervalo):
+    from django.db import close_old_connections
+
+    # Confere com frequência para pegar a virada do dia, mas só varre quando vence o intervalo
+    espera = min(intervalo, 300)
+    time.sleep(ATRASO_INICIAL)
+    while True:
+        try:
+            close_old_connections()
+            if varredura_pendente(intervalo):
+                resumo = varrer_vencimentos()
+                logger.info('Varredura de vencimentos: %s', resumo)
+        except Exception:
+            logger.exception('Falha na varredura de vencimentos')
+        finally:
+            close_old_connections()
+        time.sleep(espera)
+
+
+def iniciar_agendador(intervalo):
+    """Inicia (uma vez por processo) a thread que varre os vencimentos"""
+    if not intervalo or not _e_processo_servidor():
+        return
+    with _agendador_lock:
+        if _agendador['thread'] is not None:
+            return
+        thread = threading.Thread(
+            target=_executar_agendador, args=(intervalo,),
+            name='varredura-vencimentos', daemon=True,
+        )
+        _agendador['thread'] = thread
+        thread.start()
@@ -17,7 +17,10 @@ from .models import (
     # NOVOS
     CategoriaReceita, ContaReceber, VendaParcelada, ConfiguracaoFinanceiro
 )
+from .encargos import EM_ABERTO, anotar_encargos, encargos_por, totais_encargos
+from .series import DIAS_MAXIMO, serie_temporal, ultimos_dias, ultimos_meses
 from clientes.models import Cliente
+from core.indicadores import indicadores_financeiro, indicadores_vendas
 from estoque.models import Fornecedor
 
 # ==========================================
@@ -35,13 +38,12 @@ def dashboard_financeiro(request):
         data_vencimento__month=hoje.month
     ).exclude(status='CANCELADO')
     
-    # Estatísticas gerais
+    # Estatísticas gerais (1 consulta, em cache)
+    indicadores = indicadores_financeiro()
     stats = {
-        'total_contas_mes': contas_mes.aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total'],
-        'total_pagas_mes': contas_mes.filter(status='PAGO').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total'],
-        'total_pendentes_mes': contas_mes.filter(status='PENDENTE').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total'],
-        'total_atrasadas': ContaPagar.objects.filter(status='PENDENTE', data_vencimento__lt=hoje).exclude(status='CANCELADO').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total'],
-        'qtd_atrasadas': ContaPagar.objects.filter(status='PENDENTE', data_vencimento__lt=hoje).exclude(status='CANCELADO').count(),
+        campo: indicadores[campo]
+        for campo in ('total_contas_mes', 'total_pagas_mes', 'total_pendentes_mes',
+                      'total_atrasadas', 'qtd_atrasadas')
     }
     
     # Contas vencendo nos próximos 7 dias
@@ -69,32 +71,21 @@ def dashboard_financeiro(request):
     faturamentos = FaturamentoMensal.objects.order_by('-ano', '-mes')[:6]
     
     # Despesas fixas vs variáveis do mês
-    despesas_fixas_mes = contas_mes.filter(tipo='FIXA').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    despesas_variaveis_mes = contas_mes.filter(tipo='VARIAVEL').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    despesas_parceladas_mes = contas_mes.filter(tipo='PARCELADO').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    tributos_mes = contas_mes.filter(tipo='TRIBUTO').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    
-    # Dados para gráfico mensal (últimos 6 meses)
-    dados_grafico = []
-    for i in range(5, -1, -1):
-        mes_ref = hoje - timedelta(days=30 * i)
-        mes = mes_ref.month
-        ano = mes_ref.year
-        
-        total_despesas = ContaPagar.objects.filter(
-            data_vencimento__year=ano,
-            data_vencimento__month=mes
-        ).exclude(status='CANCELADO').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-        
-        faturamento = FaturamentoMensal.objects.filter(mes=mes, ano=ano).first()
-        valor_faturamento = faturamento.valor_faturamento if faturamento else Decimal('0')
-        
-        dados_grafico.append({
-            'mes': f"{mes:02d}/{ano}",
-            'despesas': float(total_despesas),
-            'faturamento': float(valor_faturamento),
-            'lucro': float(valor_faturamento - total_despesas)
-        })
+    despesas_fixas_mes = indicadores['despesas_fixas_mes']
+    despesas_variaveis_mes = indicadores['despesas_variaveis_mes']
+    despesas_parceladas_mes = indicadores['despesas_parceladas_mes']
+    tributos_mes = indicadores['tributos_mes']
+    
+    # Dados para gráfico mensal (últimos 6 meses, 2 consultas)
+    dados_grafico = [
+        {
+            'mes': linha['periodo'].strftime('%m/%Y'),
+            'despesas': float(linha['despesas']),
+            'faturamento': float(linha['faturamento']),
+            'lucro': float(linha['faturamento'] - linha['despesas']),
+        }
+        for linha in serie_temporal(['despesas', 'faturamento'], *ultimos_meses(6, hoje), 'mes')
+    ]
     
     context = {
         'stats': stats,
@@ -147,13 +138,6 @@ def lista_contas_pagar(request):
     elif ano:
         contas = contas.filter(data_vencimento__year=ano)
     
-    # Atualizar status de contas atrasadas
-    hoje = date.today()
-    ContaPagar.objects.filter(
-        status='PENDENTE',
-        data_vencimento__lt=hoje
-    ).update(status='ATRASADO')
-    
     # Ordenação
     contas = contas.order_by('data_vencimento')
     
@@ -754,27 +738,14 @@ def api_stats_financeiro(request):
 @login_required
 def api_grafico_mensal(request):
     """API com dados para gráfico mensal"""
-    hoje = date.today()
-    dados = []
-    
-    for i in range(11, -1, -1):
-        mes_ref = hoje - timedelta(days=30 * i)
-        mes = mes_ref.month
-        ano = mes_ref.year
-        
-        despesas = ContaPagar.objects.filter(
-            data_vencimento__year=ano,
-            data_vencimento__month=mes
-        ).exclude(status='CANCELADO').aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-        
-        faturamento = FaturamentoMensal.objects.filter(mes=mes, ano=ano).first()
-        valor_fat = faturamento.valor_faturamento if faturamento else Decimal('0')
-        
-        dados.append({
-            'mes': f"{mes:02d}/{ano}",
-            'despesas': float(despesas),
-            'faturamento': float(valor_fat),
-        })
+    dados = [
+        {
+            'mes': linha['periodo'].strftime('%m/%Y'),
+            'despesas': float(linha['despesas']),
+            'faturamento': float(linha['faturamento']),
+        }
+        for linha in serie_temporal(['despesas', 'faturamento'], *ultimos_meses(12), 'mes')
+    ]
     
     return JsonResponse({'dados': dados})
 
@@ -826,13 +797,6 @@ def lista_contas_receber(request):
     elif ano:
         contas = contas.filter(data_vencimento__year=ano)
     
-    # Atualizar status de contas atrasadas
-    hoje = date.today()
-    ContaReceber.objects.filter(
-        status='PENDENTE',
-        data_vencimento__lt=hoje
-    ).update(status='ATRASADO')
-    
     contas = contas.order_by('data_vencimento')
     
     # Estatísticas
@@ -1072,7 +1036,7 @@ def lista_vendas_parceladas(request):
     
     vendas = VendaParcelada.objects.all().select_related(
         'cliente', 'categoria', 'venda'
-    ).prefetch_related('parcelas')
+    )
     
     if busca:
         vendas = vendas.filter(
@@ -1096,25 +1060,18 @@ def lista_vendas_parceladas(request):
     
     vendas = vendas.order_by('-data_cadastro')
     
-    total_credito = vendas.aggregate(total=Coalesce(Sum('valor_total'), Decimal('0')))['total']
-    total_recebido = ContaReceber.objects.filter(
-        venda_parcelada__in=vendas,
-        status='RECEBIDO'
-    ).aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    total_pendente = ContaReceber.objects.filter(
-        venda_parcelada__in=vendas,
-        status__in=['PENDENTE', 'ATRASADO']
-    ).aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    total_atrasado = ContaReceber.objects.filter(
-        venda_parcelada__in=vendas,
-        status='ATRASADO'
-    ).aggregate(total=Coalesce(Sum('valor'), Decimal('0')))['total']
+    hoje = date.today()
+    parcelas = ContaReceber.objects.filter(venda_parcelada__in=vendas)
+    em_aberto = totais_encargos(parcelas.filter(status__in=EM_ABERTO), hoje)
     
     stats = {
-        'total_credito': total_credito,
-        'total_recebido': total_recebido,
-        'total_pendente': total_pendente,
-        'total_atrasado': total_atrasado,
+        'total_credito': vendas.aggregate(total=Coalesce(Sum('valor_total'), Decimal('0')))['total'],
+        'total_recebido': parcelas.filter(status='RECEBIDO').aggregate(
+            total=Coalesce(Sum('valor'), Decimal('0'))
+        )['total'],
+        'total_pendente': em_aberto['valor_total'],
+        'total_atrasado': em_aberto['valor_atrasado'],
+        'total_devido': em_aberto['total_devido'],
         'qtd_clientes': vendas.values('cliente').distinct().count(),
     }
     
@@ -1122,6 +1079,25 @@ def lista_vendas_parceladas(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Situação das parcelas só dos crediários da página (2 consultas agrupadas)
+    ids = [venda.id for venda in page_obj]
+    parcelas_pagina = ContaReceber.objects.filter(venda_parcelada_id__in=ids)
+    abertas = encargos_por(parcelas_pagina.filter(status__in=EM_ABERTO), 'venda_parcelada', hoje)
+    recebidas = {
+        linha['venda_parcelada']: linha
+        for linha in parcelas_pagina.filter(status='RECEBIDO').order_by().values('venda_parcelada').annotate(
+            qtd=Count('id'), total=Sum('valor')
+        )
+    }
+    for venda in page_obj:
+        aberta = abertas.get(venda.id, {})
+        recebida = recebidas.get(venda.id, {})
+        venda.qtd_recebidas = recebida.get('qtd', 0)
+        venda.valor_recebido = recebida.get('total') or Decimal('0')
+        venda.qtd_abertas = aberta.get('qtd', 0)
+        venda.qtd_atrasadas = aberta.get('qtd_atrasadas', 0)
+        venda.valor_devido = aberta.get('total_devido', Decimal('0'))
+    
     clientes = Cliente.objects.filter(
         vendas_parceladas__isnull=False
     ).distinct().order_by('nome')
@@ -1342,11 +1318,13 @@ def deletar_categoria_receita(request, categoria_id):
 def api_pendencias_cliente(request, cliente_id):
     """API: Retorna pendências financeiras de um cliente"""
     cliente = get_object_or_404(Cliente, id=cliente_id)
+    hoje = date.today()
     
     pendencias = ContaReceber.objects.filter(
         cliente=cliente,
-        status__in=['PENDENTE', 'ATRASADO']
-    ).order_by('data_vencimento')
+        status__in=EM_ABERTO
+    )
+    totais = totais_encargos(pendencias, hoje)
     
     dados = {
         'cliente': {
@@ -1354,11 +1332,10 @@ def api_pendencias_cliente(request, cliente_id):
             'nome': cliente.nome,
         },
         'resumo': {
-            'total_pendente': float(pendencias.aggregate(
-                total=Coalesce(Sum('valor'), Decimal('0'))
-            )['total']),
-            'qtd_parcelas': pendencias.count(),
-            'qtd_atrasadas': pendencias.filter(status='ATRASADO').count(),
+            'total_pendente': float(totais['valor_total']),
+            'total_devido': float(totais['total_devido']),
+            'qtd_parcelas': totais['qtd'],
+            'qtd_atrasadas': totais['qtd_atrasadas'],
         },
         'parcelas': [
             {
@@ -1367,10 +1344,13 @@ def api_pendencias_cliente(request, cliente_id):
                 'valor': float(p.valor),
                 'data_vencimento': p.data_vencimento.strftime('%d/%m/%Y'),
                 'status': p.status,
-                'dias_atraso': p.dias_atraso,
+                'dias_atraso': p.dias_em_atraso,
+                'juros': float(p.juros_calculado),
+                'multa': float(p.multa_calculada),
+                'total_devido': float(p.total_devido),
                 'parcela': f"{p.parcela_atual}/{p.total_parcelas}" if p.total_parcelas > 1 else None,
             }
-            for p in pendencias
+            for p in anotar_encargos(pendencias.order_by('data_vencimento'), hoje)
         ]
     }
     
@@ -1437,32 +1417,23 @@ def dashboard_caixa(request):
     
     saldo_total = contas.aggregate(total=Sum('saldo_atual'))['total'] or Decimal('0')
     
-    # Movimentações de hoje
-    movimentacoes_hoje = MovimentacaoCaixa.objects.filter(data=hoje)
+    # Entradas/saídas por dia desde o início do mês ou dos últimos 7 dias
+    # (1 consulta, em cache): alimenta o gráfico e os totais de hoje e do mês
+    primeiro_dia_mes = date(hoje.year, hoje.month, 1)
+    inicio_grafico, _ = ultimos_dias(7, hoje)
+    fluxo = serie_temporal(['entradas', 'saidas'], min(inicio_grafico, primeiro_dia_mes), hoje)
+    
+    entradas_hoje = fluxo[-1]['entradas']
+    saidas_hoje = fluxo[-1]['saidas']
     
-    entradas_hoje = movimentacoes_hoje.filter(tipo='ENTRADA').aggregate(
-        total=Coalesce(Sum('valor'), Decimal('0'))
-    )['total']
-    
-    saidas_hoje = movimentacoes_hoje.filter(tipo='SAIDA').aggregate(
-        total=Coalesce(Sum('valor'), Decimal('0'))
-    )['total']
-    
-    # Vendas de hoje (do modelo Venda)
-    from vendas.models import Venda
-    vendas_hoje = Venda.objects.filter(data_venda__date=hoje, status='F')
-    total_vendas_hoje = vendas_hoje.aggregate(total=Coalesce(Sum('total'), Decimal('0')))['total']
-    qtd_vendas_hoje = vendas_hoje.count()
-    
-    # Vendas por forma de pagamento hoje
-    vendas_dinheiro = vendas_hoje.filter(forma_pagamento='DI').aggregate(
-        total=Coalesce(Sum('total'), Decimal('0')))['total']
-    vendas_pix = vendas_hoje.filter(forma_pagamento='PI').aggregate(
-        total=Coalesce(Sum('total'), Decimal('0')))['total']
-    vendas_debito = vendas_hoje.filter(forma_pagamento='CD').aggregate(
-        total=Coalesce(Sum('total'), Decimal('0')))['total']
-    vendas_credito = vendas_hoje.filter(forma_pagamento='CC').aggregate(
-        total=Coalesce(Sum('total'), Decimal('0')))['total']
+    # Vendas de hoje, total e por forma de pagamento (1 consulta, em cache)
+    vendas = indicadores_vendas()
+    total_vendas_hoje = vendas['vendas_hoje_total']
+    qtd_vendas_hoje = vendas['vendas_hoje_qtd']
+    vendas_dinheiro = vendas['vendas_hoje_dinheiro']
+    vendas_pix = vendas['vendas_hoje_pix']
+    vendas_debito = vendas['vendas_hoje_debito']
+    vendas_credito = vendas['vendas_hoje_credito']
     
     # Cartões pendentes
     cartoes_pendentes = RecebimentoCartao.objects.filter(status='PENDENTE')
@@ -1477,28 +1448,19 @@ def dashboard_caixa(request):
     fechamento_hoje = FechamentoCaixa.objects.filter(data=hoje).first()
     
     # Dados para gráfico - últimos 7 dias
-    dados_grafico = []
-    for i in range(6, -1, -1):
-        dia = hoje - timedelta(days=i)
-        movs_dia = MovimentacaoCaixa.objects.filter(data=dia)
-        entradas = movs_dia.filter(tipo='ENTRADA').aggregate(
-            total=Coalesce(Sum('valor'), Decimal('0')))['total']
-        saidas = movs_dia.filter(tipo='SAIDA').aggregate(
-            total=Coalesce(Sum('valor'), Decimal('0')))['total']
-        dados_grafico.append({
-            'data': dia.strftime('%d/%m'),
-            'entradas': float(entradas),
-            'saidas': float(saidas),
-        })
+    dados_grafico = [
+        {
+            'data': linha['periodo'].strftime('%d/%m'),
+            'entradas': float(linha['entradas']),
+            'saidas': float(linha['saidas']),
+        }
+        for linha in fluxo if linha['periodo'] >= inicio_grafico
+    ]
     
     # Movimentações do mês
-    primeiro_dia_mes = date(hoje.year, hoje.month, 1)
-    movimentacoes_mes = MovimentacaoCaixa.objects.filter(data__gte=primeiro_dia_mes)
-    
-    entradas_mes = movimentacoes_mes.filter(tipo='ENTRADA').aggregate(
-        total=Coalesce(Sum('valor'), Decimal('0')))['total']
-    saidas_mes = movimentacoes_mes.filter(tipo='SAIDA').aggregate(
-        total=Coalesce(Sum('valor'), Decimal('0')))['total']
+    do_mes = [linha for linha in fluxo if linha['periodo'] >= primeiro_dia_mes]
+    entradas_mes = sum((linha['entradas'] for linha in do_mes), Decimal('0'))
+    saidas_mes = sum((linha['saidas'] for linha in do_mes), Decimal('0'))
     
     context = {
         'contas': contas,
@@ -1568,6 +1530,8 @@ def lista_movimentacoes(request):
         'total_saidas': total_saidas,
         'saldo': total_entradas - total_saidas,
         'contas': contas,
+        # Com uma conta filtrada, cada linha mostra o saldo da conta após a movimentação
+        'mostrar_saldo': bool(conta),
         'filtros': {
             'data_inicio': data_inicio,
             'data_fim': data_fim,
@@ -1800,14 +1764,11 @@ def atualizar_saldo_inicial(request, conta_id):
         novo_saldo = Decimal(request.POST.get('saldo', '0').replace(',', '.'))
         
         # Calcular a diferença
+        conta.refresh_from_db(fields=['saldo_atual'])
         diferenca = novo_saldo - conta.saldo_atual
         
-        # Atualizar saldos
-        conta.saldo_inicial = novo_saldo
-        conta.saldo_atual = novo_saldo
-        conta.save()
-        
-        # Registrar ajuste se houver diferença
+        # O ajuste leva o saldo ao valor informado pelo razão (gravar saldo_atual
+        # aqui e depois lançar o ajuste aplicava a diferença duas vezes)
         if diferenca != 0:
             tipo = 'ENTRADA' if diferenca > 0 else 'SAIDA'
             MovimentacaoCaixa.objects.create(
@@ -1858,24 +1819,20 @@ def api_resumo_caixa(request):
 @login_required
 def api_grafico_fluxo(request):
     """API que retorna dados para gráfico de fluxo"""
-    dias = int(request.GET.get('dias', 7))
-    hoje = date.today()
-    
-    dados = []
-    for i in range(dias - 1, -1, -1):
-        dia = hoje - timedelta(days=i)
-        movs = MovimentacaoCaixa.objects.filter(data=dia)
-        
-        entradas = movs.filter(tipo='ENTRADA').aggregate(
-            total=Coalesce(Sum('valor'), Decimal('0')))['total']
-        saidas = movs.filter(tipo='SAIDA').aggregate(
-            total=Coalesce(Sum('valor'), Decimal('0')))['total']
-        
-        dados.append({
-            'data': dia.strftime('%d/%m'),
-            'entradas': float(entradas),
-            'saidas': float(saidas),
-        })
+    try:
+        dias = int(request.GET.get('dias', 7))
+    except ValueError:
+        dias = 7
+    dias = min(max(dias, 1), DIAS_MAXIMO)
+    
+    dados = [
+        {
+            'data': linha['periodo'].strftime('%d/%m'),
+            'entradas': float(linha['entradas']),
+            'saidas': float(linha['saidas']),
+        }
+        for linha in serie_temporal(['entradas', 'saidas'], *ultimos_dias(dias))
+    ]
     
     return JsonResponse({'dados': dados})
 
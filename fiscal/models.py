@@ -111,18 +111,14 @@ class ConfiguracaoFiscal(models.Model):
         return cls.objects.filter(ativo=True).first()
     
     def get_proximo_numero_nfe(self):
-        """Retorna e incrementa o próximo número de NF-e"""
-        numero = self.proximo_numero_nfe
-        self.proximo_numero_nfe += 1
-        self.save(update_fields=['proximo_numero_nfe'])
-        return numero
+        """Retorna e incrementa o próximo número de NF-e (UPDATE atômico)"""
+        from core.sequencias import proximo_valor_campo
+        return proximo_valor_campo(self, 'proximo_numero_nfe')
     
     def get_proximo_numero_nfce(self):
-        """Retorna e incrementa o próximo número de NFC-e"""
-        numero = self.proximo_numero_nfce
-        self.proximo_numero_nfce += 1
-        self.save(update_fields=['proximo_numero_nfce'])
-        return numero
+        """Retorna e incrementa o próximo número de NFC-e (UPDATE atômico)"""
+        from core.sequencias import proximo_valor_campo
+        return proximo_valor_campo(self, 'proximo_numero_nfce')
 
 
 # ==========================================
@@ -0,0 +1,247 @@
+"""
+Manutenção dos fatos diários de vendas (FatoVendaDia / FatoVendaProdutoDia)
+
+As tabelas são atualizadas por delta, na mesma transação da gravação,
+pelos signals de vendas/signals.py: qualquer caminho que salve ou exclua
+Venda/ItemVenda pelo ORM (PDV, telas de edição/cancelamento, admin, API
+REST) mantém os fatos. Só gravações em massa que não disparam signals
+(bulk_create, queryset.update/delete) precisam chamar as funções daqui,
+como o PDV faz com registrar_itens.
+
+    FatoVendaDia         soma do cabeçalho (subtotal, desconto, total) das vendas finalizadas
+    FatoVendaProdutoDia  soma dos itens das vendas finalizadas
+
+As duas podem ser reconstruídas a partir de Venda/ItemVenda com o comando
+`reconstruir_fatos_vendas`.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Venda, ItemVenda, FatoVendaDia, FatoVendaProdutoDia
+
+
+def data_da_venda(venda):
+    """Dia (horário local) em que a venda foi registrada"""
+    return timezone.localtime(venda.data_venda).date()
+
+
+def chave(status, data_venda, forma_pagamento):
+    """(dia, forma de pagamento) em que a venda conta nos fatos; None se não finalizada"""
+    if status != 'F' or data_venda is None:
+        return None
+    return timezone.localtime(data_venda).date(), forma_pagamento
+
+
+def chave_da_venda(venda):
+    return chave(venda.status, venda.data_venda, venda.forma_pagamento)
+
+
+def intervalo_datas(data_inicio, data_fim):
+    """
+    Converte datas em limites de datetime [início, fim+1) no fuso local,
+    para filtrar data_venda sem __date (que impede o uso de índice)
+    """
+    tz = timezone.get_current_timezone()
+    inicio = timezone.make_aware(datetime.combine(data_inicio, time.min), tz)
+    fim = timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), time.min), tz)
+    return inicio, fim
+
+
+def _custo_unitario(item):
+    if item.custo_unitario is not None:
+        return item.custo_unitario
+    return item.produto.preco_custo or Decimal('0')
+
+
+def _somar_dia(data, forma_pagamento, quantidade_vendas, subtotal, desconto, total):
+    deltas = {
+        'quantidade_vendas': F('quantidade_vendas') + quantidade_vendas,
+        'valor_subtotal': F('valor_subtotal') + subtotal,
+        'valor_desconto': F('valor_desconto') + desconto,
+        'valor_total': F('valor_total') + total,
+    }
+    filtro = FatoVendaDia.objects.filter(data=data, forma_pagamento=forma_pagamento)
+    if filtro.update(**deltas):
+        return
+    try:
+        with transaction.atomic():
+            FatoVendaDia.objects.create(
+                data=data,
+                forma_pagamento=forma_pagamento,
+                quantidade_vendas=quantidade_vendas,
+                valor_subtotal=subtotal,
+                valor_desconto=desconto,
+                valor_total=total,
+            )
+    except IntegrityError:
+        filtro.update(**deltas)
+
+
+def _somar_produtos(data, forma_pagamento, linhas):
+    """
+    Aplica {produto_id: (quantidade, valor, custo)} com um UPDATE para as
+    linhas existentes e bulk_create para as novas
+    """
+    if not linhas:
+        return
+
+    filtro = FatoVendaProdutoDia.objects.filter(data=data, forma_pagamento=forma_pagamento)
+    existentes = set(
+        filtro.filter(produto_id__in=linhas).values_list('produto_id', flat=True)
+    )
+
+    if existentes:
+        def caso(campo, indice, output_field):
+            return Case(
+                *[When(produto_id=pid, then=F(campo) + linhas[pid][indice]) for pid in existentes],
+                default=F(campo),
+                output_field=output_field,
+            )
+
+        filtro.filter(produto_id__in=existentes).update(
+            quantidade=caso('quantidade', 0, IntegerField()),
+            valor_total=caso('valor_total', 1, DecimalField(max_digits=12, decimal_places=2)),
+            custo_total=caso('custo_total', 2, DecimalField(max_digits=14, decimal_places=4)),
+        )
+
+    novos = [pid for pid in linhas if pid not in existentes]
+    if novos:
+        try:
+            with transaction.atomic():
+                FatoVendaProdutoDia.objects.bulk_create([
+                    FatoVendaProdutoDia(
+                        data=data,
+                        forma_pagamento=forma_pagamento,
+                        produto_id=pid,
+                        quantidade=linhas[pid][0],
+                        valor_total=linhas[pid][1],
+                        custo_total=linhas[pid][2],
+                    )
+                    for pid in novos
+                ])
+        except IntegrityError:
+            # Outra venda do mesmo dia criou a linha ao mesmo tempo
+            _somar_produtos(data, forma_pagamento, {pid: linhas[pid] for pid in novos})
+
+
+def _aplicar_itens(chave_fato, itens, sinal):
+    linhas = {}
+    for item in itens:
+        quantidade, valor, custo = linhas.get(item.produto_id, (0, Decimal('0'), Decimal('0')))
+        linhas[item.produto_id] = (
+            quantidade + sinal * item.quantidade,
+            valor + sinal * item.total,
+            custo + sinal * _custo_unitario(item) * item.quantidade,
+        )
+    _somar_produtos(*chave_fato, linhas)
+
+
+def somar_cabecalho(chave_fato, sinal, subtotal, desconto, total):
+    """Soma (sinal=1) ou tira (sinal=-1) uma venda dos totais do dia"""
+    _somar_dia(
+        *chave_fato, sinal,
+        sinal * (subtotal or 0), sinal * (desconto or 0), sinal * (total or 0),
+    )
+
+
+def somar_itens(chave_fato, itens, sinal=1):
+    """Soma (sinal=1) ou tira (sinal=-1) itens dos fatos por produto"""
+    if chave_fato and itens:
+        _aplicar_itens(chave_fato, itens, sinal)
+
+
+def registrar_itens(venda, itens):
+    """
+    Soma nos fatos itens gravados com bulk_create (sem signals) em uma
+    venda finalizada; o cabeçalho já foi somado pelo signal da Venda
+    """
+    somar_itens(chave_da_venda(venda), itens)
+
+
+@transaction.atomic
+def reconstruir(data_inicio=None, data_fim=None):
+    """
+    Recalcula os fatos a partir de Venda/ItemVenda (período opcional).
+
+    Returns:
+        Tuple (linhas_dia, linhas_produto)
+    """
+    vendas = Venda.objects.filter(status='F')
+    itens = ItemVenda.objects.filter(venda__status='F')
+    fatos_dia = FatoVendaDia.objects.all()
+    fatos_produto = FatoVendaProdutoDia.objects.all()
+
+    if data_inicio:
+        inicio, _ = intervalo_datas(data_inicio, data_inicio)
+        vendas = vendas.filter(data_venda__gte=inicio)
+        itens = itens.filter(venda__data_venda__gte=inicio)
+        fatos_dia = fatos_dia.filter(data__gte=data_inicio)
+        fatos_produto = fatos_produto.filter(data__gte=data_inicio)
+    if data_fim:
+        _, fim = intervalo_datas(data_fim, data_fim)
+        vendas = vendas.filter(data_venda__lt=fim)
+        itens = itens.filter(venda__data_venda__lt=fim)
+        fatos_dia = fatos_dia.filter(data__lte=data_fim)
+        fatos_produto = fatos_produto.filter(data__lte=data_fim)
+
+    fatos_dia.delete()
+    fatos_produto.delete()
+    return gravar(vendas, itens, FatoVendaDia, FatoVendaProdutoDia)
+
+
+def gravar(vendas, itens, modelo_dia, modelo_produto):
+    """
+    Agrega vendas/itens finalizados e grava as linhas dos fatos (tabelas
+    já limpas no período). Recebe os models para servir também à migração
+    que preenche os fatos com os models históricos.
+
+    Returns:
+        Tuple (linhas_dia, linhas_produto)
+    """
+    linhas_dia = modelo_dia.objects.bulk_create([
+        modelo_dia(
+            data=linha['dia'],
+            forma_pagamento=linha['forma_pagamento'],
+            quantidade_vendas=linha['quantidade_vendas'],
+            valor_subtotal=linha['valor_subtotal'] or 0,
+            valor_desconto=linha['valor_desconto'] or 0,
+            valor_total=linha['valor_total'] or 0,
+        )
+        for linha in vendas.annotate(dia=TruncDate('data_venda')).values(
+            'dia', 'forma_pagamento'
+        ).annotate(
+            quantidade_vendas=Count('id'),
+            valor_subtotal=Sum('subtotal'),
+            valor_desconto=Sum('desconto'),
+            valor_total=Sum('total'),
+        ).order_by()
+    ], batch_size=1000)
+
+    linhas_produto = modelo_produto.objects.bulk_create([
+        modelo_produto(
+            data=linha['dia'],
+            forma_pagamento=linha['venda__forma_pagamento'],
+            produto_id=linha['produto_id'],
+            quantidade=linha['soma_quantidade'] or 0,
+            valor_total=linha['soma_total'] or 0,
+            custo_total=linha['soma_custo'] or 0,
+        )
+        for linha in itens.annotate(dia=TruncDate('venda__data_venda')).values(
+            'dia', 'venda__forma_pagamento', 'produto_id'
+        ).annotate(
+            soma_quantidade=Sum('quantidade'),
+            soma_total=Sum('total'),
+            soma_custo=Sum(
+                F('quantidade') * F('custo_unitario'),
+                output_field=DecimalField(max_digits=14, decimal_places=4)
+            ),
+        ).order_by()
+    ], batch_size=1000)
+
+    return len(linhas_dia), len(linhas_produto)
@@ -0,0 +1,90 @@
+from bisect import bisect_right
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from estoque.models import HistoricoPreco
+from vendas import fatos
+from vendas.models import ItemVenda, PecaOS
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o custo unitário dos itens vendidos a partir do histórico de preços'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-inicio', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--data-fim', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--sem-fatos', action='store_true',
+                            help='Não reconstruir os fatos diários de vendas ao final')
+
+    def _data(self, valor):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD)')
+
+    def _carregar_historico(self):
+        """{produto_id: (datas, custos_novos, custo_antes_da_primeira_alteracao)}"""
+        historico = {}
+        for produto_id, data, anterior, novo in HistoricoPreco.objects.order_by(
+            'produto_id', 'data_alteracao'
+        ).values_list('produto_id', 'data_alteracao', 'preco_custo_anterior', 'preco_custo_novo'):
+            datas, custos, _ = historico.setdefault(produto_id, ([], [], anterior))
+            datas.append(data)
+            custos.append(novo)
+        return historico
+
+    @staticmethod
+    def _custo_em(historico, produto_id, momento):
+        datas, custos, inicial = historico[produto_id]
+        posicao = bisect_right(datas, momento)
+        return custos[posicao - 1] if posicao else inicial
+
+    def _reconstruir(self, model, campo_data, historico, data_inicio, data_fim):
+        """Recalcula o custo dos itens de produtos com histórico; retorna quantos mudaram"""
+        itens = model.objects.filter(produto_id__in=historico)
+        if data_inicio:
+            inicio, _ = fatos.intervalo_datas(data_inicio, data_inicio)
+            itens = itens.filter(**{f'{campo_data}__gte': inicio})
+        if data_fim:
+            _, fim = fatos.intervalo_datas(data_fim, data_fim)
+            itens = itens.filter(**{f'{campo_data}__lt': fim})
+
+        alterados = []
+        total = 0
+        for item_id, produto_id, momento, custo_atual in itens.values_list(
+            'id', 'produto_id', campo_data, 'custo_unitario'
+        ).iterator(chunk_size=2000):
+            custo = self._custo_em(historico, produto_id, momento)
+            if custo != custo_atual:
+                alterados.append(model(id=item_id, custo_unitario=custo))
+            if len(alterados) >= 1000:
+                model.objects.bulk_update(alterados, ['custo_unitario'])
+                total += len(alterados)
+                alterados = []
+
+        if alterados:
+            model.objects.bulk_update(alterados, ['custo_unitario'])
+            total += len(alterados)
+        return total
+
+    def handle(self, *args, **options):
+        data_inicio = self._data(options['data_inicio'])
+        data_fim = self._data(options['data_fim'])
+
+        historico = self._carregar_historico()
+        self.stdout.write(f'{len(historico)} produtos com histórico de preço')
+
+        with transaction.atomic():
+            itens = self._reconstruir(ItemVenda, 'venda__data_venda', historico, data_inicio, data_fim)
+            pecas = self._reconstruir(PecaOS, 'ordem_servico__data_entrada', historico, data_inicio, data_fim)
+
+            if not options['sem_fatos']:
+                fatos.reconstruir(data_inicio, data_fim)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído! {itens} itens de venda e {pecas} peças de OS atualizados.'
+        ))
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vendas import fatos
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os fatos diários de vendas usados pelos relatórios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-inicio', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--data-fim', help='Data final (AAAA-MM-DD)')
+
+    def _data(self, valor):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        data_inicio = self._data(options['data_inicio'])
+        data_fim = self._data(options['data_fim'])
+
+        linhas_dia, linhas_produto = fatos.reconstruir(data_inicio, data_fim)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Concluído! {linhas_dia} linhas por dia/pagamento, '
+            f'{linhas_produto} linhas por produto.'
+        ))
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-18 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('estoque', '0009_produto_tem_st'),
+        ('vendas', '0002_orcamento_itemorcamento_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FatoVendaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('forma_pagamento', models.CharField(choices=[('DI', 'Dinheiro'), ('CD', 'Cartão de Débito'), ('CC', 'Cartão de Crédito'), ('PI', 'PIX'), ('BO', 'Boleto'), ('CR', 'Crediário')], max_length=2, verbose_name='Forma de Pagamento')),
+                ('quantidade_vendas', models.IntegerField(default=0, verbose_name='Quantidade de Vendas')),
+                ('valor_subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Subtotal')),
+                ('valor_desconto', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Descontos')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Fato de Venda (Dia)',
+                'verbose_name_plural': 'Fatos de Venda (Dia)',
+                'ordering': ['data', 'forma_pagamento'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FatoVendaProdutoDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('forma_pagamento', models.CharField(choices=[('DI', 'Dinheiro'), ('CD', 'Cartão de Débito'), ('CC', 'Cartão de Crédito'), ('PI', 'PIX'), ('BO', 'Boleto'), ('CR', 'Crediário')], max_length=2, verbose_name='Forma de Pagamento')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento')),
+                ('custo_total', models.DecimalField(decimal_places=4, default=0, max_digits=14, verbose_name='Custo')),
+            ],
+            options={
+                'verbose_name': 'Fato de Venda (Produto/Dia)',
+                'verbose_name_plural': 'Fatos de Venda (Produto/Dia)',
+                'ordering': ['data', 'produto'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['status', 'data_venda'], name='vendas_vend_status_4e49dc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fatovendadia',
+            unique_together={('data', 'forma_pagamento')},
+        ),
+        migrations.AddField(
+            model_name='fatovendaprodutodia',
+            name='produto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fatos_venda', to='estoque.produto', verbose_name='Produto'),
+        ),
+        migrations.AddIndex(
+            model_name='fatovendaprodutodia',
+            index=models.Index(fields=['produto', 'data'], name='vendas_fato_produto_12f22d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fatovendaprodutodia',
+            unique_together={('data', 'produto', 'forma_pagamento')},
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-18 11:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_custo_atual(apps, schema_editor):
+    """
+    Itens antigos recebem o custo atual do produto. O comando
+    reconstruir_custos_venda refaz o valor a partir do HistoricoPreco.
+    """
+    Produto = apps.get_model('estoque', 'Produto')
+    custo = Subquery(Produto.objects.filter(pk=OuterRef('produto_id')).values('preco_custo')[:1])
+    for nome in ('ItemVenda', 'PecaOS'):
+        apps.get_model('vendas', nome).objects.filter(
+            custo_unitario__isnull=True
+        ).update(custo_unitario=custo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0003_fatos_venda_diaria'),
+        ('estoque', '0009_produto_tem_st'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemvenda',
+            name='custo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Custo Unitário'),
+        ),
+        migrations.AddField(
+            model_name='pecaos',
+            name='custo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Custo Unitário'),
+        ),
+        migrations.RunPython(preencher_custo_atual, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:02
+
+from django.db import migrations
+
+
+def preencher_fatos(apps, schema_editor):
+    """
+    Preenche os fatos diários com as vendas já gravadas (depois do custo
+    dos itens, 0004). O comando reconstruir_fatos_vendas faz o mesmo a
+    qualquer momento.
+    """
+    from vendas.fatos import gravar
+
+    Venda = apps.get_model('vendas', 'Venda')
+    ItemVenda = apps.get_model('vendas', 'ItemVenda')
+    FatoVendaDia = apps.get_model('vendas', 'FatoVendaDia')
+    FatoVendaProdutoDia = apps.get_model('vendas', 'FatoVendaProdutoDia')
+    FatoVendaDia.objects.all().delete()
+    FatoVendaProdutoDia.objects.all().delete()
+    gravar(
+        Venda.objects.filter(status='F'),
+        ItemVenda.objects.filter(venda__status='F'),
+        FatoVendaDia, FatoVendaProdutoDia,
+    )
+
+
+def limpar_fatos(apps, schema_editor):
+    apps.get_model('vendas', 'FatoVendaDia').objects.all().delete()
+    apps.get_model('vendas', 'FatoVendaProdutoDia').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0004_custo_unitario_itens'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_fatos, limpar_fatos),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from clientes.models import Cliente, Veiculo
 from django.db import models
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
 from estoque.models import Produto, VeiculoModelo
 from decimal import Decimal
@@ -44,12 +45,15 @@ class Venda(models.Model):
         verbose_name = 'Venda'
         verbose_name_plural = 'Vendas'
         ordering = ['-data_venda']
+        indexes = [
+            models.Index(fields=['status', 'data_venda']),
+        ]
     
     def __str__(self):
         return f"Venda {self.numero} - {self.cliente.nome}"
     
     def calcular_total(self):
-        self.subtotal = sum(item.total for item in self.itens.all())
+        self.subtotal = self.itens.aggregate(total=Sum('total'))['total'] or Decimal('0')
         self.total = self.subtotal - self.desconto
         self.save()
 
@@ -61,6 +65,9 @@ class ItemVenda(models.Model):
     valor_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     desconto = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=10, decimal_places=2)
+    # Custo do produto no momento da venda (relatórios de margem)
+    custo_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                         verbose_name='Custo Unitário')
     
     class Meta:
         verbose_name = 'Item de Venda'
@@ -71,6 +78,8 @@ class ItemVenda(models.Model):
     
     def save(self, *args, **kwargs):
         self.total = (self.valor_unitario * self.quantidade) - self.desconto
+        if self.custo_unitario is None:
+            self.custo_unitario = self.produto.preco_custo or 0
         super().save(*args, **kwargs)
 
 
@@ -115,8 +124,8 @@ class OrdemServico(models.Model):
         return f"OS {self.numero} - {self.cliente.nome}"
     
     def calcular_total(self):
-        self.valor_pecas = sum(item.total for item in self.pecas.all())
-        self.valor_servicos = sum(servico.valor for servico in self.servicos.all())
+        self.valor_pecas = self.pecas.aggregate(total=Sum('total'))['total'] or Decimal('0')
+        self.valor_servicos = self.servicos.aggregate(total=Sum('valor'))['total'] or Decimal('0')
         self.total = self.valor_pecas + self.valor_servicos - self.desconto
         self.save()
 
@@ -127,6 +136,9 @@ class PecaOS(models.Model):
     quantidade = models.IntegerField()
     valor_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     total = models.DecimalField(max_digits=10, decimal_places=2)
+    # Custo do produto no momento da aplicação na OS
+    custo_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                         verbose_name='Custo Unitário')
     
     class Meta:
         verbose_name = 'Peça da OS'
@@ -137,6 +149,8 @@ class PecaOS(models.Model):
     
     def save(self, *args, **kwargs):
         self.total = self.valor_unitario * self.quantidade
+        if self.custo_unitario is None:
+            self.custo_unitario = self.produto.preco_custo or 0
         super().save(*args, **kwargs)
 
 
@@ -233,11 +247,122 @@ class Orcamento(models.Model):
     def __str__(self):
         return f"Orçamento {self.numero} - {self.cliente.nome}"
     
+    @classmethod
+    def gerar_numero(cls):
+        """Próximo número de orçamento (ORC-000001) da sequência 'orcamento'"""
+        from core.sequencias import proximo_valor
+        
+        def ultimo_numero():
+            numeros = cls.objects.filter(numero__regex=r'^ORC-[0-9]+$').values_list('numero', flat=True)
+            return max((int(numero[4:]) for numero in numeros), default=0)
+        
+        return f"ORC-{proximo_valor('orcamento', inicial=ultimo_numero):06d}"
+    
     def calcular_totais(self):
-        """Recalcula subtotal e total"""
-        self.subtotal = sum(item.total for item in self.itens.all())
+        """Recalcula subtotal e total com uma agregação no banco"""
+        self.subtotal = self.itens.aggregate(total=Sum('total'))['total'] or Decimal('0')
         self.total = self.subtotal - self.desconto
-        self.save()
+        self.save(update_fields=['subtotal', 'total'])
+    
+    def aplicar_delta(self, valor):
+        """
+        Soma `valor` ao subtotal e ao total direto no banco (UPDATE com F),
+        sem reler os itens. Usado na inclusão/alteração/exclusão de um item.
+        """
+        if not valor:
+            return
+        Orcamento.objects.filter(pk=self.pk).update(
+            subtotal=F('subtotal') + valor,
+            total=F('total') + valor,
+        )
+        self.subtotal += valor
+        self.total += valor
+    
+    def aplicar_desconto(self, desconto):
+        """Grava o desconto e recalcula o total a partir do subtotal gravado"""
+        Orcamento.objects.filter(pk=self.pk).update(
+            desconto=desconto,
+            total=F('subtotal') - desconto,
+        )
+        self.desconto = desconto
+        self.total = self.subtotal - desconto
+    
+    def preco_para(self, produto):
+        """Preço unitário do produto conforme a forma de pagamento do orçamento"""
+        precos = {
+            'DINHEIRO': produto.preco_venda_dinheiro,
+            'DEBITO': produto.preco_venda_debito,
+            'CREDITO': produto.preco_venda_credito,
+            'ATACADO': produto.preco_atacado or produto.preco_venda_dinheiro,
+        }
+        return precos.get(self.forma_pagamento) or produto.preco_venda_dinheiro
+    
+    def set_itens(self, itens):
+        """
+        Substitui os itens do orçamento em lote
+        
+        Itens de produtos já presentes são atualizados (bulk_update), os
+        novos são criados (bulk_create) e os que ficaram de fora são
+        excluídos, assim como linhas repetidas do mesmo produto gravadas
+        antes. Os totais são recalculados uma única vez no final.
+        
+        Args:
+            itens: lista de dicts {produto (ou produto_id), quantidade,
+                   preco_unitario, desconto_item (opcional)}
+        
+        Returns:
+            Lista de ItemOrcamento na ordem recebida
+        
+        Raises:
+            ValueError: o mesmo produto aparece mais de uma vez
+        """
+        produtos_ids = [item.get('produto_id') or item['produto'].pk for item in itens]
+        produtos = Produto.objects.in_bulk(produtos_ids)
+        vistos = set()
+        for produto_id in produtos_ids:
+            if produto_id in vistos:
+                raise ValueError(f'Produto {produtos[produto_id].codigo} informado mais de uma vez')
+            vistos.add(produto_id)
+        
+        # Um item por produto; linhas repetidas entram direto na exclusão
+        existentes = {}
+        excluir = []
+        for item in self.itens.order_by('pk'):
+            if item.produto_id in existentes:
+                excluir.append(item.pk)
+            else:
+                existentes[item.produto_id] = item
+        
+        novos = []
+        alterados = []
+        resultado = []
+        for dados, produto_id in zip(itens, produtos_ids):
+            produto = produtos[produto_id]
+            item = existentes.pop(produto_id, None)
+            if item is None:
+                item = ItemOrcamento(orcamento=self, produto=produto)
+                novos.append(item)
+            else:
+                item.produto = produto
+                alterados.append(item)
+            item.quantidade = dados['quantidade']
+            item.preco_unitario = dados['preco_unitario']
+            item.desconto_item = dados.get('desconto_item') or Decimal('0')
+            item.calcular_total()
+            resultado.append(item)
+        
+        excluir += [item.pk for item in existentes.values()]
+        if excluir:
+            ItemOrcamento.objects.filter(pk__in=excluir).delete()
+        if alterados:
+            ItemOrcamento.objects.bulk_update(
+                alterados, ['quantidade', 'preco_unitario', 'desconto_item', 'total', 'estoque_disponivel']
+            )
+        if novos:
+            ItemOrcamento.objects.bulk_create(novos)
+        
+        self.calcular_totais()
+        return resultado
     
     def pode_converter(self):
         """Verifica se o orçamento pode ser convertido em venda"""
@@ -282,17 +407,33 @@ class ItemOrcamento(models.Model):
     def __str__(self):
         return f"{self.produto.codigo} - {self.quantidade}un"
     
-    def save(self, *args, **kwargs):
-        # Calcular total do item
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Total gravado, para atualizar o orçamento só pela diferença
+        instancia._total_salvo = instancia.__dict__.get('total')
+        return instancia
+    
+    def calcular_total(self):
+        """Total do item e estoque disponível no momento"""
         self.total = (self.preco_unitario * self.quantidade) - self.desconto_item
-        
-        # Armazenar estoque disponível no momento
         self.estoque_disponivel = self.produto.estoque_disponivel
+    
+    def save(self, *args, **kwargs):
+        self.calcular_total()
+        anterior = getattr(self, '_total_salvo', None) or Decimal('0')
         
         super().save(*args, **kwargs)
         
-        # Recalcular totais do orçamento
-        self.orcamento.calcular_totais()
+        # Atualizar totais do orçamento pela diferença
+        self.orcamento.aplicar_delta(self.total - anterior)
+        self._total_salvo = self.total
+    
+    def delete(self, *args, **kwargs):
+        total = getattr(self, '_total_salvo', None) or Decimal('0')
+        resultado = super().delete(*args, **kwargs)
+        self.orcamento.aplicar_delta(-total)
+        return resultado
     
     def tem_estoque(self):
         """Verifica se tem estoque suficiente"""
@@ -305,4 +446,62 @@ class ItemOrcamento(models.Model):
         elif self.produto.estoque_disponivel > 0:
             return 'PARCIAL'
         else:
-            return 'INDISPONIVEL'
\ No newline at end of file
+            return 'INDISPONIVEL'
+
+# ==========================================
+# FATOS DIÁRIOS DE VENDAS (RELATÓRIOS)
+# ==========================================
+class FatoVendaDia(models.Model):
+    """
+    Totais diários das vendas finalizadas por forma de pagamento.
+    Mantido por vendas.fatos (signals de Venda/ItemVenda) e reconstruído
+    pelo comando reconstruir_fatos_vendas.
+    """
+    data = models.DateField(verbose_name='Data')
+    forma_pagamento = models.CharField(max_length=2, choices=Venda.FORMA_PAGAMENTO_CHOICES,
+                                       verbose_name='Forma de Pagamento')
+    quantidade_vendas = models.IntegerField(default=0, verbose_name='Quantidade de Vendas')
+    valor_subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                         verbose_name='Subtotal')
+    valor_desconto = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                         verbose_name='Descontos')
+    valor_total = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                      verbose_name='Total')
+    
+    class Meta:
+        verbose_name = 'Fato de Venda (Dia)'
+        verbose_name_plural = 'Fatos de Venda (Dia)'
+        ordering = ['data', 'forma_pagamento']
+        unique_together = ['data', 'forma_pagamento']
+    
+    def __str__(self):
+        return f"{self.data} {self.forma_pagamento}: {self.valor_total}"
+
+
+class FatoVendaProdutoDia(models.Model):
+    """
+    Quantidade, faturamento e custo diários por produto e forma de pagamento
+    (somente vendas finalizadas)
+    """
+    data = models.DateField(verbose_name='Data')
+    produto = models.ForeignKey(Produto, on_delete=models.CASCADE,
+                                related_name='fatos_venda', verbose_name='Produto')
+    forma_pagamento = models.CharField(max_length=2, choices=Venda.FORMA_PAGAMENTO_CHOICES,
+                                       verbose_name='Forma de Pagamento')
+    quantidade = models.IntegerField(default=0, verbose_name='Quantidade')
+    valor_total = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                      verbose_name='Faturamento')
+    custo_total = models.DecimalField(max_digits=14, decimal_places=4, default=0,
+                                      verbose_name='Custo')
+    
+    class Meta:
+        verbose_name = 'Fato de Venda (Produto/Dia)'
+        verbose_name_plural = 'Fatos de Venda (Produto/Dia)'
+        ordering = ['data', 'produto']
+        unique_together = ['data', 'produto', 'forma_pagamento']
+        indexes = [
+            models.Index(fields=['produto', 'data']),
+        ]
+    
+    def __str__(self):
+        return f"{self.data} {self.produto_id}: {self.quantidade}"
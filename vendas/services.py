@@ -0,0 +1,283 @@
+"""
+Services do Módulo de Vendas
+
+Contém a lógica de negócio para:
+- Finalização de venda do PDV (itens, estoque, cascos e financeiro)
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+
+from clientes.models import Cliente
+from core.sequencias import proximo_valor
+from estoque.models import Produto, AmperagemBateria, MovimentacaoCasco
+from estoque.search import cache_codigo_barras
+from financeiro.models import ContaReceber, VendaParcelada, CategoriaReceita
+from . import fatos
+from .models import Venda, ItemVenda
+
+
+CPF_CLIENTE_GENERICO = '00000000000'
+
+# Forma de pagamento do PDV -> Venda.forma_pagamento
+MAPA_FORMA_PAGAMENTO_PDV = {
+    'DI': 'DI',  # Dinheiro
+    'PI': 'PI',  # PIX
+    'DB': 'CD',  # Débito
+    'CC': 'CC',  # Crédito à vista
+    'CP': 'CC',  # Crédito parcelado (ainda é cartão de crédito)
+    'CR': 'CR',  # Crediário
+}
+
+def _ultimo_numero_venda():
+    """Maior número V000000 já usado (executado só ao criar a sequência)"""
+    numeros = Venda.objects.filter(numero__regex=r'^V[0-9]+$').values_list('numero', flat=True)
+    return max((int(numero[1:]) for numero in numeros), default=0)
+
+
+def gerar_numero_venda():
+    """Próximo número de venda (V000001) a partir da sequência 'venda'"""
+    return f"V{proximo_valor('venda', inicial=_ultimo_numero_venda):06d}"
+
+
+# Os dois registros abaixo são lidos a cada venda (1 SELECT quando já
+# existem). Não ficam em cache no processo: se a venda que os criou for
+# desfeita, a instância guardada apontaria para uma linha inexistente.
+
+def get_cliente_generico():
+    """Cliente usado nas vendas sem identificação"""
+    cliente, _ = Cliente.objects.get_or_create(
+        cpf_cnpj=CPF_CLIENTE_GENERICO,
+        defaults={
+            'nome': 'Cliente não identificado',
+            'ativo': True
+        }
+    )
+    return cliente
+
+
+def get_categoria_receita_vendas():
+    """Categoria de receita padrão das vendas de peças"""
+    categoria, _ = CategoriaReceita.objects.get_or_create(
+        nome='Vendas de Peças',
+        defaults={
+            'tipo': 'VENDA',
+            'icone': 'bi-box-seam',
+            'cor': '#22c55e'
+        }
+    )
+    return categoria
+
+
+class VendaPDVService:
+    """
+    Finalização de venda do PDV em lote
+
+    Todos os produtos são lidos com um único in_bulk, os itens e as
+    movimentações de casco são gravados com bulk_create e o estoque é
+    baixado com um único UPDATE atômico (F()), sem ler e regravar a linha.
+    """
+
+    def __init__(self, usuario: User = None):
+        self.usuario = usuario
+        self.errors = []
+        self.warnings = []
+
+    @transaction.atomic
+    def finalizar(self, itens: List[Dict], forma_pagamento: str, cliente_id=None,
+                  subtotal=Decimal('0'), desconto=Decimal('0'), total=Decimal('0'),
+                  parcelas: int = 1, observacoes: str = '') -> Venda:
+        """
+        Grava a venda finalizada
+
+        Args:
+            itens: [{id, quantidade, preco, is_bateria, info_casco}]
+            forma_pagamento: Código do PDV (DI, PI, DB, CC, CP, CR)
+
+        Returns:
+            Venda criada (avisos de estoque em self.warnings)
+
+        Raises:
+            ValueError: Produto inexistente ou quantidade inválida
+        """
+        self.errors = []
+        self.warnings = []
+
+        # ========== ITENS E PRODUTOS (1 query) ==========
+        linhas = []
+        for item in itens:
+            quantidade = int(Decimal(str(item['quantidade'])))
+            if quantidade <= 0:
+                raise ValueError('Quantidade inválida no carrinho')
+            linhas.append((int(item['id']), quantidade, Decimal(str(item['preco'])), item))
+
+        produtos = Produto.objects.select_related('amperagem_bateria').in_bulk(
+            {produto_id for produto_id, _, _, _ in linhas}
+        )
+        faltando = [str(pid) for pid, _, _, _ in linhas if pid not in produtos]
+        if faltando:
+            raise ValueError(f"Produto(s) não encontrado(s): {', '.join(faltando)}")
+
+        baixas = {}
+        for produto_id, quantidade, _, _ in linhas:
+            baixas[produto_id] = baixas.get(produto_id, 0) + quantidade
+
+        for produto_id, quantidade in baixas.items():
+            produto = produtos[produto_id]
+            if (produto.estoque_atual or 0) < quantidade:
+                self.warnings.append(
+                    f'{produto.descricao}: estoque {produto.estoque_atual or 0}, vendido {quantidade}'
+                )
+
+        # ========== VENDA ==========
+        numero_venda = gerar_numero_venda()
+
+        cliente = None
+        if cliente_id:
+            cliente = Cliente.objects.filter(id=cliente_id).first()
+        if not cliente:
+            cliente = get_cliente_generico()
+
+        venda = Venda.objects.create(
+            numero=numero_venda,
+            cliente=cliente,
+            forma_pagamento=MAPA_FORMA_PAGAMENTO_PDV.get(forma_pagamento, 'DI'),
+            status='F',  # Finalizada
+            subtotal=subtotal,
+            desconto=desconto,
+            total=total,
+            observacoes=observacoes,
+            vendedor=self.usuario.username if self.usuario else ''
+        )
+
+        itens_venda = ItemVenda.objects.bulk_create([
+            ItemVenda(
+                venda=venda,
+                produto=produtos[produto_id],
+                quantidade=quantidade,
+                valor_unitario=preco,
+                total=preco * quantidade,
+                custo_unitario=produtos[produto_id].preco_custo or Decimal('0')
+            )
+            for produto_id, quantidade, preco, _ in linhas
+        ])
+        
+        # Fatos diários dos itens (bulk_create não dispara os signals;
+        # o cabeçalho já entrou pelo post_save da Venda)
+        fatos.registrar_itens(venda, itens_venda)
+
+        # ========== BAIXA DE ESTOQUE (1 UPDATE) ==========
+        Produto.objects.filter(pk__in=baixas).update(
+            estoque_atual=Case(
+                *[When(pk=pk, then=F('estoque_atual') - qtd) for pk, qtd in baixas.items()],
+                output_field=IntegerField(),
+            ),
+            data_atualizacao=timezone.now()
+        )
+        transaction.on_commit(lambda: [
+            cache_codigo_barras.invalidar_produto(pk) for pk in baixas
+        ])
+
+        # ========== CASCOS (BATERIAS) ==========
+        MovimentacaoCasco.registrar_em_lote(
+            self._movimentacoes_casco(venda, linhas, produtos)
+        )
+
+        # ========== FINANCEIRO ==========
+        categoria_receita = get_categoria_receita_vendas()
+
+        if forma_pagamento == 'CR' and parcelas > 0:
+            venda_parcelada = VendaParcelada.objects.create(
+                descricao=f'Venda {numero_venda}',
+                categoria=categoria_receita,
+                cliente=cliente,
+                venda=venda,
+                valor_total=total,
+                numero_parcelas=parcelas,
+                data_primeira_parcela=date.today() + timedelta(days=30),
+                intervalo_tipo='MENSAL',
+                forma_cobranca='FIADO',
+                usuario_cadastro=self.usuario
+            )
+            venda_parcelada.gerar_parcelas()
+
+        # Cartão parcelado: a administradora paga à vista, receita única
+        elif forma_pagamento in ['DI', 'PI', 'DB', 'CC', 'CP']:
+            ContaReceber.objects.create(
+                descricao=f'Venda {numero_venda}',
+                categoria=categoria_receita,
+                tipo='VENDA',
+                valor=total,
+                data_vencimento=date.today(),
+                data_recebimento=date.today(),
+                status='RECEBIDO',
+                forma_cobranca='DINHEIRO' if forma_pagamento in ['DI', 'PI'] else 'CARTAO',
+                cliente=cliente if cliente.cpf_cnpj != CPF_CLIENTE_GENERICO else None,
+                venda=venda,
+                valor_recebido=total,
+                usuario_cadastro=self.usuario
+            )
+
+        return venda
+
+    def _movimentacoes_casco(self, venda, linhas, produtos) -> List[MovimentacaoCasco]:
+        """Monta (sem gravar) as movimentações de casco dos itens de bateria"""
+        ids_casco = {
+            item.get('info_casco', {}).get('amperagem_casco_id')
+            for _, _, _, item in linhas
+            if item.get('is_bateria') and item.get('info_casco')
+        }
+        ids_casco.discard(None)
+        ids_casco.discard('')
+        amperagens = AmperagemBateria.objects.in_bulk(ids_casco) if ids_casco else {}
+
+        movimentacoes = []
+        for produto_id, quantidade, _, item in linhas:
+            amperagem_vendida = produtos[produto_id].amperagem_bateria
+            if not item.get('is_bateria') or not amperagem_vendida:
+                continue
+
+            info_casco = item.get('info_casco') or {}
+            base = {
+                'quantidade': quantidade,
+                'usuario': self.usuario,
+                'venda': venda,
+            }
+
+            if info_casco.get('trouxe_casco', False):
+                amperagem_casco_id = info_casco.get('amperagem_casco_id')
+                amperagem_casco = amperagens.get(int(amperagem_casco_id)) if amperagem_casco_id else None
+
+                # Mesma amperagem: entra e sai igual, não movimenta
+                if amperagem_casco and amperagem_casco.id != amperagem_vendida.id:
+                    movimentacoes.append(MovimentacaoCasco(
+                        amperagem=amperagem_vendida,
+                        tipo='S',
+                        motivo='VENDA_COM_TROCA',
+                        observacao=f'Venda {venda.numero} - Troca por casco {amperagem_casco.amperagem}',
+                        **base
+                    ))
+                    movimentacoes.append(MovimentacaoCasco(
+                        amperagem=amperagem_casco,
+                        tipo='E',
+                        motivo='VENDA_COM_TROCA',
+                        observacao=f'Venda {venda.numero} - Casco recebido em troca de {amperagem_vendida.amperagem}',
+                        **base
+                    ))
+            else:
+                # Cliente NÃO trouxe casco - diminui estoque de casco
+                movimentacoes.append(MovimentacaoCasco(
+                    amperagem=amperagem_vendida,
+                    tipo='S',
+                    motivo='VENDA_SEM_TROCA',
+                    observacao=f'Venda {venda.numero} - Sem troca de casco',
+                    **base
+                ))
+
+        return movimentacoes
@@ -0,0 +1,120 @@
+"""
+Signals de vendas: mantêm os fatos diários (vendas.fatos) em qualquer
+gravação de Venda/ItemVenda pelo ORM — PDV, telas de edição, admin e API
+
+O estado anterior é lido do banco no pre_save (uma consulta por gravação)
+e o post_save aplica só a diferença:
+- Venda: o cabeçalho sai da chave antiga (dia, forma) e entra na nova; se
+  a chave mudou (finalizada, cancelada, reaberta, outra forma de
+  pagamento), os itens já gravados mudam junto
+- ItemVenda: o item antigo sai e o novo entra, se a venda está finalizada
+
+Ao excluir uma venda, os itens são excluídos antes (CASCADE) e cada um
+sai dos fatos pelo próprio signal; a venda tira só o cabeçalho.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import fatos
+from .models import ItemVenda, Venda
+
+
+CAMPOS_VENDA = ('status', 'data_venda', 'forma_pagamento', 'subtotal', 'desconto', 'total')
+
+
+# ==========================================
+# VENDA
+# ==========================================
+
+@receiver(pre_save, sender=Venda)
+def guardar_venda_anterior(sender, instance, raw=False, **kwargs):
+    instance._fato_anterior = None
+    if instance.pk and not raw:
+        instance._fato_anterior = Venda.objects.filter(pk=instance.pk).values(*CAMPOS_VENDA).first()
+
+
+@receiver(post_save, sender=Venda)
+def atualizar_fatos_venda(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_fato_anterior', None)
+    instance._fato_anterior = None
+
+    chave_nova = fatos.chave_da_venda(instance)
+    chave_antiga = None
+    if anterior:
+        chave_antiga = fatos.chave(anterior['status'], anterior['data_venda'], anterior['forma_pagamento'])
+        cabecalho_antigo = (anterior['subtotal'], anterior['desconto'], anterior['total'])
+    cabecalho_novo = (instance.subtotal, instance.desconto, instance.total)
+
+    # Nada que conte nos fatos mudou (ex.: observações, cliente)
+    if chave_antiga == chave_nova and (chave_nova is None or cabecalho_antigo == cabecalho_novo):
+        return
+
+    if chave_antiga:
+        fatos.somar_cabecalho(chave_antiga, -1, *cabecalho_antigo)
+    if chave_nova:
+        fatos.somar_cabecalho(chave_nova, 1, *cabecalho_novo)
+
+    if chave_antiga != chave_nova:
+        itens = list(instance.itens.select_related('produto'))
+        fatos.somar_itens(chave_antiga, itens, -1)
+        fatos.somar_itens(chave_nova, itens, 1)
+
+
+@receiver(post_delete, sender=Venda)
+def remover_fatos_venda(sender, instance, **kwargs):
+    chave_fato = fatos.chave_da_venda(instance)
+    if chave_fato:
+        fatos.somar_cabecalho(chave_fato, -1, instance.subtotal, instance.desconto, instance.total)
+
+
+# ==========================================
+# ITEM DE VENDA
+# ==========================================
+
+def _chave_venda(venda_id):
+    valores = Venda.objects.filter(pk=venda_id).values('status', 'data_venda', 'forma_pagamento').first()
+    return fatos.chave(**valores) if valores else None
+
+
+def _chave_do_item(item):
+    venda = item._state.fields_cache.get('venda')
+    if venda is not None and venda.pk == item.venda_id:
+        return fatos.chave_da_venda(venda)
+    return _chave_venda(item.venda_id)
+
+
+def _mesmo_item(anterior, atual):
+    campos = ('venda_id', 'produto_id', 'quantidade', 'total', 'custo_unitario')
+    return all(getattr(anterior, campo) == getattr(atual, campo) for campo in campos)
+
+
+@receiver(pre_save, sender=ItemVenda)
+def guardar_item_anterior(sender, instance, raw=False, **kwargs):
+    instance._fato_anterior = None
+    if instance.pk and not raw:
+        instance._fato_anterior = ItemVenda.objects.filter(pk=instance.pk).select_related('produto').first()
+
+
+@receiver(post_save, sender=ItemVenda)
+def atualizar_fatos_item(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_fato_anterior', None)
+    instance._fato_anterior = None
+
+    if anterior is not None and _mesmo_item(anterior, instance):
+        return
+
+    chave_nova = _chave_do_item(instance)
+    if anterior is not None:
+        chave_antiga = chave_nova if anterior.venda_id == instance.venda_id else _chave_venda(anterior.venda_id)
+        fatos.somar_itens(chave_antiga, [anterior], -1)
+    fatos.somar_itens(chave_nova, [instance], 1)
+
+
+@receiver(post_delete, sender=ItemVenda)
+def remover_fatos_item(sender, instance, **kwargs):
+    fatos.somar_itens(_chave_do_item(instance), [instance], -1)